@@ -52,6 +52,9 @@ try:
 except ImportError:
     KittenTTS = None
 
+from funtts.tts.router import RouterTTS
+from funtts.tts.synthetic import SyntheticTTS
+
 __all__ = [
     "BaseTTS",
     "TTSFactory",
@@ -67,6 +70,8 @@ __all__ = [
     "TortoiseTTS",
     "IndexTTS2",
     "KittenTTS",
+    "RouterTTS",
+    "SyntheticTTS",
     "create_tts",
     "get_available_engines",
     "merge_audio_files",
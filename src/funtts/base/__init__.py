@@ -1,4 +1,18 @@
 from .base import BaseTTS
+from .circuit_breaker import CircuitBreaker
+from .hedging import HedgePolicy
+from .rate_limiter import AdaptiveConcurrency, RateLimiter, TokenBucket
+from .scheduler import RequestScheduler
+from .single_flight import SingleFlight
 
 
-__all__ = ["BaseTTS"]
+__all__ = [
+    "BaseTTS",
+    "CircuitBreaker",
+    "HedgePolicy",
+    "RateLimiter",
+    "TokenBucket",
+    "AdaptiveConcurrency",
+    "SingleFlight",
+    "RequestScheduler",
+]
@@ -1,24 +1,104 @@
+import asyncio
 import time
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import replace
+from functools import partial
+from typing import Callable, Optional, Dict, Any, List
 from funtts.models import VoiceInfo, TTSRequest, TTSResponse, SubtitleMaker
+from funtts.utils.file_utils import is_temp_file, materialize_file
+from funtts.utils.output_writer import OutputWriter, get_output_writer
+from funtts.utils.workspace import get_workspace
 from funutil import getLogger
 
+from .circuit_breaker import CircuitBreaker
+from .hedging import HedgeAttempt, HedgePolicy
+from .rate_limiter import Permit, RateLimiter
+from .single_flight import SingleFlight
+
 
 logger = getLogger("funtts")
 
+# 输出格式对应的MIME类型
+_CONTENT_TYPES = {
+    "wav": "audio/wav",
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "flac": "audio/flac",
+    "aac": "audio/aac",
+    "m4a": "audio/mp4",
+}
+
+# 当前请求收到第一块音频时的回调，由对冲策略为每次尝试设置
+_first_audio: ContextVar[Optional[Callable[[], None]]] = ContextVar(
+    "funtts_first_audio", default=None
+)
+# 当前请求中引擎开始执行（取得限流许可）的时间，用于熔断器的耗时统计
+_engine_started: ContextVar[Optional[List[float]]] = ContextVar(
+    "funtts_engine_started", default=None
+)
+
 
 class BaseTTS(ABC):
     # ==================== 类变量 ====================
     supported_formats: List[str] = ["wav"]  # 子类可以重写
     supports_subtitles: bool = True  # 子类可以重写
+    output_writer: Optional[OutputWriter] = None  # 后台输出写入器，None表示同步输出
+    rate_limiter: Optional[RateLimiter] = None  # 限流器，None表示不限流
+    hedge_policy: Optional[HedgePolicy] = None  # 对冲请求策略，None表示不对冲
+    circuit_breaker: Optional[CircuitBreaker] = None  # 熔断器，None表示不熔断
+    fallback: Optional["BaseTTS"] = None  # 熔断期间转交请求的备用引擎
+    single_flight: Optional[SingleFlight] = None  # 请求合并，None表示不合并
 
     def __init__(self, *args, **kwargs):
         """初始化TTS基类
 
         子类可以根据需要重写此方法来处理特定的初始化参数
+
+        Args:
+            **kwargs: 通用配置参数，包括:
+                - output_writer: 后台输出写入器，设置后输出文件在响应返回后异步写入
+                - async_output: 为True时使用全局后台输出写入器
+                - rate_limiter: 限流器实例，可在多个引擎实例间共享
+                - rate_limit: 限流参数字典，按RateLimiter的参数创建限流器，
+                  如 {"requests_per_second": 20, "chars_per_second": 5000}
+                - hedge_policy: 对冲请求策略实例
+                - hedge: 对冲参数字典，按HedgePolicy的参数创建策略，
+                  如 {"percentile": 95, "budget": 0.05}
+                - circuit_breaker: 熔断器实例
+                - circuit: 熔断参数字典，按CircuitBreaker的参数创建熔断器，
+                  如 {"failure_rate_threshold": 0.5, "open_seconds": 30}
+                - fallback: 熔断期间转交请求的备用引擎
+                - coalesce: 为True时合并同时进行的相同请求
         """
-        pass
+        if kwargs.get("output_writer") is not None:
+            self.output_writer = kwargs["output_writer"]
+        elif kwargs.get("async_output"):
+            self.output_writer = get_output_writer()
+
+        if kwargs.get("rate_limiter") is not None:
+            self.rate_limiter = kwargs["rate_limiter"]
+        elif kwargs.get("rate_limit"):
+            self.rate_limiter = RateLimiter(**kwargs["rate_limit"])
+
+        if kwargs.get("hedge_policy") is not None:
+            self.hedge_policy = kwargs["hedge_policy"]
+        elif kwargs.get("hedge"):
+            self.hedge_policy = HedgePolicy(**kwargs["hedge"])
+
+        if kwargs.get("circuit_breaker") is not None:
+            self.circuit_breaker = kwargs["circuit_breaker"]
+        elif kwargs.get("circuit"):
+            self.circuit_breaker = CircuitBreaker(
+                **{"name": self.__class__.__name__, **kwargs["circuit"]}
+            )
+        if kwargs.get("fallback") is not None:
+            self.fallback = kwargs["fallback"]
+
+        if kwargs.get("coalesce"):
+            self.single_flight = SingleFlight()
 
     # ==================== 核心抽象方法 ====================
 
@@ -27,6 +107,9 @@ class BaseTTS(ABC):
         """语音合成核心方法，子类必须实现（内部方法）
 
         这是纯粹的合成逻辑，子类只需要实现核心功能。
+        请求中指定了output_file时，应尽量直接写入该路径；否则使用
+        funtts.utils.file_utils.create_temp_file创建临时文件，
+        基类会将其移动（而不是复制）到最终位置。
         返回的TTSResponse对象必须设置以下字段：
         - success: bool - 是否成功
         - audio_file: Optional[str] - 音频文件路径
@@ -48,6 +131,36 @@ class BaseTTS(ABC):
         """
         raise NotImplementedError("子类必须实现_synthesize方法")
 
+    async def _asynthesize(self, request: TTSRequest) -> TTSResponse:
+        """语音合成核心方法的原生异步实现，可选（内部方法）
+
+        基于asyncio的网络引擎可以实现此方法，要求与_synthesize相同。
+        配置了对冲策略时，实现了此方法的引擎在事件循环中执行主请求和对冲请求，
+        被放弃的一方会被取消（关闭连接），而不是在线程中执行完后丢弃；
+        被取消时实现应删除已经写入的临时文件。
+
+        Args:
+            request: TTS请求对象
+
+        Returns:
+            TTS响应对象
+        """
+        raise NotImplementedError("该引擎没有原生异步实现")
+
+    def _has_native_async(self) -> bool:
+        """是否实现了_asynthesize"""
+        return type(self)._asynthesize is not BaseTTS._asynthesize
+
+    @staticmethod
+    def _first_audio_callback() -> Callable[[], None]:
+        """当前请求收到第一块音频时应调用的回调
+
+        能观察到音频分块返回的引擎在_synthesize/_asynthesize中收到第一块音频时调用，
+        对冲策略据此按首字节时间决定是否发起对冲请求。回调绑定在当前上下文上，
+        需要在SDK的回调线程中调用时，应在合成开始前获取。
+        """
+        return _first_audio.get() or _no_op
+
     @abstractmethod
     def list_voices(self, language: Optional[str] = None) -> List[VoiceInfo]:
         """获取可用语音列表，子类必须实现
@@ -79,16 +192,86 @@ class BaseTTS(ABC):
 
     # ==================== 公共方法 ====================
 
+    def set_output_writer(self, output_writer: Optional[OutputWriter]):
+        """设置后台输出写入器
+
+        Args:
+            output_writer: 写入器实例，None表示恢复同步输出
+        """
+        self.output_writer = output_writer
+
+    def flush_outputs(self, timeout: Optional[float] = None) -> bool:
+        """等待所有后台输出写入完成
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+
+        Returns:
+            bool: 是否在超时前全部完成
+        """
+        if self.output_writer is None:
+            return True
+        return self.output_writer.flush(timeout)
+
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        """设置限流器
+
+        Args:
+            rate_limiter: 限流器实例，None表示不限流
+        """
+        self.rate_limiter = rate_limiter
+
+    def get_rate_limit_state(self) -> Optional[Dict[str, Any]]:
+        """获取限流器当前状态（令牌、并发上限、在途请求数、结果统计）
+
+        Returns:
+            状态字典，未配置限流器时返回None
+        """
+        if self.rate_limiter is None:
+            return None
+        return self.rate_limiter.state()
+
+    def set_hedge_policy(self, hedge_policy: Optional[HedgePolicy]):
+        """设置对冲请求策略
+
+        Args:
+            hedge_policy: 策略实例，None表示不对冲
+        """
+        self.hedge_policy = hedge_policy
+
+    def get_hedge_stats(self) -> Optional[Dict[str, Any]]:
+        """获取对冲统计（当前等待时间、对冲次数、对冲胜出次数）
+
+        Returns:
+            统计字典，未配置对冲策略时返回None
+        """
+        if self.hedge_policy is None:
+            return None
+        return self.hedge_policy.stats()
+
+    def get_coalescing_stats(self) -> Optional[Dict[str, int]]:
+        """获取请求合并统计（执行次数、被合并的请求数）
+
+        Returns:
+            统计字典，未开启请求合并时返回None
+        """
+        if self.single_flight is None:
+            return None
+        return self.single_flight.stats()
+
     # ==================== 可重写的方法 ====================
 
     def get_engine_info(self) -> Dict[str, Any]:
         """获取引擎信息"""
-        return {
+        info = {
             "engine_name": self.__class__.__name__,
             "default_voice": self.get_default_voice(),
             "supported_formats": self.supported_formats,
             "supports_subtitles": self.supports_subtitles,
         }
+        if self.circuit_breaker is not None:
+            info["circuit_breaker"] = self.circuit_breaker.stats()
+        return info
 
     # ==================== 便捷方法 ====================
 
@@ -127,14 +310,24 @@ class BaseTTS(ABC):
             logger.error(f"检查语音可用性失败: {str(e)}")
             return False
 
-    # ==================== 流式接口（预留） ====================
+    # ==================== 流式接口 ====================
 
     def synthesize_stream(self, request: TTSRequest):
-        """流式语音合成接口（预留，暂不实现）
+        """流式语音合成接口，支持流式输出的引擎重写此方法
 
-        未来实现时将调用_synthesize方法进行流式处理
+        实现应为生成器，在合成过程中逐块产出事件字典：
+        - {"type": "audio", "data": bytes}：音频数据块
+        - {"type": "WordBoundary", "start_time": float, "end_time": float,
+          "text": str}：词边界，时间单位为秒
         """
-        raise NotImplementedError("流式接口暂未实现")
+        raise NotImplementedError("该引擎不支持流式合成")
+
+    def stream_content_type(self, request: TTSRequest) -> str:
+        """synthesize_stream产出的音频数据的MIME类型
+
+        默认按请求的output_format推断，产出格式与请求不同的引擎重写此方法。
+        """
+        return _CONTENT_TYPES.get(request.output_format, "application/octet-stream")
 
     # ==================== 对外接口方法 ====================
     def synthesize(self, request: TTSRequest) -> TTSResponse:
@@ -148,12 +341,25 @@ class BaseTTS(ABC):
         5. 处理字幕文件生成
         6. 异常处理和错误响应
 
+        配置了output_writer时，第4、5步在响应返回后由后台写入器执行，
+        响应中的文件路径仍会立即设置，可通过response.wait_outputs()等待写入完成。
+        配置了hedge_policy时，第2步按对冲策略执行（见_synthesize_hedged）。
+        配置了circuit_breaker时，熔断期间不调用第2步，直接返回CIRCUIT_OPEN错误响应，
+        或在配置了fallback时转交给备用引擎。
+        配置了single_flight时，同时进行的相同请求共享一次第2步的结果（见_coalesced_call）。
+
         Args:
             request: TTS请求对象
 
         Returns:
             完整的TTS响应对象
         """
+        # 合成失败时没有交给响应的临时文件在结束时释放
+        with get_workspace().track():
+            return self._synthesize_tracked(request)
+
+    def _synthesize_tracked(self, request: TTSRequest) -> TTSResponse:
+        """synthesize的处理流程，在临时工作区的跟踪范围内执行"""
         start_time = time.time()
 
         try:
@@ -167,56 +373,21 @@ class BaseTTS(ABC):
                     processing_time=time.time() - start_time,
                 )
 
-            # 调用子类实现的核心合成方法
-            response = self._synthesize(request)
-
-            # 设置公共信息
-            response.request = request
-            response.processing_time = time.time() - start_time
-            response.engine_info.update(self.get_engine_info())
-
-            # 处理输出文件
-            if response.success and request.output_file and response.audio_file:
-                if response.audio_file != request.output_file:
-                    # 复制文件到指定位置
-                    import shutil
-
-                    shutil.copy2(response.audio_file, request.output_file)
-                    response.audio_file = request.output_file
-
-            # 处理字幕文件
-            if (
-                response.success
-                and request.generate_subtitles
-                and response.subtitle_maker
-                and response.audio_file
-            ):
-                # 使用SubtitleMaker的统一文件命名策略
-                # 1. 保存FRT格式（完整数据）
-                frt_file = SubtitleMaker.generate_subtitle_filename(
-                    response.audio_file, "frt"
-                )
-                response.subtitle_maker.save_to_file(frt_file, "frt")
-                response.frt_subtitle_file = frt_file
-                logger.success(f"FRT字幕文件已保存: {frt_file}")
-
-                # 2. 保存标准格式（兼容性）
-                standard_file = SubtitleMaker.generate_subtitle_filename(
-                    response.audio_file, request.subtitle_format
-                )
-                response.subtitle_maker.save_to_file(
-                    standard_file, request.subtitle_format
-                )
-                response.subtitle_file = standard_file
-                logger.success(
-                    f"{request.subtitle_format.upper()}字幕文件已保存: {standard_file}"
-                )
+            # 熔断期间快速失败，不再占用并发和等待超时
+            breaker = self.circuit_breaker
+            if breaker is not None and not breaker.allow():
+                return self._circuit_open_response(request, start_time)
 
-                logger.success(
-                    f"字幕文件生成完成: FRT格式({frt_file}) + {request.subtitle_format.upper()}格式({standard_file})"
-                )
+            # 调用子类实现的核心合成方法
+            shared = False
+            if self.single_flight is not None:
+                response, shared = self._coalesced_call(request)
+            else:
+                response = self._dispatch_recorded(request)
 
-            return response
+            if shared:
+                response = self._share_response(request, response)
+            return self._complete_response(request, response, start_time)
 
         except Exception as e:
             logger.error(f"TTS处理失败: {str(e)}")
@@ -229,6 +400,440 @@ class BaseTTS(ABC):
                 engine_info=self.get_engine_info(),
             )
 
+    async def asynthesize(self, request: TTSRequest) -> TTSResponse:
+        """异步语音合成（对外接口）
+
+        在线程池中执行synthesize，限流器对同步和异步调用统一生效。
+
+        Args:
+            request: TTS请求对象
+
+        Returns:
+            完整的TTS响应对象
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.synthesize, request)
+
+    def _circuit_open_response(
+        self, request: TTSRequest, start_time: float
+    ) -> TTSResponse:
+        """熔断期间的响应：转交备用引擎，或返回CIRCUIT_OPEN错误"""
+        if self.fallback is not None:
+            response = self.fallback.synthesize(request)
+            response.engine_info["fallback_from"] = self.__class__.__name__
+            return response
+        return TTSResponse(
+            success=False,
+            request=request,
+            error_message=f"{self.__class__.__name__} 已熔断，请求被快速拒绝",
+            error_code="CIRCUIT_OPEN",
+            processing_time=time.time() - start_time,
+            engine_info=self.get_engine_info(),
+        )
+
+    def synthesize_batch(self, requests: List[TTSRequest]) -> List[TTSResponse]:
+        """批量语音合成（对外接口）
+
+        默认逐个调用synthesize，能够合并请求的引擎可以重写此方法，
+        例如把多个短文本打包进一次服务端调用。
+
+        Args:
+            requests: TTS请求列表
+
+        Returns:
+            与请求一一对应的响应列表
+        """
+        return [self.synthesize(request) for request in requests]
+
+    @staticmethod
+    def _pack_requests(
+        requests: List[TTSRequest],
+        indexes: List[int],
+        max_count: int,
+        max_chars: int,
+    ) -> List[List[int]]:
+        """按数量和字符数上限把请求分包，供引擎实现批量合成
+
+        Args:
+            requests: TTS请求列表
+            indexes: 需要分包的请求序号
+            max_count: 每包最多的请求数
+            max_chars: 每包最多的字符数（单个超长请求单独成包）
+
+        Returns:
+            分包后的请求序号列表
+        """
+        packs: List[List[int]] = []
+        current: List[int] = []
+        chars = 0
+        for index in indexes:
+            length = len(requests[index].text)
+            if current and (len(current) >= max_count or chars + length > max_chars):
+                packs.append(current)
+                current, chars = [], 0
+            current.append(index)
+            chars += length
+        if current:
+            packs.append(current)
+        return packs
+
+    def _dispatch(self, request: TTSRequest) -> TTSResponse:
+        """按对冲策略（如果配置）调用核心合成方法"""
+        if self.hedge_policy is not None:
+            return self._synthesize_hedged(request)
+        return self._call_engine(request)
+
+    def _dispatch_recorded(self, request: TTSRequest) -> TTSResponse:
+        """调用_dispatch，并把结果记入熔断器（如果配置）
+
+        耗时从引擎开始执行（取得限流许可）时算起，限流等待和合并等待不计入，
+        避免排队延迟被当作后端过慢；对冲时从第一个请求开始执行时算起。
+        """
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return self._dispatch(request)
+        started: List[float] = []
+        token = _engine_started.set(started)
+        try:
+            response = self._dispatch(request)
+        except Exception:
+            breaker.record(False, _elapsed_since(started))
+            raise
+        finally:
+            _engine_started.reset(token)
+        breaker.record(response.success, _elapsed_since(started))
+        return response
+
+    def _coalesced_call(self, request: TTSRequest):
+        """合并同时进行的相同请求
+
+        以请求的规范哈希为键，同一时刻只有一个调用真正执行。
+        执行时不写入output_file，结果文件留在临时工作区并绑定到共享的原始响应，
+        所有调用方使用完后释放。只有真正执行的调用把结果记入熔断器，
+        其他调用方归还各自的放行许可。
+
+        Returns:
+            (原始响应, 是否与其他调用方共享)
+        """
+        attempt = replace(request, output_file=None)
+        executed = []
+
+        def run() -> TTSResponse:
+            executed.append(True)
+            return get_workspace().attach(self._dispatch_recorded(attempt))
+
+        try:
+            return self.single_flight.do(
+                request.cache_key(self.__class__.__name__), run
+            )
+        finally:
+            if not executed and self.circuit_breaker is not None:
+                self.circuit_breaker.release()
+
+    @staticmethod
+    def _share_response(request: TTSRequest, shared: TTSResponse) -> TTSResponse:
+        """为共享结果的调用方创建独立的响应对象
+
+        需要输出文件时复制一份，共享的临时文件保持不变。
+        """
+        response = replace(shared, engine_info=dict(shared.engine_info))
+        response.engine_info["coalesced"] = True
+        if response.success and response.audio_file and request.output_file:
+            materialize_file(response.audio_file, request.output_file)
+            response.audio_file = request.output_file
+        return response
+
+    def _call_engine(self, request: TTSRequest) -> TTSResponse:
+        """按限流器的令牌和并发上限调用核心合成方法"""
+        with self._limited(len(request.text)) as permit:
+            _mark_engine_started()
+            response = self._synthesize(request)
+            permit.record(response)
+        return response
+
+    def _synthesize_hedged(self, request: TTSRequest) -> TTSResponse:
+        """按对冲策略执行核心合成（同步入口，竞争过程见_race_hedged）"""
+        race = self._race_hedged(request)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(race)
+        # 同步接口被事件循环线程直接调用时，在单独的线程中运行竞争；
+        # 不使用策略的线程池，竞争中的请求还需要占用它
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(copy_context().run, asyncio.run, race).result()
+
+    async def _race_hedged(self, request: TTSRequest) -> TTSResponse:
+        """对冲竞争
+
+        主请求开始执行后，在对冲等待时间内既没有收到第一块音频也没有结束，
+        且预算允许时，向同一引擎（或备用引擎）发起副本请求，先成功的结果被采用，
+        另一个被取消；都失败时返回主请求的结果。
+
+        - 等待时间从主请求开始执行时算起，在线程池中排队的时间不计入等待时间和延迟样本
+        - 通过_first_audio_callback报告首个音频块的引擎（Edge、Azure、合成测试引擎）
+          按首字节时间触发对冲；其他引擎观察不到首字节，按完成时间触发
+        - 实现了_asynthesize的引擎在事件循环中执行，被放弃的请求被取消；
+          其他引擎在策略的线程池中执行，被放弃的请求尚未开始时取消，
+          已经开始的无法中断，完成后删除其临时文件
+        """
+        policy = self.hedge_policy
+        policy.on_request()
+        # 两个请求可能同时写文件：都写入临时文件，由采用的结果移动到最终位置
+        attempt_request = replace(request, output_file=None)
+
+        primary = self._start_attempt(attempt_request, policy.executor, policy)
+        attempts = {primary.task: (primary, self)}
+        await primary.started.wait()
+        try:
+            await asyncio.wait_for(primary.progressed.wait(), policy.delay())
+        except asyncio.TimeoutError:
+            if policy.try_hedge():
+                engine = policy.alternate or self
+                hedge_request = attempt_request
+                if policy.alternate is not None:
+                    hedge_request = replace(
+                        attempt_request, voice_name=policy.alternate_voice
+                    )
+                logger.info(
+                    f"请求超过对冲等待时间，发起对冲请求: {engine.__class__.__name__}"
+                )
+                hedge = engine._start_attempt(hedge_request, policy.executor)
+                attempts[hedge.task] = (hedge, engine)
+
+        winner: Optional[asyncio.Task] = None
+        pending = set(attempts)
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None and task.result().success:
+                    winner = task
+                    break
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            # 等待被取消的请求关闭连接、删除临时文件
+            await asyncio.wait(pending)
+        for task in attempts:
+            if task is not winner and not task.cancelled():
+                if task.exception() is None:
+                    _discard_response(task.result())
+
+        if winner is None:
+            # 都失败：返回主请求的结果或抛出其异常
+            return primary.task.result()
+
+        response = winner.result()
+        if len(attempts) > 1:
+            response.engine_info["hedged"] = True
+            if winner is not primary.task:
+                policy.record_hedge_win()
+                engine = attempts[winner][1]
+                response.engine_info["hedge_winner"] = engine.__class__.__name__
+        return response
+
+    def _start_attempt(
+        self,
+        request: TTSRequest,
+        executor: Executor,
+        policy: Optional[HedgePolicy] = None,
+    ) -> HedgeAttempt:
+        """在当前事件循环中启动对冲竞争中的一次请求
+
+        Args:
+            request: 请求（不含output_file）
+            executor: 执行同步引擎和等待限流许可的线程池
+            policy: 主请求传入对冲策略，用于记录延迟样本
+        """
+        attempt = HedgeAttempt(policy)
+        if self._has_native_async():
+            run = self._run_async_attempt(request, attempt, executor)
+        else:
+            run = self._run_threaded_attempt(request, attempt, executor)
+        attempt.task = asyncio.ensure_future(run)
+        attempt.task.add_done_callback(lambda _: attempt.finished())
+        return attempt
+
+    async def _run_threaded_attempt(
+        self, request: TTSRequest, attempt: HedgeAttempt, executor: Executor
+    ) -> TTSResponse:
+        """在线程池中执行_call_engine，开始执行时才开始计时"""
+
+        def run() -> TTSResponse:
+            attempt.mark_started()
+            token = _first_audio.set(attempt.mark_first_audio)
+            try:
+                response = self._call_engine(request)
+            finally:
+                _first_audio.reset(token)
+            attempt.mark_done(response.success)
+            return response
+
+        # 复制上下文，线程中分配的临时文件同样由调用方的track()跟踪
+        future = executor.submit(copy_context().run, run)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                future.add_done_callback(_discard_abandoned)
+            raise
+
+    async def _run_async_attempt(
+        self, request: TTSRequest, attempt: HedgeAttempt, executor: Executor
+    ) -> TTSResponse:
+        """在事件循环中执行_asynthesize，取消时连接随之关闭"""
+        limited = self._limited(len(request.text))
+        if self.rate_limiter is None:
+            permit = limited.__enter__()
+        else:
+            # 等待限流许可会阻塞线程，放到线程池中进行
+            entering = executor.submit(limited.__enter__)
+            try:
+                permit = await asyncio.wrap_future(entering)
+            except asyncio.CancelledError:
+                if not entering.cancel():
+                    entering.add_done_callback(partial(_release_permit, limited))
+                raise
+
+        attempt.mark_started()
+        _mark_engine_started()
+        token = _first_audio.set(attempt.mark_first_audio)
+        try:
+            response = await self._asynthesize(request)
+            permit.record(response)
+        except BaseException as e:
+            limited.__exit__(type(e), e, e.__traceback__)
+            raise
+        finally:
+            _first_audio.reset(token)
+        limited.__exit__(None, None, None)
+        attempt.mark_done(response.success)
+        return response
+
+    @contextmanager
+    def _limited(self, chars: int = 0):
+        """获取一次服务调用的限流许可，未配置限流器时不做限制
+
+        引擎在synthesize之外直接调用服务（打包合成、流式合成）时使用：
+
+            with self._limited(chars) as permit:
+                response = ...
+                permit.record(response)
+
+        Args:
+            chars: 本次调用的字符数
+        """
+        if self.rate_limiter is None:
+            yield Permit()
+            return
+        with self.rate_limiter.limit(chars) as permit:
+            yield permit
+
+    def _complete_response(
+        self, request: TTSRequest, response: TTSResponse, start_time: float
+    ) -> TTSResponse:
+        """为核心合成结果设置公共信息，并处理输出文件和字幕文件
+
+        Args:
+            request: TTS请求对象
+            response: 核心合成方法返回的响应
+            start_time: 请求开始处理的时间
+
+        Returns:
+            完整的TTS响应对象
+        """
+        # 设置公共信息
+        response.request = request
+        response.processing_time = time.time() - start_time
+        response.engine_info.update(self.get_engine_info())
+
+        # 处理输出文件和字幕文件
+        self._finalize_outputs(request, response)
+
+        # 临时工作区中的文件随响应对象释放
+        return get_workspace().attach(response)
+
+    def _finalize_outputs(self, request: TTSRequest, response: TTSResponse):
+        """处理输出文件和字幕文件
+
+        文件路径总是同步确定并写入response；实际的文件复制和字幕序列化
+        在配置了output_writer时交给后台写入器执行。
+
+        Args:
+            request: TTS请求对象
+            response: TTS响应对象
+        """
+        if not response.success or not response.audio_file:
+            return
+
+        tasks = []
+
+        # 处理输出文件
+        if request.output_file and response.audio_file != request.output_file:
+            # funtts自己的临时文件直接移动到指定位置，其他文件复制
+            tasks.append(
+                partial(
+                    materialize_file,
+                    response.audio_file,
+                    request.output_file,
+                    move=is_temp_file(response.audio_file),
+                )
+            )
+            response.audio_file = request.output_file
+
+        # 处理字幕文件
+        if request.generate_subtitles and response.subtitle_maker:
+            # 使用SubtitleMaker的统一文件命名策略
+            # 1. 保存FRT格式（完整数据）
+            frt_file = SubtitleMaker.generate_subtitle_filename(
+                response.audio_file, "frt"
+            )
+            # 2. 保存标准格式（兼容性）
+            standard_file = SubtitleMaker.generate_subtitle_filename(
+                response.audio_file, request.subtitle_format
+            )
+            tasks.append(
+                partial(
+                    self._save_subtitles,
+                    response.subtitle_maker,
+                    frt_file,
+                    standard_file,
+                    request.subtitle_format,
+                )
+            )
+            response.frt_subtitle_file = frt_file
+            response.subtitle_file = standard_file
+
+        if not tasks:
+            return
+
+        if self.output_writer is None:
+            for task in tasks:
+                task()
+        else:
+            response.output_future = self.output_writer.submit_all(tasks)
+
+    @staticmethod
+    def _save_subtitles(
+        subtitle_maker: SubtitleMaker,
+        frt_file: str,
+        standard_file: str,
+        subtitle_format: str,
+    ):
+        """保存FRT字幕和标准格式字幕"""
+        subtitle_maker.save_to_file(frt_file, "frt")
+        logger.success(f"FRT字幕文件已保存: {frt_file}")
+
+        subtitle_maker.save_to_file(standard_file, subtitle_format)
+        logger.success(f"{subtitle_format.upper()}字幕文件已保存: {standard_file}")
+
+        logger.success(
+            f"字幕文件生成完成: FRT格式({frt_file}) + {subtitle_format.upper()}格式({standard_file})"
+        )
+
     def synthesize_text(
         self,
         text: str,
@@ -256,3 +861,38 @@ class BaseTTS(ABC):
             text=text, voice_name=voice_name, output_file=output_file, **kwargs
         )
         return self.synthesize(request)
+
+
+def _no_op():
+    pass
+
+
+def _mark_engine_started():
+    started = _engine_started.get()
+    if started is not None:
+        started.append(time.time())
+
+
+def _elapsed_since(started: List[float]) -> Optional[float]:
+    """从最早开始执行的时间算起的耗时，引擎没有开始执行时为None"""
+    return time.time() - min(started) if started else None
+
+
+def _discard_response(response: TTSResponse):
+    """删除被放弃的响应的临时文件"""
+    for file_path in (response.audio_file, response.subtitle_file):
+        if file_path and is_temp_file(file_path):
+            get_workspace().discard(file_path)
+
+
+def _discard_abandoned(future: Future):
+    """删除被放弃的对冲请求完成后产生的临时文件"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    _discard_response(future.result())
+
+
+def _release_permit(limited, future: Future):
+    """归还被取消的请求在取消之后才拿到的限流许可"""
+    if not future.cancelled() and future.exception() is None:
+        limited.__exit__(None, None, None)
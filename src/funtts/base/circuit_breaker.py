@@ -0,0 +1,211 @@
+"""
+熔断器
+依赖的服务持续失败或变慢时快速失败，不再占用并发和等待超时；
+熔断一段时间后放行少量探测请求，探测成功则恢复。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+# 熔断器状态
+STATE_CLOSED = "closed"  # 正常放行
+STATE_OPEN = "open"  # 熔断，直接失败
+STATE_HALF_OPEN = "half_open"  # 放行探测请求
+
+
+class CircuitBreaker:
+    """基于滑动窗口的熔断器
+
+    - 关闭状态下统计最近window次调用，失败率或慢调用率超过阈值、
+      或连续失败达到consecutive_failures次时打开
+    - 打开open_seconds秒后进入半开状态，最多同时放行half_open_probes个探测请求
+    - 探测全部成功后关闭，任一探测失败重新打开
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        consecutive_failures: int = 5,
+        latency_threshold: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        name: Optional[str] = None,
+    ):
+        """
+        Args:
+            failure_rate_threshold: 窗口内失败率阈值（0-1）
+            consecutive_failures: 连续失败次数阈值，0表示不按连续失败熔断
+            latency_threshold: 慢调用阈值（秒），None表示不统计慢调用
+            slow_call_rate_threshold: 窗口内慢调用率阈值（0-1）
+            window: 滑动窗口大小（调用次数）
+            min_calls: 窗口内至少有多少次调用才按比例判断
+            open_seconds: 打开状态持续时间（秒）
+            half_open_probes: 半开状态下的探测请求数
+            name: 名称，用于日志
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.consecutive_failures = consecutive_failures
+        self.latency_threshold = latency_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.name = name or "circuit"
+
+        self._calls: deque = deque(maxlen=window)  # (是否失败, 是否慢调用)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._failures_in_row = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._rejected = 0
+        self._opened_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """当前状态（打开超时后视为半开）"""
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def _update_state(self):
+        if (
+            self._state == STATE_OPEN
+            and time.time() - self._opened_at >= self.open_seconds
+        ):
+            self._state = STATE_HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"{self.name} 熔断结束，进入半开状态放行探测请求")
+
+    def is_available(self) -> bool:
+        """是否可以放行请求（不占用探测名额）"""
+        with self._lock:
+            self._update_state()
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN:
+                return self._probes_in_flight < self.half_open_probes
+            return False
+
+    def allow(self) -> bool:
+        """请求放行许可，半开状态下占用一个探测名额
+
+        放行后必须调用record()或release()。
+        """
+        with self._lock:
+            self._update_state()
+            if self._state == STATE_CLOSED:
+                return True
+            if (
+                self._state == STATE_HALF_OPEN
+                and self._probes_in_flight < self.half_open_probes
+            ):
+                self._probes_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def release(self):
+        """放弃一次已放行的请求，不计入统计"""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def record(self, success: bool, latency: Optional[float] = None):
+        """记录一次已放行请求的结果
+
+        Args:
+            success: 是否成功
+            latency: 耗时（秒）
+        """
+        slow = (
+            self.latency_threshold is not None
+            and latency is not None
+            and latency > self.latency_threshold
+        )
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not success or slow:
+                    self._open("探测请求失败" if not success else "探测请求过慢")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._state = STATE_CLOSED
+                    self._calls.clear()
+                    self._failures_in_row = 0
+                    logger.info(f"{self.name} 探测成功，熔断器关闭")
+                return
+
+            if self._state == STATE_OPEN:
+                # 打开前已放行的请求：结果不再影响状态
+                return
+
+            self._calls.append((not success, slow))
+            self._failures_in_row = 0 if success else self._failures_in_row + 1
+
+            if self.consecutive_failures and (
+                self._failures_in_row >= self.consecutive_failures
+            ):
+                self._open(f"连续失败 {self._failures_in_row} 次")
+                return
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for failed, _ in self._calls if failed)
+            failure_rate = failures / len(self._calls)
+            if failure_rate >= self.failure_rate_threshold:
+                self._open(f"失败率 {failure_rate:.0%}")
+                return
+            if self.latency_threshold is not None:
+                slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+                slow_rate = slow_calls / len(self._calls)
+                if slow_rate >= self.slow_call_rate_threshold:
+                    self._open(f"慢调用率 {slow_rate:.0%}")
+
+    def _open(self, reason: str):
+        self._state = STATE_OPEN
+        self._opened_at = time.time()
+        self._opened_count += 1
+        self._probes_in_flight = 0
+        logger.warning(f"{self.name} 熔断 {self.open_seconds:.0f}秒: {reason}")
+
+    def reset(self):
+        """恢复到关闭状态并清空统计"""
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._calls.clear()
+            self._failures_in_row = 0
+            self._probes_in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        with self._lock:
+            self._update_state()
+            calls = len(self._calls)
+            failures = sum(1 for failed, _ in self._calls if failed)
+            slow = sum(1 for _, is_slow in self._calls if is_slow)
+            stats = {
+                "state": self._state,
+                "failure_rate": round(failures / calls, 4) if calls else 0.0,
+                "slow_call_rate": round(slow / calls, 4) if calls else 0.0,
+                "window_calls": calls,
+                "consecutive_failures": self._failures_in_row,
+                "rejected": self._rejected,
+                "opened": self._opened_count,
+            }
+            if self._state == STATE_OPEN:
+                stats["retry_after"] = round(
+                    max(0.0, self.open_seconds - (time.time() - self._opened_at)), 3
+                )
+            return stats
@@ -0,0 +1,202 @@
+"""
+对冲请求（hedged requests）策略
+请求在按历史延迟分位数计算的等待时间内仍未收到第一块音频（或未完成）时，
+再发起一个副本请求（同一引擎或备用引擎），先成功的结果被采用，另一个被取消；
+对冲次数受预算限制，不超过总请求数的固定比例。
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+
+class HedgePolicy:
+    """对冲策略
+
+    - 等待时间取最近window个主请求延迟的percentile分位数，
+      样本不足min_samples时使用initial_delay；延迟从请求开始执行时算起，
+      能报告首个音频块的引擎取首字节时间，其他引擎取完成时间
+    - 每个主请求积累budget个对冲令牌（上限max_tokens），每次对冲消耗1个，
+      因此对冲次数不会超过请求数的budget比例
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.05,
+        max_delay: Optional[float] = None,
+        window: int = 200,
+        min_samples: int = 20,
+        max_tokens: float = 10.0,
+        alternate: Any = None,
+        alternate_voice: Optional[str] = None,
+        max_workers: int = 32,
+    ):
+        """
+        Args:
+            percentile: 触发对冲的延迟分位数（0-100）
+            budget: 对冲请求占总请求数的比例上限
+            initial_delay: 样本不足时的对冲等待时间（秒）
+            min_delay: 对冲等待时间下限（秒）
+            max_delay: 对冲等待时间上限（秒），None表示不限制
+            window: 统计延迟的最近样本数
+            min_samples: 使用分位数前需要的最少样本数
+            max_tokens: 对冲令牌上限，限制空闲后的突发对冲数量
+            alternate: 备用引擎（BaseTTS实例），None表示向同一引擎发起副本
+            alternate_voice: 备用引擎使用的语音，None使用其默认语音
+            max_workers: 执行主请求和对冲请求的线程数
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+        self.alternate = alternate
+        self.alternate_voice = alternate_voice
+        self.max_workers = max_workers
+
+        self._latencies: deque = deque(maxlen=window)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._requests = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._denied = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """执行主请求和对冲请求的线程池（首次使用时创建）"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="funtts-hedge"
+                )
+            return self._executor
+
+    def delay(self) -> float:
+        """当前的对冲等待时间（秒）"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            value = self.initial_delay
+        else:
+            index = min(
+                len(samples) - 1, int(len(samples) * self.percentile / 100.0)
+            )
+            value = samples[index]
+        value = max(self.min_delay, value)
+        if self.max_delay is not None:
+            value = min(self.max_delay, value)
+        return value
+
+    def on_request(self):
+        """记录一个主请求并积累对冲令牌"""
+        with self._lock:
+            self._requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.budget)
+
+    def try_hedge(self) -> bool:
+        """尝试消耗一个对冲令牌"""
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self._hedges += 1
+                return True
+            self._denied += 1
+            return False
+
+    def record_latency(self, seconds: float):
+        """记录一个主请求的首字节时间（或完成耗时）"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def record_hedge_win(self):
+        """记录对冲请求先于主请求完成"""
+        with self._lock:
+            self._hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """获取对冲统计"""
+        delay = self.delay()
+        with self._lock:
+            return {
+                "delay": round(delay, 3),
+                "requests": self._requests,
+                "hedges": self._hedges,
+                "hedge_wins": self._hedge_wins,
+                "denied": self._denied,
+                "hedge_ratio": (
+                    round(self._hedges / self._requests, 4) if self._requests else 0.0
+                ),
+                "samples": len(self._latencies),
+            }
+
+    def shutdown(self):
+        """关闭线程池，不等待被放弃的请求"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+class HedgeAttempt:
+    """对冲竞争中的一次请求（主请求或对冲请求）的进度
+
+    mark_started/mark_first_audio/mark_done可以在任意线程中调用，
+    started和progressed事件在竞争所在的事件循环中设置；
+    主请求（policy不为None）的首字节时间或完成耗时记为延迟样本。
+    """
+
+    def __init__(self, policy: Optional[HedgePolicy] = None):
+        self.policy = policy
+        self.task: Optional[asyncio.Task] = None
+        self.started = asyncio.Event()  # 开始执行（不含排队时间）
+        self.progressed = asyncio.Event()  # 收到第一块音频或已结束
+        self.started_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+        self._loop = asyncio.get_running_loop()
+
+    def mark_started(self):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+            self._set(self.started)
+
+    def mark_first_audio(self):
+        if self.first_audio_at is not None or self.started_at is None:
+            return
+        self.first_audio_at = time.monotonic()
+        self._record(self.first_audio_at)
+        self._set(self.progressed)
+
+    def mark_done(self, success: bool):
+        """请求完成；没有报告首个音频块时以完成耗时作为延迟样本"""
+        if success and self.first_audio_at is None and self.started_at is not None:
+            self._record(time.monotonic())
+
+    def finished(self):
+        """任务结束（包括失败和取消），解除所有等待"""
+        self.started.set()
+        self.progressed.set()
+
+    def _record(self, now: float):
+        if self.policy is not None:
+            self.policy.record_latency(now - self.started_at)
+
+    def _set(self, event: asyncio.Event):
+        try:
+            self._loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # 竞争已经结束，事件循环已关闭
+            pass
@@ -0,0 +1,299 @@
+"""
+客户端限流和自适应并发控制
+为云端引擎提供令牌桶限流（请求数/秒、字符数/秒）和AIMD自适应并发：
+成功时并发上限缓慢增加，遇到限流或超时时成倍缩小。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+# 请求结果分类
+OUTCOME_SUCCESS = "success"
+OUTCOME_THROTTLED = "throttled"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_ERROR = "error"
+OUTCOME_CANCELLED = "cancelled"  # 调用方主动取消（如提前关闭流式生成器），不调整并发
+
+# 错误信息中表示被服务端限流的关键字
+_THROTTLE_MARKERS = ("429", "too many requests", "throttl", "rate limit", "quota")
+_TIMEOUT_MARKERS = ("timeout", "timed out", "超时")
+
+
+def classify_error(error_message: str) -> str:
+    """根据错误信息判断失败类型"""
+    message = (error_message or "").lower()
+    if any(marker in message for marker in _THROTTLE_MARKERS):
+        return OUTCOME_THROTTLED
+    if any(marker in message for marker in _TIMEOUT_MARKERS):
+        return OUTCOME_TIMEOUT
+    return OUTCOME_ERROR
+
+
+def classify_response(response: Any) -> str:
+    """判断TTSResponse的结果类型"""
+    if response is None or getattr(response, "success", False):
+        return OUTCOME_SUCCESS
+    error_code = getattr(response, "error_code", None) or ""
+    return classify_error(f"{error_code} {getattr(response, 'error_message', '')}")
+
+
+def classify_exception(error: BaseException) -> str:
+    """判断异常的结果类型"""
+    if isinstance(error, (GeneratorExit, KeyboardInterrupt)) or (
+        type(error).__name__ == "CancelledError"
+    ):
+        return OUTCOME_CANCELLED
+    if isinstance(error, TimeoutError):
+        return OUTCOME_TIMEOUT
+    return classify_error(f"{type(error).__name__} {error}")
+
+
+class TokenBucket:
+    """令牌桶
+
+    按固定速率补充令牌，允许不超过容量的突发。
+    单次需求超过容量时允许透支，后续调用等待令牌补足。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量，默认等于rate（即最多1秒的突发）
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """预占令牌并返回需要等待的时间（秒）"""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    @property
+    def available(self) -> float:
+        """当前可用令牌数（透支时为负）"""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class AdaptiveConcurrency:
+    """AIMD自适应并发上限
+
+    - 成功：上限加 increase / 上限（约每一轮并发加increase）
+    - 限流或超时：上限乘以backoff，cooldown内只缩小一次，避免一次突发被重复惩罚
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.cooldown = cooldown
+
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """等待并占用一个并发名额"""
+        with self._cond:
+            self._waiting += 1
+            try:
+                acquired = self._cond.wait_for(
+                    lambda: self._in_flight < self.limit, timeout
+                )
+            finally:
+                self._waiting -= 1
+            if acquired:
+                self._in_flight += 1
+            return acquired
+
+    def release(self, outcome: str = OUTCOME_SUCCESS):
+        """释放名额并根据结果调整上限"""
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            if outcome == OUTCOME_SUCCESS:
+                self._limit = min(
+                    self.max_limit, self._limit + self.increase / self._limit
+                )
+            elif outcome in (OUTCOME_THROTTLED, OUTCOME_TIMEOUT):
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+                    logger.info(f"检测到{outcome}，并发上限降为 {self.limit}")
+            self._cond.notify_all()
+
+    def state(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "concurrency_limit": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+            }
+
+
+class Permit:
+    """一次受限调用的许可，调用方通过record()报告结果"""
+
+    def __init__(self):
+        self.outcome = OUTCOME_SUCCESS
+
+    def record(self, response: Any):
+        """根据TTSResponse记录结果"""
+        self.outcome = classify_response(response)
+
+
+class RateLimiter:
+    """引擎级限流器：令牌桶限流 + AIMD自适应并发
+
+    用法：
+        with limiter.limit(chars=len(text)) as permit:
+            response = do_request()
+            permit.record(response)
+    """
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        chars_per_second: Optional[float] = None,
+        request_burst: Optional[float] = None,
+        char_burst: Optional[float] = None,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        acquire_timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            requests_per_second: 每秒请求数上限，None表示不限制
+            chars_per_second: 每秒字符数上限，None表示不限制
+            request_burst: 请求突发容量，默认等于requests_per_second
+            char_burst: 字符突发容量，默认等于chars_per_second
+            initial_concurrency: 初始并发上限
+            min_concurrency: 并发上限下限
+            max_concurrency: 并发上限上限
+            acquire_timeout: 等待并发名额的超时时间（秒），None表示一直等待
+        """
+        self.request_bucket = (
+            TokenBucket(requests_per_second, request_burst)
+            if requests_per_second
+            else None
+        )
+        self.char_bucket = (
+            TokenBucket(chars_per_second, char_burst) if chars_per_second else None
+        )
+        self.concurrency = AdaptiveConcurrency(
+            initial=initial_concurrency,
+            min_limit=min_concurrency,
+            max_limit=max_concurrency,
+        )
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Lock()
+        self._counts = {
+            OUTCOME_SUCCESS: 0,
+            OUTCOME_THROTTLED: 0,
+            OUTCOME_TIMEOUT: 0,
+            OUTCOME_ERROR: 0,
+            OUTCOME_CANCELLED: 0,
+        }
+        self._waited = 0.0
+
+    def _wait_for_tokens(self, chars: int):
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.char_bucket is not None and chars:
+            wait = max(wait, self.char_bucket.reserve(chars))
+        if wait > 0:
+            with self._lock:
+                self._waited += wait
+            time.sleep(wait)
+
+    @contextmanager
+    def limit(self, chars: int = 0):
+        """获取一次调用的许可
+
+        先等待令牌，再等待并发名额；退出时按结果调整并发上限。
+        调用内抛出的异常按异常类型记录结果，已通过permit.record记录了失败的除外。
+
+        Args:
+            chars: 本次调用的字符数
+
+        Raises:
+            TimeoutError: 等待并发名额超时
+        """
+        self._wait_for_tokens(chars)
+        if not self.concurrency.acquire(self.acquire_timeout):
+            raise TimeoutError("等待并发名额超时")
+
+        permit = Permit()
+        try:
+            yield permit
+        except BaseException as e:
+            if permit.outcome == OUTCOME_SUCCESS:
+                permit.outcome = classify_exception(e)
+            raise
+        finally:
+            self.concurrency.release(permit.outcome)
+            with self._lock:
+                self._counts[permit.outcome] += 1
+
+    def state(self) -> Dict[str, Any]:
+        """获取限流器当前状态"""
+        state = self.concurrency.state()
+        state["requests_per_second"] = (
+            self.request_bucket.rate if self.request_bucket else None
+        )
+        state["chars_per_second"] = self.char_bucket.rate if self.char_bucket else None
+        state["request_tokens"] = (
+            round(self.request_bucket.available, 2) if self.request_bucket else None
+        )
+        state["char_tokens"] = (
+            round(self.char_bucket.available, 2) if self.char_bucket else None
+        )
+        with self._lock:
+            state["outcomes"] = dict(self._counts)
+            state["total_wait_seconds"] = round(self._waited, 3)
+        return state
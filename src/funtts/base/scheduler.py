@@ -0,0 +1,507 @@
+"""
+请求调度器
+在调用方和BaseTTS.synthesize之间排队请求，实时请求和批量任务共用同一引擎实例时：
+- 优先级类别之间严格按优先级调度，批量任务不会挤占实时请求
+- 同一类别内按租户加权公平排队（WFQ），单个租户的大批量任务不会饿死其他租户
+- 同一租户内按文本长度短作业优先（SJF），排队超过max_age的请求按先来先服务
+- 请求可以设置截止时间，预计无法按时完成时丢弃，或降级到更快的备用引擎
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Sequence
+
+from funutil import getLogger
+
+from funtts.models import TTSRequest, TTSResponse
+
+if TYPE_CHECKING:
+    from .base import BaseTTS
+
+logger = getLogger("funtts")
+
+# 预置的优先级类别，从高到低
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_STANDARD = "standard"
+PRIORITY_BATCH = "batch"
+DEFAULT_PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_STANDARD, PRIORITY_BATCH)
+
+# 截止时间无法满足时的处理方式
+ON_DEADLINE_DROP = "drop"
+ON_DEADLINE_DOWNGRADE = "downgrade"
+
+
+class _Job:
+    """排队中的一个请求"""
+
+    __slots__ = (
+        "request",
+        "priority",
+        "tenant",
+        "cost",
+        "deadline",
+        "on_deadline",
+        "future",
+        "enqueued_at",
+        "seq",
+        "taken",
+    )
+
+    def __init__(self, request, priority, tenant, deadline, on_deadline, seq):
+        self.request = request
+        self.priority = priority
+        self.tenant = tenant
+        self.cost = max(1, len(request.text))
+        self.deadline = deadline
+        self.on_deadline = on_deadline
+        self.future: Future = Future()
+        self.enqueued_at = time.time()
+        self.seq = seq
+        self.taken = False
+
+
+class _TenantQueue:
+    """一个租户在某个优先级类别中的队列
+
+    按预估耗时排序的堆用于短作业优先，按到达顺序的队列用于找出等待最久的请求，
+    两者共享同一组任务，出队时只做标记、延迟删除。
+    """
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.finish = 0.0  # 上一个已调度请求的虚拟完成时间
+        self.size = 0
+        self._by_cost: List = []
+        self._by_arrival: Deque[_Job] = deque()
+
+    def push(self, job: _Job):
+        heapq.heappush(self._by_cost, (job.cost, job.seq, job))
+        self._by_arrival.append(job)
+        self.size += 1
+
+    def head(self, now: float, max_age: Optional[float]) -> _Job:
+        while self._by_cost[0][2].taken:
+            heapq.heappop(self._by_cost)
+        while self._by_arrival[0].taken:
+            self._by_arrival.popleft()
+        oldest = self._by_arrival[0]
+        if max_age is not None and now - oldest.enqueued_at >= max_age:
+            return oldest
+        return self._by_cost[0][2]
+
+    def take(self, job: _Job):
+        job.taken = True
+        self.size -= 1
+        if self.size == 0:
+            self._by_cost.clear()
+            self._by_arrival.clear()
+
+
+class _PriorityClass:
+    """一个优先级类别：租户之间按虚拟时间加权公平调度"""
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.tenants: Dict[str, _TenantQueue] = {}
+        self.virtual_time = 0.0
+        self.size = 0
+        self.queued_cost = 0
+        self.served = 0
+        self.dropped = 0
+        self.waits: Deque[float] = deque(maxlen=window)
+
+    def push(self, job: _Job, weight: float):
+        queue = self.tenants.get(job.tenant)
+        if queue is None:
+            queue = self.tenants[job.tenant] = _TenantQueue(weight)
+        queue.push(job)
+        self.size += 1
+        self.queued_cost += job.cost
+
+    def pop(self, now: float, max_age: Optional[float]) -> _Job:
+        """取出虚拟完成时间最早的租户的下一个请求"""
+        best = None
+        idle = []
+        for tenant, queue in self.tenants.items():
+            if not queue.size:
+                # 空闲且没有剩余额度的租户不再保留状态
+                if queue.finish <= self.virtual_time:
+                    idle.append(tenant)
+                continue
+            job = queue.head(now, max_age)
+            start = max(self.virtual_time, queue.finish)
+            tag = start + job.cost / queue.weight
+            if best is None or tag < best[0]:
+                best = (tag, start, queue, job)
+        tag, start, queue, job = best
+        queue.take(job)
+        queue.finish = tag
+        self.virtual_time = start
+        self.size -= 1
+        self.queued_cost -= job.cost
+        for tenant in idle:
+            del self.tenants[tenant]
+        return job
+
+
+class RequestScheduler:
+    """带优先级、截止时间和租户公平性的请求调度器
+
+    由workers个工作线程从队列取出请求，调用引擎的synthesize执行。
+
+    用法::
+
+        scheduler = RequestScheduler(engine, workers=8, tenant_weights={"vip": 4})
+        response = scheduler.synthesize(request, priority="interactive", timeout=2.0)
+        future = scheduler.submit(request, priority="batch", tenant="import-job")
+    """
+
+    def __init__(
+        self,
+        engine: "BaseTTS",
+        workers: int = 4,
+        priorities: Sequence[str] = DEFAULT_PRIORITIES,
+        default_priority: Optional[str] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        max_queue: int = 10000,
+        max_age: Optional[float] = 60.0,
+        downgrade_engine: Optional["BaseTTS"] = None,
+        downgrade_workers: Optional[int] = None,
+        alpha: float = 0.2,
+        window: int = 1000,
+    ):
+        """
+        Args:
+            engine: 执行请求的引擎
+            workers: 工作线程数（同时执行的请求数）
+            priorities: 优先级类别名称，从高到低
+            default_priority: 默认类别，None表示中间的类别
+            tenant_weights: 租户权重，未列出的租户权重为1
+            max_queue: 最大排队请求数，超过后新请求直接返回QUEUE_FULL
+            max_age: 同一租户内请求排队超过该时间（秒）后不再让位给短作业，None表示不限
+            downgrade_engine: 截止时间无法满足时改用的更快引擎
+            downgrade_workers: 入队时即判定需要降级的请求不排队，
+                直接由这么多个线程在downgrade_engine上执行，默认同workers
+            alpha: 每字符耗时移动平均系数
+            window: 每个类别保留多少个最近的排队时间样本
+        """
+        if not priorities:
+            raise ValueError("至少需要一个优先级类别")
+        self.engine = engine
+        self.workers = max(1, workers)
+        self.priorities = list(priorities)
+        self.default_priority = default_priority or self.priorities[
+            (len(self.priorities) - 1) // 2
+        ]
+        if self.default_priority not in self.priorities:
+            raise ValueError(f"未知的优先级类别: {self.default_priority}")
+        self.tenant_weights = dict(tenant_weights or {})
+        self.max_queue = max_queue
+        self.max_age = max_age
+        self.downgrade_engine = downgrade_engine
+        self.downgrade_workers = downgrade_workers or self.workers
+        self.alpha = alpha
+
+        self._classes = [_PriorityClass(name, window) for name in self.priorities]
+        self._class_index = {name: i for i, name in enumerate(self.priorities)}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._downgrade_executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+        self._busy = 0
+        # 每个引擎的每字符耗时估计（秒），用于截止时间判断
+        self._seconds_per_char: Dict[int, float] = {}
+        self._rejected = 0
+        self._downgraded = 0
+
+    # ==================== 提交 ====================
+
+    def submit(
+        self,
+        request: TTSRequest,
+        priority: Optional[str] = None,
+        tenant: str = "default",
+        timeout: Optional[float] = None,
+        on_deadline: str = ON_DEADLINE_DROP,
+    ) -> "Future[TTSResponse]":
+        """提交请求
+
+        Args:
+            request: TTS请求
+            priority: 优先级类别，None使用default_priority
+            tenant: 租户标识
+            timeout: 截止时间（从现在起的秒数），None表示不限
+            on_deadline: 预计无法按时完成时的处理方式，drop丢弃，
+                downgrade改用downgrade_engine（未配置时丢弃）
+
+        Returns:
+            Future: 结果为TTSResponse；排队已满或无法按时完成时为失败响应
+        """
+        priority = priority or self.default_priority
+        if priority not in self._class_index:
+            raise ValueError(f"未知的优先级类别: {priority}")
+        if on_deadline not in (ON_DEADLINE_DROP, ON_DEADLINE_DOWNGRADE):
+            raise ValueError(f"未知的截止时间处理方式: {on_deadline}")
+        deadline = time.time() + timeout if timeout is not None else None
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("调度器已关闭")
+            self._start_workers()
+            job = _Job(
+                request, priority, tenant, deadline, on_deadline, next(self._seq)
+            )
+            if sum(c.size for c in self._classes) >= self.max_queue:
+                self._rejected += 1
+                self._finish_rejected(job, "QUEUE_FULL", "调度队列已满")
+                return job.future
+            if deadline is not None and not self._admit_deadline(job):
+                return job.future
+            self._classes[self._class_index[priority]].push(
+                job, self.tenant_weights.get(tenant, 1.0)
+            )
+            self._cond.notify()
+        return job.future
+
+    def synthesize(self, request: TTSRequest, **kwargs) -> TTSResponse:
+        """提交请求并等待结果，参数同submit"""
+        return self.submit(request, **kwargs).result()
+
+    async def asynthesize(self, request: TTSRequest, **kwargs) -> TTSResponse:
+        """异步提交请求并等待结果，参数同submit"""
+        return await asyncio.wrap_future(self.submit(request, **kwargs))
+
+    def set_tenant_weight(self, tenant: str, weight: float):
+        """设置租户权重，对之后入队的租户生效"""
+        if weight <= 0:
+            raise ValueError("租户权重必须大于0")
+        with self._cond:
+            self.tenant_weights[tenant] = weight
+            for priority_class in self._classes:
+                queue = priority_class.tenants.get(tenant)
+                if queue is not None:
+                    queue.weight = weight
+
+    # ==================== 截止时间 ====================
+
+    def _estimate(self, engine: "BaseTTS", cost: int) -> float:
+        """预估在engine上执行的耗时，没有样本时返回0"""
+        return self._seconds_per_char.get(id(engine), 0.0) * cost
+
+    def _estimate_wait(self, index: int) -> float:
+        """预估新请求在第index个类别中的排队时间（调用时须持有锁）"""
+        ahead = sum(c.queued_cost for c in self._classes[: index + 1])
+        return self._estimate(self.engine, ahead) / self.workers
+
+    def _admit_deadline(self, job: _Job) -> bool:
+        """入队前检查截止时间（调用时须持有锁），无法满足时按策略处理
+
+        Returns:
+            bool: 是否进入主队列
+        """
+        index = self._class_index[job.priority]
+        wait = self._estimate_wait(index)
+        if time.time() + wait + self._estimate(self.engine, job.cost) <= job.deadline:
+            return True
+        if self._can_downgrade(job):
+            # 备用引擎有自己的容量，不在主队列中等待
+            if self._downgrade_executor is None:
+                self._downgrade_executor = ThreadPoolExecutor(
+                    max_workers=self.downgrade_workers,
+                    thread_name_prefix="funtts-scheduler-downgrade",
+                )
+            self._downgrade_executor.submit(self._run, job, self.downgrade_engine)
+            return False
+        self._classes[index].dropped += 1
+        self._finish_rejected(job, "DEADLINE_EXCEEDED", "预计无法在截止时间前完成")
+        return False
+
+    def _can_downgrade(self, job: _Job) -> bool:
+        return (
+            job.on_deadline == ON_DEADLINE_DOWNGRADE
+            and self.downgrade_engine is not None
+        )
+
+    def _choose_engine(self, job: _Job, now: float) -> Optional["BaseTTS"]:
+        """出队时按截止时间选择引擎，无法按时完成时返回None"""
+        if job.deadline is None:
+            return self.engine
+        if now + self._estimate(self.engine, job.cost) <= job.deadline:
+            return self.engine
+        if self._can_downgrade(job) and now + self._estimate(
+            self.downgrade_engine, job.cost
+        ) <= job.deadline:
+            return self.downgrade_engine
+        return None
+
+    # ==================== 执行 ====================
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f"funtts-scheduler-{len(self._threads)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self) -> Optional[_Job]:
+        """按优先级取出下一个请求（调用时须持有锁）"""
+        now = time.time()
+        for priority_class in self._classes:
+            if priority_class.size:
+                return priority_class.pop(now, self.max_age)
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                self._busy += 1
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._busy -= 1
+
+    def _run(self, job: _Job, engine: Optional["BaseTTS"] = None):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        now = time.time()
+        wait = now - job.enqueued_at
+        priority_class = self._classes[self._class_index[job.priority]]
+        engine = engine or self._choose_engine(job, now)
+        with self._cond:
+            priority_class.waits.append(wait)
+            if engine is None:
+                priority_class.dropped += 1
+            else:
+                priority_class.served += 1
+                if engine is not self.engine:
+                    self._downgraded += 1
+        if engine is None:
+            job.future.set_result(
+                self._error_response(
+                    job, "DEADLINE_EXCEEDED", "排队后已无法在截止时间前完成", wait
+                )
+            )
+            return
+
+        start = time.time()
+        try:
+            response = engine.synthesize(job.request)
+        except BaseException as e:
+            job.future.set_exception(e)
+            return
+        elapsed = time.time() - start
+        if response.success:
+            key = id(engine)
+            sample = elapsed / job.cost
+            with self._cond:
+                previous = self._seconds_per_char.get(key)
+                self._seconds_per_char[key] = (
+                    sample
+                    if previous is None
+                    else previous + self.alpha * (sample - previous)
+                )
+        response.engine_info["scheduler"] = {
+            "priority": job.priority,
+            "tenant": job.tenant,
+            "queue_seconds": round(wait, 4),
+            "downgraded": engine is not self.engine,
+        }
+        job.future.set_result(response)
+
+    def _error_response(
+        self, job: _Job, code: str, message: str, wait: float = 0.0
+    ) -> TTSResponse:
+        return TTSResponse(
+            success=False,
+            request=job.request,
+            error_message=message,
+            error_code=code,
+            engine_info={
+                "scheduler": {
+                    "priority": job.priority,
+                    "tenant": job.tenant,
+                    "queue_seconds": round(wait, 4),
+                }
+            },
+        )
+
+    def _finish_rejected(self, job: _Job, code: str, message: str):
+        job.future.set_running_or_notify_cancel()
+        job.future.set_result(self._error_response(job, code, message))
+
+    # ==================== 监控与关闭 ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """获取队列深度、排队时间等统计"""
+        with self._cond:
+            classes = {}
+            for priority_class in self._classes:
+                waits = sorted(priority_class.waits)
+
+                def pick(p: float) -> float:
+                    index = min(len(waits) - 1, int(p / 100 * len(waits)))
+                    return round(waits[index], 4)
+
+                classes[priority_class.name] = {
+                    "depth": priority_class.size,
+                    "queued_chars": priority_class.queued_cost,
+                    "tenants": {
+                        tenant: queue.size
+                        for tenant, queue in priority_class.tenants.items()
+                        if queue.size
+                    },
+                    "served": priority_class.served,
+                    "dropped": priority_class.dropped,
+                    "wait_p50": pick(50) if waits else 0.0,
+                    "wait_p95": pick(95) if waits else 0.0,
+                    "wait_max": round(waits[-1], 4) if waits else 0.0,
+                }
+            return {
+                "workers": self.workers,
+                "busy": self._busy,
+                "depth": sum(c.size for c in self._classes),
+                "rejected": self._rejected,
+                "downgraded": self._downgraded,
+                "seconds_per_char": round(
+                    self._seconds_per_char.get(id(self.engine), 0.0), 6
+                ),
+                "classes": classes,
+            }
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """关闭调度器
+
+        Args:
+            wait: 是否等待工作线程结束
+            cancel_pending: 是否取消尚未开始的请求，否则执行完队列中的请求再退出
+        """
+        with self._cond:
+            self._closed = True
+            if cancel_pending:
+                while True:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    job.future.cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self._downgrade_executor is not None:
+            self._downgrade_executor.shutdown(wait=wait)
@@ -0,0 +1,80 @@
+"""
+请求合并（single-flight）
+同一时刻内容相同的请求只执行一次，其他调用方等待并共享结果。
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+
+class _Call:
+    """一次正在执行的调用"""
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并并发调用
+
+    第一个调用方执行函数，执行期间到达的相同键的调用方等待其结果；
+    执行结束后键被移除，之后的调用重新执行。
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行或加入一次调用
+
+        Args:
+            key: 调用的键
+            fn: 执行函数
+
+        Returns:
+            (结果, 是否与其他调用方共享)。执行函数抛出的异常会传给所有调用方
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            return call.future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.future.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(key, None)
+            shared = call.waiters > 0
+        call.future.set_result(result)
+        return result, shared
+
+    def stats(self) -> Dict[str, int]:
+        """获取合并统计"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+            }
@@ -0,0 +1,33 @@
+"""
+批量合成模块
+"""
+
+from .audiobook import AudiobookPipeline, Chapter, iter_chapters
+from .dedup import UnitCache, unit_key
+from .manifest import CompletedIndex, Manifest, iter_records, read_manifest_summary
+from .queue import Job, JobQueue, shard_path
+from .runner import BatchRunner, parse_line
+from .script import ScriptLine, ScriptRenderer, SpeakerVoice, load_script
+from .worker import QueueWorker
+
+__all__ = [
+    "BatchRunner",
+    "Manifest",
+    "CompletedIndex",
+    "iter_records",
+    "read_manifest_summary",
+    "parse_line",
+    "JobQueue",
+    "Job",
+    "shard_path",
+    "QueueWorker",
+    "AudiobookPipeline",
+    "Chapter",
+    "iter_chapters",
+    "ScriptRenderer",
+    "ScriptLine",
+    "SpeakerVoice",
+    "load_script",
+    "UnitCache",
+    "unit_key",
+]
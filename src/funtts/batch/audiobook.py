@@ -0,0 +1,439 @@
+"""
+有声书/长文档合成流水线
+按章节切分文本块并行合成，结果按顺序流式写入章节音频、整书音频和字幕，
+并生成章节索引。内存占用与书的长度无关。
+"""
+
+import itertools
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from funutil import getLogger
+
+from ..models import AudioSegment, TTSRequest, TTSResponse
+from ..utils.file_utils import is_temp_file
+from ..utils.stream_writer import AudioStreamWriter, SubtitleStreamWriter
+from ..utils.text_utils import chunk_text, normalize_text
+from ..utils.workspace import get_workspace
+from .dedup import UnitCache, unit_key
+from .manifest import fingerprint
+
+if TYPE_CHECKING:
+    from ..base import BaseTTS
+
+logger = getLogger("funtts")
+
+# 章节标题行：Markdown标题，或"第X章/节/回"开头、不含句末标点的短行
+_HEADING = re.compile(
+    r"^\s*(?:#{1,6}\s+(?P<md>.+?)"
+    r"|(?P<cn>第[0-9零一二三四五六七八九十百千两]+[章节回卷][^。！？!?]{0,30}?))\s*$"
+)
+
+
+@dataclass
+class Chapter:
+    """章节"""
+
+    title: str
+    text: str
+
+
+def iter_chapters(path: str) -> Iterator[Chapter]:
+    """逐章读取文档
+
+    - .jsonl: 每行一个 {"title": ..., "text": ...}
+    - 其他文本文件: 按标题行（Markdown标题或"第X章"）切分，标题前的文字作为序言
+
+    只在内存中保留当前章节的文本。
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                yield Chapter(
+                    title=str(data.get("title") or f"第{number}章"), text=data["text"]
+                )
+        return
+
+    title = None
+    lines: List[str] = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            match = _HEADING.match(line)
+            if match:
+                if "".join(lines).strip():
+                    yield Chapter(title=title or "序", text="".join(lines))
+                title = match.group("md") or match.group("cn")
+                lines = []
+            else:
+                lines.append(line)
+    if "".join(lines).strip():
+        yield Chapter(title=title or "正文", text="".join(lines))
+
+
+@dataclass
+class _Chunk:
+    chapter: int
+    index: int
+    text: str
+    key: Optional[str] = None  # 去重键，启用去重时设置
+    reused: bool = False  # 是否复用了相同文本块的结果
+
+
+class AudiobookPipeline:
+    """有声书合成流水线
+
+    - 章节和文本块都是惰性生成的，文本块以concurrency并发合成
+    - 提交顺序即输出顺序：已提交未写出的文本块不超过window个（有界重排缓冲），
+      最早的文本块完成后立即写出，之后的文本块继续合成
+    - 音频直接追加到章节文件和整书文件（见AudioStreamWriter），字幕边写边落盘，
+      时长由写入的音频数据得出，不再读取和探测合并后的文件
+    - 每章完成后更新章节索引（index.json）
+    - dedup=True时，规范化后相同的文本块只合成一次；此前出现过的句子单独成块，
+      最晚从第三次出现起直接复用（第一次出现时可能已与前后的句子合并合成）
+
+    使用示例:
+        pipeline = AudiobookPipeline(tts, "out/book1", voice_name="zh-CN-YunxiNeural")
+        index = pipeline.run(iter_chapters("book1.md"))
+    """
+
+    def __init__(
+        self,
+        engine: "BaseTTS",
+        output_dir: str,
+        concurrency: int = 4,
+        window: Optional[int] = None,
+        max_chunk_chars: int = 200,
+        gap: float = 0.3,
+        chapter_gap: float = 1.5,
+        output_format: str = "wav",
+        subtitle_format: str = "srt",
+        book_name: Optional[str] = "book",
+        read_titles: bool = True,
+        retries: int = 2,
+        dedup: bool = False,
+        dedup_cache_size: int = 1024,
+        request: Optional[TTSRequest] = None,
+        **request_options: Any,
+    ):
+        """
+        Args:
+            engine: 执行合成的引擎
+            output_dir: 输出目录
+            concurrency: 并发合成的文本块数
+            window: 重排缓冲大小（已提交未写出的最大文本块数），默认为concurrency的4倍
+            max_chunk_chars: 每个文本块的最大字符数
+            gap: 同一章中文本块之间的静音（秒）
+            chapter_gap: 整书文件中章节之间的静音（秒）
+            output_format: 音频格式，wav或mp3（mp3拼接时不插入静音）
+            subtitle_format: 字幕格式，srt、vtt或frt
+            book_name: 整书文件名（不含扩展名），None表示只输出章节文件
+            read_titles: 是否朗读章节标题（作为每章的第一个文本块）
+            retries: 文本块合成失败后的重试次数
+            dedup: 是否复用重复文本块的合成结果
+            dedup_cache_size: 保留以供复用的文本块结果数（临时文件留在工作区中）
+            request: 请求模板，文本块请求复制其语音、语速等参数
+            **request_options: 请求参数，覆盖模板中的同名字段（如voice_name）
+        """
+        self.engine = engine
+        self.output_dir = output_dir
+        self.concurrency = max(1, concurrency)
+        self.window = max(self.concurrency, window or self.concurrency * 4)
+        self.max_chunk_chars = max_chunk_chars
+        self.gap = gap
+        self.chapter_gap = chapter_gap
+        self.output_format = output_format
+        self.subtitle_format = subtitle_format
+        self.book_name = book_name
+        self.read_titles = read_titles
+        self.retries = max(0, retries)
+        self.dedup = dedup
+        self.dedup_cache_size = dedup_cache_size
+        self.template = replace(
+            request or TTSRequest(text="-"),
+            output_format=output_format,
+            output_file=None,
+            output_dir=None,
+            generate_subtitles=True,
+            **request_options,
+        )
+
+        self._chapters: List[Dict[str, Any]] = []
+        self._current: Optional[Dict[str, Any]] = None
+        self._chapter_audio: Optional[AudioStreamWriter] = None
+        self._chapter_subtitle: Optional[SubtitleStreamWriter] = None
+        self._book_audio: Optional[AudioStreamWriter] = None
+        self._book_subtitle: Optional[SubtitleStreamWriter] = None
+        self._stats = {"chunks": 0, "characters": 0, "synthesis_seconds": 0.0}
+        self._units: Optional[UnitCache] = None
+
+    # ==================== 执行 ====================
+
+    def run(
+        self, chapters: Iterable[Union[Chapter, Tuple[str, str]]]
+    ) -> Dict[str, Any]:
+        """合成全部章节
+
+        Args:
+            chapters: 章节序列，元素为Chapter或(标题, 文本)，可以是生成器
+
+        Returns:
+            章节索引（同index.json）；有文本块最终失败时success为False，
+            已写出的章节仍然保留
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._chapters = []
+        self._stats = {"chunks": 0, "characters": 0, "synthesis_seconds": 0.0}
+        self._units = (
+            UnitCache(self.dedup_cache_size, on_evict=self._discard)
+            if self.dedup
+            else None
+        )
+        started_at = time.time()
+        if self.book_name:
+            self._book_audio = AudioStreamWriter(
+                self._path(f"{self.book_name}.{self.output_format}")
+            )
+            self._book_subtitle = SubtitleStreamWriter(
+                self._path(f"{self.book_name}.{self.subtitle_format}")
+            )
+
+        error = None
+        executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="funtts-audiobook"
+        )
+        pending: Deque[Tuple[_Chunk, Future]] = deque()
+        try:
+            for chunk in self._iter_chunks(chapters):
+                if len(pending) >= self.window:
+                    self._write(*pending.popleft())
+                pending.append((chunk, executor.submit(self._synthesize, chunk)))
+            while pending:
+                self._write(*pending.popleft())
+        except Exception as e:
+            error = str(e)
+            logger.error(f"有声书合成中止: {e}")
+        finally:
+            # 中止时排队中的文本块不再合成，只等待正在合成的文本块结束
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            for chunk, future in pending:
+                if future.done() and not future.cancelled() and not future.exception():
+                    self._release(chunk, future.result())
+            self._close_chapter(complete=error is None)
+            for writer in (self._book_audio, self._book_subtitle):
+                if writer is not None:
+                    writer.close()
+
+        index = self._index(True, error, time.time() - started_at)
+        if self._units is not None:
+            index["dedup"] = self._units.stats()
+            self._units.clear()
+        self._save_index(index)
+        logger.info(
+            f"有声书合成{'完成' if error is None else '中止'}: {len(self._chapters)}章 "
+            f"{self._stats['chunks']}段 时长{index['duration']:.1f}s "
+            f"用时{index['elapsed']:.1f}s"
+        )
+        return index
+
+    def _iter_chunks(
+        self, chapters: Iterable[Union[Chapter, Tuple[str, str]]]
+    ) -> Iterator[_Chunk]:
+        isolate = None
+        if self.dedup:
+            # 只保存句子的32位指纹，冲突只会让句子多单独合成一次
+            seen = set()
+
+            def isolate(sentence: str) -> bool:
+                key = fingerprint(normalize_text(sentence))
+                if key in seen:
+                    return True
+                seen.add(key)
+                return False
+
+        for chapter_index, chapter in enumerate(chapters):
+            if not isinstance(chapter, Chapter):
+                chapter = Chapter(*chapter)
+            self._chapters.append(
+                {
+                    "index": chapter_index,
+                    "title": chapter.title,
+                    "chunks": 0,
+                    "characters": 0,
+                }
+            )
+            entry = self._chapters[-1]
+            chunks = chunk_text(chapter.text, self.max_chunk_chars, isolate)
+            if self.read_titles and chapter.title.strip():
+                chunks = itertools.chain([chapter.title.strip()], chunks)
+            for index, text in enumerate(chunks):
+                entry["chunks"] += 1
+                entry["characters"] += len(text)
+                yield _Chunk(chapter_index, index, text)
+
+    def _synthesize(self, chunk: _Chunk) -> TTSResponse:
+        request = replace(self.template, text=chunk.text)
+        if self._units is None:
+            return self._synthesize_request(chunk, request)
+        chunk.key = unit_key(request, self.engine.__class__.__name__)
+        response, chunk.reused = self._units.acquire(
+            chunk.key, lambda: self._synthesize_request(chunk, request), len(chunk.text)
+        )
+        return response
+
+    def _synthesize_request(self, chunk: _Chunk, request: TTSRequest) -> TTSResponse:
+        for attempt in range(self.retries + 1):
+            response = self.engine.synthesize(request)
+            if response.success and response.wait_outputs():
+                return response
+            self._discard(response)
+            logger.warning(
+                f"第{chunk.chapter + 1}章第{chunk.index + 1}段合成失败"
+                f"（第{attempt + 1}次）: {response.error_message}"
+            )
+        raise RuntimeError(
+            f"第{chunk.chapter + 1}章第{chunk.index + 1}段合成失败: "
+            f"{response.error_message}"
+        )
+
+    # ==================== 写出 ====================
+
+    def _write(self, chunk: _Chunk, future: Future):
+        response = future.result()
+        try:
+            if chunk.index == 0:
+                self._open_chapter(chunk.chapter)
+            elif self.gap > 0:
+                self._chapter_audio.add_silence(self.gap)
+                if self._book_audio is not None:
+                    self._book_audio.add_silence(self.gap)
+
+            chapter_offset = self._chapter_audio.duration
+            book_offset = self._book_audio.duration if self._book_audio else 0.0
+            duration = self._chapter_audio.append_file(response.audio_file)
+            if self._book_audio is not None:
+                self._book_audio.append_file(response.audio_file)
+
+            segments = (
+                response.subtitle_maker.get_segments()
+                if response.subtitle_maker
+                else [AudioSegment(0.0, duration, chunk.text)]
+            )
+            for segment in segments:
+                self._chapter_subtitle.write(segment, chapter_offset)
+                if self._book_subtitle is not None:
+                    self._book_subtitle.write(segment, book_offset)
+
+            self._stats["chunks"] += 1
+            self._stats["characters"] += len(chunk.text)
+            if not chunk.reused:
+                self._stats["synthesis_seconds"] += response.processing_time
+        finally:
+            self._release(chunk, response)
+
+    def _open_chapter(self, chapter_index: int):
+        self._close_chapter()
+        entry = self._chapters[chapter_index]
+        name = f"{chapter_index + 1:03d}"
+        entry["audio_file"] = self._path(f"{name}.{self.output_format}")
+        entry["subtitle_file"] = self._path(f"{name}.{self.subtitle_format}")
+        self._chapter_audio = AudioStreamWriter(entry["audio_file"])
+        self._chapter_subtitle = SubtitleStreamWriter(entry["subtitle_file"])
+        if self._book_audio is not None:
+            if self._book_audio.duration > 0:
+                self._book_audio.add_silence(self.chapter_gap)
+            entry["offset"] = round(self._book_audio.duration, 3)
+        self._current = entry
+        logger.info(f"开始写入第{chapter_index + 1}章: {entry['title']}")
+
+    def _close_chapter(self, complete: bool = True):
+        if self._chapter_audio is None:
+            return
+        self._chapter_audio.close()
+        self._chapter_subtitle.close()
+        self._current["duration"] = round(self._chapter_audio.duration, 3)
+        # 中止时正在写入的章节只包含已写出的部分
+        self._current["complete"] = complete
+        self._current = None
+        self._chapter_audio = None
+        self._chapter_subtitle = None
+        self._save_index(self._index(False))
+
+    def _release(self, chunk: _Chunk, response: TTSResponse):
+        if self._units is not None:
+            self._units.release(chunk.key)
+        else:
+            self._discard(response)
+
+    @staticmethod
+    def _discard(response: TTSResponse):
+        """文本块的临时音频和字幕文件写出后立即删除，不等响应对象回收"""
+        for path in (
+            response.audio_file,
+            response.subtitle_file,
+            response.frt_subtitle_file,
+        ):
+            if path and is_temp_file(path):
+                get_workspace().discard(path)
+
+    # ==================== 索引 ====================
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def _index(
+        self,
+        finished: bool,
+        error: Optional[str] = None,
+        elapsed: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """章节索引，finished为False时表示合成仍在进行（每章结束时保存一次）"""
+        chapters = [entry for entry in self._chapters if "duration" in entry]
+        index: Dict[str, Any] = {
+            "success": error is None,
+            "finished": finished,
+            "chapters": chapters,
+            "duration": round(
+                self._book_audio.duration
+                if self._book_audio is not None
+                else sum(entry.get("duration", 0.0) for entry in chapters),
+                3,
+            ),
+            **self._stats,
+        }
+        if self._book_audio is not None:
+            index["audio_file"] = self._book_audio.file_path
+            index["subtitle_file"] = self._book_subtitle.file_path
+        if elapsed is not None:
+            index["elapsed"] = round(elapsed, 3)
+        if error is not None:
+            index["error"] = error
+        return index
+
+    def _save_index(self, index: Dict[str, Any]):
+        path = self._path("index.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(index, file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
@@ -0,0 +1,173 @@
+"""
+任务内的重复文本去重
+同一任务中规范化后相同的合成单元（条目、文本块或台词）只合成一次，
+结果在各次出现之间共享，并统计复用情况。
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from funutil import getLogger
+
+from ..models import TTSRequest, TTSResponse
+from ..utils.text_utils import normalize_text
+
+logger = getLogger("funtts")
+
+
+def unit_key(request: TTSRequest, *extra: Any) -> str:
+    """合成单元的去重键：规范化文本后的请求哈希，不含输出路径"""
+    return replace(request, text=normalize_text(request.text)).cache_key(*extra)
+
+
+@dataclass
+class _Entry:
+    future: Future
+    users: int = 0
+
+
+class UnitCache:
+    """合成单元缓存
+
+    - acquire: 键第一次出现时由调用方线程执行合成，之后（包括同时进行）的
+      出现等待并共享同一个响应；失败的结果不缓存，下一次出现重新合成
+    - 调用方用完成功的响应后调用release；只有没有使用者的条目会被淘汰，
+      淘汰时调用on_evict（如删除临时文件），缓存的条目数不超过max_entries
+      （所有条目都在使用中时暂时超出）
+
+    使用示例:
+        cache = UnitCache(max_entries=256, on_evict=discard_files)
+        response, reused = cache.acquire(key, lambda: engine.synthesize(request))
+        ...
+        cache.release(key)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        on_evict: Optional[Callable[[TTSResponse], None]] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"units": 0, "synthesized": 0, "reused": 0, "reused_chars": 0}
+
+    def acquire(
+        self, key: str, synthesize: Callable[[], TTSResponse], chars: int = 0
+    ) -> Tuple[TTSResponse, bool]:
+        """获取键对应的响应，不存在时调用synthesize合成
+
+        Args:
+            key: 去重键（见unit_key）
+            synthesize: 合成函数
+            chars: 单元的字符数，用于统计
+
+        Returns:
+            (响应, 是否复用了其他出现的结果)；响应成功时需要调用release
+        """
+        with self._lock:
+            self._stats["units"] += 1
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry(Future())
+            else:
+                self._entries.move_to_end(key)
+            entry.users += 1
+
+        if not owner:
+            try:
+                response = entry.future.result()
+            except BaseException:
+                self._drop_user(entry)
+                raise
+            if not response.success:
+                self._drop_user(entry)
+                return response, False
+            with self._lock:
+                self._stats["reused"] += 1
+                self._stats["reused_chars"] += chars
+            return response, True
+
+        try:
+            response = synthesize()
+        except BaseException as e:
+            self._remove(key, entry)
+            entry.future.set_exception(e)
+            raise
+        with self._lock:
+            self._stats["synthesized"] += 1
+        if not response.success:
+            self._remove(key, entry)
+        entry.future.set_result(response)
+        return response, False
+
+    def release(self, key: str):
+        """调用方不再使用键对应的响应"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.users = max(0, entry.users - 1)
+            evicted = self._evict()
+        self._notify(evicted)
+
+    def clear(self):
+        """淘汰所有条目（包括仍在使用中的）"""
+        with self._lock:
+            evicted = [
+                entry.future.result()
+                for entry in self._entries.values()
+                if entry.future.done() and entry.future.exception() is None
+            ]
+            self._entries.clear()
+        self._notify(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """复用统计：units为查询次数，synthesized为实际合成次数"""
+        with self._lock:
+            units = self._stats["units"]
+            return {
+                **self._stats,
+                "cached": len(self._entries),
+                "reuse_ratio": round(self._stats["reused"] / units, 4)
+                if units
+                else 0.0,
+            }
+
+    def _drop_user(self, entry: _Entry):
+        with self._lock:
+            entry.users = max(0, entry.users - 1)
+
+    def _remove(self, key: str, entry: _Entry):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+    def _evict(self) -> List[TTSResponse]:
+        """淘汰最久未使用且没有使用者的条目（需持有锁）"""
+        evicted = []
+        if len(self._entries) <= self.max_entries:
+            return evicted
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_entries:
+                break
+            entry = self._entries[key]
+            if entry.users or not entry.future.done():
+                continue
+            del self._entries[key]
+            evicted.append(entry.future.result())
+        return evicted
+
+    def _notify(self, evicted: List[TTSResponse]):
+        if self.on_evict is None:
+            return
+        for response in evicted:
+            try:
+                self.on_evict(response)
+            except Exception as e:
+                logger.warning(f"清理去重缓存条目失败: {e}")
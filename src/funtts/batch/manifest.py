@@ -0,0 +1,166 @@
+"""
+批量任务清单（manifest）
+只追加的JSONL文件，每完成（或最终失败）一条请求写入一行记录；
+重启时据此跳过已完成的条目，记录本身从不修改。
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from array import array
+from typing import Any, Dict, Iterator, Optional
+
+from funutil import getLogger
+
+from ..utils.file_utils import file_sha256
+
+logger = getLogger("funtts")
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 完成校验方式
+VERIFY_HASH = "hash"  # 输出文件存在，大小和sha256与记录一致
+VERIFY_SIZE = "size"  # 输出文件存在，大小与记录一致
+VERIFY_EXISTS = "exists"  # 输出文件存在
+
+
+def fingerprint(key: str) -> int:
+    """把请求键压缩为非零的32位指纹"""
+    return zlib.crc32(key.encode("utf-8")) or 1
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取清单记录，跳过损坏的行（如进程崩溃时写了一半的最后一行）"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"清单第{number}行损坏，已忽略: {path}")
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def verify_record(record: Dict[str, Any], verify: str = VERIFY_HASH) -> bool:
+    """检查一条完成记录的输出是否仍然有效"""
+    audio_file = record.get("audio_file")
+    if not audio_file or not os.path.isfile(audio_file):
+        return False
+    if verify == VERIFY_EXISTS:
+        return True
+    if os.path.getsize(audio_file) != record.get("audio_size"):
+        return False
+    if verify == VERIFY_SIZE:
+        return True
+    return file_sha256(audio_file) == record.get("audio_sha256")
+
+
+class CompletedIndex:
+    """已完成条目的索引
+
+    按输入行号保存请求键的32位指纹（每条4字节），占用内存只与输入条数有关，
+    与清单的大小和记录内容无关；同一行号的请求内容变化后指纹不再匹配，会重新合成。
+    """
+
+    def __init__(self):
+        self._fingerprints = array("I")
+        self.count = 0
+
+    def add(self, index: int, key: str):
+        if index >= len(self._fingerprints):
+            self._fingerprints.extend([0] * (index + 1 - len(self._fingerprints)))
+        if not self._fingerprints[index]:
+            self.count += 1
+        self._fingerprints[index] = fingerprint(key)
+
+    def contains(self, index: int, key: str) -> bool:
+        return (
+            index < len(self._fingerprints)
+            and self._fingerprints[index] == fingerprint(key)
+        )
+
+    @classmethod
+    def load(cls, path: str, verify: str = VERIFY_HASH) -> "CompletedIndex":
+        """从清单加载已完成且输出有效的条目"""
+        index = cls()
+        invalid = 0
+        for record in iter_records(path):
+            if record.get("status") != STATUS_DONE or "index" not in record:
+                continue
+            if verify_record(record, verify):
+                index.add(record["index"], record.get("key", ""))
+            else:
+                invalid += 1
+        if invalid:
+            logger.warning(f"清单中有{invalid}条完成记录的输出已缺失或不一致，将重新合成")
+        return index
+
+
+class Manifest:
+    """只追加的清单写入器，可在多个线程中使用
+
+    每条记录写入后立即flush；每fsync_interval秒fsync一次，兼顾崩溃后的完整性和写入开销。
+    """
+
+    def __init__(self, path: str, fsync_interval: float = 1.0):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._synced_at = time.time()
+
+    def append(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file.closed:
+                # 再次中断时不再等待在途条目，这些条目下次运行时重新合成
+                logger.warning(f"清单已关闭，第{record.get('index')}条的记录未写入")
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            if time.time() - self._synced_at >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._synced_at = time.time()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_manifest_summary(path: str) -> Optional[Dict[str, int]]:
+    """统计清单中各状态的条目数（按行号去重，以最后一条记录为准）"""
+    if not os.path.exists(path):
+        return None
+    states = array("b")
+    for record in iter_records(path):
+        index = record.get("index")
+        if not isinstance(index, int) or index < 0:
+            continue
+        if index >= len(states):
+            states.extend([0] * (index + 1 - len(states)))
+        states[index] = 1 if record.get("status") == STATUS_DONE else -1
+    return {
+        "done": sum(1 for state in states if state == 1),
+        "failed": sum(1 for state in states if state == -1),
+    }
@@ -0,0 +1,554 @@
+"""
+基于SQLite的持久化任务队列
+多个进程、多台机器上的合成工作进程共享同一个队列文件（放在共享存储上），
+或者每个分片一个队列文件，不需要额外的消息中间件。
+
+- 认领任务时设置租约，租约到期未完成（工作进程崩溃、断网）的任务重新可见
+- 失败的任务按指数退避重试，超过最大尝试次数后标记为失败
+- 完成结果（音频路径、sha256、时长等）记录在队列中，可导出为批量合成清单
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from funutil import getLogger
+
+from ..models import TTSRequest
+from .runner import iter_input, parse_line
+
+logger = getLogger("funtts")
+
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    request TEXT NOT NULL,
+    engine TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    error_code TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (batch, item_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (status, lease_expires);
+"""
+
+
+def default_worker_id() -> str:
+    """工作进程标识：主机名、进程号和随机串"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def shard_of(item_id: str, shards: int) -> int:
+    """条目所属的分片，由item_id决定，重复入队时分片不变"""
+    return zlib.crc32(item_id.encode("utf-8")) % shards
+
+
+def shard_path(path: str, index: int, shards: int) -> str:
+    """分片队列文件路径，如 jobs.db 的第1个分片为 jobs.1.db；只有一个分片时为原路径"""
+    if shards <= 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{index}{ext}"
+
+
+@dataclass
+class Job:
+    """已认领的任务"""
+
+    id: int
+    batch: str
+    item_id: str
+    request: TTSRequest
+    engine: Optional[str]
+    attempts: int  # 包含本次在内的尝试次数
+
+
+class JobQueue:
+    """SQLite任务队列，可在多个线程和进程中同时使用
+
+    每个线程使用独立的连接；认领、续租和结果写入都在BEGIN IMMEDIATE事务中完成，
+    同一任务不会同时被两个租约有效的工作进程持有。
+    各节点用本地时钟判断租约是否到期，节点间时钟偏差应远小于租约时长。
+
+    使用示例:
+        queue = JobQueue("jobs.db")
+        queue.enqueue_file("requests.jsonl", batch="book1")
+        jobs = queue.claim("worker-1")
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 5.0,
+        max_backoff: float = 300.0,
+        journal_mode: str = "wal",
+        busy_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            path: 队列文件路径
+            lease_seconds: 默认租约时长（秒），工作进程应在到期前续租
+            max_attempts: 每个任务的最大尝试次数（含租约到期）
+            retry_backoff: 首次重试前的等待时间（秒），之后每次翻倍
+            max_backoff: 重试等待时间上限（秒）
+            journal_mode: SQLite日志模式；WAL要求所有访问者在同一台机器上，
+                队列文件放在网络文件系统上时使用delete
+            busy_timeout: 等待其他连接释放写锁的最长时间（秒）
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.journal_mode = journal_mode
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._connection().executescript(_SCHEMA)
+
+    # ==================== 连接 ====================
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 自行管理事务（isolation_level=None），便于使用BEGIN IMMEDIATE
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def close(self):
+        """关闭所有线程的连接"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # ==================== 入队 ====================
+
+    def enqueue(
+        self,
+        items: Iterable[Tuple[str, TTSRequest]],
+        batch: str = "default",
+        engine: Optional[str] = None,
+        chunk_size: int = 500,
+    ) -> int:
+        """批量入队
+
+        同一批次中item_id相同的任务只入队一次，重复入队同一份清单不会产生重复任务。
+
+        Args:
+            items: (item_id, 请求) 序列，可以是生成器
+            batch: 批次名称
+            engine: 执行引擎，None表示由工作进程决定
+            chunk_size: 每个事务插入的任务数
+
+        Returns:
+            int: 新增的任务数
+        """
+        added = 0
+        chunk = []
+        for item_id, request in items:
+            chunk.append((item_id, request))
+            if len(chunk) >= chunk_size:
+                added += self._insert(chunk, batch, engine)
+                chunk = []
+        if chunk:
+            added += self._insert(chunk, batch, engine)
+        return added
+
+    def _insert(
+        self, chunk: List[Tuple[str, TTSRequest]], batch: str, engine: Optional[str]
+    ) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (batch, item_id, request, engine, "
+                "status, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        batch,
+                        str(item_id),
+                        json.dumps(request.to_dict(), ensure_ascii=False),
+                        engine,
+                        STATUS_PENDING,
+                        now,
+                        now,
+                        now,
+                    )
+                    for item_id, request in chunk
+                ],
+            )
+            return conn.total_changes - before
+
+    def enqueue_file(
+        self,
+        input_path: str,
+        batch: Optional[str] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        **kwargs,
+    ) -> Tuple[int, int]:
+        """把批量合成的JSONL输入文件入队
+
+        没有id的条目以行号（只计非空行）为item_id。
+
+        Args:
+            input_path: 输入文件，格式同BatchRunner
+            batch: 批次名称，默认为输入文件名
+            shard: (分片序号, 分片数)，只入队属于该分片的条目，见shard_of
+            **kwargs: 传给enqueue
+
+        Returns:
+            (新增任务数, 无效行数)
+        """
+        invalid = [0]
+
+        def items():
+            for index, line in iter_input(input_path):
+                try:
+                    item_id, request = parse_line(line)
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"第{index}条不是有效的请求: {e}")
+                    invalid[0] += 1
+                    continue
+                item_id = item_id if item_id is not None else f"{index:06d}"
+                if shard is None or shard_of(item_id, shard[1]) == shard[0]:
+                    yield item_id, request
+
+        batch = batch or os.path.splitext(os.path.basename(input_path))[0]
+        return self.enqueue(items(), batch=batch, **kwargs), invalid[0]
+
+    # ==================== 认领与结果 ====================
+
+    def claim(
+        self,
+        worker_id: str,
+        limit: int = 1,
+        lease_seconds: Optional[float] = None,
+        batch: Optional[str] = None,
+    ) -> List[Job]:
+        """认领可执行的任务
+
+        可执行的任务包括到达重试时间的待执行任务，以及租约已到期的任务；
+        租约到期且已用完尝试次数的任务直接标记为失败。
+
+        Args:
+            worker_id: 工作进程标识
+            limit: 最多认领的任务数
+            lease_seconds: 租约时长，None使用队列默认值
+            batch: 只认领该批次的任务
+
+        Returns:
+            List[Job]: 认领到的任务，没有可执行任务时为空
+        """
+        now = time.time()
+        expires = now + (lease_seconds or self.lease_seconds)
+        batch_filter, batch_args = ("AND batch = ?", (batch,)) if batch else ("", ())
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, error_code = ?, "
+                "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires <= ? AND attempts >= ? "
+                f"{batch_filter}",
+                (
+                    STATUS_FAILED,
+                    "租约到期且已用完尝试次数",
+                    "LEASE_EXPIRED",
+                    now,
+                    STATUS_LEASED,
+                    now,
+                    self.max_attempts,
+                    *batch_args,
+                ),
+            )
+            rows = conn.execute(
+                "SELECT id, batch, item_id, request, engine, attempts FROM jobs "
+                "WHERE ((status = ? AND available_at <= ?) "
+                f"OR (status = ? AND lease_expires <= ?)) {batch_filter} "
+                "ORDER BY id LIMIT ?",
+                (STATUS_PENDING, now, STATUS_LEASED, now, *batch_args, limit),
+            ).fetchall()
+            if not rows:
+                return []
+            conn.executemany(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(STATUS_LEASED, worker_id, expires, now, row["id"]) for row in rows],
+            )
+        return [
+            Job(
+                id=row["id"],
+                batch=row["batch"],
+                item_id=row["item_id"],
+                request=TTSRequest(**json.loads(row["request"])),
+                engine=row["engine"],
+                attempts=row["attempts"] + 1,
+            )
+            for row in rows
+        ]
+
+    def heartbeat(
+        self,
+        job_ids: Iterable[int],
+        worker_id: str,
+        lease_seconds: Optional[float] = None,
+    ) -> List[int]:
+        """为仍持有的任务续租，返回已失去租约的任务id"""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return []
+        now = time.time()
+        expires = now + (lease_seconds or self.lease_seconds)
+        lost = []
+        with self._transaction() as conn:
+            for job_id in job_ids:
+                cursor = conn.execute(
+                    "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                    "WHERE id = ? AND status = ? AND lease_owner = ?",
+                    (expires, now, job_id, STATUS_LEASED, worker_id),
+                )
+                if cursor.rowcount == 0:
+                    lost.append(job_id)
+        return lost
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """记录任务完成
+
+        Returns:
+            bool: 是否仍持有该任务的租约；租约已被其他工作进程接手时返回False，结果不写入
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, "
+                "error_code = NULL, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (
+                    STATUS_DONE,
+                    json.dumps(result, ensure_ascii=False),
+                    time.time(),
+                    job_id,
+                    STATUS_LEASED,
+                    worker_id,
+                ),
+            )
+            return cursor.rowcount > 0
+
+    def fail(
+        self,
+        job_id: int,
+        worker_id: str,
+        error: str,
+        error_code: Optional[str] = None,
+        retryable: bool = True,
+    ) -> Optional[str]:
+        """记录任务失败：未用完尝试次数时按指数退避重新排队，否则标记为失败
+
+        Returns:
+            任务的新状态（pending或failed），已失去租约时返回None
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM jobs "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (job_id, STATUS_LEASED, worker_id),
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = row["attempts"]
+            if retryable and attempts < self.max_attempts:
+                status = STATUS_PENDING
+                delay = min(self.retry_backoff * 2 ** (attempts - 1), self.max_backoff)
+            else:
+                status = STATUS_FAILED
+                delay = 0.0
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, error = ?, "
+                "error_code = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, now + delay, error, error_code, now, job_id),
+            )
+            return status
+
+    def release(self, job_id: int, worker_id: str) -> bool:
+        """归还未开始执行的任务（工作进程退出时），不计入尝试次数"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, "
+                "attempts = attempts - 1, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (STATUS_PENDING, now, now, job_id, STATUS_LEASED, worker_id),
+            )
+            return cursor.rowcount > 0
+
+    # ==================== 管理 ====================
+
+    def retry_failed(self, batch: Optional[str] = None) -> int:
+        """把失败的任务重新排队并清零尝试次数，返回重新排队的任务数"""
+        now = time.time()
+        batch_filter, batch_args = ("AND batch = ?", (batch,)) if batch else ("", ())
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, "
+                f"updated_at = ? WHERE status = ? {batch_filter}",
+                (STATUS_PENDING, now, now, STATUS_FAILED, *batch_args),
+            )
+            return cursor.rowcount
+
+    def stats(
+        self, batch: Optional[str] = None, window: float = 60.0
+    ) -> Dict[str, Any]:
+        """队列状态
+
+        Args:
+            batch: 只统计该批次
+            window: 吞吐量统计窗口（秒）
+
+        Returns:
+            各状态的任务数、活跃工作进程数、最近window秒内的完成速率和预计剩余时间
+        """
+        now = time.time()
+        batch_filter, batch_args = ("WHERE batch = ?", (batch,)) if batch else ("", ())
+        conn = self._connection()
+        counts = {
+            STATUS_PENDING: 0,
+            STATUS_LEASED: 0,
+            STATUS_DONE: 0,
+            STATUS_FAILED: 0,
+        }
+        for row in conn.execute(
+            f"SELECT status, COUNT(*) AS n FROM jobs {batch_filter} GROUP BY status",
+            batch_args,
+        ):
+            counts[row["status"]] = row["n"]
+        and_batch = "AND batch = ?" if batch else ""
+        recent, since = conn.execute(
+            "SELECT COUNT(*), MIN(updated_at) FROM jobs "
+            f"WHERE status = ? AND updated_at > ? {and_batch}",
+            (STATUS_DONE, now - window, *batch_args),
+        ).fetchone()
+        # 刚开始执行时按实际经过的时间计算，不被空的窗口拉低
+        rate = recent / max(now - since, 1.0) if recent else 0.0
+        remaining = counts[STATUS_PENDING] + counts[STATUS_LEASED]
+        return {
+            **counts,
+            "total": sum(counts.values()),
+            "workers": len(self.workers(batch)),
+            "rate": round(rate, 3),
+            "eta": round(remaining / rate, 1) if rate > 0 else None,
+        }
+
+    def has_unfinished(self, batch: Optional[str] = None) -> bool:
+        """是否还有待执行或执行中的任务"""
+        batch_filter, batch_args = ("AND batch = ?", (batch,)) if batch else ("", ())
+        row = self._connection().execute(
+            f"SELECT 1 FROM jobs WHERE status IN (?, ?) {batch_filter} LIMIT 1",
+            (STATUS_PENDING, STATUS_LEASED, *batch_args),
+        ).fetchone()
+        return row is not None
+
+    def workers(self, batch: Optional[str] = None) -> List[str]:
+        """持有有效租约的工作进程标识"""
+        batch_filter, batch_args = ("AND batch = ?", (batch,)) if batch else ("", ())
+        return [
+            row[0]
+            for row in self._connection().execute(
+                "SELECT DISTINCT lease_owner FROM jobs "
+                f"WHERE status = ? AND lease_expires > ? {batch_filter}",
+                (STATUS_LEASED, time.time(), *batch_args),
+            )
+        ]
+
+    def batches(self) -> List[str]:
+        """队列中的批次名称"""
+        return [
+            row[0]
+            for row in self._connection().execute(
+                "SELECT DISTINCT batch FROM jobs ORDER BY batch"
+            )
+        ]
+
+    def iter_results(
+        self, batch: Optional[str] = None, status: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """按入队顺序逐条返回已结束（完成或失败）任务的记录，格式同批量合成清单"""
+        statuses = [status] if status else [STATUS_DONE, STATUS_FAILED]
+        placeholders = ", ".join("?" for _ in statuses)
+        batch_filter, batch_args = ("AND batch = ?", (batch,)) if batch else ("", ())
+        cursor = self._connection().execute(
+            "SELECT batch, item_id, status, attempts, result, error, error_code "
+            f"FROM jobs WHERE status IN ({placeholders}) {batch_filter} ORDER BY id",
+            (*statuses, *batch_args),
+        )
+        for row in cursor:
+            record = json.loads(row["result"]) if row["result"] else {}
+            record.update(
+                batch=row["batch"],
+                id=row["item_id"],
+                status=row["status"],
+                attempts=row["attempts"],
+            )
+            if row["status"] == STATUS_FAILED:
+                record.update(error=row["error"], error_code=row["error_code"])
+            yield record
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE事务：开始时即取得写锁，避免读后升级写锁时的死锁"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
@@ -0,0 +1,485 @@
+"""
+可断点续跑的批量合成
+从JSONL读取TTSRequest形式的请求，按有界并发执行，结果写入只追加的清单；
+重启后跳过清单中已完成且输出文件校验通过的条目。
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import fields, replace
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, Tuple
+
+from funutil import getLogger
+
+from ..models import SubtitleMaker, TTSRequest, TTSResponse
+from ..utils.file_utils import file_sha256, materialize_file
+from .dedup import UnitCache, unit_key
+from .manifest import (
+    STATUS_DONE,
+    STATUS_FAILED,
+    VERIFY_HASH,
+    CompletedIndex,
+    Manifest,
+)
+
+if TYPE_CHECKING:
+    from ..base import BaseTTS, RequestScheduler
+
+logger = getLogger("funtts")
+
+_REQUEST_FIELDS = {field.name for field in fields(TTSRequest)}
+# 输入行中除TTSRequest字段外允许的键
+_EXTRA_FIELDS = ("id",)
+# 重试也不会成功的错误
+PERMANENT_ERRORS = ("INVALID_REQUEST",)
+
+
+def parse_line(line: str) -> Tuple[Optional[str], TTSRequest]:
+    """解析一行输入，返回(条目id, 请求)
+
+    Raises:
+        ValueError: 不是有效的请求
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("每行必须是JSON对象")
+    unknown = set(data) - _REQUEST_FIELDS - set(_EXTRA_FIELDS)
+    if unknown:
+        raise ValueError(f"未知的字段: {', '.join(sorted(unknown))}")
+    item_id = data.pop("id", None)
+    request = TTSRequest(**data)
+    if not request.validate():
+        raise ValueError("请求参数验证失败")
+    return (str(item_id) if item_id is not None else None), request
+
+
+def check_outputs(request: TTSRequest, response: TTSResponse) -> TTSResponse:
+    """等待后台输出写入完成，输出文件缺失时把响应改为失败"""
+    if response.success and not response.wait_outputs():
+        response.success = False
+        response.error_code = "OUTPUT_ERROR"
+        response.error_message = "输出文件写入失败"
+    audio_file = response.audio_file or request.output_file
+    if response.success and not (audio_file and os.path.isfile(audio_file)):
+        response.success = False
+        response.error_code = "OUTPUT_ERROR"
+        response.error_message = "输出文件不存在"
+    return response
+
+
+def output_record(request: TTSRequest, response: TTSResponse) -> Dict[str, Any]:
+    """成功响应的清单字段：输出文件及其大小、sha256，时长和字幕路径"""
+    audio_file = response.audio_file or request.output_file
+    return {
+        "audio_file": audio_file,
+        "audio_size": os.path.getsize(audio_file),
+        "audio_sha256": file_sha256(audio_file),
+        "duration": round(response.duration, 3),
+        "subtitle_file": response.subtitle_file,
+        "frt_subtitle_file": response.frt_subtitle_file,
+        "voice_used": response.voice_used,
+    }
+
+
+def _remove_outputs(request: TTSRequest):
+    """删除条目上次留下的输出文件
+
+    已有的输出文件可能与其他条目共享inode（硬链接），引擎原地写入时会一起改写；
+    先删除目录项再合成，新文件总是独立的inode。
+    """
+    paths = [request.output_file] + [
+        SubtitleMaker.generate_subtitle_filename(request.output_file, format_type)
+        for format_type in (request.subtitle_format, "frt")
+    ]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def iter_input(path: str) -> Iterator[Tuple[int, str]]:
+    """逐行读取输入，返回(行号, 内容)，行号只计非空行"""
+    index = 0
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            yield index, line
+            index += 1
+
+
+def count_lines(path: str) -> int:
+    """统计非空行数，按块读取"""
+    count = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if line.strip():
+                count += 1
+    return count
+
+
+class BatchRunner:
+    """批量合成执行器
+
+    - 输入逐行读取，同时在途的条目不超过max_pending，内存占用与输入规模无关
+    - 条目以输入行号标识，跳过判断只需每行4字节的指纹索引（见CompletedIndex）
+    - 每个条目完成或最终失败后向清单追加一条记录：音频路径、大小、sha256、时长、
+      字幕路径、耗时、重试次数和错误信息
+    - 定时输出进度、吞吐量和预计剩余时间
+    - dedup=True时，本次运行中内容相同（规范化文本后，不含输出路径）的条目只合成一次，
+      其余条目复制（优先硬链接）第一个条目的音频和字幕文件
+
+    使用示例:
+        runner = BatchRunner(engine, "out/manifest.jsonl", concurrency=8)
+        stats = runner.run("requests.jsonl")
+    """
+
+    def __init__(
+        self,
+        engine: "BaseTTS",
+        manifest_path: str,
+        concurrency: int = 4,
+        output_dir: Optional[str] = None,
+        retries: int = 2,
+        retry_backoff: float = 1.0,
+        verify: str = VERIFY_HASH,
+        max_pending: Optional[int] = None,
+        progress_interval: float = 5.0,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        scheduler: Optional["RequestScheduler"] = None,
+        tenant: str = "batch",
+        priority: Optional[str] = None,
+        dedup: bool = False,
+        dedup_cache_size: int = 4096,
+    ):
+        """
+        Args:
+            engine: 执行合成的引擎
+            manifest_path: 清单文件路径
+            concurrency: 并发合成数
+            output_dir: 未指定output_file的请求的输出目录，默认为清单所在目录下的audio
+            retries: 失败后的重试次数
+            retry_backoff: 首次重试前的等待时间（秒），之后每次翻倍
+            verify: 跳过已完成条目前的校验方式，hash/size/exists
+            max_pending: 最大在途条目数，默认为concurrency的2倍
+            progress_interval: 进度输出间隔（秒），0表示不输出
+            on_progress: 进度回调，参数同stats()
+            scheduler: 通过请求调度器提交（与在线请求共享引擎时使用），
+                此时并发由调度器的workers决定
+            tenant: 通过调度器提交时的租户
+            priority: 通过调度器提交时的优先级类别，默认为最低的类别
+            dedup: 是否复用本次运行中相同请求的合成结果
+            dedup_cache_size: 记住的不同请求数，超出后最早的请求不再参与复用
+        """
+        self.engine = engine
+        self.manifest_path = manifest_path
+        self.concurrency = max(1, concurrency)
+        self.output_dir = output_dir or os.path.join(
+            os.path.dirname(os.path.abspath(manifest_path)), "audio"
+        )
+        self.retries = max(0, retries)
+        self.retry_backoff = retry_backoff
+        self.verify = verify
+        self.max_pending = max_pending or self.concurrency * 2
+        self.progress_interval = progress_interval
+        self.on_progress = on_progress
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.priority = priority or (scheduler.priorities[-1] if scheduler else None)
+        self.dedup = dedup
+        self.dedup_cache_size = dedup_cache_size
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self._total = 0
+        self._skipped = 0
+        self._done = 0
+        self._failed = 0
+        self._chars = 0
+        self._audio_seconds = 0.0
+        self._started_at = time.time()
+        self._units = UnitCache(self.dedup_cache_size) if self.dedup else None
+
+    # ==================== 执行 ====================
+
+    def run(self, input_path: str) -> Dict[str, Any]:
+        """执行输入文件中的全部请求，返回统计信息（同stats()）
+
+        可以在另一个线程中调用stop()提前结束：不再提交新条目，等待在途条目完成。
+        中断后再次运行会从中断处继续。
+        """
+        self._reset()
+        self._stop.clear()
+        self._total = count_lines(input_path)
+        completed = CompletedIndex.load(self.manifest_path, self.verify)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="funtts-batch"
+        )
+        slots = threading.BoundedSemaphore(self.max_pending)
+        progress = self._start_progress()
+        logger.info(
+            f"开始批量合成: 共{self._total}条，清单中已完成{completed.count}条，"
+            f"并发{self.concurrency}"
+        )
+        try:
+            with Manifest(self.manifest_path) as manifest:
+                try:
+                    for index, line in iter_input(input_path):
+                        if self._stop.is_set():
+                            break
+                        try:
+                            item_id, request = parse_line(line)
+                        except (ValueError, TypeError) as e:
+                            self._record_invalid(manifest, index, str(e))
+                            continue
+                        request = self._prepare(index, item_id, request)
+                        key = self._key(request)
+                        if completed.contains(index, key):
+                            with self._lock:
+                                self._skipped += 1
+                            continue
+
+                        slots.acquire()
+                        future = executor.submit(
+                            self._process, manifest, index, item_id, key, request
+                        )
+                        future.add_done_callback(
+                            lambda f, index=index: self._done_callback(f, index, slots)
+                        )
+                except KeyboardInterrupt:
+                    logger.warning("收到中断，等待在途条目完成后退出")
+                    self._stop.set()
+                finally:
+                    executor.shutdown(wait=True)
+        finally:
+            if progress is not None:
+                progress.set()
+        stats = self.stats()
+        self._report(stats)
+        return stats
+
+    def _done_callback(
+        self, future: Future, index: int, slots: threading.BoundedSemaphore
+    ):
+        slots.release()
+        error = future.exception()
+        if error is not None:
+            logger.error(f"第{index}条处理异常: {error}")
+            with self._lock:
+                self._failed += 1
+
+    def stop(self):
+        """停止提交新条目，run在途条目完成后返回"""
+        self._stop.set()
+
+    def _prepare(
+        self, index: int, item_id: Optional[str], request: TTSRequest
+    ) -> TTSRequest:
+        """为未指定输出路径的请求分配确定的路径，重跑时写到同一位置"""
+        if not request.output_file:
+            name = item_id if item_id is not None else f"{index:06d}"
+            request.output_file = os.path.join(
+                request.output_dir or self.output_dir,
+                f"{name}.{request.output_format}",
+            )
+        directory = os.path.dirname(os.path.abspath(request.output_file))
+        os.makedirs(directory, exist_ok=True)
+        return request
+
+    def _key(self, request: TTSRequest) -> str:
+        """条目的内容键：请求内容、引擎和输出路径任一变化都需要重新合成"""
+        return request.cache_key(
+            self.engine.__class__.__name__, os.path.abspath(request.output_file)
+        )
+
+    def _synthesize(self, request: TTSRequest) -> TTSResponse:
+        if self.scheduler is not None:
+            return self.scheduler.synthesize(
+                request, priority=self.priority, tenant=self.tenant
+            )
+        return self.engine.synthesize(request)
+
+    def _process(
+        self,
+        manifest: Manifest,
+        index: int,
+        item_id: Optional[str],
+        key: str,
+        request: TTSRequest,
+    ):
+        started_at = time.time()
+        attempts = 0
+        response: Optional[TTSResponse] = None
+        error = ""
+        while True:
+            attempts += 1
+            try:
+                response = self._synthesize_unit(request)
+                error = response.error_message
+            except Exception as e:
+                response = None
+                error = str(e)
+            if response is not None and response.success:
+                break
+            code = response.error_code if response is not None else None
+            if attempts > self.retries or code in PERMANENT_ERRORS:
+                break
+            if self._stop.wait(self.retry_backoff * 2 ** (attempts - 1)):
+                break
+
+        finished_at = time.time()
+        record: Dict[str, Any] = {
+            "index": index,
+            "id": item_id,
+            "key": key,
+            "audio_file": request.output_file,
+            "started_at": round(started_at, 3),
+            "finished_at": round(finished_at, 3),
+            "processing_time": round(finished_at - started_at, 3),
+            "attempts": attempts,
+        }
+        if response is not None and response.success:
+            record.update(status=STATUS_DONE, **output_record(request, response))
+            if "reused_from" in response.engine_info:
+                record["reused_from"] = response.engine_info["reused_from"]
+            manifest.append(record)
+            with self._lock:
+                self._done += 1
+                self._chars += len(request.text)
+                self._audio_seconds += response.duration
+        else:
+            record.update(
+                status=STATUS_FAILED,
+                error=error or "合成失败",
+                error_code=(response.error_code if response else None)
+                or "PROCESSING_ERROR",
+            )
+            manifest.append(record)
+            logger.warning(f"第{index}条合成失败（尝试{attempts}次）: {record['error']}")
+            with self._lock:
+                self._failed += 1
+
+    def _synthesize_unit(self, request: TTSRequest) -> TTSResponse:
+        """合成一个条目，启用去重时复用相同请求的结果"""
+        _remove_outputs(request)
+        if self._units is None:
+            return check_outputs(request, self._synthesize(request))
+        key = unit_key(request, self.engine.__class__.__name__)
+        response, reused = self._units.acquire(
+            key,
+            lambda: check_outputs(request, self._synthesize(request)),
+            len(request.text),
+        )
+        if not response.success:
+            return response
+        try:
+            return self._reuse(request, response) if reused else response
+        finally:
+            # 结果已落盘到第一个条目的输出路径，不需要保持引用
+            self._units.release(key)
+
+    @staticmethod
+    def _reuse(request: TTSRequest, source: TTSResponse) -> TTSResponse:
+        """把相同请求的输出文件复制到本条目的输出路径
+
+        不使用硬链接：引擎原地写入输出文件，共享inode时重新合成一个条目会改写其他条目
+        """
+        audio_file = materialize_file(source.audio_file, request.output_file)
+        subtitle_files = {}
+        for field, format_type in (
+            ("subtitle_file", request.subtitle_format),
+            ("frt_subtitle_file", "frt"),
+        ):
+            path = getattr(source, field)
+            if path and os.path.isfile(path):
+                subtitle_files[field] = materialize_file(
+                    path,
+                    SubtitleMaker.generate_subtitle_filename(audio_file, format_type),
+                )
+        return replace(
+            source,
+            request=request,
+            audio_file=audio_file,
+            subtitle_file=subtitle_files.get("subtitle_file"),
+            frt_subtitle_file=subtitle_files.get("frt_subtitle_file"),
+            engine_info={**source.engine_info, "reused_from": source.audio_file},
+            processing_time=0.0,
+            output_future=None,
+        )
+
+    def _record_invalid(self, manifest: Manifest, index: int, error: str):
+        now = round(time.time(), 3)
+        manifest.append(
+            {
+                "index": index,
+                "status": STATUS_FAILED,
+                "started_at": now,
+                "finished_at": now,
+                "attempts": 0,
+                "error": error,
+                "error_code": "INVALID_REQUEST",
+            }
+        )
+        logger.warning(f"第{index}条不是有效的请求: {error}")
+        with self._lock:
+            self._failed += 1
+
+    # ==================== 进度 ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """当前进度
+
+        rate和chars_per_second只统计本次运行实际合成的条目，
+        eta按该速率估算剩余条目（不含已跳过的条目）所需时间。
+        """
+        with self._lock:
+            elapsed = max(time.time() - self._started_at, 1e-6)
+            processed = self._done + self._failed
+            remaining = max(self._total - self._skipped - processed, 0)
+            rate = processed / elapsed
+            return {
+                "total": self._total,
+                "skipped": self._skipped,
+                "done": self._done,
+                "failed": self._failed,
+                "remaining": remaining,
+                "elapsed": round(elapsed, 3),
+                "rate": round(rate, 3),
+                "chars_per_second": round(self._chars / elapsed, 1),
+                "audio_seconds": round(self._audio_seconds, 3),
+                "eta": round(remaining / rate, 1) if rate > 0 else None,
+                "reused": self._units.stats()["reused"] if self._units else 0,
+            }
+
+    def _report(self, stats: Dict[str, Any]):
+        finished = stats["skipped"] + stats["done"] + stats["failed"]
+        eta = f"{stats['eta']:.0f}s" if stats["eta"] is not None else "-"
+        logger.info(
+            f"批量合成进度: {finished}/{stats['total']} "
+            f"(完成{stats['done']}，跳过{stats['skipped']}，失败{stats['failed']}"
+            f"{'，复用' + str(stats['reused']) if self.dedup else ''}) "
+            f"{stats['rate']:.2f}条/s {stats['chars_per_second']:.0f}字/s 剩余{eta}"
+        )
+        if self.on_progress is not None:
+            self.on_progress(stats)
+
+    def _start_progress(self) -> Optional[threading.Event]:
+        if self.progress_interval <= 0:
+            return None
+        stopped = threading.Event()
+
+        def loop():
+            while not stopped.wait(self.progress_interval):
+                self._report(self.stats())
+
+        threading.Thread(target=loop, name="funtts-batch-progress", daemon=True).start()
+        return stopped
@@ -0,0 +1,513 @@
+"""
+多角色剧本合成
+按语音把台词分组，每组在同一个引擎上连续合成（可被引擎的synthesize_batch打包），
+各组并行执行，完成后按剧本顺序拼接音频并生成带说话者信息的字幕。
+"""
+
+import copy
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from funutil import getLogger
+
+from ..config import get_config
+from ..factory import TTSFactory
+from ..models import SubtitleMaker, TTSRequest, TTSResponse
+from ..utils.audio_utils import get_audio_duration, merge_audio_files
+from ..utils.file_utils import is_temp_file
+from ..utils.stream_writer import STREAMABLE_FORMATS, AudioStreamWriter
+from ..utils.subtitle_utils import merge_subtitle_makers
+from ..utils.text_utils import normalize_text
+from ..utils.workspace import get_workspace
+
+if TYPE_CHECKING:
+    from ..base import BaseTTS
+
+logger = getLogger("funtts")
+
+# 纯文本剧本的台词行："角色：台词" 或 "Speaker: line"
+_SCRIPT_LINE = re.compile(
+    r"^\s*(?P<speaker>[^:：\s][^:：]{0,31}?)\s*[:：]\s*(?P<text>.+)$"
+)
+
+
+@dataclass
+class ScriptLine:
+    """剧本中的一句台词"""
+
+    speaker: str  # 说话者ID，对应speakers映射中的键
+    text: str
+    emotion: Optional[str] = None  # 情感，写入字幕片段
+    style: Optional[str] = None  # 风格，写入字幕片段
+
+
+@dataclass
+class SpeakerVoice:
+    """说话者使用的引擎和语音"""
+
+    engine: Union[str, "BaseTTS", None] = None  # 引擎名称或实例，None使用默认引擎
+    voice_name: Optional[str] = None
+    voice_rate: float = 1.0
+    voice_pitch: float = 1.0
+    voice_volume: float = 1.0
+    display_name: Optional[str] = None  # 字幕中显示的名称，默认使用说话者ID
+
+    @classmethod
+    def from_value(
+        cls, value: Union["SpeakerVoice", str, Sequence[Any], Mapping[str, Any]]
+    ) -> "SpeakerVoice":
+        """从简写形式创建
+
+        - "zh-CN-YunxiNeural": 默认引擎的语音
+        - ("bark", "v2/en_speaker_6"): (引擎, 语音)
+        - {"engine": "edge", "voice_name": "...", "voice_rate": 1.2}
+        """
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            return cls(voice_name=value)
+        if isinstance(value, Mapping):
+            return cls(**value)
+        return cls(*value)
+
+
+def load_script(path: str) -> List[ScriptLine]:
+    """读取剧本文件
+
+    - .jsonl: 每行一个 {"speaker": ..., "text": ..., "emotion": ..., "style": ...}
+    - 其他文本文件: 每行"角色：台词"，不含冒号的行接在上一句台词之后
+    """
+    lines: List[ScriptLine] = []
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            for line in file:
+                if line.strip():
+                    lines.append(ScriptLine(**json.loads(line)))
+            return lines
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            match = _SCRIPT_LINE.match(line)
+            if match:
+                lines.append(ScriptLine(match.group("speaker"), match.group("text")))
+            elif lines:
+                lines[-1].text += line.strip()
+            else:
+                raise ValueError(f"剧本第{number}行缺少说话者: {line.strip()}")
+    return lines
+
+
+@dataclass
+class _Group:
+    """使用同一引擎和语音的台词"""
+
+    engine: "BaseTTS"
+    template: TTSRequest
+    lines: List[int]  # 台词在剧本中的序号
+
+
+class ScriptRenderer:
+    """多角色剧本合成器
+
+    - 台词按(引擎, 语音参数)分组，组内请求在同一线程中按batch_size分批交给
+      引擎的synthesize_batch，模型、连接和语音提示保持热状态，Edge/Azure等
+      支持打包的引擎还会把同一语音的短句合并为一次服务端调用
+    - 各组以concurrency并发执行，同一引擎的各组依次提交，减少引擎之间的来回切换
+    - 全部完成后按剧本顺序拼接音频，台词之间插入gap秒静音；
+      字幕片段带有说话者、语音、情感和风格信息
+    - dedup=True时，同一语音组内规范化后相同的台词只合成一次，
+      音频和字幕复用到每一次出现的位置
+
+    使用示例:
+        renderer = ScriptRenderer(
+            {"旁白": "zh-CN-YunxiNeural", "小红": ("edge", "zh-CN-XiaoxiaoNeural")}
+        )
+        response = renderer.render(
+            [("旁白", "那天下着雨。"), ("小红", "我们走吧。")], "dialogue.wav"
+        )
+    """
+
+    def __init__(
+        self,
+        speakers: Mapping[str, Any],
+        engine: Union[str, "BaseTTS", None] = None,
+        engine_kwargs: Optional[Dict[str, Dict[str, Any]]] = None,
+        concurrency: int = 4,
+        batch_size: int = 16,
+        gap: float = 0.4,
+        subtitle_format: str = "srt",
+        retries: int = 1,
+        dedup: bool = False,
+        request: Optional[TTSRequest] = None,
+        **request_options: Any,
+    ):
+        """
+        Args:
+            speakers: 说话者ID到语音的映射，值为SpeakerVoice或其简写（见SpeakerVoice.from_value）
+            engine: 未指定引擎的说话者使用的引擎，默认使用配置中的default_engine
+            engine_kwargs: 按名称创建引擎时的参数，键为引擎名称
+            concurrency: 并发执行的语音组数
+            batch_size: 每次交给synthesize_batch的台词数
+            gap: 台词之间的静音（秒），MP3输出不插入静音
+            subtitle_format: 字幕格式
+            retries: 单句合成失败后的重试次数
+            dedup: 是否复用相同台词的合成结果
+            request: 请求模板，台词请求复制其采样率、语言等参数
+            **request_options: 请求参数，覆盖模板中的同名字段
+        """
+        self.speakers = {
+            speaker: SpeakerVoice.from_value(value)
+            for speaker, value in speakers.items()
+        }
+        self.default_engine = engine
+        self.engine_kwargs = {
+            name.lower(): kwargs for name, kwargs in (engine_kwargs or {}).items()
+        }
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.gap = gap
+        self.subtitle_format = subtitle_format
+        self.retries = max(0, retries)
+        self.dedup = dedup
+        self.template = replace(
+            request or TTSRequest(text="-"),
+            output_file=None,
+            output_dir=None,
+            generate_subtitles=True,
+            **request_options,
+        )
+        self._engines: Dict[str, "BaseTTS"] = {}
+        self._engine_lock = threading.Lock()
+
+    # ==================== 引擎 ====================
+
+    def get_engine(self, engine: Union[str, "BaseTTS", None] = None) -> "BaseTTS":
+        """获取（并缓存）引擎实例"""
+        engine = engine or self.default_engine or get_config().get_default_engine()
+        if not isinstance(engine, str):
+            return engine
+        name = engine.lower()
+        with self._engine_lock:
+            if name not in self._engines:
+                self._engines[name] = TTSFactory.create_tts(
+                    name,
+                    None,
+                    get_config().get_engine_config(name),
+                    **self.engine_kwargs.get(name, {}),
+                )
+            return self._engines[name]
+
+    # ==================== 合成 ====================
+
+    def render(
+        self,
+        lines: Iterable[Union[ScriptLine, Tuple[str, str], Mapping[str, Any]]],
+        output_file: str,
+    ) -> TTSResponse:
+        """合成剧本
+
+        Args:
+            lines: 台词序列，元素为ScriptLine、(说话者, 台词)或字典
+            output_file: 输出音频文件，格式由扩展名决定
+
+        Returns:
+            合并后的响应；subtitle_maker包含全部台词的字幕片段，
+            engine_info["script"]中有分组和耗时统计
+        """
+        started_at = time.time()
+        script = [self._to_line(line) for line in lines]
+        if not script:
+            return TTSResponse(success=False, error_message="剧本为空")
+        unknown = sorted({line.speaker for line in script} - set(self.speakers))
+        if unknown:
+            return TTSResponse(
+                success=False,
+                error_message=f"未配置语音的说话者: {', '.join(unknown)}",
+                error_code="INVALID_REQUEST",
+            )
+
+        output_format = os.path.splitext(output_file)[1][1:].lower() or "wav"
+        try:
+            groups = self._group(script, output_format)
+        except Exception as e:
+            logger.error(f"剧本引擎初始化失败: {e}")
+            return TTSResponse(success=False, error_message=str(e))
+
+        logger.info(
+            f"剧本合成开始: {len(script)}句台词，{len(self.speakers)}个说话者，"
+            f"{len(groups)}个语音组"
+        )
+        responses: List[Optional[TTSResponse]] = [None] * len(script)
+        group_stats: List[Dict[str, Any]] = []
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="funtts-script"
+            ) as executor:
+                futures = [
+                    executor.submit(self._render_group, group, script, responses)
+                    for group in groups
+                ]
+                errors = []
+                for future in futures:
+                    try:
+                        group_stats.append(future.result())
+                    except Exception as e:
+                        errors.append(str(e))
+            if errors:
+                logger.error(f"剧本合成失败: {errors[0]}")
+                return TTSResponse(
+                    success=False,
+                    error_message="; ".join(errors),
+                    error_code="PROCESSING_ERROR",
+                    processing_time=time.time() - started_at,
+                )
+            synthesized_at = time.time()
+            response = self._assemble(script, responses, output_file)
+        finally:
+            # 去重时多句台词共享同一个响应
+            for line_response in {id(r): r for r in responses if r}.values():
+                self._discard(line_response)
+
+        response.processing_time = time.time() - started_at
+        response.engine_info = {
+            **response.engine_info,
+            "script": {
+                "lines": len(script),
+                "speakers": len({line.speaker for line in script}),
+                "groups": group_stats,
+                "reused_lines": sum(group["reused"] for group in group_stats),
+                # 逐句顺序合成时相邻台词切换语音的次数，分组后每组只切换一次
+                "voice_switches": sum(
+                    1
+                    for previous, line in zip(script, script[1:])
+                    if self._voice_key(previous.speaker)
+                    != self._voice_key(line.speaker)
+                ),
+                "synthesis_seconds": round(synthesized_at - started_at, 3),
+                "assemble_seconds": round(time.time() - synthesized_at, 3),
+            },
+        }
+        logger.success(
+            f"剧本合成完成: {output_file} 时长{response.duration:.1f}s "
+            f"用时{response.processing_time:.1f}s"
+        )
+        return response
+
+    @staticmethod
+    def _to_line(
+        line: Union[ScriptLine, Tuple[str, str], Mapping[str, Any]]
+    ) -> ScriptLine:
+        if isinstance(line, ScriptLine):
+            return line
+        if isinstance(line, Mapping):
+            return ScriptLine(**line)
+        return ScriptLine(*line)
+
+    def _voice_key(self, speaker: str) -> Tuple[Any, ...]:
+        voice = self.speakers[speaker]
+        return (
+            voice.engine,
+            voice.voice_name,
+            voice.voice_rate,
+            voice.voice_pitch,
+            voice.voice_volume,
+        )
+
+    def _group(self, script: List[ScriptLine], output_format: str) -> List[_Group]:
+        """按(引擎, 语音参数)分组，同一引擎的组相邻排列"""
+        groups: Dict[Tuple[int, str], _Group] = {}
+        for index, line in enumerate(script):
+            voice = self.speakers[line.speaker]
+            engine = self.get_engine(voice.engine)
+            template = replace(
+                self.template,
+                voice_name=voice.voice_name or self.template.voice_name,
+                voice_rate=voice.voice_rate,
+                voice_pitch=voice.voice_pitch,
+                voice_volume=voice.voice_volume,
+                output_format=output_format,
+            )
+            key = (id(engine), template.cache_key())
+            if key not in groups:
+                groups[key] = _Group(engine, template, [])
+            groups[key].lines.append(index)
+
+        # 先按引擎首次出现的位置、再按组内台词数排序，大组先开始
+        first_seen: Dict[int, int] = {}
+        for engine_id, _ in groups:
+            first_seen.setdefault(engine_id, len(first_seen))
+        return sorted(
+            groups.values(),
+            key=lambda group: (first_seen[id(group.engine)], -len(group.lines)),
+        )
+
+    def _render_group(
+        self,
+        group: _Group,
+        script: List[ScriptLine],
+        responses: List[Optional[TTSResponse]],
+    ) -> Dict[str, Any]:
+        started_at = time.time()
+        # 每个合成单元对应一句或（去重时）多句相同的台词
+        units: Dict[Any, List[int]] = {}
+        for index in group.lines:
+            key = normalize_text(script[index].text) if self.dedup else index
+            units.setdefault(key, []).append(index)
+        unique = list(units.values())
+
+        for start in range(0, len(unique), self.batch_size):
+            batch = unique[start : start + self.batch_size]
+            requests = [
+                replace(group.template, text=script[indexes[0]].text)
+                for indexes in batch
+            ]
+            results = group.engine.synthesize_batch(requests)
+            for indexes, request, response in zip(batch, requests, results):
+                index = indexes[0]
+                attempt = 0
+                while not (response.success and response.wait_outputs()):
+                    self._discard(response)
+                    if attempt >= self.retries:
+                        raise RuntimeError(
+                            f"第{index + 1}句（{script[index].speaker}）合成失败: "
+                            f"{response.error_message}"
+                        )
+                    attempt += 1
+                    logger.warning(
+                        f"第{index + 1}句合成失败，重试第{attempt}次: "
+                        f"{response.error_message}"
+                    )
+                    response = group.engine.synthesize(request)
+                for index in indexes:
+                    responses[index] = response
+        return {
+            "engine": group.engine.__class__.__name__,
+            "voice_name": group.template.voice_name,
+            "lines": len(group.lines),
+            "reused": len(group.lines) - len(unique),
+            "elapsed": round(time.time() - started_at, 3),
+        }
+
+    # ==================== 拼接 ====================
+
+    def _assemble(
+        self,
+        script: List[ScriptLine],
+        responses: List[TTSResponse],
+        output_file: str,
+    ) -> TTSResponse:
+        """按剧本顺序拼接音频，并为字幕片段设置说话者信息"""
+        offsets = self._concat_audio(responses, output_file)
+        if offsets is None:
+            return TTSResponse(success=False, error_message="音频文件合并失败")
+
+        makers = []
+        used = set()
+        for line, response in zip(script, responses):
+            voice = self.speakers[line.speaker]
+            maker = response.subtitle_maker
+            if maker is None or not maker.get_segments():
+                maker = SubtitleMaker()
+                maker.add_segment(0.0, self._duration(response), line.text)
+            elif id(maker) in used:
+                # 复用的台词可能属于另一个说话者，复制片段后再设置说话者信息
+                maker = copy.deepcopy(maker)
+            used.add(id(maker))
+            for segment in maker.get_segments():
+                segment.speaker_id = line.speaker
+                segment.speaker_name = voice.display_name or line.speaker
+                segment.voice_name = response.voice_used or voice.voice_name
+                segment.emotion = line.emotion or segment.emotion
+                segment.style = line.style or segment.style
+            makers.append(maker)
+        merged = merge_subtitle_makers(makers, offsets, self.gap)
+
+        subtitle_file = merged.generate_subtitle_filename(
+            output_file, self.subtitle_format
+        )
+        merged.save_to_file_static(merged, subtitle_file, self.subtitle_format)
+        frt_subtitle_file = None
+        if self.subtitle_format != "frt":
+            frt_subtitle_file = merged.generate_subtitle_filename(output_file, "frt")
+            merged.save_to_file_static(merged, frt_subtitle_file, "frt")
+
+        voices = sorted({r.voice_used for r in responses if r.voice_used})
+        return TTSResponse(
+            success=True,
+            audio_file=output_file,
+            subtitle_maker=merged,
+            subtitle_file=subtitle_file,
+            frt_subtitle_file=frt_subtitle_file,
+            duration=offsets[-1] + self._duration(responses[-1]),
+            voice_used=voices[0] if len(voices) == 1 else f"混合语音({len(voices)}个)",
+        )
+
+    def _concat_audio(
+        self, responses: List[TTSResponse], output_file: str
+    ) -> Optional[List[float]]:
+        """拼接音频，返回每句台词在输出文件中的起始时间
+
+        格式一致的wav/mp3直接流式拼接；不同引擎的采样率等参数不一致时
+        退回merge_audio_files（需要pydub或ffmpeg）。
+        """
+        directory = os.path.dirname(os.path.abspath(output_file))
+        os.makedirs(directory, exist_ok=True)
+        output_format = os.path.splitext(output_file)[1][1:].lower()
+        if output_format in STREAMABLE_FORMATS:
+            offsets = []
+            try:
+                with AudioStreamWriter(output_file, output_format) as writer:
+                    for index, response in enumerate(responses):
+                        if index:
+                            writer.add_silence(self.gap)
+                        offsets.append(writer.duration)
+                        # 记录实际写入的时长，字幕与拼接结果严格对齐
+                        response.duration = writer.append_file(response.audio_file)
+                return offsets
+            except Exception as e:
+                logger.warning(f"无法直接拼接，改用merge_audio_files: {e}")
+
+        if not merge_audio_files(
+            [response.audio_file for response in responses],
+            output_file,
+            format=output_format or "wav",
+            silence_duration=self.gap,
+        ):
+            return None
+        offsets, current = [], 0.0
+        for response in responses:
+            offsets.append(current)
+            current += self._duration(response) + self.gap
+        return offsets
+
+    @staticmethod
+    def _duration(response: TTSResponse) -> float:
+        return response.duration or get_audio_duration(response.audio_file) or 0.0
+
+    @staticmethod
+    def _discard(response: TTSResponse):
+        """删除台词的临时音频和字幕文件"""
+        for path in (
+            response.audio_file,
+            response.subtitle_file,
+            response.frt_subtitle_file,
+        ):
+            if path and is_temp_file(path):
+                get_workspace().discard(path)
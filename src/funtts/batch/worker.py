@@ -0,0 +1,398 @@
+"""
+任务队列的合成工作进程
+从一个或多个JobQueue（分片）认领任务，用TTSFactory创建的引擎合成并记录结果。
+在更多进程或机器上启动工作进程即可提高吞吐量。
+"""
+
+import os
+import threading
+import time
+import zlib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from funutil import getLogger
+
+from ..config import get_config
+from ..factory import TTSFactory
+from .queue import STATUS_FAILED, Job, JobQueue, default_worker_id
+from .runner import PERMANENT_ERRORS, check_outputs, output_record
+
+if TYPE_CHECKING:
+    from ..base import BaseTTS
+
+logger = getLogger("funtts")
+
+
+class QueueWorker:
+    """队列工作进程
+
+    - concurrency个线程各自认领并执行任务，多个分片队列轮流认领
+    - 后台线程定期为执行中的任务续租；进程崩溃时租约到期，任务由其他工作进程接手
+    - 失败的任务交给队列按退避策略重新排队，请求参数无效的任务不重试
+    - 未指定output_file的任务写入 output_dir/<批次>/<item_id>.<格式>，
+      重新执行同一任务总是写到同一路径
+    - 每次尝试先写入 <item_id>.<尝试次数>.part.<格式>，续租确认仍持有任务后才改名为
+      最终路径并记录完成，租约到期后仍在执行的旧尝试不会覆盖接手者的输出
+
+    使用示例:
+        worker = QueueWorker(JobQueue("jobs.db"), engine="edge", concurrency=8)
+        worker.run()
+    """
+
+    def __init__(
+        self,
+        queues: Union[JobQueue, Sequence[JobQueue]],
+        engine: Optional[str] = None,
+        engine_kwargs: Optional[Dict[str, Dict[str, Any]]] = None,
+        concurrency: int = 4,
+        worker_id: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        batch: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        poll_interval: float = 1.0,
+        exit_when_empty: bool = False,
+        progress_interval: float = 30.0,
+    ):
+        """
+        Args:
+            queues: 任务队列，或多个分片队列
+            engine: 任务未指定引擎时使用的引擎，默认使用配置中的default_engine
+            engine_kwargs: 各引擎的创建参数，键为引擎名称
+            concurrency: 并发执行的任务数
+            worker_id: 工作进程标识，默认由主机名和进程号生成
+            output_dir: 未指定output_file的任务的输出目录，默认为第一个队列文件所在目录下的audio
+            batch: 只执行该批次的任务
+            lease_seconds: 租约时长，None使用队列默认值
+            poll_interval: 没有可执行任务时的轮询间隔（秒）
+            exit_when_empty: 所有队列都没有待执行和执行中的任务时退出
+            progress_interval: 进度输出间隔（秒），0表示不输出
+        """
+        self.queues: List[JobQueue] = (
+            [queues] if isinstance(queues, JobQueue) else list(queues)
+        )
+        if not self.queues:
+            raise ValueError("至少需要一个任务队列")
+        self.default_engine = (engine or get_config().get_default_engine()).lower()
+        self.engine_kwargs = {
+            name.lower(): kwargs for name, kwargs in (engine_kwargs or {}).items()
+        }
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or default_worker_id()
+        self.output_dir = output_dir or os.path.join(
+            os.path.dirname(os.path.abspath(self.queues[0].path)), "audio"
+        )
+        self.batch = batch
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.exit_when_empty = exit_when_empty
+        self.progress_interval = progress_interval
+
+        self._engines: Dict[str, "BaseTTS"] = {}
+        self._engine_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        # 执行中的任务：(队列序号, 任务id)
+        self._active: Dict[Tuple[int, int], Job] = {}
+        # 各工作进程从不同的分片开始轮询，减少对同一队列文件的写锁竞争
+        self._next_queue = zlib.crc32(self.worker_id.encode("utf-8")) % len(self.queues)
+        self._stats = {"done": 0, "failed": 0, "retried": 0, "lost": 0, "chars": 0}
+        self._started_at = time.time()
+
+    # ==================== 引擎 ====================
+
+    def get_engine(self, name: Optional[str] = None) -> "BaseTTS":
+        """获取（并缓存）引擎实例"""
+        name = (name or self.default_engine).lower()
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        with self._engine_lock:
+            if name not in self._engines:
+                self._engines[name] = TTSFactory.create_tts(
+                    name,
+                    None,
+                    get_config().get_engine_config(name),
+                    **self.engine_kwargs.get(name, {}),
+                )
+            return self._engines[name]
+
+    # ==================== 执行 ====================
+
+    def run(self) -> Dict[str, Any]:
+        """执行任务直到调用stop()，或设置了exit_when_empty且队列已空
+
+        Returns:
+            本进程的统计信息（同stats()）
+        """
+        self._stop.clear()
+        self._finished.clear()
+        self._started_at = time.time()
+        logger.info(
+            f"工作进程{self.worker_id}启动: "
+            f"{len(self.queues)}个队列，并发{self.concurrency}"
+        )
+        threads = [
+            threading.Thread(
+                target=self._work_loop, name=f"funtts-worker-{i}", daemon=True
+            )
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="funtts-worker-heartbeat", daemon=True
+        )
+        heartbeat.start()
+        reported_at = time.time()
+        try:
+            while True:
+                alive = [thread for thread in threads if thread.is_alive()]
+                if not alive:
+                    break
+                alive[0].join(timeout=1.0)
+                if (
+                    self.progress_interval
+                    and time.time() - reported_at >= self.progress_interval
+                ):
+                    self._report()
+                    reported_at = time.time()
+        except KeyboardInterrupt:
+            logger.warning("收到中断，等待执行中的任务完成后退出")
+            self.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            self._stop.set()
+            self._finished.set()
+            heartbeat.join()
+        self._report()
+        return self.stats()
+
+    def stop(self):
+        """不再认领新任务，执行中的任务完成后run返回"""
+        self._stop.set()
+
+    def _claim(self) -> Optional[Tuple[int, Job]]:
+        """轮流从各分片队列认领一个任务"""
+        with self._lock:
+            start = self._next_queue
+            self._next_queue = (self._next_queue + 1) % len(self.queues)
+        for offset in range(len(self.queues)):
+            index = (start + offset) % len(self.queues)
+            jobs = self.queues[index].claim(
+                self.worker_id, 1, self.lease_seconds, self.batch
+            )
+            if jobs:
+                return index, jobs[0]
+        return None
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+            except Exception as e:
+                logger.error(f"认领任务失败: {e}")
+                self._stop.wait(self.poll_interval)
+                continue
+            if claimed is None:
+                if self.exit_when_empty and not any(
+                    queue.has_unfinished(self.batch) for queue in self.queues
+                ):
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            index, job = claimed
+            if self._stop.is_set():
+                # 认领期间收到停止请求，归还任务且不计入尝试次数
+                self.queues[index].release(job.id, self.worker_id)
+                return
+            with self._lock:
+                self._active[(index, job.id)] = job
+            try:
+                self._execute(self.queues[index], job)
+            except Exception as e:
+                logger.error(f"任务{job.batch}/{job.item_id}执行异常: {e}")
+                self.queues[index].fail(
+                    job.id, self.worker_id, str(e), "PROCESSING_ERROR"
+                )
+            finally:
+                with self._lock:
+                    self._active.pop((index, job.id), None)
+
+    def _execute(self, queue: JobQueue, job: Job):
+        request = job.request
+        output_file = request.output_file or os.path.join(
+            request.output_dir or self.output_dir,
+            job.batch,
+            f"{job.item_id}.{request.output_format}",
+        )
+        directory = os.path.dirname(os.path.abspath(output_file))
+        os.makedirs(directory, exist_ok=True)
+        # 本次尝试写入独立的临时路径，保留扩展名供引擎判断格式
+        root, ext = os.path.splitext(output_file)
+        request.output_file = f"{root}.{job.attempts}.part{ext}"
+        outputs = _AttemptOutputs(request.output_file, output_file)
+
+        started_at = time.time()
+        response = None
+        try:
+            response = check_outputs(
+                request, self.get_engine(job.engine).synthesize(request)
+            )
+            error = response.error_message
+            error_code = response.error_code
+        except Exception as e:
+            error, error_code = str(e), "PROCESSING_ERROR"
+
+        if response is not None and response.success:
+            finished_at = time.time()
+            try:
+                result = {
+                    **outputs.record(output_record(request, response)),
+                    "worker": self.worker_id,
+                    "started_at": round(started_at, 3),
+                    "finished_at": round(finished_at, 3),
+                    "processing_time": round(finished_at - started_at, 3),
+                }
+                # 先续租确认仍持有任务，再改名为最终路径，最后记录完成：
+                # 改名失败时任务仍由本进程持有，异常由_work_loop交给queue.fail重试；
+                # 改名后、记录前崩溃时租约到期，任务由其他工作进程重新执行
+                held = not queue.heartbeat(
+                    [job.id], self.worker_id, self.lease_seconds
+                )
+                if held:
+                    outputs.commit()
+            except BaseException:
+                outputs.discard()
+                raise
+            if held and queue.complete(job.id, self.worker_id, result):
+                self._count("done", chars=len(request.text))
+            else:
+                # 租约已到期并被其他工作进程接手，结果以对方为准
+                if not held:
+                    outputs.discard()
+                logger.warning(
+                    f"任务{job.batch}/{job.item_id}的租约已失效，结果未记录"
+                )
+                self._count("lost")
+            return
+
+        outputs.discard()
+        status = queue.fail(
+            job.id,
+            self.worker_id,
+            error or "合成失败",
+            error_code or "PROCESSING_ERROR",
+            retryable=error_code not in PERMANENT_ERRORS,
+        )
+        if status is None:
+            self._count("lost")
+        elif status == STATUS_FAILED:
+            logger.warning(
+                f"任务{job.batch}/{job.item_id}失败（尝试{job.attempts}次）: {error}"
+            )
+            self._count("failed")
+        else:
+            self._count("retried")
+
+    def _heartbeat_loop(self):
+        interval = (self.lease_seconds or self.queues[0].lease_seconds) / 3
+        # 停止认领后仍为收尾中的任务续租，直到所有执行线程退出
+        while not self._finished.wait(interval):
+            with self._lock:
+                held: Dict[int, List[int]] = {}
+                for index, job_id in self._active:
+                    held.setdefault(index, []).append(job_id)
+            for index, job_ids in held.items():
+                try:
+                    self.queues[index].heartbeat(
+                        job_ids, self.worker_id, self.lease_seconds
+                    )
+                except Exception as e:
+                    logger.error(f"任务续租失败: {e}")
+
+    # ==================== 统计 ====================
+
+    def _count(self, key: str, chars: int = 0):
+        with self._lock:
+            self._stats[key] += 1
+            self._stats["chars"] += chars
+
+    def stats(self) -> Dict[str, Any]:
+        """本工作进程的统计信息"""
+        with self._lock:
+            elapsed = max(time.time() - self._started_at, 1e-6)
+            return {
+                "worker": self.worker_id,
+                **self._stats,
+                "active": len(self._active),
+                "elapsed": round(elapsed, 3),
+                "rate": round(self._stats["done"] / elapsed, 3),
+                "chars_per_second": round(self._stats["chars"] / elapsed, 1),
+            }
+
+    def _report(self):
+        stats = self.stats()
+        logger.info(
+            f"工作进程{stats['worker']}: 完成{stats['done']}，重试{stats['retried']}，"
+            f"失败{stats['failed']}，执行中{stats['active']} "
+            f"{stats['rate']:.2f}条/s {stats['chars_per_second']:.0f}字/s"
+        )
+
+
+class _AttemptOutputs:
+    """一次尝试的输出文件：先写入临时路径，确认完成后改名为最终路径
+
+    字幕等附带文件与音频同名（仅扩展名不同），随音频一起改名。
+    """
+
+    _RECORD_FIELDS = ("audio_file", "subtitle_file", "frt_subtitle_file")
+
+    def __init__(self, part_file: str, final_file: str):
+        self.part_root = os.path.splitext(part_file)[0]
+        self.final_root = os.path.splitext(final_file)[0]
+        self.renames: Dict[str, str] = {}
+
+    def _final_path(self, path: str) -> Optional[str]:
+        if path and path.startswith(self.part_root):
+            return self.final_root + path[len(self.part_root) :]
+        return None
+
+    def record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """把清单记录中的临时路径替换为最终路径"""
+        for key in self._RECORD_FIELDS:
+            final = self._final_path(record.get(key))
+            if final is not None:
+                self.renames[record[key]] = final
+                record[key] = final
+        return record
+
+    def commit(self):
+        """改名为最终路径，覆盖之前尝试留下的文件；改名失败时抛出OSError"""
+        for part, final in self.renames.items():
+            os.replace(part, final)
+
+    def discard(self):
+        """删除本次尝试写入的所有文件"""
+        directory = os.path.dirname(self.part_root) or "."
+        prefix = os.path.basename(self.part_root)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            if name == prefix or name.startswith(prefix + "."):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError as e:
+                    logger.warning(f"删除未完成的输出文件失败: {name}, {e}")
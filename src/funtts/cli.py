@@ -0,0 +1,555 @@
+"""
+funtts命令行入口
+
+子命令:
+- serve  启动TTS HTTP服务
+- bench  压测TTS服务
+- bench-cpu  对比torch引擎的CPU推理配置（线程数、inference_mode、动态int8量化）
+- batch  按JSONL批量合成，可断点续跑
+- queue  持久化任务队列：入队、启动工作进程、查看状态、重试失败任务、导出结果
+- audiobook  把长文档按章节合成为有声书
+- script  多角色剧本合成
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import List, Optional
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+
+def _json_arg(value: str):
+    try:
+        return json.loads(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"无效的JSON: {e}")
+
+
+def _speakers_arg(value: str):
+    """说话者映射：JSON文件路径或JSON字符串"""
+    if os.path.exists(value):
+        return value
+    return _json_arg(value)
+
+
+def _profile_arg(value: str):
+    """CPU推理配置：预设名，或 名称=JSON参数"""
+    name, sep, params = value.partition("=")
+    return (name, _json_arg(params)) if sep else (name, name)
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from .config import get_config
+    from .server import TTSServer
+
+    engine = args.engine or get_config().get_default_engine()
+    server = TTSServer(
+        host=args.host,
+        port=args.port,
+        engine=engine,
+        engine_kwargs={engine.lower(): args.engine_kwargs or {}},
+        engines=args.engines,
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout,
+        scheduler=args.scheduler,
+    )
+    server.run()
+    return 0
+
+
+def _cmd_bench(args: argparse.Namespace) -> int:
+    from .server import format_report, run_benchmark
+
+    result = asyncio.run(
+        run_benchmark(
+            url=args.url,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            texts=args.text,
+            engine=args.engine,
+            voice_name=args.voice,
+            stream=not args.no_stream,
+            server_kwargs={
+                "max_concurrency": args.max_concurrency,
+                "max_queue": args.max_queue,
+                "engine_kwargs": {"synthetic": args.engine_kwargs or {}},
+            },
+        )
+    )
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print(format_report(result))
+    return 0
+
+
+def _cmd_batch(args: argparse.Namespace) -> int:
+    from .batch import BatchRunner
+    from .config import get_config
+    from .factory import TTSFactory
+
+    config = get_config()
+    engine_name = args.engine or config.get_default_engine()
+    engine = TTSFactory.create_tts(
+        engine_name,
+        None,
+        config.get_engine_config(engine_name),
+        **(args.engine_kwargs or {}),
+    )
+    runner = BatchRunner(
+        engine,
+        args.manifest or f"{os.path.splitext(args.input)[0]}.manifest.jsonl",
+        concurrency=args.concurrency,
+        output_dir=args.output_dir,
+        retries=args.retries,
+        verify=args.verify,
+        progress_interval=args.progress_interval,
+        dedup=args.dedup,
+    )
+    stats = runner.run(args.input)
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False))
+    return 0 if stats["failed"] == 0 else 2
+
+
+def _open_queues(args: argparse.Namespace) -> list:
+    from .batch import JobQueue, shard_path
+
+    return [
+        JobQueue(
+            shard_path(args.queue, index, args.shards),
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            journal_mode=args.journal_mode,
+        )
+        for index in range(max(1, args.shards))
+    ]
+
+
+def _cmd_queue_enqueue(args: argparse.Namespace) -> int:
+    queues = _open_queues(args)
+    for input_path in args.input:
+        added = invalid = 0
+        for index, queue in enumerate(queues):
+            shard = (index, len(queues)) if len(queues) > 1 else None
+            count, bad = queue.enqueue_file(
+                input_path, batch=args.batch, shard=shard, engine=args.engine
+            )
+            added += count
+            invalid = bad
+        print(f"{input_path}: 新增{added}个任务，无效{invalid}行")
+    return 0
+
+
+def _cmd_queue_work(args: argparse.Namespace) -> int:
+    from .batch import QueueWorker
+    from .config import get_config
+
+    engine = args.engine or get_config().get_default_engine()
+    worker = QueueWorker(
+        _open_queues(args),
+        engine=engine,
+        engine_kwargs={engine.lower(): args.engine_kwargs or {}},
+        concurrency=args.concurrency,
+        output_dir=args.output_dir,
+        batch=args.batch,
+        poll_interval=args.poll_interval,
+        exit_when_empty=args.exit_when_empty,
+    )
+    stats = worker.run()
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False))
+    return 0
+
+
+def _cmd_queue_status(args: argparse.Namespace) -> int:
+    queues = _open_queues(args)
+    batches = [args.batch] if args.batch else sorted(
+        {batch for queue in queues for batch in queue.batches()}
+    )
+    report = {}
+    for batch in batches + [None]:
+        total: dict = {}
+        for queue in queues:
+            for key, value in queue.stats(batch).items():
+                if key not in ("eta", "workers"):
+                    total[key] = total.get(key, 0) + value
+        # 同一工作进程可能同时持有多个分片的任务
+        total["workers"] = len(
+            {worker for queue in queues for worker in queue.workers(batch)}
+        )
+        remaining = total["pending"] + total["leased"]
+        total["eta"] = round(remaining / total["rate"], 1) if total["rate"] else None
+        report[batch or "*"] = total
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+        return 0
+    for batch, stats in report.items():
+        eta = f"{stats['eta']:.0f}s" if stats["eta"] is not None else "-"
+        print(
+            f"{batch}: 共{stats['total']} 待执行{stats['pending']} "
+            f"执行中{stats['leased']} 完成{stats['done']} 失败{stats['failed']} "
+            f"工作进程{stats['workers']} {stats['rate']:.2f}条/s 剩余{eta}"
+        )
+    return 0
+
+
+def _cmd_queue_retry(args: argparse.Namespace) -> int:
+    count = sum(queue.retry_failed(args.batch) for queue in _open_queues(args))
+    print(f"已重新排队{count}个失败任务")
+    return 0
+
+
+def _cmd_queue_export(args: argparse.Namespace) -> int:
+    from .batch import Manifest
+
+    count = 0
+    with Manifest(args.output) as manifest:
+        for queue in _open_queues(args):
+            for record in queue.iter_results(args.batch):
+                manifest.append(record)
+                count += 1
+    print(f"已导出{count}条记录到{args.output}")
+    return 0
+
+
+def _cmd_audiobook(args: argparse.Namespace) -> int:
+    from .batch import AudiobookPipeline, iter_chapters
+    from .config import get_config
+    from .factory import TTSFactory
+
+    config = get_config()
+    engine_name = args.engine or config.get_default_engine()
+    engine = TTSFactory.create_tts(
+        engine_name,
+        None,
+        config.get_engine_config(engine_name),
+        **(args.engine_kwargs or {}),
+    )
+    options = {"voice_name": args.voice} if args.voice else {}
+    if args.voice_rate is not None:
+        options["voice_rate"] = args.voice_rate
+    pipeline = AudiobookPipeline(
+        engine,
+        args.output_dir,
+        concurrency=args.concurrency,
+        window=args.window,
+        max_chunk_chars=args.max_chunk_chars,
+        gap=args.gap,
+        chapter_gap=args.chapter_gap,
+        output_format=args.format,
+        subtitle_format=args.subtitle_format,
+        book_name=None if args.no_book else args.book_name,
+        dedup=args.dedup,
+        **options,
+    )
+    index = pipeline.run(iter_chapters(args.input))
+    if args.json:
+        print(json.dumps(index, ensure_ascii=False))
+    return 0 if index["success"] else 2
+
+
+def _cmd_bench_cpu(args: argparse.Namespace) -> int:
+    from .server import compare_cpu_profiles, format_profile_report
+
+    result = compare_cpu_profiles(
+        args.engine,
+        profiles=dict(args.profile) if args.profile else None,
+        texts=args.text,
+        runs=args.runs,
+        engine_kwargs=args.engine_kwargs,
+        seed=args.seed,
+    )
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print(format_profile_report(result))
+    return 0 if all("error" not in item for item in result["profiles"]) else 2
+
+
+def _cmd_script(args: argparse.Namespace) -> int:
+    from .batch import ScriptRenderer, load_script
+
+    speakers = args.speakers
+    if isinstance(speakers, str):
+        with open(speakers, "r", encoding="utf-8") as file:
+            speakers = json.load(file)
+    renderer = ScriptRenderer(
+        speakers,
+        engine=args.engine,
+        engine_kwargs=args.engine_kwargs,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        gap=args.gap,
+        subtitle_format=args.subtitle_format,
+        dedup=args.dedup,
+    )
+    response = renderer.render(load_script(args.input), args.output)
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "success": response.success,
+                    "error": response.error_message or None,
+                    "audio_file": response.audio_file,
+                    "subtitle_file": response.subtitle_file,
+                    "duration": response.duration,
+                    "processing_time": round(response.processing_time, 3),
+                    **response.engine_info.get("script", {}),
+                },
+                ensure_ascii=False,
+            )
+        )
+    elif not response.success:
+        print(f"剧本合成失败: {response.error_message}", file=sys.stderr)
+    return 0 if response.success else 2
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="funtts", description="FunTTS命令行工具")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve = subparsers.add_parser("serve", help="启动TTS HTTP服务")
+    serve.add_argument("--host", default="127.0.0.1", help="监听地址")
+    serve.add_argument("--port", type=int, default=8000, help="监听端口")
+    serve.add_argument("--engine", help="默认引擎，默认使用配置中的default_engine")
+    serve.add_argument(
+        "--engine-kwargs", type=_json_arg, help="默认引擎的创建参数（JSON）"
+    )
+    serve.add_argument(
+        "--engines", nargs="+", help="允许客户端选择的引擎，默认不限制"
+    )
+    serve.add_argument("--max-concurrency", type=int, default=8, help="最大并发合成数")
+    serve.add_argument("--max-queue", type=int, default=32, help="最大排队请求数")
+    serve.add_argument(
+        "--queue-timeout", type=float, default=30.0, help="最长排队时间（秒）"
+    )
+    serve.add_argument(
+        "--scheduler",
+        type=_json_arg,
+        help="为每个引擎启用请求调度器，值为RequestScheduler的参数（JSON），如 '{\"workers\": 8}'",
+    )
+    serve.set_defaults(func=_cmd_serve)
+
+    bench = subparsers.add_parser("bench", help="压测TTS服务")
+    bench.add_argument(
+        "--url", help="服务地址，不指定时在进程内启动合成测试引擎服务"
+    )
+    bench.add_argument("--requests", "-n", type=int, default=100, help="请求总数")
+    bench.add_argument("--concurrency", "-c", type=int, default=10, help="并发数")
+    bench.add_argument("--text", action="append", help="请求文本，可多次指定")
+    bench.add_argument("--engine", help="请求使用的引擎")
+    bench.add_argument("--voice", help="请求使用的语音")
+    bench.add_argument("--no-stream", action="store_true", help="不使用流式合成")
+    bench.add_argument(
+        "--max-concurrency", type=int, default=8, help="进程内服务的最大并发合成数"
+    )
+    bench.add_argument(
+        "--max-queue", type=int, default=32, help="进程内服务的最大排队请求数"
+    )
+    bench.add_argument(
+        "--engine-kwargs", type=_json_arg, help="进程内合成测试引擎的参数（JSON）"
+    )
+    bench.add_argument("--json", action="store_true", help="以JSON输出结果")
+    bench.set_defaults(func=_cmd_bench)
+
+    bench_cpu = subparsers.add_parser(
+        "bench-cpu", help="对比torch引擎的CPU推理配置的速度和精度"
+    )
+    bench_cpu.add_argument(
+        "--engine", required=True, help="torch引擎，如 coqui、bark、kitten"
+    )
+    bench_cpu.add_argument(
+        "--profile",
+        action="append",
+        type=_profile_arg,
+        help="参与对比的配置，预设名（torch、default、int8）或 名称=JSON参数，"
+        "如 'w4={\"workers\": 4, \"quantize\": true}'；可多次指定，"
+        "量化的配置最后运行，第一个运行的配置为基准",
+    )
+    bench_cpu.add_argument("--text", action="append", help="合成文本，可多次指定")
+    bench_cpu.add_argument(
+        "--runs", "-n", type=int, default=3, help="每条文本的合成次数"
+    )
+    bench_cpu.add_argument("--engine-kwargs", type=_json_arg, help="引擎的创建参数（JSON）")
+    bench_cpu.add_argument(
+        "--seed", type=int, default=0, help="每次合成前设置的随机种子"
+    )
+    bench_cpu.add_argument("--json", action="store_true", help="以JSON输出结果")
+    bench_cpu.set_defaults(func=_cmd_bench_cpu)
+
+    batch = subparsers.add_parser("batch", help="按JSONL批量合成，可断点续跑")
+    batch.add_argument("input", help="输入文件，每行一个TTSRequest形式的JSON对象")
+    batch.add_argument(
+        "--manifest", help="清单文件，默认为输入文件同名的.manifest.jsonl"
+    )
+    batch.add_argument("--engine", help="使用的引擎，默认使用配置中的default_engine")
+    batch.add_argument("--engine-kwargs", type=_json_arg, help="引擎的创建参数（JSON）")
+    batch.add_argument("--concurrency", "-c", type=int, default=4, help="并发合成数")
+    batch.add_argument(
+        "--output-dir", help="未指定output_file的请求的输出目录，默认为清单旁的audio"
+    )
+    batch.add_argument("--retries", type=int, default=2, help="失败重试次数")
+    batch.add_argument(
+        "--verify",
+        choices=["hash", "size", "exists"],
+        default="hash",
+        help="跳过已完成条目前校验输出文件的方式",
+    )
+    batch.add_argument(
+        "--progress-interval", type=float, default=5.0, help="进度输出间隔（秒）"
+    )
+    batch.add_argument(
+        "--dedup", action="store_true", help="内容相同的请求只合成一次，复制输出文件"
+    )
+    batch.add_argument("--json", action="store_true", help="以JSON输出统计结果")
+    batch.set_defaults(func=_cmd_batch)
+
+    queue_options = argparse.ArgumentParser(add_help=False)
+    queue_options.add_argument("queue", help="队列文件（SQLite）")
+    queue_options.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="分片数，大于1时使用 <队列文件名>.<序号>.db 等多个队列文件",
+    )
+    queue_options.add_argument(
+        "--journal-mode",
+        default="wal",
+        help="SQLite日志模式，队列文件在网络文件系统上时使用delete",
+    )
+    queue_options.add_argument(
+        "--lease-seconds", type=float, default=120.0, help="任务租约时长（秒）"
+    )
+    queue_options.add_argument(
+        "--max-attempts", type=int, default=3, help="每个任务的最大尝试次数"
+    )
+    queue_options.add_argument("--batch", help="批次名称")
+
+    queue = subparsers.add_parser("queue", help="持久化任务队列")
+    queue_commands = queue.add_subparsers(dest="queue_command")
+
+    enqueue = queue_commands.add_parser(
+        "enqueue", parents=[queue_options], help="把JSONL输入文件入队"
+    )
+    enqueue.add_argument("input", nargs="+", help="输入文件，格式同batch命令")
+    enqueue.add_argument("--engine", help="执行这些任务的引擎，默认由工作进程决定")
+    enqueue.set_defaults(func=_cmd_queue_enqueue)
+
+    work = queue_commands.add_parser(
+        "work", parents=[queue_options], help="启动工作进程执行队列中的任务"
+    )
+    work.add_argument("--engine", help="任务未指定引擎时使用的引擎")
+    work.add_argument("--engine-kwargs", type=_json_arg, help="引擎的创建参数（JSON）")
+    work.add_argument("--concurrency", "-c", type=int, default=4, help="并发任务数")
+    work.add_argument("--output-dir", help="未指定output_file的任务的输出目录")
+    work.add_argument(
+        "--poll-interval", type=float, default=1.0, help="队列为空时的轮询间隔（秒）"
+    )
+    work.add_argument(
+        "--exit-when-empty", action="store_true", help="队列中的任务全部结束后退出"
+    )
+    work.add_argument("--json", action="store_true", help="退出时以JSON输出统计结果")
+    work.set_defaults(func=_cmd_queue_work)
+
+    status = queue_commands.add_parser(
+        "status", parents=[queue_options], help="查看各批次的进度"
+    )
+    status.add_argument("--json", action="store_true", help="以JSON输出")
+    status.set_defaults(func=_cmd_queue_status)
+
+    retry = queue_commands.add_parser(
+        "retry", parents=[queue_options], help="重新排队失败的任务"
+    )
+    retry.set_defaults(func=_cmd_queue_retry)
+
+    export = queue_commands.add_parser(
+        "export", parents=[queue_options], help="把已结束任务的结果导出为清单"
+    )
+    export.add_argument("output", help="输出的清单文件（追加写入）")
+    export.set_defaults(func=_cmd_queue_export)
+
+    audiobook = subparsers.add_parser("audiobook", help="把长文档按章节合成为有声书")
+    audiobook.add_argument(
+        "input", help="文本/Markdown文件（按章节标题切分），或每行一章的JSONL"
+    )
+    audiobook.add_argument("--output-dir", "-o", required=True, help="输出目录")
+    audiobook.add_argument("--engine", help="使用的引擎，默认使用配置中的default_engine")
+    audiobook.add_argument(
+        "--engine-kwargs", type=_json_arg, help="引擎的创建参数（JSON）"
+    )
+    audiobook.add_argument("--voice", help="语音名称")
+    audiobook.add_argument("--voice-rate", type=float, help="语速")
+    audiobook.add_argument("--format", choices=["wav", "mp3"], default="wav")
+    audiobook.add_argument(
+        "--subtitle-format", choices=["srt", "vtt", "frt"], default="srt"
+    )
+    audiobook.add_argument("--concurrency", "-c", type=int, default=4, help="并发数")
+    audiobook.add_argument("--window", type=int, help="重排缓冲大小，默认为并发数的4倍")
+    audiobook.add_argument(
+        "--max-chunk-chars", type=int, default=200, help="每个文本块的最大字符数"
+    )
+    audiobook.add_argument(
+        "--gap", type=float, default=0.3, help="文本块之间的静音（秒）"
+    )
+    audiobook.add_argument(
+        "--chapter-gap", type=float, default=1.5, help="整书文件中章节之间的静音（秒）"
+    )
+    audiobook.add_argument("--book-name", default="book", help="整书文件名")
+    audiobook.add_argument("--no-book", action="store_true", help="只输出章节文件")
+    audiobook.add_argument(
+        "--dedup", action="store_true", help="重复的文本块只合成一次，复用结果"
+    )
+    audiobook.add_argument("--json", action="store_true", help="以JSON输出章节索引")
+    audiobook.set_defaults(func=_cmd_audiobook)
+
+    script = subparsers.add_parser("script", help="多角色剧本合成")
+    script.add_argument("input", help="剧本文件：每行\"角色：台词\"，或JSONL")
+    script.add_argument("--output", "-o", required=True, help="输出音频文件")
+    script.add_argument(
+        "--speakers",
+        type=_speakers_arg,
+        required=True,
+        help='说话者到语音的映射（JSON文件或JSON），如{"旁白": ["edge", "zh-CN-YunxiNeural"]}',
+    )
+    script.add_argument("--engine", help="未指定引擎的说话者使用的引擎")
+    script.add_argument(
+        "--engine-kwargs",
+        type=_json_arg,
+        help='各引擎的创建参数（JSON），如{"bark": {"device": "cuda"}}',
+    )
+    script.add_argument("--concurrency", "-c", type=int, default=4, help="并发语音组数")
+    script.add_argument(
+        "--batch-size", type=int, default=16, help="每次交给引擎批量合成的台词数"
+    )
+    script.add_argument("--gap", type=float, default=0.4, help="台词之间的静音（秒）")
+    script.add_argument(
+        "--subtitle-format", choices=["srt", "vtt", "frt"], default="srt"
+    )
+    script.add_argument(
+        "--dedup", action="store_true", help="同一语音的相同台词只合成一次"
+    )
+    script.add_argument("--json", action="store_true", help="以JSON输出结果")
+    script.set_defaults(func=_cmd_script)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行主入口"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 1
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,8 @@ class TTSEngine(Enum):
     ESPEAK = "espeak"
     PYTTSX3 = "pyttsx3"
     FESTIVAL = "festival"
+    ROUTER = "router"
+    SYNTHETIC = "synthetic"
 
 
 class TTSFactory:
@@ -52,7 +54,7 @@ class TTSFactory:
     def create_tts(
         cls,
         engine_name: str,
-        voice_name: str,
+        voice_name: Optional[str],
         config: Optional[Dict[str, Any]] = None,
         **kwargs,
     ) -> BaseTTS:
@@ -60,7 +62,7 @@ class TTSFactory:
 
         Args:
             engine_name: 引擎名称
-            voice_name: 语音名称
+            voice_name: 语音名称，None使用引擎自己的默认语音
             config: 配置参数
             **kwargs: 其他参数
 
@@ -79,9 +81,9 @@ class TTSFactory:
 
         try:
             engine_class = cls._engines[engine_name]
-            instance = engine_class(
-                voice_name=voice_name, config=config or {}, **kwargs
-            )
+            if voice_name is not None:
+                kwargs["voice_name"] = voice_name
+            instance = engine_class(config=config or {}, **kwargs)
 
             logger.info(f"成功创建TTS引擎实例: {engine_name}, 语音: {voice_name}")
             return instance
@@ -178,6 +180,14 @@ def _auto_register_engines():
     except ImportError as e:
         logger.warning(f"无法导入Pyttsx3TTS: {e}")
 
+    from funtts.tts.router import RouterTTS
+
+    TTSFactory.register_engine("router", RouterTTS)
+
+    from funtts.tts.synthetic import SyntheticTTS
+
+    TTSFactory.register_engine("synthetic", SyntheticTTS)
+
 
 # 执行自动注册
 _auto_register_engines()
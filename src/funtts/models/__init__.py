@@ -6,8 +6,16 @@ FunTTS数据模型模块
 # 导入所有数据模型
 from .audio_segment import AudioSegment
 from .subtitle_maker import SubtitleMaker
+from .subtitle_view import ConcatSubtitleMaker
 from .voice_info import VoiceInfo
 from .request_response import TTSRequest, TTSResponse
 
 # 公开的API
-__all__ = ["AudioSegment", "SubtitleMaker", "VoiceInfo", "TTSRequest", "TTSResponse"]
+__all__ = [
+    "AudioSegment",
+    "SubtitleMaker",
+    "ConcatSubtitleMaker",
+    "VoiceInfo",
+    "TTSRequest",
+    "TTSResponse",
+]
@@ -0,0 +1,286 @@
+"""
+FRT二进制格式（FRTB）编解码
+紧凑的FRT变体：文件头 + 时间块索引 + 定长片段记录 + 字符串表
+
+文件布局（小端序）::
+
+    文件头      HEADER_STRUCT
+    块索引      block_count 个 (最早开始时间, 最晚结束时间)
+    片段记录    segment_count 个定长记录（开始、结束时间 + 8个字符串索引）
+    字符串偏移  string_count + 1 个相对字符串数据区的偏移
+    字符串数据  UTF-8编码的文本、说话者、语音、元数据(JSON)等
+
+只存储AudioSegment的原始字段，时长、显示名称等派生字段在读取时重新计算，
+与JSON FRT可以无损互相转换。按时间读取片段时只需读取文件头、块索引以及
+命中的记录块和字符串，不必读取整个文件。
+"""
+
+import json
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .audio_segment import AudioSegment
+
+FRTB_MAGIC = b"FRTB"
+FRTB_VERSION = 1
+DEFAULT_BLOCK_SIZE = 256
+
+# magic, version, flags, total_duration, segment_count, string_count,
+# block_size, block_count, index_offset, records_offset, strings_offset, blob_offset
+HEADER_STRUCT = struct.Struct("<4sHHdIIIIQQQQ")
+INDEX_STRUCT = struct.Struct("<dd")
+# start_time, end_time, text, speaker_id, speaker_name, voice_name,
+# emotion, style, segment_id, metadata
+RECORD_STRUCT = struct.Struct("<dd8I")
+OFFSET_STRUCT = struct.Struct("<I")
+
+NO_STRING = 0xFFFFFFFF
+
+_STRING_FIELDS = (
+    "text",
+    "speaker_id",
+    "speaker_name",
+    "voice_name",
+    "emotion",
+    "style",
+    "segment_id",
+    "metadata",
+)
+
+
+class _StringTable:
+    """去重的字符串表"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.strings: List[bytes] = []
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        position = self.index.get(value)
+        if position is None:
+            position = len(self.strings)
+            self.index[value] = position
+            self.strings.append(value.encode("utf-8"))
+        return position
+
+
+def dumps_frtb(
+    total_duration: float,
+    items: Iterable[Tuple[float, float, Optional[str], AudioSegment]],
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> bytes:
+    """编码为FRTB二进制数据
+
+    Args:
+        total_duration: 总时长（秒）
+        items: (开始时间, 结束时间, 片段ID, 片段) 序列，即SubtitleMaker._iter_export()
+        block_size: 每个索引块包含的记录数
+
+    Returns:
+        bytes: FRTB数据
+    """
+    table = _StringTable()
+    records = []
+    index = []
+    block_start = block_end = 0.0
+
+    for position, (start, end, segment_id, segment) in enumerate(items):
+        metadata = (
+            json.dumps(segment.metadata, ensure_ascii=False)
+            if segment.metadata
+            else None
+        )
+        records.append(
+            RECORD_STRUCT.pack(
+                float(start),
+                float(end),
+                table.add(segment.text),
+                table.add(segment.speaker_id),
+                table.add(segment.speaker_name),
+                table.add(segment.voice_name),
+                table.add(segment.emotion),
+                table.add(segment.style),
+                table.add(segment_id),
+                table.add(metadata),
+            )
+        )
+        if position % block_size == 0:
+            if position:
+                index.append(INDEX_STRUCT.pack(block_start, block_end))
+            block_start, block_end = start, end
+        else:
+            block_start = min(block_start, start)
+            block_end = max(block_end, end)
+    if records:
+        index.append(INDEX_STRUCT.pack(block_start, block_end))
+
+    offsets = [0]
+    for value in table.strings:
+        offsets.append(offsets[-1] + len(value))
+
+    index_offset = HEADER_STRUCT.size
+    records_offset = index_offset + len(index) * INDEX_STRUCT.size
+    strings_offset = records_offset + len(records) * RECORD_STRUCT.size
+    blob_offset = strings_offset + len(offsets) * OFFSET_STRUCT.size
+
+    header = HEADER_STRUCT.pack(
+        FRTB_MAGIC,
+        FRTB_VERSION,
+        0,
+        float(total_duration),
+        len(records),
+        len(table.strings),
+        block_size,
+        len(index),
+        index_offset,
+        records_offset,
+        strings_offset,
+        blob_offset,
+    )
+    return b"".join(
+        [
+            header,
+            b"".join(index),
+            b"".join(records),
+            struct.pack(f"<{len(offsets)}I", *offsets),
+            b"".join(table.strings),
+        ]
+    )
+
+
+def _unpack_header(data: bytes) -> tuple:
+    if len(data) < HEADER_STRUCT.size:
+        raise ValueError("FRTB文件头不完整")
+    header = HEADER_STRUCT.unpack_from(data)
+    if header[0] != FRTB_MAGIC:
+        raise ValueError("不是有效的FRTB格式文件")
+    if header[1] > FRTB_VERSION:
+        raise ValueError(f"不支持的FRTB版本: {header[1]}")
+    return header
+
+
+def _build_segment(record: tuple, lookup) -> AudioSegment:
+    """根据定长记录和字符串查找函数创建AudioSegment"""
+    fields = {
+        name: lookup(position) if position != NO_STRING else None
+        for name, position in zip(_STRING_FIELDS, record[2:])
+    }
+    metadata = fields.pop("metadata")
+    return AudioSegment(
+        start_time=record[0],
+        end_time=record[1],
+        text=fields.pop("text") or "",
+        metadata=json.loads(metadata) if metadata else {},
+        **fields,
+    )
+
+
+def loads_frtb(data: bytes) -> Tuple[float, List[AudioSegment]]:
+    """解码FRTB二进制数据
+
+    Args:
+        data: FRTB数据
+
+    Returns:
+        (总时长, 片段列表)
+    """
+    (
+        _,
+        _,
+        _,
+        total_duration,
+        segment_count,
+        string_count,
+        _,
+        _,
+        _,
+        records_offset,
+        strings_offset,
+        blob_offset,
+    ) = _unpack_header(data)
+
+    offsets = struct.unpack_from(f"<{string_count + 1}I", data, strings_offset)
+    cache: Dict[int, str] = {}
+
+    def lookup(position: int) -> str:
+        value = cache.get(position)
+        if value is None:
+            value = data[
+                blob_offset + offsets[position] : blob_offset + offsets[position + 1]
+            ].decode("utf-8")
+            cache[position] = value
+        return value
+
+    segments = [
+        _build_segment(record, lookup)
+        for record in RECORD_STRUCT.iter_unpack(
+            data[
+                records_offset : records_offset + segment_count * RECORD_STRUCT.size
+            ]
+        )
+    ]
+    return total_duration, segments
+
+
+def read_frtb_window(
+    file_path: str, start_time: float, end_time: float
+) -> Tuple[float, List[AudioSegment]]:
+    """随机读取与时间窗口重叠的片段
+
+    只读取文件头、块索引、命中的记录块和被引用的字符串。
+
+    Args:
+        file_path: FRTB文件路径
+        start_time: 窗口开始时间（秒）
+        end_time: 窗口结束时间（秒）
+
+    Returns:
+        (总时长, 与窗口重叠的片段列表)
+    """
+    with open(file_path, "rb") as f:
+        (
+            _,
+            _,
+            _,
+            total_duration,
+            segment_count,
+            _,
+            block_size,
+            block_count,
+            index_offset,
+            records_offset,
+            strings_offset,
+            blob_offset,
+        ) = _unpack_header(f.read(HEADER_STRUCT.size))
+
+        f.seek(index_offset)
+        index = list(INDEX_STRUCT.iter_unpack(f.read(block_count * INDEX_STRUCT.size)))
+
+        cache: Dict[int, str] = {}
+
+        def lookup(position: int) -> str:
+            value = cache.get(position)
+            if value is None:
+                f.seek(strings_offset + position * OFFSET_STRUCT.size)
+                begin, finish = struct.unpack("<2I", f.read(2 * OFFSET_STRUCT.size))
+                f.seek(blob_offset + begin)
+                value = f.read(finish - begin).decode("utf-8")
+                cache[position] = value
+            return value
+
+        segments = []
+        for block, (block_start, block_end) in enumerate(index):
+            if block_start > end_time or block_end < start_time:
+                continue
+            first = block * block_size
+            count = min(block_size, segment_count - first)
+            f.seek(records_offset + first * RECORD_STRUCT.size)
+            for record in RECORD_STRUCT.iter_unpack(
+                f.read(count * RECORD_STRUCT.size)
+            ):
+                if record[0] <= end_time and record[1] >= start_time:
+                    segments.append(_build_segment(record, lookup))
+
+    return total_duration, segments
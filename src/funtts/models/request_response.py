@@ -3,9 +3,14 @@ TTS请求和响应数据结构
 统一的请求响应模型
 """
 
+import hashlib
+import json
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 
+# 只影响输出位置、不影响合成结果的请求字段
+_OUTPUT_FIELDS = ("output_file", "output_dir")
+
 
 @dataclass
 class TTSRequest:
@@ -21,7 +26,7 @@ class TTSRequest:
     output_file: Optional[str] = None  # 输出文件路径，None则不保存文件
     output_dir: Optional[str] = None  # 输出目录路径，用于某些引擎
     generate_subtitles: bool = False  # 是否生成字幕
-    subtitle_format: str = "srt"  # 字幕格式 (srt/vtt/frt)
+    subtitle_format: str = "srt"  # 字幕格式 (srt/vtt/frt/frtb)
     language: Optional[str] = None  # 语言代码，用于语音选择
 
     def to_dict(self) -> Dict[str, Any]:
@@ -41,6 +46,26 @@ class TTSRequest:
             "language": self.language,
         }
 
+    def cache_key(self, *extra: Any) -> str:
+        """请求的规范哈希
+
+        由所有影响合成结果的字段计算，不包含输出路径；
+        内容相同的请求得到相同的值，可用于请求合并和结果缓存。
+
+        Args:
+            *extra: 附加的区分信息（如引擎名称）
+
+        Returns:
+            str: 十六进制sha256摘要
+        """
+        fields = {
+            key: value
+            for key, value in self.to_dict().items()
+            if key not in _OUTPUT_FIELDS
+        }
+        payload = json.dumps([fields, list(extra)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
     def validate(self) -> bool:
         """验证请求参数是否有效"""
         if not self.text or not self.text.strip():
@@ -53,7 +78,7 @@ class TTSRequest:
             return False
         if self.output_format not in ["wav", "mp3", "ogg", "flac"]:
             return False
-        if self.subtitle_format not in ["srt", "vtt", "frt"]:
+        if self.subtitle_format not in ["srt", "vtt", "frt", "frtb"]:
             return False
         return True
 
@@ -74,11 +99,31 @@ class TTSResponse:
     error_message: str = ""  # 错误信息
     error_code: Optional[str] = None  # 错误代码
     processing_time: float = 0.0  # 处理时间（秒）
+    output_future: Optional[Any] = None  # 后台输出任务（异步输出时设置）
 
     def __post_init__(self):
         if self.engine_info is None:
             self.engine_info = {}
 
+    def wait_outputs(self, timeout: Optional[float] = None) -> bool:
+        """等待后台输出（音频复制、字幕文件）写入完成
+
+        同步输出时直接返回True。
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+
+        Returns:
+            bool: 输出是否已成功写入
+        """
+        if self.output_future is None:
+            return True
+        try:
+            self.output_future.result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
         return {
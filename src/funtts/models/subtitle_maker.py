@@ -1,14 +1,15 @@
 """
 字幕制作器
-支持SRT、VTT、FRT三种格式的字幕生成和解析
+支持SRT、VTT、FRT（含二进制FRTB）格式的字幕生成和解析
 """
 
 import os
 import re
 import json
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 from datetime import timedelta
 from .audio_segment import AudioSegment
+from .frt_binary import FRTB_MAGIC, dumps_frtb, loads_frtb, read_frtb_window
 
 
 class SubtitleMaker:
@@ -54,9 +55,9 @@ class SubtitleMaker:
         """生成SRT格式字幕"""
         srt_content = []
 
-        for i, segment in enumerate(self.segments, 1):
-            start_time = self._format_time(segment.start_time)
-            end_time = self._format_time(segment.end_time)
+        for i, (start, end, _, segment) in enumerate(self._iter_export(), 1):
+            start_time = self._format_time(start)
+            end_time = self._format_time(end)
 
             srt_content.append(f"{i}")
             srt_content.append(f"{start_time} --> {end_time}")
@@ -76,9 +77,9 @@ class SubtitleMaker:
         """生成WebVTT格式字幕"""
         vtt_content = ["WEBVTT", ""]
 
-        for segment in self.segments:
-            start_time = self._format_time(segment.start_time, use_comma=False)
-            end_time = self._format_time(segment.end_time, use_comma=False)
+        for start, end, _, segment in self._iter_export():
+            start_time = self._format_time(start, use_comma=False)
+            end_time = self._format_time(end, use_comma=False)
 
             vtt_content.append(f"{start_time} --> {end_time}")
 
@@ -99,10 +100,46 @@ class SubtitleMaker:
             "format": "FRT",
             "version": "1.0",
             "total_duration": self._total_duration,
-            "segments": [segment.to_dict() for segment in self.segments],
+            "segments": [
+                self._export_dict(start, end, segment_id, segment)
+                for start, end, segment_id, segment in self._iter_export()
+            ],
         }
         return json.dumps(data, ensure_ascii=False, indent=2)
 
+    def to_frtb(self) -> bytes:
+        """生成FRTB格式字幕（FRT的紧凑二进制变体，带时间块索引）"""
+        return dumps_frtb(self._total_duration, self._iter_export())
+
+    def _iter_export(self) -> Iterator[Tuple[float, float, Optional[str], AudioSegment]]:
+        """遍历导出用的片段
+
+        导出器（SRT/VTT/FRT）统一通过此方法读取片段，子类（如拼接视图）
+        可以重写它，在导出时即时计算时间和片段ID，而不必复制片段。
+
+        Yields:
+            (开始时间, 结束时间, 片段ID, 原始片段) 元组
+        """
+        for segment in self.segments:
+            yield segment.start_time, segment.end_time, segment.segment_id, segment
+
+    @staticmethod
+    def _export_dict(
+        start: float, end: float, segment_id: Optional[str], segment: AudioSegment
+    ) -> dict:
+        """生成导出用的片段字典，时间和片段ID以导出值为准"""
+        data = segment.to_dict()
+        if (
+            start != segment.start_time
+            or end != segment.end_time
+            or segment_id != segment.segment_id
+        ):
+            data["start_time"] = start
+            data["end_time"] = end
+            data["duration"] = end - start
+            data["segment_id"] = segment_id
+        return data
+
     def _format_time(self, seconds: float, use_comma: bool = True) -> str:
         """格式化时间为字幕格式
 
@@ -123,14 +160,19 @@ class SubtitleMaker:
         return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millisecs:03d}"
 
     def save_to_file(self, file_path: str, format_type: str = "srt"):
-        """保存字幕到文件，支持SRT、VTT、FRT格式
+        """保存字幕到文件，支持SRT、VTT、FRT、FRTB格式
 
         Args:
             file_path: 文件路径
-            format_type: 字幕格式，支持 "srt"、"vtt"、"frt"
+            format_type: 字幕格式，支持 "srt"、"vtt"、"frt"、"frtb"
         """
         format_type = format_type.lower()
 
+        if format_type == "frtb":
+            with open(file_path, "wb") as f:
+                f.write(self.to_frtb())
+            return
+
         if format_type == "srt":
             content = self.to_srt()
         elif format_type == "vtt":
@@ -144,7 +186,7 @@ class SubtitleMaker:
             f.write(content)
 
     def load_from_file(self, file_path: str) -> bool:
-        """从文件加载字幕，支持SRT、VTT、FRT格式
+        """从文件加载字幕，支持SRT、VTT、FRT、FRTB格式
 
         Args:
             file_path: 字幕文件路径
@@ -156,6 +198,11 @@ class SubtitleMaker:
             if not os.path.exists(file_path):
                 return False
 
+            if self.is_frtb_file(file_path):
+                self.clear()
+                with open(file_path, "rb") as f:
+                    return self._parse_frtb(f.read())
+
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read().strip()
 
@@ -208,7 +255,7 @@ class SubtitleMaker:
 
     def __bool__(self) -> bool:
         """检查是否有片段"""
-        return len(self.segments) > 0
+        return len(self) > 0
 
     def _parse_srt(self, content: str) -> bool:
         """解析SRT格式字幕"""
@@ -361,6 +408,17 @@ class SubtitleMaker:
             print(f"解析FRT格式失败: {e}")
             return False
 
+    def _parse_frtb(self, data: bytes) -> bool:
+        """解析FRTB格式字幕"""
+        try:
+            self._total_duration, segments = loads_frtb(data)
+            self.segments.extend(segments)
+            return True
+
+        except Exception as e:
+            print(f"解析FRTB格式失败: {e}")
+            return False
+
     def _parse_time(self, time_str: str) -> float:
         """解析时间字符串为秒数"""
         # 处理逗号分隔符（SRT格式）
@@ -394,11 +452,16 @@ class SubtitleMaker:
                 print(f"文件不存在: {file_path}")
                 return None
 
+            subtitle_maker = SubtitleMaker()
+
+            if SubtitleMaker.is_frtb_file(file_path):
+                with open(file_path, "rb") as f:
+                    success = subtitle_maker._parse_frtb(f.read())
+                return subtitle_maker if success else None
+
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read().strip()
 
-            subtitle_maker = SubtitleMaker()
-
             # 根据文件扩展名或内容判断格式
             if file_path.lower().endswith(".frt"):
                 success = subtitle_maker._parse_frt(content)
@@ -417,12 +480,12 @@ class SubtitleMaker:
     def save_to_file_static(
         subtitle_maker: "SubtitleMaker", file_path: str, format_type: str = "srt"
     ) -> bool:
-        """静态方法：保存字幕到文件，支持SRT、VTT、FRT格式
+        """静态方法：保存字幕到文件，支持SRT、VTT、FRT、FRTB格式
 
         Args:
             subtitle_maker: SubtitleMaker对象
             file_path: 文件路径
-            format_type: 字幕格式，支持 "srt"、"vtt"、"frt"
+            format_type: 字幕格式，支持 "srt"、"vtt"、"frt"、"frtb"
 
         Returns:
             bool: 是否保存成功
@@ -430,6 +493,11 @@ class SubtitleMaker:
         try:
             format_type = format_type.lower()
 
+            if format_type == "frtb":
+                with open(file_path, "wb") as f:
+                    f.write(subtitle_maker.to_frtb())
+                return True
+
             if format_type == "srt":
                 content = subtitle_maker.to_srt()
             elif format_type == "vtt":
@@ -449,19 +517,61 @@ class SubtitleMaker:
             print(f"保存字幕文件失败: {e}")
             return False
 
+    @staticmethod
+    def is_frtb_file(file_path: str) -> bool:
+        """根据扩展名或文件头判断是否为FRTB格式文件"""
+        if file_path.lower().endswith(".frtb"):
+            return True
+        try:
+            with open(file_path, "rb") as f:
+                return f.read(len(FRTB_MAGIC)) == FRTB_MAGIC
+        except OSError:
+            return False
+
+    @staticmethod
+    def load_time_window(
+        file_path: str, start_time: float, end_time: float
+    ) -> Optional["SubtitleMaker"]:
+        """静态方法：从FRTB文件随机读取指定时间窗口内的片段
+
+        借助FRTB的时间块索引，只读取与窗口重叠的记录块，不加载整个文件。
+
+        Args:
+            file_path: FRTB文件路径
+            start_time: 窗口开始时间（秒）
+            end_time: 窗口结束时间（秒）
+
+        Returns:
+            只包含与窗口重叠片段的SubtitleMaker对象，读取失败返回None
+        """
+        try:
+            subtitle_maker = SubtitleMaker()
+            subtitle_maker._total_duration, segments = read_frtb_window(
+                file_path, start_time, end_time
+            )
+            subtitle_maker.segments.extend(segments)
+            return subtitle_maker
+
+        except Exception as e:
+            print(f"读取FRTB时间窗口失败: {e}")
+            return None
+
     @staticmethod
     def generate_subtitle_filename(audio_file: str, format_type: str = "srt") -> str:
         """根据音频文件名生成字幕文件名
 
         Args:
             audio_file: 音频文件路径
-            format_type: 字幕格式（srt、vtt或frt）
+            format_type: 字幕格式（srt、vtt、frt或frtb）
 
         Returns:
-            str: 字幕文件路径
+            str: 字幕文件路径；没有音频文件时在临时工作区中分配唯一路径
         """
         if not audio_file:
-            return f"subtitle.{format_type}"
+            # 避免与funtts.utils之间的循环导入
+            from funtts.utils.file_utils import allocate_path
+
+            return allocate_path(suffix=f".{format_type}", prefix="subtitle_")
 
         # 获取音频文件的目录和基础名称
         audio_dir = os.path.dirname(audio_file)
@@ -0,0 +1,105 @@
+"""
+拼接字幕视图
+按时间偏移引用多个字幕制作器，避免合并时复制片段
+"""
+
+from typing import Iterator, List, Optional, Tuple
+from .audio_segment import AudioSegment
+from .subtitle_maker import SubtitleMaker
+
+
+class ConcatSubtitleMaker(SubtitleMaker):
+    """拼接视图字幕制作器
+
+    引用源SubtitleMaker并记录每一部分的时间偏移，合并时不复制任何片段。
+    导出（SRT/VTT/FRT）时即时叠加偏移并生成片段ID；首次访问 ``segments``
+    （包括 ``add_segment``、``clear`` 等修改操作）时才物化为普通片段列表，
+    之后与普通SubtitleMaker行为一致。
+
+    注意：物化之前视图直接引用源片段，合并后不应再修改源字幕制作器。
+    """
+
+    def __init__(self, parts: Optional[List[Tuple[SubtitleMaker, float]]] = None):
+        """
+        Args:
+            parts: (字幕制作器, 时间偏移秒数) 列表，按拼接顺序排列
+        """
+        super().__init__()
+        self._parts: List[Tuple[SubtitleMaker, float]] = list(parts or [])
+        self._segments: Optional[List[AudioSegment]] = None
+        self._total_duration = max(
+            (
+                offset + maker.get_total_duration()
+                for maker, offset in self._parts
+                if len(maker)
+            ),
+            default=0.0,
+        )
+
+    @property
+    def segments(self) -> List[AudioSegment]:
+        """片段列表，首次访问时物化"""
+        if self._segments is None:
+            self._materialize()
+        return self._segments
+
+    @segments.setter
+    def segments(self, value: List[AudioSegment]):
+        self._parts = []
+        self._segments = value
+
+    @property
+    def is_materialized(self) -> bool:
+        """是否已物化为普通片段列表"""
+        return self._segments is not None
+
+    def _iter_parts(
+        self,
+    ) -> Iterator[Tuple[float, float, Optional[str], AudioSegment]]:
+        """按拼接顺序遍历各部分片段，即时叠加偏移"""
+        index = 0
+        for part_index, (maker, offset) in enumerate(self._parts):
+            for start, end, segment_id, segment in maker._iter_export():
+                yield (
+                    start + offset,
+                    end + offset,
+                    f"{part_index}_{segment_id}"
+                    if segment_id
+                    else f"{part_index}_{index}",
+                    segment,
+                )
+                index += 1
+
+    def _iter_export(
+        self,
+    ) -> Iterator[Tuple[float, float, Optional[str], AudioSegment]]:
+        if self._segments is not None:
+            return super()._iter_export()
+        return self._iter_parts()
+
+    def _materialize(self):
+        """将视图物化为独立的片段列表"""
+        segments = []
+        for start, end, segment_id, segment in self._iter_parts():
+            segments.append(
+                AudioSegment(
+                    start_time=start,
+                    end_time=end,
+                    text=segment.text,
+                    speaker_id=segment.speaker_id,
+                    speaker_name=segment.speaker_name,
+                    voice_name=segment.voice_name,
+                    emotion=segment.emotion,
+                    style=segment.style,
+                    segment_id=segment_id,
+                    metadata=segment.metadata.copy() if segment.metadata else {},
+                )
+            )
+        self._segments = segments
+        self._parts = []
+
+    def __len__(self) -> int:
+        """返回片段数量，视图状态下不触发物化"""
+        if self._segments is not None:
+            return len(self._segments)
+        return sum(len(maker) for maker, _ in self._parts)
@@ -0,0 +1,33 @@
+"""
+TTS服务模块
+"""
+
+from .admission import AdmissionControl, Rejected
+from .bench import (
+    compare_audio,
+    compare_cpu_profiles,
+    format_profile_report,
+    format_report,
+    run_benchmark,
+)
+from .server import HTTPError, TTSServer
+from .session import StreamingSession, split_sentences
+from .streaming import ThreadedStream
+from .websocket import WebSocket, WebSocketClosed
+
+__all__ = [
+    "TTSServer",
+    "HTTPError",
+    "AdmissionControl",
+    "Rejected",
+    "ThreadedStream",
+    "StreamingSession",
+    "split_sentences",
+    "WebSocket",
+    "WebSocketClosed",
+    "run_benchmark",
+    "format_report",
+    "compare_cpu_profiles",
+    "compare_audio",
+    "format_profile_report",
+]
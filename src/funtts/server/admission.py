@@ -0,0 +1,100 @@
+"""
+准入控制
+限制同时合成的请求数和排队长度，超出时立即拒绝，而不是让请求在服务端无限堆积。
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+
+class Rejected(Exception):
+    """请求被准入控制拒绝"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionControl:
+    """并发上限 + 有界等待队列
+
+    - 同时执行的请求数不超过max_concurrency
+    - 执行中和排队中的请求总数超过max_concurrency + max_queue时立即拒绝
+    - 排队超过queue_timeout秒仍未开始执行的请求也被拒绝
+
+    只在事件循环线程中使用。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        queue_timeout: Optional[float] = 30.0,
+    ):
+        """
+        Args:
+            max_concurrency: 最大并发执行数
+            max_queue: 最大排队数，0表示不排队
+            queue_timeout: 最长排队时间（秒），None表示不限
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._queue_seconds = 0.0  # 排队时间的指数移动平均
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def slot(self):
+        """获取一个执行名额，退出时归还
+
+        Raises:
+            Rejected: 队列已满或排队超时
+        """
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise Rejected("服务繁忙，请稍后重试", self._retry_after())
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.waiting += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise Rejected("排队超时", self._retry_after())
+        finally:
+            self.waiting -= 1
+        self._queue_seconds += 0.2 * (time.monotonic() - start - self._queue_seconds)
+
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def _retry_after(self) -> float:
+        return max(1.0, round(self._queue_seconds, 1))
+
+    def stats(self) -> Dict[str, Any]:
+        """获取准入统计"""
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_queue_seconds": round(self._queue_seconds, 4),
+        }
@@ -0,0 +1,452 @@
+"""
+TTS服务压测
+以固定并发向 /synthesize 发送请求，统计首字节时间（TTFB）、总延迟分位数、吞吐量和被拒绝的请求数。
+未指定服务地址时在进程内启动一个使用合成测试引擎的服务，用于衡量服务本身的开销。
+另提供torch引擎CPU推理配置（线程数、inference_mode、动态int8量化）的速度和精度对比。
+"""
+
+import array
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import wave
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .server import TTSServer
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]):
+    """逐块读取响应体，产出数据块"""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                await reader.readline()
+                return
+            yield await reader.readexactly(size)
+            await reader.readline()
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            data = await reader.read(min(remaining, 65536))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(data)
+            yield data
+    else:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            yield data
+
+
+async def request_once(
+    host: str, port: int, payload: Dict[str, Any]
+) -> Tuple[int, Optional[float], float, int]:
+    """发送一次合成请求
+
+    Returns:
+        (状态码, 首字节时间, 总耗时, 音频字节数)，连接失败时状态码为0
+    """
+    start = time.perf_counter()
+    ttfb = None
+    size = 0
+    body = json.dumps(payload).encode("utf-8")
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return 0, None, time.perf_counter() - start, 0
+    try:
+        writer.write(
+            (
+                f"POST /synthesize HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await writer.drain()
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(head[0].split(" ")[1])
+        headers = {}
+        for line in head[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        async for data in _read_body(reader, headers):
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(data)
+        return status, ttfb, time.perf_counter() - start, size
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+        return 0, ttfb, time.perf_counter() - start, size
+    finally:
+        writer.close()
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(p: float) -> float:
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 4)
+
+    return {
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": round(values[-1], 4),
+    }
+
+
+async def run_benchmark(
+    url: Optional[str] = None,
+    requests: int = 100,
+    concurrency: int = 10,
+    texts: Optional[List[str]] = None,
+    engine: Optional[str] = None,
+    voice_name: Optional[str] = None,
+    stream: bool = True,
+    server_kwargs: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """执行压测
+
+    Args:
+        url: 服务地址，如 http://127.0.0.1:8000；None时在进程内启动合成测试引擎服务
+        requests: 请求总数
+        concurrency: 并发数
+        texts: 轮流使用的文本
+        engine: 请求使用的引擎，None使用服务的默认引擎
+        voice_name: 请求使用的语音
+        stream: 是否请求流式合成
+        server_kwargs: 进程内服务的参数，如 {"max_concurrency": 8}
+
+    Returns:
+        Dict[str, Any]: 统计结果
+    """
+    texts = texts or ["这是一段用于压测的示例文本，用来衡量语音合成服务的延迟和吞吐量。"]
+    server = None
+    if url is None:
+        server = TTSServer(port=0, **{"engine": "synthetic", **(server_kwargs or {})})
+        await server.start()
+        host, port = server.host, server.port
+    else:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+
+    statuses: Dict[int, int] = {}
+    ttfbs: List[float] = []
+    latencies: List[float] = []
+    audio_bytes = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal audio_bytes
+        for index in counter:
+            payload = {"text": texts[index % len(texts)], "stream": stream}
+            if engine:
+                payload["engine"] = engine
+            if voice_name:
+                payload["voice_name"] = voice_name
+            status, ttfb, latency, size = await request_once(host, port, payload)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(latency)
+                audio_bytes += size
+                if ttfb is not None:
+                    ttfbs.append(ttfb)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        elapsed = time.perf_counter() - start
+        if server is not None:
+            await server.close()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "succeeded": len(latencies),
+        "rejected": statuses.get(503, 0),
+        "statuses": statuses,
+        "ttfb": _percentiles(ttfbs),
+        "latency": _percentiles(latencies),
+        "audio_bytes": audio_bytes,
+    }
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    """把压测结果格式化为文本"""
+    lines = [
+        f"请求数: {result['requests']}  并发: {result['concurrency']}  "
+        f"耗时: {result['elapsed']}s",
+        f"成功: {result['succeeded']}  拒绝(503): {result['rejected']}  "
+        f"状态码: {result['statuses']}",
+        f"吞吐量: {result['throughput']} 请求/秒  音频: {result['audio_bytes']} 字节",
+    ]
+    for name in ("ttfb", "latency"):
+        values = result[name]
+        if values:
+            lines.append(
+                f"{name:<8} p50={values['p50']}s  p95={values['p95']}s  "
+                f"p99={values['p99']}s  max={values['max']}s"
+            )
+    return "\n".join(lines)
+
+
+# ==================== torch引擎CPU推理配置对比 ====================
+
+# 完全相同的音频的信噪比记为该值
+_MAX_SNR_DB = 120.0
+
+
+def _read_samples(path: str) -> Tuple[List[float], int]:
+    """读取音频文件第一个声道的采样值（归一化到 -1~1）和采样率"""
+    try:
+        with wave.open(path, "rb") as file:
+            width = file.getsampwidth()
+            channels = file.getnchannels()
+            rate = file.getframerate()
+            frames = file.readframes(file.getnframes())
+    except wave.Error:
+        # 浮点WAV等wave模块不支持的格式
+        import soundfile
+
+        data, rate = soundfile.read(path, always_2d=True)
+        return [float(row[0]) for row in data], rate
+
+    if width == 1:
+        return [(b - 128) / 128.0 for b in frames[::channels]], rate
+    if width not in (2, 4):
+        raise ValueError(f"不支持的采样位宽: {width * 8}bit")
+    samples = array.array("h" if width == 2 else "i")
+    samples.frombytes(frames)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    scale = float(1 << (width * 8 - 1))
+    return [value / scale for value in samples[::channels]], rate
+
+
+def _envelope(samples: List[float], frame: int) -> List[float]:
+    return [
+        math.sqrt(sum(x * x for x in samples[i : i + frame]) / frame)
+        for i in range(0, len(samples) - frame + 1, frame)
+    ]
+
+
+def _correlation(a: List[float], b: List[float]) -> Optional[float]:
+    n = min(len(a), len(b))
+    if n < 2:
+        return None
+    a, b = a[:n], b[:n]
+    mean_a, mean_b = sum(a) / n, sum(b) / n
+    cov = sum((x - mean_a) * (y - mean_b) for x, y in zip(a, b))
+    var_a = sum((x - mean_a) ** 2 for x in a)
+    var_b = sum((y - mean_b) ** 2 for y in b)
+    if not var_a or not var_b:
+        return None
+    return cov / math.sqrt(var_a * var_b)
+
+
+def compare_audio(reference: str, candidate: str) -> Dict[str, Optional[float]]:
+    """比较两个音频文件
+
+    Returns:
+        duration_ratio: 时长比（候选/参考）
+        snr_db: 以参考音频为信号、逐采样差值为噪声的信噪比，按较短的长度对齐
+        envelope_corr: 20ms帧能量包络的相关系数，对轻微的相位和采样差异不敏感
+    """
+    ref, rate = _read_samples(reference)
+    cand, cand_rate = _read_samples(candidate)
+    result: Dict[str, Optional[float]] = {
+        "duration_ratio": round((len(cand) / cand_rate) / (len(ref) / rate), 4)
+        if ref
+        else None,
+        "snr_db": None,
+        "envelope_corr": None,
+    }
+    if rate != cand_rate or not ref or not cand:
+        return result
+
+    n = min(len(ref), len(cand))
+    signal = sum(x * x for x in ref[:n])
+    noise = sum((x - y) ** 2 for x, y in zip(ref[:n], cand[:n]))
+    if signal:
+        snr = _MAX_SNR_DB if not noise else 10 * math.log10(signal / noise)
+        result["snr_db"] = round(min(snr, _MAX_SNR_DB), 2)
+    frame = max(1, rate // 50)
+    corr = _correlation(_envelope(ref, frame), _envelope(cand, frame))
+    result["envelope_corr"] = round(corr, 4) if corr is not None else None
+    return result
+
+
+def _seed(seed: Optional[int]):
+    """固定随机种子，使采样式模型（Bark、Tortoise）在各配置间可比"""
+    if seed is None:
+        return
+    random.seed(seed)
+    try:
+        import numpy
+
+        numpy.random.seed(seed)
+    except ImportError:
+        pass
+    try:
+        import torch
+
+        torch.manual_seed(seed)
+    except ImportError:
+        pass
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(sum(values) / len(values), 4) if values else None
+
+
+def compare_cpu_profiles(
+    engine: str,
+    profiles: Optional[Dict[str, Any]] = None,
+    texts: Optional[List[str]] = None,
+    runs: int = 3,
+    engine_kwargs: Optional[Dict[str, Any]] = None,
+    seed: Optional[int] = 0,
+) -> Dict[str, Any]:
+    """对比torch引擎在不同CPU推理配置下的速度和精度
+
+    每个配置创建一个新的引擎实例，先合成一次（包括模型加载）作为预热，
+    再把每条文本合成runs次统计耗时。启用量化的配置排在最后运行，
+    因为Bark等引擎的模型缓存在进程内，量化后会影响之后创建的实例；
+    第一个运行的配置为基准，精度比较每条文本最后一次合成的音频。
+
+    Args:
+        engine: 引擎名称，如 "coqui"、"bark"
+        profiles: 配置名到CPUProfile取值（实例、参数字典或预设名）的映射，
+            默认对比 torch、default、int8 三个预设
+        texts: 合成文本
+        runs: 每条文本的合成次数
+        engine_kwargs: 引擎的创建参数
+        seed: 每次合成前设置的随机种子，None表示不设置
+
+    Returns:
+        Dict[str, Any]: 各配置的耗时、实时率（RTF）、加速比和精度指标
+    """
+    from ..factory import TTSFactory
+    from ..models import TTSRequest
+    from ..utils.torch_profile import CPUProfile
+
+    profiles = profiles or {name: name for name in ("torch", "default", "int8")}
+    texts = texts or [
+        "The quick brown fox jumps over the lazy dog.",
+        "这是一段用于对比推理配置的示例文本，用来衡量合成速度和音质的变化。",
+    ]
+    resolved = [
+        (name, CPUProfile.from_value(value)) for name, value in profiles.items()
+    ]
+    resolved.sort(key=lambda item: item[1].quantize)
+
+    results = []
+    reference: Dict[int, Any] = {}
+    for name, profile in resolved:
+        tts = TTSFactory.create_tts(
+            engine, None, **{**(engine_kwargs or {}), "cpu_profile": profile}
+        )
+        _seed(seed)
+        start = time.perf_counter()
+        warmup = tts.synthesize(TTSRequest(text=texts[0]))
+        first = time.perf_counter() - start
+        if not warmup.success:
+            results.append({"profile": name, "error": warmup.error_message})
+            continue
+
+        latencies: List[float] = []
+        audio_seconds = 0.0
+        last: Dict[int, Any] = {}
+        for _ in range(max(1, runs)):
+            for index, text in enumerate(texts):
+                _seed(seed)
+                start = time.perf_counter()
+                response = tts.synthesize(TTSRequest(text=text))
+                latencies.append(time.perf_counter() - start)
+                if not response.success:
+                    raise RuntimeError(f"{name} 合成失败: {response.error_message}")
+                audio_seconds += response.duration or 0.0
+                last[index] = response
+
+        accuracy = []
+        if reference:
+            accuracy = [
+                compare_audio(reference[index].audio_file, response.audio_file)
+                for index, response in last.items()
+            ]
+        else:
+            reference = last
+        elapsed = sum(latencies)
+        info = tts.get_engine_info().get("cpu_profile", {})
+        results.append(
+            {
+                "profile": name,
+                "settings": info or profile.describe(),
+                "first_seconds": round(first, 3),
+                "latency": _percentiles(latencies),
+                "mean_seconds": _mean(latencies),
+                "rtf": round(elapsed / audio_seconds, 4) if audio_seconds else None,
+                "duration_ratio": _mean([a["duration_ratio"] for a in accuracy]),
+                "snr_db": _mean([a["snr_db"] for a in accuracy]),
+                "envelope_corr": _mean([a["envelope_corr"] for a in accuracy]),
+            }
+        )
+        del tts
+
+    baseline = next((r for r in results if "error" not in r), None)
+    for result in results:
+        if baseline is not None and result.get("mean_seconds"):
+            result["speedup"] = round(
+                baseline["mean_seconds"] / result["mean_seconds"], 3
+            )
+    return {
+        "engine": engine,
+        "texts": len(texts),
+        "runs": runs,
+        "baseline": baseline["profile"] if baseline else None,
+        "profiles": results,
+    }
+
+
+def format_profile_report(result: Dict[str, Any]) -> str:
+    """把CPU推理配置对比结果格式化为文本"""
+    lines = [
+        f"引擎: {result['engine']}  文本: {result['texts']}  "
+        f"每条合成: {result['runs']}次  基准: {result['baseline']}",
+        f"{'配置':<10}{'首次(s)':>9}{'p50(s)':>9}{'平均(s)':>9}{'RTF':>8}"
+        f"{'加速比':>8}{'时长比':>8}{'SNR(dB)':>9}{'包络相关':>9}",
+    ]
+
+    def cell(value, width):
+        return f"{'-' if value is None else value:>{width}}"
+
+    for item in result["profiles"]:
+        if "error" in item:
+            lines.append(f"{item['profile']:<10}失败: {item['error']}")
+            continue
+        lines.append(
+            f"{item['profile']:<10}"
+            + cell(item["first_seconds"], 9)
+            + cell(item["latency"].get("p50"), 9)
+            + cell(item["mean_seconds"], 9)
+            + cell(item["rtf"], 8)
+            + cell(item.get("speedup"), 8)
+            + cell(item["duration_ratio"], 8)
+            + cell(item["snr_db"], 9)
+            + cell(item["envelope_corr"], 9)
+        )
+    return "\n".join(lines)
@@ -0,0 +1,573 @@
+"""
+TTS HTTP服务
+基于asyncio的轻量HTTP/1.1服务，不依赖第三方Web框架：
+- 引擎实例按名称缓存，在请求之间复用（连接池、模型、语音列表缓存都随之复用）
+- 支持流式合成的引擎边合成边以分块传输编码发送音频
+- 准入控制限制并发和排队长度，超出时返回503和Retry-After
+
+接口:
+- GET  /health      服务状态和统计
+- GET  /voices      语音列表，参数 engine、language
+- POST /synthesize  语音合成，JSON请求体
+- GET  /ws          WebSocket流式朗读，协议见session模块
+"""
+
+import asyncio
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from funutil import getLogger
+
+from ..base import BaseTTS, RequestScheduler
+from ..config import get_config
+from ..factory import TTSFactory
+from ..models import TTSRequest, TTSResponse
+from .admission import AdmissionControl, Rejected
+from .session import StreamingSession
+from .streaming import ThreadedStream
+from .websocket import WebSocket
+
+logger = getLogger("funtts")
+
+# 请求体中可以直接映射到TTSRequest的字段
+_REQUEST_FIELDS = {
+    field.name
+    for field in fields(TTSRequest)
+    if field.name not in ("output_file", "output_dir")
+}
+
+# 交给调度器的排队参数
+_SCHEDULE_FIELDS = ("priority", "tenant", "timeout")
+
+# 合成失败响应的错误码对应的HTTP状态码，其余为500
+_ERROR_STATUS = {"CIRCUIT_OPEN": 503, "QUEUE_FULL": 503, "DEADLINE_EXCEEDED": 504}
+
+_STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class HTTPError(Exception):
+    """请求处理中需要直接返回给客户端的错误"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class HTTPRequest:
+    """解析后的HTTP请求"""
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.headers = headers
+        self.body = body
+        url = urlsplit(target)
+        self.path = url.path
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.body.decode("utf-8") or "{}")
+        except (UnicodeDecodeError, ValueError) as e:
+            raise HTTPError(400, f"请求体不是有效的JSON: {e}")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "请求体必须是JSON对象")
+        return data
+
+
+class TTSServer:
+    """TTS HTTP服务
+
+    用法::
+
+        server = TTSServer(port=8000, engine="edge", max_concurrency=16)
+        server.run()
+
+    或在已有的事件循环中::
+
+        await server.start()
+        await server.serve_forever()
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        engine: Optional[str] = None,
+        engine_kwargs: Optional[Dict[str, Dict[str, Any]]] = None,
+        engines: Optional[List[str]] = None,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        queue_timeout: Optional[float] = 30.0,
+        max_body: int = 1024 * 1024,
+        chunk_size: int = 64 * 1024,
+        stream_buffer: int = 16,
+        scheduler: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机端口
+            engine: 默认引擎名称，None使用全局配置中的默认引擎
+            engine_kwargs: 按引擎名称指定的创建参数，如 {"edge": {"rate_limit": {...}}}
+            engines: 允许客户端选择的引擎，None表示所有已注册的引擎
+            max_concurrency: 最大并发合成数
+            max_queue: 最大排队请求数
+            queue_timeout: 最长排队时间（秒）
+            max_body: 请求体大小上限（字节）
+            chunk_size: 发送文件时的分块大小（字节）
+            stream_buffer: 流式合成时缓存的事件数，超过后引擎等待客户端接收
+            scheduler: 按RequestScheduler的参数为每个引擎创建调度器，
+                非流式合成经调度器按优先级、租户和截止时间排队，None表示不使用
+        """
+        self.host = host
+        self.port = port
+        self.default_engine = (engine or get_config().get_default_engine()).lower()
+        self.engine_kwargs = engine_kwargs or {}
+        self.allowed_engines = (
+            {name.lower() for name in engines} if engines is not None else None
+        )
+        self.max_body = max_body
+        self.chunk_size = chunk_size
+        self.stream_buffer = stream_buffer
+        self.admission = AdmissionControl(max_concurrency, max_queue, queue_timeout)
+        self.scheduler_options = scheduler
+
+        self._engines: Dict[str, BaseTTS] = {}
+        self._schedulers: Dict[str, RequestScheduler] = {}
+        self._engine_lock = threading.Lock()
+        # 合成在专用线程池中执行，线程数与并发上限一致
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.admission.max_concurrency,
+            thread_name_prefix="funtts-server",
+        )
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._started_at = time.time()
+        self._stats = {
+            "requests": 0,
+            "synthesized": 0,
+            "streamed": 0,
+            "failed": 0,
+            "client_disconnects": 0,
+            "ws_sessions": 0,
+            "ws_segments": 0,
+        }
+
+    # ==================== 引擎 ====================
+
+    def get_engine(self, name: Optional[str] = None) -> BaseTTS:
+        """获取缓存的引擎实例，首次使用时创建
+
+        Raises:
+            HTTPError: 引擎不可用
+        """
+        name = (name or self.default_engine).lower()
+        if self.allowed_engines is not None and name not in self.allowed_engines:
+            raise HTTPError(400, f"不允许使用的引擎: {name}")
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        with self._engine_lock:
+            if name not in self._engines:
+                config = get_config().get_engine_config(name)
+                try:
+                    self._engines[name] = TTSFactory.create_tts(
+                        name, None, config, **self.engine_kwargs.get(name, {})
+                    )
+                except ValueError as e:
+                    raise HTTPError(400, str(e))
+                if self.scheduler_options is not None:
+                    self._schedulers[name] = RequestScheduler(
+                        self._engines[name], **self.scheduler_options
+                    )
+            return self._engines[name]
+
+    async def _get_engine(self, name: Optional[str]) -> BaseTTS:
+        # 引擎创建可能需要加载模型，放到线程中执行
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_engine, name)
+
+    # ==================== 生命周期 ====================
+
+    async def start(self):
+        """开始监听"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started_at = time.time()
+        logger.info(f"TTS服务已启动: http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self, timeout: float = 10.0):
+        """停止监听，等待进行中的请求完成后释放线程池
+
+        Args:
+            timeout: 等待进行中请求的最长时间（秒）
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._connections:
+            await asyncio.wait(set(self._connections), timeout=timeout)
+        self._executor.shutdown(wait=False)
+        for scheduler in self._schedulers.values():
+            scheduler.shutdown(wait=False)
+        logger.info("TTS服务已停止")
+
+    def run(self):
+        """启动服务并阻塞，Ctrl+C退出"""
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._executor.shutdown(wait=False)
+
+    # ==================== 连接处理 ====================
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            request = await self._read_request(reader)
+            if request is None:
+                return
+            self._stats["requests"] += 1
+            if request.path == "/ws":
+                await self._websocket(request, reader, writer)
+            else:
+                await self._route(request, writer)
+        except HTTPError as e:
+            await self._send_json(
+                writer, e.status, {"error": e.message}, headers=e.headers
+            )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self._stats["client_disconnects"] += 1
+        except Exception as e:
+            logger.error(f"处理请求失败: {e}")
+            try:
+                await self._send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Optional[HTTPRequest]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "请求头过大")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "无效的请求行")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "无效的Content-Length")
+        if length < 0:
+            raise HTTPError(400, "无效的Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, "请求体过大")
+        body = await reader.readexactly(length) if length else b""
+        return HTTPRequest(method.upper(), target, headers, body)
+
+    async def _route(self, request: HTTPRequest, writer: asyncio.StreamWriter):
+        routes = {
+            "/health": ("GET", self._health),
+            "/voices": ("GET", self._voices),
+            "/synthesize": ("POST", self._synthesize),
+        }
+        if request.path not in routes:
+            raise HTTPError(404, f"未知路径: {request.path}")
+        method, handler = routes[request.path]
+        if request.method != method:
+            raise HTTPError(405, f"{request.path} 只支持 {method}")
+        await handler(request, writer)
+
+    # ==================== 接口 ====================
+
+    async def _health(self, request: HTTPRequest, writer: asyncio.StreamWriter):
+        engines = {}
+        for name, engine in list(self._engines.items()):
+            info = {"class": engine.__class__.__name__}
+            if engine.circuit_breaker is not None:
+                info["circuit_breaker"] = engine.circuit_breaker.stats()
+            if engine.rate_limiter is not None:
+                info["rate_limit"] = engine.get_rate_limit_state()
+            if name in self._schedulers:
+                info["scheduler"] = self._schedulers[name].stats()
+            engines[name] = info
+        await self._send_json(
+            writer,
+            200,
+            {
+                "status": "ok",
+                "uptime": round(time.time() - self._started_at, 3),
+                "default_engine": self.default_engine,
+                "engines": engines,
+                "admission": self.admission.stats(),
+                "stats": dict(self._stats),
+            },
+        )
+
+    async def _voices(self, request: HTTPRequest, writer: asyncio.StreamWriter):
+        engine_name = request.query.get("engine") or self.default_engine
+        engine = await self._get_engine(engine_name)
+        loop = asyncio.get_running_loop()
+        voices = await loop.run_in_executor(
+            None, engine.list_voices, request.query.get("language")
+        )
+        await self._send_json(
+            writer,
+            200,
+            {"engine": engine_name, "voices": [voice.to_dict() for voice in voices]},
+        )
+
+    async def _synthesize(self, request: HTTPRequest, writer: asyncio.StreamWriter):
+        data = request.json()
+        schedule = {key: data.pop(key) for key in _SCHEDULE_FIELDS if key in data}
+        if "x-tenant" in request.headers:
+            schedule.setdefault("tenant", request.headers["x-tenant"])
+        tts_request, engine_name, stream = self.parse_synthesis(data)
+        engine = await self._get_engine(engine_name)
+        scheduler = self._schedulers.get((engine_name or self.default_engine).lower())
+        try:
+            if scheduler is None:
+                async with self.admission.slot():
+                    if stream and await self._send_stream(engine, tts_request, writer):
+                        self._stats["streamed"] += 1
+                        return
+                    await self._send_synthesized(engine, tts_request, writer)
+                return
+            # 流式合成直接占用准入名额；完整合成由调度器排队
+            if stream:
+                async with self.admission.slot():
+                    if await self._send_stream(engine, tts_request, writer):
+                        self._stats["streamed"] += 1
+                        return
+            await self._send_synthesized(
+                engine, tts_request, writer, scheduler, schedule
+            )
+        except Rejected as e:
+            raise HTTPError(
+                503, e.reason, headers={"Retry-After": str(int(e.retry_after))}
+            )
+
+    @staticmethod
+    def parse_synthesis(data: Dict[str, Any]) -> Tuple[TTSRequest, Optional[str], bool]:
+        """把JSON请求体转换为(TTS请求, 引擎名称, 是否流式)
+
+        Raises:
+            HTTPError: 参数无效
+        """
+        if not isinstance(data.get("text"), str) or not data["text"].strip():
+            raise HTTPError(400, "缺少text参数")
+        unknown = set(data) - _REQUEST_FIELDS - {"engine", "stream"}
+        if unknown:
+            raise HTTPError(400, f"未知参数: {', '.join(sorted(unknown))}")
+        try:
+            tts_request = TTSRequest(
+                **{key: value for key, value in data.items() if key in _REQUEST_FIELDS}
+            )
+            valid = tts_request.validate()
+        except TypeError as e:
+            raise HTTPError(400, f"请求参数类型错误: {e}")
+        if not valid:
+            raise HTTPError(400, "请求参数验证失败")
+        return tts_request, data.get("engine"), bool(data.get("stream", True))
+
+    async def _send_stream(
+        self, engine: BaseTTS, request: TTSRequest, writer: asyncio.StreamWriter
+    ) -> bool:
+        """流式合成并以分块传输编码发送音频
+
+        Returns:
+            bool: 引擎不支持流式合成时返回False，此时尚未发送任何数据
+        """
+        stream = ThreadedStream(
+            lambda: engine.synthesize_stream(request), self.stream_buffer
+        )
+        try:
+            # 取到第一个事件后再发送响应头，这样不支持流式或立即失败时还能返回完整响应
+            try:
+                first = await stream.__anext__()
+            except NotImplementedError:
+                return False
+            except StopAsyncIteration:
+                first = None
+            except Exception as e:
+                self._stats["failed"] += 1
+                raise HTTPError(500, f"合成失败: {e}")
+
+            await self._send_head(
+                writer,
+                200,
+                {
+                    "Content-Type": engine.stream_content_type(request),
+                    "Transfer-Encoding": "chunked",
+                },
+            )
+            if first is not None and first["type"] == "audio":
+                await self._send_chunk(writer, first["data"])
+            try:
+                async for event in stream:
+                    if event["type"] == "audio":
+                        await self._send_chunk(writer, event["data"])
+            except ConnectionError:
+                raise
+            except Exception as e:
+                # 响应头已发送，只能中断连接让客户端感知失败
+                self._stats["failed"] += 1
+                logger.error(f"流式合成中断: {e}")
+                return True
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            return True
+        finally:
+            await stream.aclose()
+
+    async def _send_synthesized(
+        self,
+        engine: BaseTTS,
+        request: TTSRequest,
+        writer: asyncio.StreamWriter,
+        scheduler: Optional[RequestScheduler] = None,
+        schedule: Optional[Dict[str, Any]] = None,
+    ):
+        """完整合成后发送音频文件"""
+        loop = asyncio.get_running_loop()
+        if scheduler is None:
+            response: TTSResponse = await loop.run_in_executor(
+                self._executor, engine.synthesize, request
+            )
+        else:
+            schedule = schedule or {}
+            timeout = schedule.get("timeout")
+            if timeout is not None and not isinstance(timeout, (int, float)):
+                raise HTTPError(400, "timeout必须是数字（秒）")
+            try:
+                future = scheduler.submit(request, **schedule)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            response = await asyncio.wrap_future(future)
+        if not response.success or not response.audio_file:
+            self._stats["failed"] += 1
+            status = _ERROR_STATUS.get(response.error_code, 500)
+            raise HTTPError(
+                status,
+                response.error_message or "合成失败",
+                headers={"X-Error-Code": response.error_code or ""},
+            )
+        self._stats["synthesized"] += 1
+
+        content_type = mimetypes.guess_type(response.audio_file)[0]
+        await self._send_head(
+            writer,
+            200,
+            {
+                "Content-Type": content_type or "application/octet-stream",
+                "Content-Length": str(os.path.getsize(response.audio_file)),
+                "X-Audio-Duration": f"{response.duration or 0:.3f}",
+                "X-Voice": response.voice_used or "",
+            },
+        )
+        with open(response.audio_file, "rb") as file:
+            while True:
+                data = await loop.run_in_executor(None, file.read, self.chunk_size)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+
+    async def _websocket(
+        self,
+        request: HTTPRequest,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ):
+        if request.method != "GET":
+            raise HTTPError(405, "/ws 只支持 GET")
+        try:
+            websocket = await WebSocket.accept(
+                reader, writer, request.headers, self.max_body
+            )
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        self._stats["ws_sessions"] += 1
+        await StreamingSession(self, websocket).run()
+
+    # ==================== 响应输出 ====================
+
+    @staticmethod
+    async def _send_head(
+        writer: asyncio.StreamWriter, status: int, headers: Dict[str, str]
+    ):
+        lines = [f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}"]
+        lines += [f"{key}: {value}" for key, value in headers.items()]
+        lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    @staticmethod
+    async def _send_chunk(writer: asyncio.StreamWriter, data: bytes):
+        if not data:
+            return
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        # 客户端接收慢时在这里等待，进而阻塞生产线程
+        await writer.drain()
+
+    async def _send_json(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        data: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        await self._send_head(
+            writer,
+            status,
+            {
+                "Content-Type": "application/json; charset=utf-8",
+                "Content-Length": str(len(body)),
+                **(headers or {}),
+            },
+        )
+        writer.write(body)
+        await writer.drain()
@@ -0,0 +1,339 @@
+"""
+WebSocket流式朗读会话
+客户端可以分多次发送文本，服务端按句切分后依次合成，
+合成过程中交替发送二进制音频帧和JSON词边界事件。
+
+客户端 → 服务端（文本消息，JSON）:
+- {"type": "config", "engine": ..., "voice_name": ..., ...}  设置后续合成参数，字段同TTSRequest
+- {"type": "text", "text": "...", "flush": false}  追加文本，完整的句子立即开始合成
+- {"type": "flush"}  不等句末标点，合成已缓存的全部文本
+- {"type": "end"}  合成剩余文本，全部发送后服务端发送done并关闭连接
+
+服务端 → 客户端:
+- {"type": "segment_start", "segment": i, "text": ..., "offset": 秒, "content_type": ...}
+- 二进制帧: 该片段的音频数据
+- {"type": "word", "segment": i, "start_time": 秒, "end_time": 秒, "text": ...}
+  时间相对于整个会话的音频起点
+- {"type": "segment_end", "segment": i, "duration": 秒}
+- {"type": "error", "segment": i, "code": ..., "message": ...}
+- {"type": "done", "segments": n, "duration": 秒}
+"""
+
+import asyncio
+import json
+import re
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from funutil import getLogger
+
+from ..base import BaseTTS
+from ..models import TTSRequest
+from ..utils.audio_utils import mp3_frame_index
+from ..utils.file_utils import is_temp_file
+from ..utils.text_utils import split_sentences
+from ..utils.workspace import get_workspace
+from .admission import Rejected
+from .streaming import ThreadedStream
+from .websocket import CLOSE_NORMAL, WebSocket, WebSocketClosed
+
+if TYPE_CHECKING:
+    from .server import TTSServer
+
+logger = getLogger("funtts")
+
+_END = object()
+
+
+def _stream_duration(content_type: str, size: int, mp3_data: bytearray) -> float:
+    """由音频数据推算时长，无法推算时返回0"""
+    if content_type.startswith("audio/L16"):
+        match = re.search(r"rate=(\d+)", content_type)
+        channels = re.search(r"channels=(\d+)", content_type)
+        rate = int(match.group(1)) if match else 16000
+        return size / (2 * rate * (int(channels.group(1)) if channels else 1))
+    if mp3_data:
+        try:
+            frames = mp3_frame_index(bytes(mp3_data))
+        except ValueError:
+            return 0.0
+        if len(frames) >= 2:
+            return frames[-1][1] + (frames[-1][1] - frames[-2][1])
+    return 0.0
+
+
+class StreamingSession:
+    """一个WebSocket连接上的流式朗读会话
+
+    - 接收协程把完整句子放入有界队列，队列满时不再读取客户端消息，
+      客户端发送过快时由TCP反压
+    - 合成协程按顺序合成各句，音频和词边界事件到达后立即发送，
+      WebSocket发送等待drain，客户端接收慢时引擎线程随之暂停
+    - 每句合成占用一个准入名额，会话空闲时不占用
+    """
+
+    def __init__(
+        self,
+        server: "TTSServer",
+        websocket: WebSocket,
+        max_pending: int = 8,
+        max_sentence_chars: int = 200,
+    ):
+        """
+        Args:
+            server: 所属服务，提供引擎缓存和准入控制
+            websocket: 已完成握手的连接
+            max_pending: 等待合成的最大句子数
+            max_sentence_chars: 无标点文本的最大切分长度
+        """
+        self.server = server
+        self.websocket = websocket
+        self.max_sentence_chars = max_sentence_chars
+        self.options: Dict[str, Any] = {}
+        self.engine_name: Optional[str] = None
+        self._buffer = ""
+        self._pending: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_pending))
+        self._ended = False
+        self._segments = 0
+        self._offset = 0.0
+
+    async def run(self):
+        """运行会话直到客户端结束或断开"""
+        reader = asyncio.ensure_future(self._read_loop())
+        synthesizer = asyncio.ensure_future(self._synthesize_loop())
+        try:
+            await asyncio.wait(
+                {reader, synthesizer}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if synthesizer.done():
+                reader.cancel()
+            elif self._ended and not reader.exception():
+                # 客户端发送了end：等待剩余句子合成完成
+                await synthesizer
+            else:
+                synthesizer.cancel()
+        finally:
+            for task in (reader, synthesizer):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(reader, synthesizer, return_exceptions=True)
+            await self.websocket.close(CLOSE_NORMAL)
+
+    # ==================== 接收 ====================
+
+    async def _read_loop(self):
+        while not self._ended:
+            try:
+                message = await self.websocket.receive()
+            except WebSocketClosed:
+                return
+            if isinstance(message, bytes):
+                await self._error("INVALID_MESSAGE", "只接受JSON文本消息")
+                continue
+            try:
+                data = json.loads(message)
+                if not isinstance(data, dict):
+                    raise ValueError("消息必须是JSON对象")
+            except ValueError as e:
+                await self._error("INVALID_MESSAGE", f"无效的消息: {e}")
+                continue
+            await self._on_message(data)
+
+    async def _on_message(self, data: Dict[str, Any]):
+        kind = data.get("type")
+        if kind == "config":
+            options = {key: value for key, value in data.items() if key != "type"}
+            # 用一段占位文本校验参数，和HTTP接口使用同一套规则
+            try:
+                _, engine_name, _ = self.server.parse_synthesis(
+                    {**options, "text": "-", "stream": True}
+                )
+            except Exception as e:
+                await self._error("INVALID_CONFIG", getattr(e, "message", str(e)))
+                return
+            self.engine_name = engine_name
+            self.options = {
+                key: value
+                for key, value in options.items()
+                if key not in ("engine", "stream", "text")
+            }
+        elif kind == "text":
+            text = data.get("text")
+            if not isinstance(text, str):
+                await self._error("INVALID_MESSAGE", "text必须是字符串")
+                return
+            self._buffer += text
+            sentences, self._buffer = split_sentences(
+                self._buffer, self.max_sentence_chars
+            )
+            for sentence in sentences:
+                await self._pending.put(sentence)
+            if data.get("flush"):
+                await self._flush()
+        elif kind == "flush":
+            await self._flush()
+        elif kind == "end":
+            await self._flush()
+            self._ended = True
+            await self._pending.put(_END)
+        else:
+            await self._error("INVALID_MESSAGE", f"未知的消息类型: {kind}")
+
+    async def _flush(self):
+        text, self._buffer = self._buffer.strip(), ""
+        if text:
+            await self._pending.put(text)
+
+    # ==================== 合成 ====================
+
+    async def _synthesize_loop(self):
+        while True:
+            sentence = await self._pending.get()
+            if sentence is _END:
+                await self.websocket.send_json(
+                    {
+                        "type": "done",
+                        "segments": self._segments,
+                        "duration": round(self._offset, 3),
+                    }
+                )
+                return
+            index = self._segments
+            self._segments += 1
+            try:
+                engine = await self.server._get_engine(self.engine_name)
+                request = TTSRequest(text=sentence, **self.options)
+                async with self.server.admission.slot():
+                    await self._synthesize_segment(index, engine, request)
+                self.server._stats["ws_segments"] += 1
+            except Rejected as e:
+                await self._error(
+                    "BUSY", e.reason, segment=index, retry_after=e.retry_after
+                )
+            except (WebSocketClosed, ConnectionError):
+                return
+            except Exception as e:
+                self.server._stats["failed"] += 1
+                logger.error(f"流式朗读片段合成失败: {e}")
+                await self._error("SYNTHESIS_ERROR", str(e), segment=index)
+
+    async def _synthesize_segment(
+        self, index: int, engine: BaseTTS, request: TTSRequest
+    ):
+        stream = ThreadedStream(
+            lambda: engine.synthesize_stream(request), self.server.stream_buffer
+        )
+        try:
+            try:
+                first = await stream.__anext__()
+            except NotImplementedError:
+                await self._send_synthesized(index, engine, request)
+                return
+            except StopAsyncIteration:
+                first = None
+
+            content_type = engine.stream_content_type(request)
+            await self._segment_start(index, request.text, content_type)
+            size = 0
+            last_word_end = 0.0
+            # 压缩格式需要完整数据才能推算时长
+            mp3_data = bytearray()
+            events = [first] if first is not None else []
+
+            async def generate():
+                for event in events:
+                    yield event
+                async for event in stream:
+                    yield event
+
+            async for event in generate():
+                if event["type"] == "audio":
+                    size += len(event["data"])
+                    if content_type == "audio/mpeg":
+                        mp3_data += event["data"]
+                    await self.websocket.send_bytes(event["data"])
+                elif event["type"] == "WordBoundary":
+                    last_word_end = max(last_word_end, event["end_time"])
+                    await self._send_word(
+                        index, event["start_time"], event["end_time"], event["text"]
+                    )
+
+            duration = _stream_duration(content_type, size, mp3_data)
+            await self._segment_end(index, duration or last_word_end)
+        finally:
+            await stream.aclose()
+
+    async def _send_synthesized(
+        self, index: int, engine: BaseTTS, request: TTSRequest
+    ):
+        """引擎不支持流式合成：完整合成后发送音频，词边界取自字幕"""
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self.server._executor,
+            engine.synthesize,
+            replace(request, generate_subtitles=True),
+        )
+        try:
+            if not response.success or not response.audio_file:
+                await self._error(
+                    response.error_code or "SYNTHESIS_ERROR",
+                    response.error_message or "合成失败",
+                    segment=index,
+                )
+                return
+            content_type = engine.stream_content_type(request)
+            await self._segment_start(index, request.text, content_type)
+            with open(response.audio_file, "rb") as file:
+                while True:
+                    data = await loop.run_in_executor(
+                        None, file.read, self.server.chunk_size
+                    )
+                    if not data:
+                        break
+                    await self.websocket.send_bytes(data)
+            if response.subtitle_maker:
+                for segment in response.subtitle_maker.get_segments():
+                    await self._send_word(
+                        index, segment.start_time, segment.end_time, segment.text
+                    )
+            await self._segment_end(index, response.duration or 0.0)
+        finally:
+            # 为取得词边界生成的字幕文件只在临时工作区中，用完即删
+            for path in (response.subtitle_file, response.frt_subtitle_file):
+                if path and is_temp_file(path):
+                    get_workspace().discard(path)
+
+    # ==================== 事件 ====================
+
+    async def _segment_start(self, index: int, text: str, content_type: str):
+        await self.websocket.send_json(
+            {
+                "type": "segment_start",
+                "segment": index,
+                "text": text,
+                "offset": round(self._offset, 3),
+                "content_type": content_type,
+            }
+        )
+
+    async def _send_word(self, index: int, start: float, end: float, text: str):
+        await self.websocket.send_json(
+            {
+                "type": "word",
+                "segment": index,
+                "start_time": round(self._offset + start, 3),
+                "end_time": round(self._offset + end, 3),
+                "text": text,
+            }
+        )
+
+    async def _segment_end(self, index: int, duration: float):
+        self._offset += duration
+        await self.websocket.send_json(
+            {"type": "segment_end", "segment": index, "duration": round(duration, 3)}
+        )
+
+    async def _error(self, code: str, message: str, **extra):
+        await self.websocket.send_json(
+            {"type": "error", "code": code, "message": message, **extra}
+        )
@@ -0,0 +1,124 @@
+"""
+同步流到异步迭代的桥接
+引擎的synthesize_stream是阻塞的同步生成器，这里在独立线程中驱动它，
+通过有界队列把事件交给事件循环；消费方跟不上时生产线程阻塞，形成背压。
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Iterator, Optional
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+_END = object()
+
+
+class _Failure:
+    """生产线程中抛出的异常，交给消费方重新抛出"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ThreadedStream:
+    """在独立线程中运行同步生成器，异步地逐个取出事件
+
+    - 队列最多缓存max_buffer个事件，满了之后生产线程阻塞，
+      引擎的生成速度因此受消费方（网络发送）约束
+    - 生成器抛出的异常在消费方的__anext__中重新抛出
+    - aclose()后生产线程在下一个事件处停止，并在线程内关闭生成器，
+      使引擎可以在finally中中止合成、归还连接
+
+    用法::
+
+        stream = ThreadedStream(lambda: engine.synthesize_stream(request))
+        try:
+            async for event in stream:
+                ...
+        finally:
+            await stream.aclose()
+    """
+
+    def __init__(self, factory: Callable[[], Iterator[Any]], max_buffer: int = 16):
+        """
+        Args:
+            factory: 返回同步迭代器的函数，在生产线程中调用
+            max_buffer: 队列容量（事件数）
+        """
+        self.factory = factory
+        self.max_buffer = max(1, max_buffer)
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._done = False
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._thread = threading.Thread(
+            target=self._produce, name="funtts-stream", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item: Any) -> bool:
+        """从生产线程放入一个事件，队列满时阻塞；消费方已关闭时返回False"""
+        if self._closed.is_set():
+            return False
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._queue.put(item), self._loop
+            )
+            future.result()
+        except Exception:
+            # 事件循环已关闭
+            self._closed.set()
+            return False
+        return not self._closed.is_set()
+
+    def _produce(self):
+        iterator = None
+        try:
+            iterator = self.factory()
+            for item in iterator:
+                if not self._put(item):
+                    break
+            else:
+                self._put(_END)
+        except BaseException as e:
+            self._put(_Failure(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    logger.debug(f"关闭流式生成器失败: {e}")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._done:
+            raise StopAsyncIteration
+        if self._thread is None:
+            self._start()
+        item = await self._queue.get()
+        if item is _END:
+            self._done = True
+            raise StopAsyncIteration
+        if isinstance(item, _Failure):
+            self._done = True
+            raise item.error
+        return item
+
+    async def aclose(self):
+        """停止消费，通知生产线程结束"""
+        self._done = True
+        self._closed.set()
+        if self._queue is not None:
+            # 清空队列，唤醒阻塞在put上的生产线程
+            while not self._queue.empty():
+                self._queue.get_nowait()
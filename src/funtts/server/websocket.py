@@ -0,0 +1,224 @@
+"""
+WebSocket协议（RFC 6455）服务端实现
+只包含TTS服务需要的部分：握手、帧收发、分片重组、ping/pong和关闭握手，不支持扩展。
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from typing import Any, Dict, Union
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# 关闭状态码
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_UNSUPPORTED = 1003
+CLOSE_TOO_BIG = 1009
+CLOSE_INTERNAL_ERROR = 1011
+
+
+class WebSocketClosed(Exception):
+    """连接已关闭"""
+
+    def __init__(self, code: int = CLOSE_NORMAL, reason: str = ""):
+        super().__init__(f"WebSocket已关闭: {code} {reason}".strip())
+        self.code = code
+        self.reason = reason
+
+
+def accept_key(key: str) -> str:
+    """根据客户端的Sec-WebSocket-Key计算Sec-WebSocket-Accept"""
+    digest = hashlib.sha1((key + _GUID).encode("latin-1")).digest()
+    return base64.b64encode(digest).decode("latin-1")
+
+
+def _unmask(data: bytes, mask: bytes) -> bytes:
+    if not data:
+        return data
+    # 按整数整体异或，比逐字节循环快得多
+    repeated = (mask * (len(data) // 4 + 1))[: len(data)]
+    value = int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")
+    return value.to_bytes(len(data), "big")
+
+
+class WebSocket:
+    """服务端WebSocket连接
+
+    发送方法在写入后等待writer.drain()，客户端接收慢时发送方随之等待；
+    多个协程可以同时发送，帧不会交错。
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        max_message: int = 1024 * 1024,
+    ):
+        """
+        Args:
+            reader: 连接的读取流
+            writer: 连接的写入流
+            max_message: 单条消息大小上限（字节）
+        """
+        self.reader = reader
+        self.writer = writer
+        self.max_message = max_message
+        self.closed = False
+        self._send_lock = asyncio.Lock()
+
+    @staticmethod
+    async def accept(
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        headers: Dict[str, str],
+        max_message: int = 1024 * 1024,
+    ) -> "WebSocket":
+        """完成握手并返回连接
+
+        Args:
+            headers: 升级请求的头部（键为小写）
+
+        Raises:
+            ValueError: 不是有效的WebSocket升级请求
+        """
+        key = headers.get("sec-websocket-key")
+        if (
+            headers.get("upgrade", "").lower() != "websocket"
+            or "upgrade" not in headers.get("connection", "").lower()
+            or not key
+        ):
+            raise ValueError("不是有效的WebSocket升级请求")
+        if headers.get("sec-websocket-version", "13") != "13":
+            raise ValueError("只支持WebSocket协议版本13")
+        writer.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+            ).encode("latin-1")
+        )
+        await writer.drain()
+        return WebSocket(reader, writer, max_message)
+
+    # ==================== 接收 ====================
+
+    async def _read_frame(self):
+        head = await self.reader.readexactly(2)
+        fin = bool(head[0] & 0x80)
+        opcode = head[0] & 0x0F
+        masked = bool(head[1] & 0x80)
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+        if not masked:
+            await self.close(CLOSE_PROTOCOL_ERROR, "客户端帧必须掩码")
+            raise WebSocketClosed(CLOSE_PROTOCOL_ERROR, "客户端帧必须掩码")
+        if length > self.max_message:
+            await self.close(CLOSE_TOO_BIG, "消息过大")
+            raise WebSocketClosed(CLOSE_TOO_BIG, "消息过大")
+        mask = await self.reader.readexactly(4)
+        payload = _unmask(await self.reader.readexactly(length), mask)
+        return fin, opcode, payload
+
+    async def receive(self) -> Union[str, bytes]:
+        """接收一条完整消息，文本消息返回str，二进制消息返回bytes
+
+        Raises:
+            WebSocketClosed: 对方关闭连接或连接断开
+        """
+        opcode = None
+        parts = []
+        size = 0
+        while True:
+            try:
+                fin, frame_opcode, payload = await self._read_frame()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                raise WebSocketClosed(1006, "连接断开")
+
+            if frame_opcode == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if frame_opcode == OP_PONG:
+                continue
+            if frame_opcode == OP_CLOSE:
+                code = (
+                    struct.unpack("!H", payload[:2])[0]
+                    if len(payload) >= 2
+                    else CLOSE_NORMAL
+                )
+                reason = payload[2:].decode("utf-8", "replace")
+                await self.close(code)
+                raise WebSocketClosed(code, reason)
+
+            if frame_opcode != OP_CONTINUATION:
+                opcode = frame_opcode
+            elif opcode is None:
+                await self.close(CLOSE_PROTOCOL_ERROR, "无效的分片")
+                raise WebSocketClosed(CLOSE_PROTOCOL_ERROR, "无效的分片")
+            size += len(payload)
+            if size > self.max_message:
+                await self.close(CLOSE_TOO_BIG, "消息过大")
+                raise WebSocketClosed(CLOSE_TOO_BIG, "消息过大")
+            parts.append(payload)
+            if fin:
+                break
+
+        data = b"".join(parts)
+        if opcode == OP_TEXT:
+            try:
+                return data.decode("utf-8")
+            except UnicodeDecodeError:
+                await self.close(CLOSE_PROTOCOL_ERROR, "文本消息不是有效的UTF-8")
+                raise WebSocketClosed(CLOSE_PROTOCOL_ERROR, "文本消息不是有效的UTF-8")
+        return data
+
+    # ==================== 发送 ====================
+
+    async def _send_frame(self, opcode: int, payload: bytes):
+        length = len(payload)
+        if length < 126:
+            head = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            head = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        async with self._send_lock:
+            if self.closed and opcode != OP_CLOSE:
+                raise WebSocketClosed(1006, "连接已关闭")
+            self.writer.write(head + payload)
+            await self.writer.drain()
+
+    async def send_bytes(self, data: bytes):
+        await self._send_frame(OP_BINARY, data)
+
+    async def send_text(self, text: str):
+        await self._send_frame(OP_TEXT, text.encode("utf-8"))
+
+    async def send_json(self, data: Dict[str, Any]):
+        await self.send_text(json.dumps(data, ensure_ascii=False))
+
+    async def close(self, code: int = CLOSE_NORMAL, reason: str = ""):
+        """发送关闭帧（只发送一次）"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self._send_frame(
+                OP_CLOSE, struct.pack("!H", code) + reason.encode("utf-8")[:120]
+            )
+        except ConnectionError:
+            pass
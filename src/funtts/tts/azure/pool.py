@@ -0,0 +1,243 @@
+"""
+Azure SpeechSynthesizer连接池
+按（语音, 输出格式）复用合成器，预先建立到服务端的连接，
+避免每个请求都重新进行TLS/websocket握手。
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+from funutil import getLogger
+
+logger = getLogger("funtts.tts.azure")
+
+# 请求输出格式到Azure SDK输出格式的映射
+OUTPUT_FORMATS = {
+    "wav": "Riff24Khz16BitMonoPcm",
+    "mp3": "Audio24Khz48KBitRateMonoMp3",
+    "ogg": "Ogg24Khz16BitMonoOpus",
+    # 流式输出使用的原始PCM（24kHz 16位单声道，无文件头）
+    "pcm": "Raw24Khz16BitMonoPcm",
+}
+
+
+class PooledSynthesizer:
+    """连接池中的一个合成器及其连接"""
+
+    def __init__(self, synthesizer: Any, connection: Any, key: Tuple[str, str]):
+        self.synthesizer = synthesizer
+        self.connection = connection
+        self.key = key
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.connected = True
+        self.broken = False
+        # 当前使用者的事件回调，合成器复用时事件只需连接一次
+        self._handlers: Dict[str, Any] = {}
+
+    def dispatch(self, event_name: str, evt: Any):
+        """将SDK事件转发给当前使用者"""
+        handler = self._handlers.get(event_name)
+        if handler is not None:
+            handler(evt)
+
+    @contextmanager
+    def listen(self, **handlers: Any):
+        """在本次使用期间接收SDK事件
+
+        Args:
+            **handlers: 事件名到回调的映射：word_boundary、synthesizing、bookmark
+        """
+        self._handlers = {k: v for k, v in handlers.items() if v is not None}
+        try:
+            yield self
+        finally:
+            self._handlers = {}
+
+    def invalidate(self):
+        """标记为不可复用（如合成被取消、连接出错），归还时会被关闭"""
+        self.broken = True
+
+    def is_healthy(self, max_age: float, max_idle: float) -> bool:
+        """检查连接是否可以继续使用"""
+        now = time.time()
+        return (
+            self.connected
+            and not self.broken
+            and now - self.created_at < max_age
+            and now - self.last_used < max_idle
+        )
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception as e:
+            logger.debug(f"关闭Azure连接失败: {e}")
+
+
+class SynthesizerPool:
+    """Azure SpeechSynthesizer连接池
+
+    - 合成器不绑定音频输出（audio_config=None），音频保存在result.audio_data中
+    - 新建合成器时通过Connection.open(True)预先建立连接
+    - 借出时检查连接状态、存活时间和空闲时间，不健康的合成器被关闭并重建
+    """
+
+    def __init__(
+        self,
+        speech_key: str,
+        service_region: str,
+        max_size: int = 4,
+        max_age: float = 600.0,
+        max_idle: float = 300.0,
+        preconnect: bool = True,
+    ):
+        """初始化连接池
+
+        Args:
+            speech_key: Azure语音服务密钥
+            service_region: Azure服务区域
+            max_size: 每个（语音, 输出格式）保留的空闲合成器数量上限
+            max_age: 合成器最长使用时间（秒），超过后回收
+            max_idle: 最长空闲时间（秒），超过后回收
+            preconnect: 是否预先建立连接
+        """
+        self.speech_key = speech_key
+        self.service_region = service_region
+        self.max_size = max_size
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self.preconnect = preconnect
+
+        self._idle: Dict[Tuple[str, str], List[PooledSynthesizer]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._recycled = 0
+
+    def _create(self, voice_name: str, output_format: str) -> PooledSynthesizer:
+        import azure.cognitiveservices.speech as speechsdk
+
+        speech_config = speechsdk.SpeechConfig(
+            subscription=self.speech_key, region=self.service_region
+        )
+        speech_config.speech_synthesis_voice_name = voice_name
+        sdk_format = OUTPUT_FORMATS.get(output_format.lower())
+        if sdk_format:
+            speech_config.set_speech_synthesis_output_format(
+                getattr(speechsdk.SpeechSynthesisOutputFormat, sdk_format)
+            )
+
+        # audio_config=None: 音频只保存在内存结果中，不写文件也不播放
+        synthesizer = speechsdk.SpeechSynthesizer(
+            speech_config=speech_config, audio_config=None
+        )
+        connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+        item = PooledSynthesizer(synthesizer, connection, (voice_name, output_format))
+
+        def on_connected(evt):
+            item.connected = True
+
+        def on_disconnected(evt):
+            item.connected = False
+
+        connection.connected.connect(on_connected)
+        connection.disconnected.connect(on_disconnected)
+        synthesizer.synthesis_word_boundary.connect(
+            lambda evt: item.dispatch("word_boundary", evt)
+        )
+        synthesizer.synthesizing.connect(
+            lambda evt: item.dispatch("synthesizing", evt)
+        )
+        synthesizer.bookmark_reached.connect(
+            lambda evt: item.dispatch("bookmark", evt)
+        )
+        if self.preconnect:
+            # True表示同时为合成建立连接
+            connection.open(True)
+
+        with self._lock:
+            self._created += 1
+        logger.debug(f"创建Azure合成器: voice={voice_name}, format={output_format}")
+        return item
+
+    def acquire(self, voice_name: str, output_format: str) -> PooledSynthesizer:
+        """借出一个合成器，没有可用的空闲合成器时新建"""
+        key = (voice_name, output_format)
+        stale = []
+        item = None
+        with self._lock:
+            idle = self._idle[key]
+            while idle:
+                candidate = idle.pop()
+                if candidate.is_healthy(self.max_age, self.max_idle):
+                    item = candidate
+                    self._reused += 1
+                    break
+                stale.append(candidate)
+                self._recycled += 1
+
+        for candidate in stale:
+            candidate.close()
+        if item is None:
+            item = self._create(voice_name, output_format)
+        item.uses += 1
+        return item
+
+    def release(self, item: PooledSynthesizer):
+        """归还合成器，不健康或超出容量的合成器直接关闭"""
+        item.last_used = time.time()
+        if item.is_healthy(self.max_age, self.max_idle):
+            with self._lock:
+                idle = self._idle[item.key]
+                if len(idle) < self.max_size:
+                    idle.append(item)
+                    return
+        else:
+            with self._lock:
+                self._recycled += 1
+        item.close()
+
+    @contextmanager
+    def synthesizer(self, voice_name: str, output_format: str):
+        """借出合成器的上下文管理器，出现异常时合成器不再复用"""
+        item = self.acquire(voice_name, output_format)
+        try:
+            yield item
+        except BaseException:
+            item.invalidate()
+            raise
+        finally:
+            self.release(item)
+
+    def warmup(self, voice_name: str, output_format: str = "wav", count: int = 1):
+        """预先创建并连接若干合成器"""
+        items = [self._create(voice_name, output_format) for _ in range(count)]
+        for item in items:
+            self.release(item)
+
+    def close(self):
+        """关闭所有空闲合成器"""
+        with self._lock:
+            items = [item for idle in self._idle.values() for item in idle]
+            self._idle.clear()
+        for item in items:
+            item.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取连接池状态"""
+        with self._lock:
+            return {
+                "idle": {
+                    f"{voice}/{fmt}": len(items)
+                    for (voice, fmt), items in self._idle.items()
+                    if items
+                },
+                "created": self._created,
+                "reused": self._reused,
+                "recycled": self._recycled,
+            }
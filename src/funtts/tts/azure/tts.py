@@ -4,16 +4,26 @@ Azure TTS引擎实现
 """
 
 import os
+import queue
+import threading
 import time
-from typing import List, Optional
+import wave
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape as xml_escape
 
 from funutil import getLogger
 
 from ...base import BaseTTS
 from ...models import TTSRequest, TTSResponse, VoiceInfo, SubtitleMaker
+from ...utils.file_utils import create_temp_file
+from .pool import SynthesizerPool
 
 logger = getLogger("funtts.tts.azure")
 
+# 打包合成使用的原始PCM参数（与连接池的"pcm"输出格式一致）
+PCM_SAMPLE_RATE = 24000
+PCM_SAMPLE_WIDTH = 2
+
 
 class AzureTTS(BaseTTS):
     """
@@ -40,13 +50,34 @@ class AzureTTS(BaseTTS):
             **kwargs: 其他配置参数，包括:
                 - speech_key: Azure语音服务密钥
                 - service_region: Azure服务区域
+                - pool_size: 每个（语音, 输出格式）保留的空闲合成器数量，默认4
+                - pool_max_age: 合成器最长使用时间（秒），默认600
+                - pool_max_idle: 合成器最长空闲时间（秒），默认300
+                - preconnect: 是否预先建立连接，默认True
+                - batch_size: 批量合成时每包最多的请求数，默认32
+                - batch_max_chars: 批量合成时每包最多的字符数，默认4000
         """
         super().__init__(voice_name, **kwargs)
+        self.voice_name = voice_name
         self.speech_key = kwargs.get("speech_key") or os.getenv("AZURE_SPEECH_KEY", "")
         self.service_region = kwargs.get("service_region") or os.getenv(
             "AZURE_SPEECH_REGION", ""
         )
 
+        # 合成器连接池，按（语音, 输出格式）复用预先建立的连接
+        self.pool = SynthesizerPool(
+            self.speech_key,
+            self.service_region,
+            max_size=kwargs.get("pool_size", 4),
+            max_age=kwargs.get("pool_max_age", 600.0),
+            max_idle=kwargs.get("pool_max_idle", 300.0),
+            preconnect=kwargs.get("preconnect", True),
+        )
+
+        # SSML打包合成参数
+        self.batch_size = kwargs.get("batch_size", 32)
+        self.batch_max_chars = kwargs.get("batch_max_chars", 4000)
+
         if not self.speech_key or not self.service_region:
             logger.warning(
                 "Azure语音服务密钥或区域未配置，请设置AZURE_SPEECH_KEY和AZURE_SPEECH_REGION环境变量"
@@ -83,7 +114,8 @@ class AzureTTS(BaseTTS):
                     error_code="MISSING_CREDENTIALS",
                 )
 
-            return self._synthesize(request)
+            # 由基类完成合成及输出文件、字幕文件处理
+            return super().synthesize(request)
 
         except ImportError as e:
             logger.error(f"Azure SDK未安装: {e}")
@@ -110,78 +142,65 @@ class AzureTTS(BaseTTS):
         try:
             import azure.cognitiveservices.speech as speechsdk
 
-            # 配置语音服务
-            speech_config = speechsdk.SpeechConfig(
-                subscription=self.speech_key, region=self.service_region
-            )
-
             voice_name = request.voice_name or self.get_default_voice()
-            speech_config.speech_synthesis_voice_name = voice_name
-
-            # 设置输出格式
-            if request.output_format.lower() == "wav":
-                speech_config.set_speech_synthesis_output_format(
-                    speechsdk.SpeechSynthesisOutputFormat.Riff24Khz16BitMonoPcm
-                )
+            text_to_speak, is_ssml = self._build_input(request, voice_name)
 
-            # 配置音频输出
-            audio_config = speechsdk.audio.AudioOutputConfig(
-                filename=request.output_file
+            logger.info(
+                f"开始Azure TTS合成: voice={voice_name}, rate={request.voice_rate}"
             )
 
-            # 创建合成器
-            synthesizer = speechsdk.SpeechSynthesizer(
-                speech_config=speech_config, audio_config=audio_config
-            )
+            # 合成过程中直接收集词边界作为字幕时间戳
+            subtitle_maker = SubtitleMaker() if request.generate_subtitles else None
 
-            # 构建SSML（如果需要调整语音速率）
-            if request.voice_rate != 1.0:
-                rate_percent = f"{int((request.voice_rate - 1.0) * 100):+d}%"
-                ssml = f"""
-                <speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="zh-CN">
-                    <voice name="{voice_name}">
-                        <prosody rate="{rate_percent}">
-                            {request.text}
-                        </prosody>
-                    </voice>
-                </speak>
-                """
-                text_to_speak = ssml
-                is_ssml = True
-            else:
-                text_to_speak = request.text
-                is_ssml = False
+            def on_word_boundary(evt):
+                offset = self._boundary_offset(evt)
+                if offset is not None:
+                    subtitle_maker.add_segment_from_offset(offset, evt.text)
 
-            logger.info(
-                f"开始Azure TTS合成: voice={voice_name}, rate={request.voice_rate}"
-            )
+            # SDK在自己的线程中回调，先取得首个音频块的通知函数
+            first_audio = self._first_audio_callback()
 
-            # 执行合成
-            if is_ssml:
-                result = synthesizer.speak_ssml_async(text_to_speak).get()
-            else:
-                result = synthesizer.speak_text_async(text_to_speak).get()
+            def on_synthesizing(evt):
+                if evt.result.audio_data:
+                    first_audio()
+
+            # 从连接池借出合成器执行合成，音频保存在内存中
+            with self.pool.synthesizer(voice_name, request.output_format) as item:
+                with item.listen(
+                    # 只有对冲请求需要首个音频块的通知，避免逐块复制音频数据
+                    synthesizing=on_synthesizing if self.hedge_policy else None,
+                    word_boundary=on_word_boundary if subtitle_maker else None,
+                ):
+                    result = self._speak_async(item, text_to_speak, is_ssml).get()
+                if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+                    item.invalidate()
 
             # 检查结果
             if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+                # 已知最终路径时直接写入，否则写入临时文件
+                audio_file = request.output_file or create_temp_file(
+                    suffix=f".{request.output_format}"
+                )
+                with open(audio_file, "wb") as f:
+                    f.write(result.audio_data)
+
                 # 获取音频时长
-                duration = self._get_audio_duration(request.output_file)
+                duration = self._get_result_duration(result, audio_file)
 
-                # 创建字幕（Azure TTS不直接提供时间戳，需要估算）
-                subtitle_maker = None
-                if request.generate_subtitles:
+                # 没有收到词边界事件时退回到按文本估算
+                if subtitle_maker is not None and not subtitle_maker:
                     subtitle_maker = self._create_subtitle_from_text(
                         request.text, duration
                     )
 
                 logger.success(
-                    f"Azure TTS合成完成: {request.output_file}, 时长: {duration:.2f}s"
+                    f"Azure TTS合成完成: {audio_file}, 时长: {duration:.2f}s"
                 )
 
                 return TTSResponse(
                     success=True,
                     request=request,
-                    audio_file=request.output_file,
+                    audio_file=audio_file,
                     subtitle_maker=subtitle_maker,
                     duration=duration,
                     voice_used=voice_name,
@@ -224,6 +243,291 @@ class AzureTTS(BaseTTS):
                 processing_time=time.time() - start_time,
             )
 
+    def synthesize_stream(self, request: TTSRequest) -> Iterator[Dict[str, Any]]:
+        """流式语音合成
+
+        合成过程中逐块产出事件：
+        - {"type": "audio", "data": bytes}：音频数据块。wav请求输出
+          24kHz 16位单声道原始PCM（无文件头），其他格式为对应编码的数据流
+        - {"type": "WordBoundary", "start_time", "end_time", "text"}：
+          词边界，时间单位为秒
+
+        Args:
+            request: TTS请求对象
+
+        Yields:
+            Dict[str, Any]: 音频或词边界事件
+        """
+        import azure.cognitiveservices.speech as speechsdk
+
+        if not self.speech_key or not self.service_region:
+            raise RuntimeError("Azure语音服务未配置，请设置speech_key和service_region")
+
+        voice_name = request.voice_name or self.get_default_voice()
+        text_to_speak, is_ssml = self._build_input(request, voice_name)
+        # wav的RIFF文件头依赖总长度，流式输出改用原始PCM
+        stream_format = request.output_format
+        if stream_format.lower() == "wav":
+            stream_format = "pcm"
+        events: "queue.Queue" = queue.Queue()
+
+        def on_synthesizing(evt):
+            if evt.result.audio_data:
+                events.put({"type": "audio", "data": evt.result.audio_data})
+
+        def on_word_boundary(evt):
+            offset = self._boundary_offset(evt)
+            if offset is not None:
+                start_time = offset[0] / 10000000
+                events.put(
+                    {
+                        "type": "WordBoundary",
+                        "start_time": start_time,
+                        "end_time": start_time + offset[1] / 10000000,
+                        "text": evt.text,
+                    }
+                )
+
+        # 流式合成在整个输出期间占用一个并发名额
+        with self._limited(len(request.text)):
+            with self.pool.synthesizer(voice_name, stream_format) as item:
+                with item.listen(
+                    synthesizing=on_synthesizing, word_boundary=on_word_boundary
+                ):
+                    future = self._speak_async(item, text_to_speak, is_ssml)
+                    # 在后台等待合成结束，结束标记排在所有事件之后
+                    waiter = threading.Thread(
+                        target=lambda: events.put(future.get()), daemon=True
+                    )
+                    waiter.start()
+                    completed = False
+                    try:
+                        while True:
+                            event = events.get()
+                            if isinstance(event, dict):
+                                yield event
+                                continue
+                            completed = True
+                            if (
+                                event.reason
+                                != speechsdk.ResultReason.SynthesizingAudioCompleted
+                            ):
+                                item.invalidate()
+                                details = speechsdk.CancellationDetails(event)
+                                raise RuntimeError(
+                                    f"Azure TTS流式合成失败: {details.reason}, "
+                                    f"{details.error_details}"
+                                )
+                            break
+                    finally:
+                        if not completed:
+                            # 调用方提前结束：停止合成，该合成器不再复用
+                            item.invalidate()
+                            try:
+                                item.synthesizer.stop_speaking_async().get()
+                            except Exception as e:
+                                logger.debug(f"停止Azure合成失败: {e}")
+
+    def stream_content_type(self, request: TTSRequest) -> str:
+        if request.output_format.lower() == "wav":
+            return f"audio/L16; rate={PCM_SAMPLE_RATE}; channels=1"
+        return super().stream_content_type(request)
+
+    def synthesize_batch(self, requests: List[TTSRequest]) -> List[TTSResponse]:
+        """批量语音合成
+
+        使用相同语音的wav请求被打包进一个SSML文档，各段之间插入<bookmark>，
+        一次合成后按书签偏移把PCM切分回各个请求，词边界同样按段切分。
+        每包最多batch_size个请求、batch_max_chars个字符；
+        其他请求或打包合成失败时逐个调用synthesize。
+
+        Args:
+            requests: TTS请求列表
+
+        Returns:
+            与请求一一对应的响应列表
+        """
+        responses: List[Optional[TTSResponse]] = [None] * len(requests)
+        groups: Dict[str, List[int]] = {}
+
+        for index, request in enumerate(requests):
+            if (
+                self.speech_key
+                and self.service_region
+                and request.output_format.lower() == "wav"
+                and request.validate()
+                and self._validate_request(request)
+            ):
+                voice_name = request.voice_name or self.get_default_voice()
+                groups.setdefault(voice_name, []).append(index)
+            else:
+                responses[index] = self.synthesize(request)
+
+        for voice_name, indexes in groups.items():
+            for packed in self._pack_requests(
+                requests, indexes, self.batch_size, self.batch_max_chars
+            ):
+                if len(packed) == 1:
+                    responses[packed[0]] = self.synthesize(requests[packed[0]])
+                    continue
+                results = self._synthesize_packed(
+                    voice_name, [requests[i] for i in packed]
+                )
+                for index, response in zip(packed, results):
+                    responses[index] = response
+
+        return responses
+
+    def _synthesize_packed(
+        self, voice_name: str, requests: List[TTSRequest]
+    ) -> List[TTSResponse]:
+        """一次合成多个请求并切分结果，失败时逐个合成"""
+        import azure.cognitiveservices.speech as speechsdk
+
+        start_time = time.time()
+        ssml = self._build_batch_ssml(voice_name, requests)
+        bookmarks: Dict[str, int] = {}
+        boundaries: List[Tuple[int, int, str]] = []
+
+        def on_bookmark(evt):
+            bookmarks[evt.text] = evt.audio_offset
+
+        def on_word_boundary(evt):
+            offset = self._boundary_offset(evt)
+            if offset is not None:
+                boundaries.append((offset[0], offset[1], evt.text))
+
+        try:
+            # 整包按一次请求、全部字符计入限流
+            with self._limited(sum(len(request.text) for request in requests)):
+                with self.pool.synthesizer(voice_name, "pcm") as item:
+                    with item.listen(
+                        bookmark=on_bookmark, word_boundary=on_word_boundary
+                    ):
+                        result = self._speak_async(item, ssml, True).get()
+                    if (
+                        result.reason
+                        != speechsdk.ResultReason.SynthesizingAudioCompleted
+                    ):
+                        item.invalidate()
+                        details = speechsdk.CancellationDetails(result)
+                        raise RuntimeError(
+                            f"打包合成失败: {details.reason}, {details.error_details}"
+                        )
+            offsets = [bookmarks[str(i)] for i in range(len(requests))]
+        except Exception as e:
+            logger.warning(f"Azure打包合成失败，改为逐个合成: {e}")
+            return [self.synthesize(request) for request in requests]
+
+        pcm = result.audio_data
+        bytes_per_second = PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH
+        # 书签偏移（100纳秒）换算为按采样对齐的字节位置
+        cuts = [
+            min(len(pcm), int(offset * PCM_SAMPLE_RATE / 10000000) * PCM_SAMPLE_WIDTH)
+            for offset in offsets
+        ] + [len(pcm)]
+
+        logger.info(
+            f"Azure打包合成完成: voice={voice_name}, 请求数={len(requests)}, "
+            f"音频={len(pcm) / bytes_per_second:.2f}s"
+        )
+
+        responses = []
+        for i, request in enumerate(requests):
+            segment_pcm = pcm[cuts[i] : cuts[i + 1]]
+            audio_file = request.output_file or create_temp_file(suffix=".wav")
+            with wave.open(audio_file, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(PCM_SAMPLE_WIDTH)
+                wav_file.setframerate(PCM_SAMPLE_RATE)
+                wav_file.writeframes(segment_pcm)
+
+            subtitle_maker = None
+            if request.generate_subtitles:
+                # 只保留落在本段内的词边界，并换算为段内时间
+                subtitle_maker = SubtitleMaker()
+                begin, end = offsets[i], (
+                    offsets[i + 1] if i + 1 < len(offsets) else float("inf")
+                )
+                for offset, duration, text in boundaries:
+                    if begin <= offset < end:
+                        subtitle_maker.add_segment_from_offset(
+                            (offset - begin, duration), text
+                        )
+
+            response = TTSResponse(
+                success=True,
+                request=request,
+                audio_file=audio_file,
+                subtitle_maker=subtitle_maker,
+                duration=len(segment_pcm) / bytes_per_second,
+                voice_used=voice_name,
+                engine_info=self._get_engine_info(),
+            )
+            response.engine_info["batch_size"] = len(requests)
+            responses.append(self._complete_response(request, response, start_time))
+        return responses
+
+    @staticmethod
+    def _build_batch_ssml(voice_name: str, requests: List[TTSRequest]) -> str:
+        """构建打包合成的SSML，每个请求前插入以序号命名的书签"""
+        parts = []
+        for i, request in enumerate(requests):
+            text = xml_escape(request.text)
+            if request.voice_rate != 1.0:
+                rate_percent = f"{int((request.voice_rate - 1.0) * 100):+d}%"
+                text = f'<prosody rate="{rate_percent}">{text}</prosody>'
+            parts.append(f'<bookmark mark="{i}"/>{text}')
+        return (
+            '<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" '
+            f'xml:lang="zh-CN"><voice name="{voice_name}">'
+            + "".join(parts)
+            + "</voice></speak>"
+        )
+
+    def get_default_voice(self) -> Optional[str]:
+        """返回初始化时配置的语音，避免每次合成都请求语音列表"""
+        return self.voice_name or super().get_default_voice()
+
+    def _build_input(self, request: TTSRequest, voice_name: str) -> Tuple[str, bool]:
+        """构建合成输入，需要调整语音速率时使用SSML
+
+        Returns:
+            (待合成文本或SSML, 是否为SSML)
+        """
+        if request.voice_rate == 1.0:
+            return request.text, False
+
+        rate_percent = f"{int((request.voice_rate - 1.0) * 100):+d}%"
+        ssml = f"""
+                <speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="zh-CN">
+                    <voice name="{voice_name}">
+                        <prosody rate="{rate_percent}">
+                            {request.text}
+                        </prosody>
+                    </voice>
+                </speak>
+                """
+        return ssml, True
+
+    @staticmethod
+    def _speak_async(item, text: str, is_ssml: bool):
+        """在借出的合成器上发起异步合成，返回结果future"""
+        if is_ssml:
+            return item.synthesizer.speak_ssml_async(text)
+        return item.synthesizer.speak_text_async(text)
+
+    @staticmethod
+    def _boundary_offset(evt) -> Optional[Tuple[int, int]]:
+        """将词边界事件转换为(偏移, 时长)，单位为100纳秒；标点返回None"""
+        boundary_type = getattr(evt, "boundary_type", None)
+        if boundary_type is not None and boundary_type.name != "Word":
+            return None
+        duration = evt.duration
+        if hasattr(duration, "total_seconds"):
+            duration = int(duration.total_seconds() * 10000000)
+        return evt.audio_offset, duration
+
     def list_voices(self, language: Optional[str] = None) -> List[VoiceInfo]:
         """
         获取可用语音列表
@@ -390,6 +694,13 @@ class AzureTTS(BaseTTS):
 
         return subtitle_maker
 
+    def _get_result_duration(self, result, audio_file: str) -> float:
+        """从合成结果获取音频时长，SDK未提供时再读取文件"""
+        audio_duration = getattr(result, "audio_duration", None)
+        if audio_duration:
+            return audio_duration.total_seconds()
+        return self._get_audio_duration(audio_file)
+
     def _get_audio_duration(self, audio_file: str) -> float:
         """获取音频文件时长"""
         try:
@@ -438,4 +749,5 @@ class AzureTTS(BaseTTS):
             "neural_voices": True,
             "custom_voices": True,
             "region": self.service_region,
+            "connection_pool": self.pool.stats(),
         }
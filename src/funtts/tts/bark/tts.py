@@ -7,7 +7,6 @@ Bark是一个基于Transformer的文本转语音模型，支持生成高度逼
 
 import os
 import time
-import tempfile
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from loguru import logger
@@ -15,6 +14,9 @@ from loguru import logger
 from funtts.base import BaseTTS
 from funtts.models import TTSRequest, TTSResponse, VoiceInfo, AudioSegment
 from funtts.models import SubtitleMaker
+from funtts.utils.file_utils import allocate_path
+from funtts.utils.torch_profile import CPUProfile
+from funtts.utils.workspace import get_workspace
 
 try:
     import torch
@@ -37,12 +39,15 @@ class BarkTTS(BaseTTS):
 
         Args:
             device: 计算设备 ('cpu', 'cuda', 'auto')
-            **kwargs: 其他配置参数
+            **kwargs: 其他配置参数，包括:
+                - cpu_profile: CPU推理配置，CPUProfile实例、参数字典或预设名
         """
         super().__init__(**kwargs)
 
         self.device = self._setup_device(device)
         self.model = None
+        self.cpu_profile = CPUProfile.from_value(kwargs.get("cpu_profile"))
+        self.quantized_modules: List[str] = []
 
         # 配置参数
         self.config = {
@@ -83,6 +88,7 @@ class BarkTTS(BaseTTS):
 
         try:
             logger.info("正在加载Bark TTS模型...")
+            self.cpu_profile.apply_threads()
 
             # 设置设备
             if self.device == "cuda" and torch.cuda.is_available():
@@ -98,6 +104,7 @@ class BarkTTS(BaseTTS):
                 fine_use_small=(self.config["use_small_models"]),
                 codec_use_gpu=(self.device == "cuda"),
             )
+            self.quantized_modules = self._quantize_models()
 
             # 设置随机种子以获得可重现的结果
             self.model = {"status": "loaded", "sample_rate": SAMPLE_RATE}
@@ -109,6 +116,21 @@ class BarkTTS(BaseTTS):
             logger.error(f"Bark TTS模型加载失败: {e}")
             raise RuntimeError(f"无法加载Bark TTS模型: {e}")
 
+    def _quantize_models(self) -> List[str]:
+        """量化bark的三个GPT模型，编解码器以卷积为主，不做量化
+
+        bark的模型缓存在进程级的字典中，量化对进程内所有Bark引擎生效。
+        """
+        if not self.cpu_profile.quantize:
+            return []
+        from bark import generation
+
+        modules = {}
+        for name in ("text", "coarse", "fine"):
+            model = generation.models.get(name)
+            modules[name] = model["model"] if isinstance(model, dict) else model
+        return self.cpu_profile.quantize_modules(self.device, modules)
+
     def synthesize(self, request: TTSRequest) -> TTSResponse:
         """
         执行语音合成
@@ -126,18 +148,16 @@ class BarkTTS(BaseTTS):
             logger.info(f"开始Bark TTS语音合成: {request.text[:50]}...")
             start_time = time.time()
 
-            # 准备输出文件路径
-            timestamp = int(time.time() * 1000)
-            base_name = f"bark_output_{timestamp}"
-
-            if request.output_dir:
-                output_dir = Path(request.output_dir)
-                output_dir.mkdir(parents=True, exist_ok=True)
+            # 准备输出文件路径（已知最终路径时直接写入，避免再复制一次）
+            if request.output_file:
+                audio_file = Path(request.output_file)
             else:
-                output_dir = Path(tempfile.gettempdir()) / "funtts"
-                output_dir.mkdir(parents=True, exist_ok=True)
-
-            audio_file = output_dir / f"{base_name}.wav"
+                # 分配不冲突的文件名，未指定输出目录时在临时工作区中分配
+                audio_file = Path(
+                    allocate_path(
+                        ".wav", request.output_dir, prefix="bark_output_"
+                    )
+                )
 
             # 准备合成参数
             synthesis_params = self._prepare_synthesis_params(request)
@@ -169,18 +189,22 @@ class BarkTTS(BaseTTS):
 
                 # 生成标准字幕
                 if "srt" in request.subtitle_format.lower():
-                    subtitle_file = output_dir / f"{base_name}.srt"
+                    subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "srt"
+                    )
                     subtitle_maker.save_srt(subtitle_file)
 
                 # 生成FRT字幕
                 if "frt" in request.subtitle_format.lower():
-                    frt_subtitle_file = output_dir / f"{base_name}.frt"
+                    frt_subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "frt"
+                    )
                     subtitle_maker.save_frt(frt_subtitle_file)
 
             synthesis_time = time.time() - start_time
             logger.success(f"Bark TTS语音合成完成，耗时: {synthesis_time:.2f}秒")
 
-            return TTSResponse(
+            response = TTSResponse(
                 audio_file=str(audio_file),
                 subtitle_file=str(subtitle_file) if subtitle_file else None,
                 frt_subtitle_file=str(frt_subtitle_file) if frt_subtitle_file else None,
@@ -189,6 +213,8 @@ class BarkTTS(BaseTTS):
                 voice_name=request.voice_name or "default",
                 engine_name="Bark TTS",
             )
+            # 临时工作区中的文件随响应对象释放
+            return get_workspace().attach(response)
 
         except Exception as e:
             logger.error(f"Bark TTS语音合成失败: {e}")
@@ -222,13 +248,14 @@ class BarkTTS(BaseTTS):
             logger.debug(f"生成语音，参数: {params}")
 
             # 执行语音生成
-            audio_array = generate_audio(
-                text_prompt=params["text_prompt"],
-                history_prompt=params["history_prompt"],
-                text_temp=params["text_temp"],
-                waveform_temp=params["waveform_temp"],
-                silent=params["silent"],
-            )
+            with self.cpu_profile.inference():
+                audio_array = generate_audio(
+                    text_prompt=params["text_prompt"],
+                    history_prompt=params["history_prompt"],
+                    text_temp=params["text_temp"],
+                    waveform_temp=params["waveform_temp"],
+                    silent=params["silent"],
+                )
 
             return audio_array
 
@@ -460,13 +487,14 @@ class BarkTTS(BaseTTS):
             # 执行合成
             from bark import generate_audio
 
-            audio_array = generate_audio(
-                text_prompt=enhanced_text,
-                history_prompt="v2/en_speaker_6",
-                text_temp=self.config["text_temp"],
-                waveform_temp=self.config["waveform_temp"],
-                silent=self.config["silent"],
-            )
+            with self.cpu_profile.inference():
+                audio_array = generate_audio(
+                    text_prompt=enhanced_text,
+                    history_prompt="v2/en_speaker_6",
+                    text_temp=self.config["text_temp"],
+                    waveform_temp=self.config["waveform_temp"],
+                    silent=self.config["silent"],
+                )
 
             # 保存音频
             self._save_audio(audio_array, Path(output_path))
@@ -510,6 +538,10 @@ class BarkTTS(BaseTTS):
             ],
             "device": self.device,
             "sample_rate": self.config["sample_rate"],
+            "cpu_profile": {
+                **self.cpu_profile.describe(),
+                "quantized_modules": self.quantized_modules,
+            },
             "special_features": [
                 "支持 [laughter], [sighs], [music] 等特效标记",
                 "可生成背景音乐和环境音",
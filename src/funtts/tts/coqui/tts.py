@@ -7,7 +7,6 @@ Coqui TTS是一个功能强大的深度学习文本转语音工具包，支持
 
 import os
 import time
-import tempfile
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Union
 from loguru import logger
@@ -15,6 +14,9 @@ from loguru import logger
 from funtts.base import BaseTTS
 from funtts.models import TTSRequest, TTSResponse, VoiceInfo, AudioSegment
 from funtts.models.subtitle import SubtitleMaker
+from funtts.utils.file_utils import allocate_path
+from funtts.utils.torch_profile import CPUProfile
+from funtts.utils.workspace import get_workspace
 
 
 class CoquiTTS(BaseTTS):
@@ -29,13 +31,16 @@ class CoquiTTS(BaseTTS):
         Args:
             model_name: 模型名称，如 'tts_models/en/ljspeech/tacotron2-DDC'
             device: 计算设备 ('cpu', 'cuda', 'auto')
-            **kwargs: 其他配置参数
+            **kwargs: 其他配置参数，包括:
+                - cpu_profile: CPU推理配置，CPUProfile实例、参数字典或预设名
         """
         super().__init__(**kwargs)
 
         self.model_name = model_name or "tts_models/en/ljspeech/tacotron2-DDC"
         self.device = self._setup_device(device)
         self.tts_model = None
+        self.cpu_profile = CPUProfile.from_value(kwargs.get("cpu_profile"))
+        self.quantized_modules: List[str] = []
 
         # 配置参数
         self.config = {
@@ -78,11 +83,17 @@ class CoquiTTS(BaseTTS):
             from TTS.api import TTS
 
             logger.info(f"正在加载Coqui TTS模型: {self.model_name}")
+            self.cpu_profile.apply_threads()
 
             # 初始化TTS模型
             self.tts_model = TTS(
                 model_name=self.model_name, gpu=(self.device == "cuda")
             )
+            # 只量化声学模型，声码器以卷积为主
+            synthesizer = getattr(self.tts_model, "synthesizer", None)
+            self.quantized_modules = self.cpu_profile.quantize_modules(
+                self.device, {"tts_model": getattr(synthesizer, "tts_model", None)}
+            )
 
             logger.success("Coqui TTS模型加载成功")
 
@@ -110,43 +121,44 @@ class CoquiTTS(BaseTTS):
             logger.info(f"开始Coqui TTS语音合成: {request.text[:50]}...")
             start_time = time.time()
 
-            # 准备输出文件路径
-            timestamp = int(time.time() * 1000)
-            base_name = f"coqui_output_{timestamp}"
-
-            if request.output_dir:
-                output_dir = Path(request.output_dir)
-                output_dir.mkdir(parents=True, exist_ok=True)
+            # 准备输出文件路径（已知最终路径时直接写入，避免再复制一次）
+            if request.output_file:
+                audio_file = Path(request.output_file)
             else:
-                output_dir = Path(tempfile.gettempdir()) / "funtts"
-                output_dir.mkdir(parents=True, exist_ok=True)
-
-            audio_file = output_dir / f"{base_name}.wav"
+                # 分配不冲突的文件名，未指定输出目录时在临时工作区中分配
+                audio_file = Path(
+                    allocate_path(
+                        ".wav", request.output_dir, prefix="coqui_output_"
+                    )
+                )
 
             # 准备合成参数
             synthesis_params = self._prepare_synthesis_params(request)
 
             # 执行语音合成
-            if self._is_multispeaker_model():
-                # 多说话人模型
-                self.tts_model.tts_to_file(
-                    text=request.text,
-                    file_path=str(audio_file),
-                    speaker=synthesis_params.get("speaker", None),
-                    language=synthesis_params.get("language", None),
-                    emotion=synthesis_params.get("emotion", None),
-                )
-            elif synthesis_params.get("speaker_wav"):
-                # 语音克隆
-                self.tts_model.tts_to_file(
-                    text=request.text,
-                    file_path=str(audio_file),
-                    speaker_wav=synthesis_params["speaker_wav"],
-                    language=synthesis_params.get("language", None),
-                )
-            else:
-                # 单说话人模型
-                self.tts_model.tts_to_file(text=request.text, file_path=str(audio_file))
+            with self.cpu_profile.inference():
+                if self._is_multispeaker_model():
+                    # 多说话人模型
+                    self.tts_model.tts_to_file(
+                        text=request.text,
+                        file_path=str(audio_file),
+                        speaker=synthesis_params.get("speaker", None),
+                        language=synthesis_params.get("language", None),
+                        emotion=synthesis_params.get("emotion", None),
+                    )
+                elif synthesis_params.get("speaker_wav"):
+                    # 语音克隆
+                    self.tts_model.tts_to_file(
+                        text=request.text,
+                        file_path=str(audio_file),
+                        speaker_wav=synthesis_params["speaker_wav"],
+                        language=synthesis_params.get("language", None),
+                    )
+                else:
+                    # 单说话人模型
+                    self.tts_model.tts_to_file(
+                        text=request.text, file_path=str(audio_file)
+                    )
 
             # 获取音频时长
             duration = self._get_audio_duration(audio_file)
@@ -169,18 +181,22 @@ class CoquiTTS(BaseTTS):
 
                 # 生成标准字幕
                 if "srt" in request.subtitle_format.lower():
-                    subtitle_file = output_dir / f"{base_name}.srt"
+                    subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "srt"
+                    )
                     subtitle_maker.save_srt(subtitle_file)
 
                 # 生成FRT字幕
                 if "frt" in request.subtitle_format.lower():
-                    frt_subtitle_file = output_dir / f"{base_name}.frt"
+                    frt_subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "frt"
+                    )
                     subtitle_maker.save_frt(frt_subtitle_file)
 
             synthesis_time = time.time() - start_time
             logger.success(f"Coqui TTS语音合成完成，耗时: {synthesis_time:.2f}秒")
 
-            return TTSResponse(
+            response = TTSResponse(
                 audio_file=str(audio_file),
                 subtitle_file=str(subtitle_file) if subtitle_file else None,
                 frt_subtitle_file=str(frt_subtitle_file) if frt_subtitle_file else None,
@@ -189,6 +205,8 @@ class CoquiTTS(BaseTTS):
                 voice_name=request.voice_name or "default",
                 engine_name="Coqui TTS",
             )
+            # 临时工作区中的文件随响应对象释放
+            return get_workspace().attach(response)
 
         except Exception as e:
             logger.error(f"Coqui TTS语音合成失败: {e}")
@@ -356,12 +374,13 @@ class CoquiTTS(BaseTTS):
             logger.info(f"开始语音克隆: {text[:50]}...")
 
             # 执行语音克隆
-            self.tts_model.tts_to_file(
-                text=text,
-                file_path=output_path,
-                speaker_wav=speaker_wav,
-                language=language,
-            )
+            with self.cpu_profile.inference():
+                self.tts_model.tts_to_file(
+                    text=text,
+                    file_path=output_path,
+                    speaker_wav=speaker_wav,
+                    language=language,
+                )
 
             logger.success(f"语音克隆完成: {output_path}")
             return output_path
@@ -405,4 +424,8 @@ class CoquiTTS(BaseTTS):
             "model_name": self.model_name,
             "device": self.device,
             "sample_rate": self.config["sample_rate"],
+            "cpu_profile": {
+                **self.cpu_profile.describe(),
+                "quantized_modules": self.quantized_modules,
+            },
         }
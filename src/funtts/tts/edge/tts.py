@@ -4,16 +4,18 @@ Edge TTS引擎实现
 """
 
 import asyncio
+import bisect
 import time
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from funutil import getLogger, deep_get
-from funutil.util.retrying import retry
 
 from funtts.base import BaseTTS
 from funtts.models import TTSRequest, TTSResponse, VoiceInfo, SubtitleMaker
+from funtts.utils.audio_utils import mp3_frame_index
+from funtts.utils.file_utils import create_temp_file
+from funtts.utils.workspace import get_workspace
 from edge_tts import Communicate
-from edge_tts import SubMaker as EdgeSubMaker
 from edge_tts import list_voices
 
 logger = getLogger("funtts")
@@ -30,6 +32,21 @@ def convert_rate_to_percent(rate: float) -> str:
         return f"{percent}%"
 
 
+# 批量合成时拼接文本使用的分隔符
+BATCH_SEPARATOR = "\n"
+
+# 视为句末的标点
+_SENTENCE_END = ".!?;。！？；…"
+
+
+def _ensure_sentence_end(text: str) -> str:
+    """确保文本以句末标点结尾，使拼接后的各段之间有自然停顿"""
+    if not text or text[-1] in _SENTENCE_END:
+        return text
+    has_cjk = any("\u4e00" <= char <= "\u9fff" for char in text)
+    return text + ("。" if has_cjk else ".")
+
+
 class EdgeTTS(BaseTTS):
     """
     Microsoft Edge TTS引擎
@@ -52,9 +69,18 @@ class EdgeTTS(BaseTTS):
 
         Args:
             voice_name: 默认语音名称
-            **kwargs: 其他配置参数
+            **kwargs: 其他配置参数，包括:
+                - batch_size: 批量合成时每包最多的请求数，默认50
+                - batch_max_chars: 批量合成时每包最多的字符数，默认3000
+                - voice_cache_ttl: 语音列表缓存时间（秒），默认3600
         """
         super().__init__(voice_name, **kwargs)
+        self.voice_name = voice_name
+        self.batch_size = kwargs.get("batch_size", 50)
+        self.batch_max_chars = kwargs.get("batch_max_chars", 3000)
+        self.voice_cache_ttl = kwargs.get("voice_cache_ttl", 3600)
+        self._voices_cache: Optional[List[VoiceInfo]] = None
+        self._voices_cached_at = 0.0
         logger.info(f"Edge TTS引擎初始化完成，默认语音: {voice_name}")
 
     def synthesize(self, request: TTSRequest) -> TTSResponse:
@@ -82,7 +108,8 @@ class EdgeTTS(BaseTTS):
             if not self.is_voice_available(voice_name):
                 logger.warning(f"语音可能不可用: {voice_name}，尝试继续合成")
 
-            return self._synthesize(request)
+            # 由基类完成合成及输出文件、字幕文件处理
+            return super().synthesize(request)
 
         except ImportError as e:
             logger.error(f"Edge TTS依赖包未安装: {e}")
@@ -102,73 +129,67 @@ class EdgeTTS(BaseTTS):
                 error_code="SYNTHESIS_ERROR",
             )
 
-    @retry(4)
     def _synthesize(self, request: TTSRequest) -> TTSResponse:
         """Edge TTS语音合成核心方法"""
-        start_time = time.time()
-        text = request.text.strip()
-        voice_file = request.output_file
-
-        if not voice_file:
-            import tempfile
-
-            voice_file = tempfile.mktemp(suffix=f".{request.output_format}")
-
+        session = _EdgeSession(self, request)
         try:
-            rate_str = convert_rate_to_percent(request.voice_rate)
-            voice_name = request.voice_name or self.get_default_voice()
-            communicate = Communicate(text, voice_name, rate=rate_str)
-            edge_sub_maker = EdgeSubMaker()
+            with session:
+                for chunk in session.communicate.stream_sync():
+                    session.feed(chunk)
+            return session.response()
+        except Exception as e:
+            return session.failed(e)
 
-            # 创建我们自己的字幕制作器
-            subtitle_maker = SubtitleMaker() if request.generate_subtitles else None
+    async def _asynthesize(self, request: TTSRequest) -> TTSResponse:
+        """Edge TTS语音合成核心方法的异步实现，取消时关闭连接并删除临时文件"""
+        session = _EdgeSession(self, request)
+        try:
+            with session:
+                async for chunk in session.communicate.stream():
+                    session.feed(chunk)
+            return session.response()
+        except asyncio.CancelledError:
+            session.discard()
+            raise
+        except Exception as e:
+            return session.failed(e)
 
-            logger.info(f"开始Edge TTS合成: voice={voice_name}, rate={rate_str}")
+    def synthesize_stream(self, request: TTSRequest) -> Iterator[Dict[str, Any]]:
+        """流式合成：边接收边产出mp3音频块和词边界"""
+        rate_str = convert_rate_to_percent(request.voice_rate)
+        voice_name = request.voice_name or self.get_default_voice()
+        communicate = Communicate(request.text.strip(), voice_name, rate=rate_str)
 
-            with open(voice_file, "wb") as file:
+        with self._limited(len(request.text)) as permit:
+            try:
                 for chunk in communicate.stream_sync():
                     if chunk["type"] == "audio":
-                        file.write(chunk["data"])
-                    elif chunk["type"] == "WordBoundary" and subtitle_maker:
-                        edge_sub_maker.create_sub(
-                            (chunk["offset"], chunk["duration"]), chunk["text"]
-                        )
-                        # 同时添加到我们的字幕制作器
-                        subtitle_maker.add_segment_from_offset(
-                            (chunk["offset"], chunk["duration"]), chunk["text"]
-                        )
-
-            # 获取音频时长
-            duration = (
-                subtitle_maker.get_total_duration()
-                if subtitle_maker
-                else self._get_audio_duration(voice_file)
-            )
-
-            logger.success(
-                f"Edge TTS合成完成: voice={voice_name}, file={voice_file}, duration={duration:.2f}s"
-            )
-
-            return TTSResponse(
-                success=True,
-                request=request,
-                audio_file=voice_file,
-                subtitle_maker=subtitle_maker,
-                duration=duration,
-                voice_used=voice_name,
-                processing_time=time.time() - start_time,
-                engine_info=self._get_engine_info(),
-            )
+                        yield {"type": "audio", "data": chunk["data"]}
+                    elif chunk["type"] == "WordBoundary":
+                        # edge-tts的时间单位为100纳秒
+                        start = chunk["offset"] / 1e7
+                        yield {
+                            "type": "WordBoundary",
+                            "start_time": start,
+                            "end_time": start + chunk["duration"] / 1e7,
+                            "text": chunk["text"],
+                        }
+            except Exception as e:
+                # 与_synthesize一样按响应记录结果，限流、超时时自适应并发随之收缩
+                permit.record(
+                    TTSResponse(
+                        success=False,
+                        request=request,
+                        error_message=f"{type(e).__name__}: {e}",
+                        error_code="EDGE_ERROR",
+                    )
+                )
+                raise
+            permit.record(TTSResponse(success=True, request=request))
 
-        except Exception as e:
-            logger.error(f"Edge TTS处理失败: {str(e)}")
-            return TTSResponse(
-                success=False,
-                request=request,
-                error_message=str(e),
-                error_code="EDGE_ERROR",
-                processing_time=time.time() - start_time,
-            )
+    def stream_content_type(self, request: TTSRequest) -> str:
+        # Edge TTS始终返回mp3数据
+        return "audio/mpeg"
 
     def list_voices(self, language: Optional[str] = None) -> List[VoiceInfo]:
         """
@@ -180,6 +201,13 @@ class EdgeTTS(BaseTTS):
         Returns:
             List[VoiceInfo]: 语音信息列表
         """
+        # 语音列表需要一次网络请求，缓存后每次合成前的语音检查不再访问服务
+        if (
+            self._voices_cache is not None
+            and time.time() - self._voices_cached_at < self.voice_cache_ttl
+        ):
+            return list(self._voices_cache)
+
         try:
             voice_list = asyncio.run(list_voices())
             result = []
@@ -190,7 +218,9 @@ class EdgeTTS(BaseTTS):
                 voice_info = self._create_voice_info(voice)
                 result.append(voice_info)
             logger.info(f"获取到 {len(result)} 个Edge TTS语音")
-            return result
+            self._voices_cache = result
+            self._voices_cached_at = time.time()
+            return list(result)
         except ImportError:
             logger.error("edge-tts包未安装，无法获取语音列表")
             return []
@@ -198,6 +228,150 @@ class EdgeTTS(BaseTTS):
             logger.error(f"获取Edge TTS语音列表失败: {str(e)}")
             return []
 
+    def synthesize_batch(self, requests: List[TTSRequest]) -> List[TTSResponse]:
+        """批量语音合成
+
+        语音和语速相同的短文本被拼接进一次Communicate会话，
+        合成后按流式返回的边界偏移把音频（MP3帧）和字幕切分回各个请求。
+        每包最多batch_size个请求、batch_max_chars个字符；
+        无法可靠切分时该包退回逐个合成。
+
+        Args:
+            requests: TTS请求列表
+
+        Returns:
+            与请求一一对应的响应列表
+        """
+        responses: List[Optional[TTSResponse]] = [None] * len(requests)
+        groups: Dict[Tuple[str, str], List[int]] = {}
+
+        for index, request in enumerate(requests):
+            if request.validate() and self._validate_request(request):
+                voice_name = request.voice_name or self.get_default_voice()
+                rate_str = convert_rate_to_percent(request.voice_rate)
+                groups.setdefault((voice_name, rate_str), []).append(index)
+            else:
+                responses[index] = self.synthesize(request)
+
+        for (voice_name, rate_str), indexes in groups.items():
+            for packed in self._pack_requests(
+                requests, indexes, self.batch_size, self.batch_max_chars
+            ):
+                if len(packed) == 1:
+                    responses[packed[0]] = self.synthesize(requests[packed[0]])
+                    continue
+                results = self._synthesize_packed(
+                    voice_name, rate_str, [requests[i] for i in packed]
+                )
+                for index, response in zip(packed, results):
+                    responses[index] = response
+
+        return responses
+
+    def _synthesize_packed(
+        self, voice_name: str, rate_str: str, requests: List[TTSRequest]
+    ) -> List[TTSResponse]:
+        """一次会话合成多个请求并切分结果，失败时逐个合成"""
+        start_time = time.time()
+
+        # 每段补全句末标点并换行分隔，保证段间有停顿且边界不跨段
+        texts = [_ensure_sentence_end(request.text.strip()) for request in requests]
+        combined = BATCH_SEPARATOR.join(texts)
+        text_starts = []
+        position = 0
+        for text in texts:
+            text_starts.append(position)
+            position += len(text) + len(BATCH_SEPARATOR)
+
+        try:
+            audio = bytearray()
+            owned: List[List[Tuple[int, int, str]]] = [[] for _ in requests]
+            cursor = 0
+            communicate = Communicate(combined, voice_name, rate=rate_str)
+            # 整包按一次请求、全部字符计入限流
+            with self._limited(len(combined)):
+                for chunk in communicate.stream_sync():
+                    if chunk["type"] == "audio":
+                        audio.extend(chunk["data"])
+                    elif chunk["type"] in ("WordBoundary", "SentenceBoundary"):
+                        # 在拼接文本中定位边界文本，确定它属于哪个请求
+                        found = combined.find(chunk["text"], cursor)
+                        if found < 0:
+                            continue
+                        cursor = found + len(chunk["text"])
+                        owner = bisect.bisect_right(text_starts, found) - 1
+                        owned[owner].append(
+                            (chunk["offset"], chunk["duration"], chunk["text"])
+                        )
+
+            if not all(owned):
+                raise RuntimeError("部分文本没有收到边界事件，无法切分")
+
+            # 切分点取相邻两段之间静音的中点（100纳秒）
+            cuts = [0]
+            for previous, current in zip(owned, owned[1:]):
+                previous_end = previous[-1][0] + previous[-1][1]
+                cuts.append((previous_end + current[0][0]) // 2)
+
+            frames = mp3_frame_index(bytes(audio))
+        except Exception as e:
+            logger.warning(f"Edge打包合成失败，改为逐个合成: {e}")
+            return [self.synthesize(request) for request in requests]
+
+        # 每个切分点对齐到不早于它的第一帧
+        frame_starts = [start for _, start in frames]
+        byte_cuts = []
+        time_cuts = []
+        for cut in cuts:
+            index = bisect.bisect_left(frame_starts, cut / 10000000)
+            index = min(index, len(frames) - 1) if cut else 0
+            byte_cuts.append(frames[index][0])
+            time_cuts.append(frames[index][1])
+        byte_cuts.append(len(audio))
+        total_duration = frames[-1][1] + (
+            frames[-1][1] - frames[-2][1] if len(frames) > 1 else 0.0
+        )
+        time_cuts.append(total_duration)
+
+        logger.info(
+            f"Edge打包合成完成: voice={voice_name}, 请求数={len(requests)}, "
+            f"音频={total_duration:.2f}s"
+        )
+
+        responses = []
+        for i, request in enumerate(requests):
+            audio_file = request.output_file or create_temp_file(
+                suffix=f".{request.output_format}"
+            )
+            with open(audio_file, "wb") as file:
+                file.write(audio[byte_cuts[i] : byte_cuts[i + 1]])
+
+            subtitle_maker = None
+            if request.generate_subtitles:
+                subtitle_maker = SubtitleMaker()
+                base = int(time_cuts[i] * 10000000)
+                for offset, duration, text in owned[i]:
+                    subtitle_maker.add_segment_from_offset(
+                        (max(0, offset - base), duration), text
+                    )
+
+            response = TTSResponse(
+                success=True,
+                request=request,
+                audio_file=audio_file,
+                subtitle_maker=subtitle_maker,
+                duration=time_cuts[i + 1] - time_cuts[i],
+                voice_used=voice_name,
+                engine_info=self._get_engine_info(),
+            )
+            response.engine_info["batch_size"] = len(requests)
+            responses.append(self._complete_response(request, response, start_time))
+        return responses
+
+    def get_default_voice(self) -> Optional[str]:
+        """返回初始化时配置的语音，避免每次合成都请求语音列表"""
+        return self.voice_name or super().get_default_voice()
+
     def is_voice_available(self, voice_name: str) -> bool:
         """
         检查语音是否可用
@@ -302,3 +476,88 @@ class EdgeTTS(BaseTTS):
             "free_tier": True,
             "neural_voices": True,
         }
+
+
+class _EdgeSession:
+    """一次Edge TTS合成会话：写入音频块、收集词边界并生成响应
+
+    同步和异步合成共用，收到第一块音频时通知对冲策略。
+    """
+
+    def __init__(self, engine: EdgeTTS, request: TTSRequest):
+        self.engine = engine
+        self.request = request
+        self.start_time = time.time()
+        self.voice_file = request.output_file or create_temp_file(
+            suffix=f".{request.output_format}"
+        )
+        self.rate_str = convert_rate_to_percent(request.voice_rate)
+        self.voice_name = request.voice_name or engine.get_default_voice()
+        self.communicate: Optional[Communicate] = None
+        # 创建我们自己的字幕制作器
+        self.subtitle_maker = SubtitleMaker() if request.generate_subtitles else None
+        self.first_audio = engine._first_audio_callback()
+        self._received_audio = False
+        self._file = None
+
+    def __enter__(self):
+        logger.info(
+            f"开始Edge TTS合成: voice={self.voice_name}, rate={self.rate_str}"
+        )
+        self.communicate = Communicate(
+            self.request.text.strip(), self.voice_name, rate=self.rate_str
+        )
+        self._file = open(self.voice_file, "wb")
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def feed(self, chunk: Dict[str, Any]):
+        if chunk["type"] == "audio":
+            self._file.write(chunk["data"])
+            if not self._received_audio:
+                self._received_audio = True
+                self.first_audio()
+        elif chunk["type"] == "WordBoundary" and self.subtitle_maker is not None:
+            self.subtitle_maker.add_segment_from_offset(
+                (chunk["offset"], chunk["duration"]), chunk["text"]
+            )
+
+    def response(self) -> TTSResponse:
+        # 获取音频时长
+        duration = (
+            self.subtitle_maker.get_total_duration()
+            if self.subtitle_maker
+            else self.engine._get_audio_duration(self.voice_file)
+        )
+
+        logger.success(
+            f"Edge TTS合成完成: voice={self.voice_name}, file={self.voice_file}, duration={duration:.2f}s"
+        )
+
+        return TTSResponse(
+            success=True,
+            request=self.request,
+            audio_file=self.voice_file,
+            subtitle_maker=self.subtitle_maker,
+            duration=duration,
+            voice_used=self.voice_name,
+            processing_time=time.time() - self.start_time,
+            engine_info=self.engine._get_engine_info(),
+        )
+
+    def failed(self, error: Exception) -> TTSResponse:
+        logger.error(f"Edge TTS处理失败: {str(error)}")
+        return TTSResponse(
+            success=False,
+            request=self.request,
+            error_message=str(error),
+            error_code="EDGE_ERROR",
+            processing_time=time.time() - self.start_time,
+        )
+
+    def discard(self):
+        """删除被取消的合成写入的临时文件"""
+        if not self.request.output_file:
+            get_workspace().discard(self.voice_file)
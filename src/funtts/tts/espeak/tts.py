@@ -11,6 +11,7 @@ from funutil import getLogger
 
 from ...base import BaseTTS
 from ...models import TTSRequest, TTSResponse, VoiceInfo
+from ...utils.file_utils import create_temp_file
 
 logger = getLogger("funtts.tts.espeak")
 
@@ -78,7 +79,8 @@ class EspeakTTS(BaseTTS):
                     error_code="MISSING_DEPENDENCY",
                 )
 
-            return self._synthesize(request)
+            # 由基类完成合成及输出文件、字幕文件处理
+            return super().synthesize(request)
 
         except Exception as e:
             logger.error(f"eSpeak TTS语音合成失败: {e}")
@@ -96,6 +98,9 @@ class EspeakTTS(BaseTTS):
         try:
             voice_name = request.voice_name or self.get_default_voice()
 
+            # 已知最终路径时直接写入，否则写入临时文件
+            audio_file = request.output_file or create_temp_file(suffix=".wav")
+
             # 构建eSpeak命令
             cmd = [
                 self.espeak_path,
@@ -104,7 +109,7 @@ class EspeakTTS(BaseTTS):
                 "-s",
                 str(int(150 * request.voice_rate)),  # 语音速度 (words per minute)
                 "-w",
-                request.output_file,  # 输出文件
+                audio_file,  # 输出文件
                 request.text,  # 要合成的文本
             ]
 
@@ -135,16 +140,16 @@ class EspeakTTS(BaseTTS):
 
             if result.returncode == 0:
                 # 获取音频时长
-                duration = self._get_audio_duration(request.output_file)
+                duration = self._get_audio_duration(audio_file)
 
                 logger.success(
-                    f"eSpeak合成完成: {request.output_file}, 时长: {duration:.2f}s"
+                    f"eSpeak合成完成: {audio_file}, 时长: {duration:.2f}s"
                 )
 
                 return TTSResponse(
                     success=True,
                     request=request,
-                    audio_file=request.output_file,
+                    audio_file=audio_file,
                     duration=duration,
                     voice_used=voice_name,
                     processing_time=time.time() - start_time,
@@ -6,7 +6,6 @@ IndexTTS2是一个工业级可控制的文本转语音模型，支持情感控
 """
 
 import time
-import tempfile
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from loguru import logger
@@ -14,6 +13,9 @@ from loguru import logger
 from funtts.base import BaseTTS
 from funtts.models import TTSRequest, TTSResponse, VoiceInfo, AudioSegment
 from funtts.models import SubtitleMaker
+from funtts.utils.file_utils import allocate_path
+from funtts.utils.torch_profile import CPUProfile
+from funtts.utils.workspace import get_workspace
 
 
 class IndexTTS2(BaseTTS):
@@ -28,7 +30,8 @@ class IndexTTS2(BaseTTS):
         Args:
             model_path: 模型路径，如果为None则使用默认路径
             device: 计算设备 ('cpu', 'cuda', 'auto')
-            **kwargs: 其他配置参数
+            **kwargs: 其他配置参数，包括:
+                - cpu_profile: CPU推理配置，CPUProfile实例、参数字典或预设名
         """
         super().__init__(**kwargs)
 
@@ -36,6 +39,8 @@ class IndexTTS2(BaseTTS):
         self.device = self._setup_device(device)
         self.model = None
         self.tokenizer = None
+        self.cpu_profile = CPUProfile.from_value(kwargs.get("cpu_profile"))
+        self.quantized_modules: List[str] = []
 
         # 配置参数
         self.config = {
@@ -75,6 +80,7 @@ class IndexTTS2(BaseTTS):
         try:
             # 这里需要根据实际的IndexTTS2 API进行调整
             logger.info("正在加载IndexTTS2模型...")
+            self.cpu_profile.apply_threads()
 
             # 示例实现 - 需要根据实际API调整
             # from indextts2 import IndexTTS2Model
@@ -86,6 +92,10 @@ class IndexTTS2(BaseTTS):
             # 临时实现 - 模拟模型加载
             self.model = {"status": "loaded", "device": self.device}
             self.tokenizer = {"status": "loaded"}
+            # 模型不是nn.Module时不做量化
+            self.quantized_modules = self.cpu_profile.quantize_modules(
+                self.device, {"model": self.model}
+            )
 
             logger.success("IndexTTS2模型加载成功")
 
@@ -110,18 +120,16 @@ class IndexTTS2(BaseTTS):
             logger.info(f"开始IndexTTS2语音合成: {request.text[:50]}...")
             start_time = time.time()
 
-            # 准备输出文件路径
-            timestamp = int(time.time() * 1000)
-            base_name = f"indextts2_output_{timestamp}"
-
-            if request.output_dir:
-                output_dir = Path(request.output_dir)
-                output_dir.mkdir(parents=True, exist_ok=True)
+            # 准备输出文件路径（已知最终路径时直接写入，避免再复制一次）
+            if request.output_file:
+                audio_file = Path(request.output_file)
             else:
-                output_dir = Path(tempfile.gettempdir()) / "funtts"
-                output_dir.mkdir(parents=True, exist_ok=True)
-
-            audio_file = output_dir / f"{base_name}.wav"
+                # 分配不冲突的文件名，未指定输出目录时在临时工作区中分配
+                audio_file = Path(
+                    allocate_path(
+                        ".wav", request.output_dir, prefix="indextts2_output_"
+                    )
+                )
 
             # 准备合成参数
             synthesis_params = {
@@ -136,7 +144,8 @@ class IndexTTS2(BaseTTS):
             }
 
             # 执行语音合成
-            audio_data = self._generate_speech(synthesis_params)
+            with self.cpu_profile.inference():
+                audio_data = self._generate_speech(synthesis_params)
 
             # 保存音频文件
             self._save_audio(audio_data, audio_file)
@@ -164,18 +173,22 @@ class IndexTTS2(BaseTTS):
 
                 # 生成标准字幕
                 if "srt" in request.subtitle_format.lower():
-                    subtitle_file = output_dir / f"{base_name}.srt"
+                    subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "srt"
+                    )
                     subtitle_maker.save_srt(subtitle_file)
 
                 # 生成FRT字幕
                 if "frt" in request.subtitle_format.lower():
-                    frt_subtitle_file = output_dir / f"{base_name}.frt"
+                    frt_subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "frt"
+                    )
                     subtitle_maker.save_frt(frt_subtitle_file)
 
             synthesis_time = time.time() - start_time
             logger.success(f"IndexTTS2语音合成完成，耗时: {synthesis_time:.2f}秒")
 
-            return TTSResponse(
+            response = TTSResponse(
                 audio_file=str(audio_file),
                 subtitle_file=str(subtitle_file) if subtitle_file else None,
                 frt_subtitle_file=str(frt_subtitle_file) if frt_subtitle_file else None,
@@ -184,6 +197,8 @@ class IndexTTS2(BaseTTS):
                 voice_name=request.voice_name or "default",
                 engine_name="IndexTTS2",
             )
+            # 临时工作区中的文件随响应对象释放
+            return get_workspace().attach(response)
 
         except Exception as e:
             logger.error(f"IndexTTS2语音合成失败: {e}")
@@ -342,4 +357,8 @@ class IndexTTS2(BaseTTS):
             ],
             "device": self.device,
             "sample_rate": self.config["sample_rate"],
+            "cpu_profile": {
+                **self.cpu_profile.describe(),
+                "quantized_modules": self.quantized_modules,
+            },
         }
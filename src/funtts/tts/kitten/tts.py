@@ -9,7 +9,6 @@ KittenTTS是一个基于深度学习的高质量文本转语音引擎，
 
 import os
 import time
-import tempfile
 import json
 from typing import List, Optional, Dict, Any
 
@@ -35,6 +34,9 @@ from funtts.models import (
     SubtitleMaker,
     AudioSegment,
 )
+from funtts.utils.file_utils import create_temp_file
+from funtts.utils.torch_profile import CPUProfile
+from funtts.utils.workspace import get_workspace
 
 logger = getLogger("funtts")
 
@@ -57,6 +59,7 @@ class KittenTTS(BaseTTS):
                 - sample_rate: 采样率，默认22050
                 - speed: 语音速度倍数，默认1.0
                 - pitch: 音调调节，默认1.0
+                - cpu_profile: CPU推理配置，CPUProfile实例、参数字典或预设名
         """
         super().__init__(voice_name, **kwargs)
 
@@ -73,6 +76,8 @@ class KittenTTS(BaseTTS):
         self.sample_rate = kwargs.get("sample_rate", 22050)
         self.speed = kwargs.get("speed", 1.0)
         self.pitch = kwargs.get("pitch", 1.0)
+        self.cpu_profile = CPUProfile.from_value(kwargs.get("cpu_profile"))
+        self.quantized_modules: List[str] = []
 
         # 模型实例
         self.model = None
@@ -88,6 +93,7 @@ class KittenTTS(BaseTTS):
                 self.device = "cuda" if torch.cuda.is_available() else "cpu"
 
             logger.info(f"初始化KittenTTS模型，设备: {self.device}")
+            self.cpu_profile.apply_threads()
 
             # 加载配置
             if self.config_path and os.path.exists(self.config_path):
@@ -108,6 +114,11 @@ class KittenTTS(BaseTTS):
                 )
                 logger.info("使用预训练模型")
 
+            # 模型本身不是nn.Module时量化其包装的网络
+            self.quantized_modules = self.cpu_profile.quantize_modules(
+                self.device, {"model": getattr(self.model, "model", self.model)}
+            )
+
             logger.info("KittenTTS模型初始化成功")
 
         except Exception as e:
@@ -142,7 +153,7 @@ class KittenTTS(BaseTTS):
             # 准备输出文件
             output_file = request.output_file
             if not output_file:
-                output_file = tempfile.mktemp(suffix=".wav")
+                output_file = create_temp_file(suffix=".wav")
 
             # 确保输出目录存在
             os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -153,11 +164,12 @@ class KittenTTS(BaseTTS):
             # 执行合成
             logger.info(f"开始KittenTTS合成: {len(request.text)}字符")
 
-            audio_data = self.model.synthesize(
-                text=request.text,
-                voice_name=request.voice_name or self.voice_name,
-                **synthesis_params,
-            )
+            with self.cpu_profile.inference():
+                audio_data = self.model.synthesize(
+                    text=request.text,
+                    voice_name=request.voice_name or self.voice_name,
+                    **synthesis_params,
+                )
 
             # 保存音频文件
             self._save_audio(audio_data, output_file)
@@ -185,7 +197,7 @@ class KittenTTS(BaseTTS):
 
             logger.success(f"KittenTTS合成完成: {output_file} ({duration:.2f}s)")
 
-            return TTSResponse(
+            response = TTSResponse(
                 success=True,
                 request=request,
                 audio_file=output_file,
@@ -196,6 +208,8 @@ class KittenTTS(BaseTTS):
                 processing_time=time.time() - start_time,
                 engine_info=self.get_engine_info(),
             )
+            # 临时工作区中的文件随响应对象释放
+            return get_workspace().attach(response)
 
         except Exception as e:
             logger.error(f"KittenTTS语音合成失败: {str(e)}")
@@ -445,6 +459,10 @@ class KittenTTS(BaseTTS):
             "device": self.device,
             "sample_rate": self.sample_rate,
             "model_path": self.model_path,
+            "cpu_profile": {
+                **self.cpu_profile.describe(),
+                "quantized_modules": self.quantized_modules,
+            },
         }
 
     def __del__(self):
@@ -10,9 +10,14 @@ Pyttsx3是一个跨平台的Python文本转语音库，支持多种TTS引擎：
 """
 
 import os
+import queue
+import threading
 import time
-import tempfile
-from typing import List, Optional
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
 
 try:
     import pyttsx3
@@ -27,16 +32,197 @@ from funtts.models import (
     TTSResponse,
     VoiceInfo,
     SubtitleMaker,
-    AudioSegment,
 )
+from funtts.utils.file_utils import create_temp_file
+from funtts.utils.workspace import get_workspace
 
 logger = getLogger("funtts")
 
 
+@dataclass
+class _SaveJob:
+    """一次save_to_file"""
+
+    request: TTSRequest
+    audio_file: str
+    voice_id: Optional[str]
+    rate: int
+    volume: float
+    future: Future
+
+
+@dataclass
+class _CallJob:
+    """在引擎线程中执行的函数"""
+
+    fn: Callable[[Any], Any]
+    future: Future
+
+
+class _EngineOwner:
+    """pyttsx3引擎的属主线程
+
+    pyttsx3引擎不是线程安全的（SAPI5/NSSpeechSynthesizer还要求在创建引擎的线程中使用），
+    引擎的创建、属性设置和runAndWait都只在这个线程中执行。
+    其他线程把请求放入队列并等待各自的Future；属主线程每次取出队列中已有的请求
+    （最多max_batch个），按顺序排入属性设置和save_to_file命令后只调用一次runAndWait，
+    分摊事件循环的启动开销。
+    """
+
+    def __init__(self, max_batch: int = 16, batch_window: float = 0.0):
+        """
+        Args:
+            max_batch: 每次runAndWait最多处理的请求数
+            batch_window: 取到第一个请求后等待更多请求的时间（秒）
+        """
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window
+        self.engine = None
+        self._queue: "queue.Queue[Union[_SaveJob, _CallJob, None]]" = queue.Queue()
+        self._ready: Future = Future()
+        # 关闭后不再接受请求；与入队在同一把锁下，保证最后一次清理不会遗漏请求
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "requests": 0}
+        self._thread = threading.Thread(
+            target=self._run, name="funtts-pyttsx3", daemon=True
+        )
+        self._thread.start()
+        # 引擎初始化失败时在调用方线程抛出
+        self._ready.result()
+
+    def call(self, fn: Callable[[Any], Any]) -> Any:
+        """在引擎线程中执行fn(engine)并返回结果"""
+        if threading.current_thread() is self._thread:
+            return fn(self.engine)
+        future: Future = Future()
+        self._put(_CallJob(fn, future))
+        return future.result()
+
+    def submit(self, job: _SaveJob) -> Future:
+        self._put(job)
+        return job.future
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    def _put(self, job: Union[_SaveJob, _CallJob]):
+        with self._lock:
+            if self._closed or not self._thread.is_alive():
+                raise RuntimeError("pyttsx3引擎已关闭")
+            self._queue.put(job)
+
+    def _run(self):
+        try:
+            self.engine = pyttsx3.init()
+        except Exception as e:
+            with self._lock:
+                self._closed = True
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(None)
+
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if isinstance(job, _CallJob):
+                self._execute_call(job)
+                continue
+            batch = [job]
+            stopping = self._drain(batch)
+            self._execute_batch(batch)
+            if stopping:
+                break
+
+        try:
+            self.engine.stop()
+        except Exception:
+            pass
+        # 先拒绝新请求，再让仍在队列中的请求直接失败
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None and not job.future.done():
+                job.future.set_exception(RuntimeError("pyttsx3引擎已关闭"))
+
+    def _drain(self, batch: List[_SaveJob]) -> bool:
+        """取出队列中已有的合成请求，返回是否收到了停止信号"""
+        deadline = time.time() + self.batch_window
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.time()
+                job = (
+                    self._queue.get(timeout=timeout)
+                    if timeout > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                return False
+            if job is None:
+                return True
+            if isinstance(job, _CallJob):
+                # 函数调用不能插入命令队列，在本批次之前执行，顺序对其调用方无影响
+                self._execute_call(job)
+                continue
+            batch.append(job)
+        return False
+
+    def _execute_call(self, job: _CallJob):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            job.future.set_result(job.fn(self.engine))
+        except Exception as e:
+            job.future.set_exception(e)
+
+    def _execute_batch(self, batch: List[_SaveJob]):
+        # pyttsx3的setProperty和save_to_file都进入同一个命令队列，
+        # runAndWait时按排入的顺序执行，每个请求的属性只作用于其后的save_to_file
+        # 调用方等待超时后已取消的请求不再执行
+        batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            for job in batch:
+                if job.voice_id:
+                    self.engine.setProperty("voice", job.voice_id)
+                self.engine.setProperty("rate", job.rate)
+                self.engine.setProperty("volume", job.volume)
+                self.engine.save_to_file(job.request.text, job.audio_file)
+            self.engine.runAndWait()
+        except Exception as e:
+            for job in batch:
+                job.future.set_exception(e)
+            return
+        self._stats["runs"] += 1
+        self._stats["requests"] += len(batch)
+        for job in batch:
+            job.future.set_result(len(batch))
+
+
+def _discard(file_path: str):
+    """删除请求失败时留下的临时文件"""
+    get_workspace().discard(file_path)
+
+
 class Pyttsx3TTS(BaseTTS):
     """Pyttsx3 TTS引擎实现
 
     基于pyttsx3库的跨平台TTS引擎，支持Windows SAPI5、macOS NSSpeechSynthesizer和Linux espeak。
+    引擎只在专属线程中使用（见_EngineOwner），可以在多线程服务中直接调用；
+    同时到达的请求由一次runAndWait批量完成，synthesize_batch会一次提交全部请求。
     """
 
     def __init__(self, voice_name: str = "default", **kwargs):
@@ -47,73 +233,97 @@ class Pyttsx3TTS(BaseTTS):
             **kwargs: 其他配置参数
                 - rate: 语音速率倍数，默认1.0
                 - volume: 音量，默认1.0
+                - max_batch: 每次runAndWait最多处理的请求数，默认16
+                - batch_window: 收到请求后等待更多请求一起处理的时间（秒），默认0
+                - timeout: 等待引擎线程完成单个请求的最长时间（秒），默认300
         """
         super().__init__(voice_name, **kwargs)
 
         if pyttsx3 is None:
             raise ImportError("pyttsx3库未安装，请运行: pip install pyttsx3")
 
-        self.engine = None
+        self.voice_name = voice_name
         self.rate_multiplier = kwargs.get("rate", 1.0)
         self.volume = kwargs.get("volume", 1.0)
+        self.max_batch = kwargs.get("max_batch", 16)
+        self.batch_window = kwargs.get("batch_window", 0.0)
+        self.timeout = kwargs.get("timeout", 300.0)
+        self._owner: Optional[_EngineOwner] = None
+        # 语音名称到语音ID、语音ID到显示名称的缓存
+        self._voice_ids: Dict[str, Optional[str]] = {}
+        self._voice_names: Dict[str, str] = {}
+        self._voice_lock = threading.Lock()
 
         self._init_engine()
 
     def _init_engine(self):
-        """初始化pyttsx3引擎"""
+        """在属主线程中初始化pyttsx3引擎，并解析默认语音"""
         try:
-            self.engine = pyttsx3.init()
-
-            # 设置语音
-            voices = self.engine.getProperty("voices")
-            if voices:
-                selected_voice = self._select_voice(voices)
-                if selected_voice:
-                    self.engine.setProperty("voice", selected_voice.id)
-                    logger.info(
-                        f"选择语音: {selected_voice.name} ({selected_voice.id})"
-                    )
-                else:
-                    logger.warning(f"未找到指定语音: {self.voice_name}，使用默认语音")
-
-            # 设置基础参数
-            self.engine.setProperty("volume", self.volume)
-
+            self._owner = _EngineOwner(self.max_batch, self.batch_window)
+            voice_id = self._resolve_voice(self.voice_name)
+            if voice_id is None:
+                logger.warning(f"未找到指定语音: {self.voice_name}，使用默认语音")
             logger.info("Pyttsx3引擎初始化成功")
 
         except Exception as e:
             logger.error(f"Pyttsx3引擎初始化失败: {str(e)}")
             raise
 
-    def _select_voice(self, voices):
+    @property
+    def engine(self):
+        """pyttsx3引擎对象，只能在引擎线程中使用（见_EngineOwner.call）"""
+        return self._owner.engine if self._owner else None
+
+    def _select_voice(self, voices, voice_name: str):
         """选择合适的语音
 
         Args:
             voices: 可用语音列表
+            voice_name: 语音名称、ID或索引
 
         Returns:
             选中的语音对象或None
         """
-        if self.voice_name == "default" and voices:
+        if voice_name == "default" and voices:
             return voices[0]
 
         # 如果voice_name是数字，按索引选择
-        if self.voice_name.isdigit():
-            voice_index = int(self.voice_name)
+        if voice_name.isdigit():
+            voice_index = int(voice_name)
             if 0 <= voice_index < len(voices):
                 return voices[voice_index]
 
         # 按名称或ID匹配
         for voice in voices:
             if (
-                self.voice_name in voice.name
-                or self.voice_name == voice.id
-                or self.voice_name.lower() in voice.name.lower()
+                voice_name in voice.name
+                or voice_name == voice.id
+                or voice_name.lower() in voice.name.lower()
             ):
                 return voice
 
         return None
 
+    def _resolve_voice(self, voice_name: str) -> Optional[str]:
+        """把语音名称解析为语音ID，结果缓存"""
+        with self._voice_lock:
+            if voice_name in self._voice_ids:
+                return self._voice_ids[voice_name]
+
+        def select(engine):
+            voice = self._select_voice(engine.getProperty("voices") or [], voice_name)
+            return (voice.id, voice.name) if voice else None
+
+        selected = self._owner.call(select)
+        with self._voice_lock:
+            self._voice_ids[voice_name] = selected[0] if selected else None
+            if selected:
+                self._voice_ids[selected[0]] = selected[0]
+                self._voice_names[selected[0]] = selected[1]
+        if selected:
+            logger.info(f"选择语音: {selected[1]} ({selected[0]})")
+        return selected[0] if selected else None
+
     def synthesize(self, request: TTSRequest) -> TTSResponse:
         """执行语音合成
 
@@ -123,71 +333,94 @@ class Pyttsx3TTS(BaseTTS):
         Returns:
             TTS响应对象
         """
-        start_time = time.time()
+        # 验证文本长度
+        if len(request.text) > 10000:
+            return TTSResponse(
+                success=False,
+                request=request,
+                error_message="文本长度超过限制（最大10000字符）",
+                error_code="TEXT_TOO_LONG",
+            )
 
-        try:
-            if not self.engine:
-                self._init_engine()
+        # 由基类完成合成及输出文件、字幕文件处理
+        return super().synthesize(request)
+
+    def synthesize_batch(self, requests: List[TTSRequest]) -> List[TTSResponse]:
+        """批量语音合成
+
+        各请求在线程池中同时提交，引擎线程把排队的请求合并进尽量少的runAndWait，
+        每个请求仍完整经过基类的限流、输出和字幕处理。
 
-            # 验证文本长度
-            if len(request.text) > 10000:
+        Args:
+            requests: TTS请求列表
+
+        Returns:
+            与请求一一对应的响应列表
+        """
+        if len(requests) <= 1:
+            return [self.synthesize(request) for request in requests]
+        with ThreadPoolExecutor(
+            max_workers=min(len(requests), self.max_batch),
+            thread_name_prefix="funtts-pyttsx3-batch",
+        ) as executor:
+            return list(executor.map(self.synthesize, requests))
+
+    def _synthesize(self, request: TTSRequest) -> TTSResponse:
+        """Pyttsx3语音合成核心方法：交给引擎线程执行并等待完成"""
+        start_time = time.time()
+        try:
+            logger.info(f"开始合成语音: {len(request.text)}字符")
+            job = self._submit(request)
+            try:
+                batched = job.future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                # 尚未开始执行的请求取消掉；已在runAndWait中的无法中断，
+                # 写完后删除其临时文件
+                if job.future.cancel():
+                    _discard(job.audio_file)
+                else:
+                    job.future.add_done_callback(lambda _: _discard(job.audio_file))
+                error_msg = f"Pyttsx3合成超时（{self.timeout}s）"
+                logger.error(error_msg)
                 return TTSResponse(
                     success=False,
                     request=request,
-                    error_message="文本长度超过限制（最大10000字符）",
-                    error_code="TEXT_TOO_LONG",
+                    error_message=error_msg,
+                    error_code="TIMEOUT_ERROR",
                     processing_time=time.time() - start_time,
                 )
 
-            # 准备输出文件
-            output_file = request.output_file
-            if not output_file:
-                output_file = tempfile.mktemp(suffix=".wav")
-
-            # 确保输出目录存在
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-            # 设置语音参数
-            self._configure_voice_parameters(request)
-
-            # 执行合成
-            logger.info(f"开始合成语音: {len(request.text)}字符")
-            self.engine.save_to_file(request.text, output_file)
-            self.engine.runAndWait()
-
             # 验证输出文件
-            if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+            if not os.path.exists(job.audio_file) or not os.path.getsize(
+                job.audio_file
+            ):
+                _discard(job.audio_file)
                 return TTSResponse(
                     success=False,
                     request=request,
-                    error_message=f"音频文件生成失败: {output_file}",
+                    error_message=f"音频文件生成失败: {job.audio_file}",
                     error_code="FILE_GENERATION_ERROR",
                     processing_time=time.time() - start_time,
                 )
 
-            # 获取音频时长
-            duration = self._estimate_audio_duration(output_file, request.text)
-
-            # 生成字幕（如果需要）
-            subtitle_file = None
-            frt_subtitle_file = None
+            duration = self._estimate_audio_duration(job.audio_file, request.text)
+            subtitle_maker = None
             if request.generate_subtitles:
-                subtitle_file, frt_subtitle_file = self._generate_subtitles(
-                    request, output_file, duration
-                )
-
-            logger.success(f"Pyttsx3合成完成: {output_file} ({duration:.2f}s)")
+                # pyttsx3不提供词边界，整句作为一个字幕片段
+                subtitle_maker = SubtitleMaker()
+                subtitle_maker.add_segment(0.0, duration, request.text)
 
+            logger.success(f"Pyttsx3合成完成: {job.audio_file} ({duration:.2f}s)")
             return TTSResponse(
                 success=True,
                 request=request,
-                audio_file=output_file,
-                subtitle_file=subtitle_file,
-                frt_subtitle_file=frt_subtitle_file,
+                audio_file=job.audio_file,
+                subtitle_maker=subtitle_maker,
                 duration=duration,
-                voice_used=self._get_current_voice_name(),
+                voice_used=self._voice_display_name(job.voice_id),
                 processing_time=time.time() - start_time,
-                engine_info=self.get_engine_info(),
+                # 与本请求在同一次runAndWait中完成的请求数
+                engine_info={"batched": batched},
             )
 
         except Exception as e:
@@ -200,75 +433,30 @@ class Pyttsx3TTS(BaseTTS):
                 processing_time=time.time() - start_time,
             )
 
-    def _configure_voice_parameters(self, request: TTSRequest):
-        """配置语音参数
-
-        Args:
-            request: TTS请求对象
-        """
+    def _submit(self, request: TTSRequest) -> _SaveJob:
+        """准备输出文件和语音参数，把请求放入引擎线程的队列"""
+        # 总是写入临时文件，成功后由基类移动到output_file：
+        # 超时的请求可能仍在runAndWait中写文件，不能让它写到最终路径覆盖重试的结果
+        audio_file = create_temp_file(suffix=".wav")
+
+        # 找不到语音时显式使用默认语音，避免沿用上一个请求设置的语音
+        voice_id = (
+            self._resolve_voice(request.voice_name or self.voice_name)
+            or self._resolve_voice(self.voice_name)
+            or self._resolve_voice("default")
+        )
         # 设置语音速率 (pyttsx3默认速率约200 words/min)
-        base_rate = 200
-        rate = int(base_rate * request.voice_rate * self.rate_multiplier)
+        rate = int(200 * request.voice_rate * self.rate_multiplier)
         rate = max(50, min(400, rate))  # 限制在合理范围内
-        self.engine.setProperty("rate", rate)
-
-        # 设置音量
-        volume = min(1.0, max(0.0, self.volume))
-        self.engine.setProperty("volume", volume)
+        volume = min(1.0, max(0.0, self.volume * request.voice_volume))
+        job = _SaveJob(request, audio_file, voice_id, rate, volume, Future())
+        self._owner.submit(job)
+        return job
 
-    def _get_current_voice_name(self) -> str:
-        """获取当前使用的语音名称"""
-        try:
-            if self.engine:
-                current_voice = self.engine.getProperty("voice")
-                voices = self.engine.getProperty("voices")
-                for voice in voices:
-                    if voice.id == current_voice:
-                        return voice.name
-        except Exception:
-            pass
-        return self.voice_name
-
-    def _generate_subtitles(
-        self, request: TTSRequest, audio_file: str, duration: float
-    ):
-        """生成字幕文件
-
-        Args:
-            request: TTS请求对象
-            audio_file: 音频文件路径
-            duration: 音频时长
-
-        Returns:
-            (subtitle_file, frt_subtitle_file) 字幕文件路径元组
-        """
-        try:
-            subtitle_maker = SubtitleMaker()
-
-            # 创建音频段
-            segment = AudioSegment(
-                start_time=0.0,
-                end_time=duration,
-                text=request.text,
-                voice_name=self._get_current_voice_name(),
-                speaker=getattr(request, "speaker", None),
-            )
-            subtitle_maker.add_segment(segment)
-
-            # 生成字幕文件
-            base_name = os.path.splitext(audio_file)[0]
-            subtitle_file = f"{base_name}.srt"
-            frt_subtitle_file = f"{base_name}.frt"
-
-            # 保存字幕
-            subtitle_maker.save_srt(subtitle_file)
-            subtitle_maker.save_frt(frt_subtitle_file)
-
-            return subtitle_file, frt_subtitle_file
-
-        except Exception as e:
-            logger.error(f"生成字幕失败: {str(e)}")
-            return None, None
+    def _voice_display_name(self, voice_id: Optional[str]) -> str:
+        """获取语音ID对应的显示名称"""
+        with self._voice_lock:
+            return self._voice_names.get(voice_id) or self.voice_name
 
     def list_voices(self, language: Optional[str] = None) -> List[VoiceInfo]:
         """获取可用的语音列表
@@ -280,10 +468,7 @@ class Pyttsx3TTS(BaseTTS):
             语音信息列表
         """
         try:
-            if not self.engine:
-                self._init_engine()
-
-            voices = self.engine.getProperty("voices")
+            voices = self._owner.call(lambda engine: engine.getProperty("voices"))
             if not voices:
                 logger.warning("未找到可用语音")
                 return []
@@ -421,6 +606,13 @@ class Pyttsx3TTS(BaseTTS):
         Returns:
             估算的时长（秒）
         """
+        try:
+            # WAV文件直接读取文件头，不启动外部进程
+            with wave.open(audio_file, "rb") as wav_file:
+                return wav_file.getnframes() / wav_file.getframerate()
+        except Exception:
+            pass
+
         try:
             # 尝试使用ffprobe获取精确时长
             import subprocess
@@ -477,12 +669,18 @@ class Pyttsx3TTS(BaseTTS):
             "default_voice": self.voice_name,
             "current_rate_multiplier": self.rate_multiplier,
             "current_volume": self.volume,
+            "run_stats": self._owner.stats() if self._owner else None,
         }
 
+    def close(self):
+        """停止引擎线程，队列中尚未执行的请求以失败结束"""
+        if self._owner is not None:
+            self._owner.close()
+
     def __del__(self):
         """析构函数，清理资源"""
-        if hasattr(self, "engine") and self.engine:
+        if getattr(self, "_owner", None) is not None:
             try:
-                self.engine.stop()
+                self._owner.close()
             except Exception:
                 pass
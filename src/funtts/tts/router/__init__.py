@@ -0,0 +1,7 @@
+"""
+多引擎路由模块
+"""
+
+from .tts import Backend, RouterTTS
+
+__all__ = ["RouterTTS", "Backend"]
@@ -0,0 +1,428 @@
+"""
+多引擎路由
+把请求分发到多个后端引擎：按观测到的延迟、并发占用和错误情况选择
+最有可能满足延迟目标的后端，失败时自动切换，后端持续出错时熔断。
+"""
+
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from funutil import getLogger
+
+from ...base import BaseTTS, CircuitBreaker
+from ...models import TTSRequest, TTSResponse, VoiceInfo
+
+logger = getLogger("funtts.tts.router")
+
+
+class Backend:
+    """路由器中的一个后端引擎及其运行统计"""
+
+    def __init__(
+        self,
+        engine: BaseTTS,
+        name: Optional[str] = None,
+        voice_name: Optional[str] = None,
+        voice_map: Optional[Dict[str, str]] = None,
+        max_concurrency: int = 8,
+        alpha: float = 0.2,
+        failure_threshold: int = 5,
+        error_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        refresh_seconds: float = 10.0,
+    ):
+        """
+        Args:
+            engine: 后端引擎实例
+            name: 后端名称，默认使用引擎类名
+            voice_name: 请求语音不在voice_map中时使用的语音，None表示沿用请求语音
+            voice_map: 路由器语音名到该后端语音名的映射
+            max_concurrency: 该后端的并发容量，超出部分按排队估算延迟
+            alpha: 延迟的指数移动平均系数
+            failure_threshold: 连续失败多少次后熔断
+            error_rate_threshold: 最近的请求中失败比例超过该值时熔断
+            open_seconds: 熔断持续时间（秒），之后放行一个探测请求
+            refresh_seconds: 延迟统计超过该时间（秒）没有更新时视为过期，
+                放行一个请求重新测量，使变慢后恢复的后端能重新获得流量
+        """
+        self.engine = engine
+        self.name = name or engine.__class__.__name__
+        self.voice_name = voice_name
+        self.voice_map = dict(voice_map or {})
+        self.max_concurrency = max(1, max_concurrency)
+        self.alpha = alpha
+        self.refresh_seconds = refresh_seconds
+        self.breaker = CircuitBreaker(
+            failure_rate_threshold=error_rate_threshold,
+            consecutive_failures=failure_threshold,
+            min_calls=failure_threshold,
+            open_seconds=open_seconds,
+            name=f"后端 {self.name}",
+        )
+
+        self.seconds_per_char: Optional[float] = None  # 每字符处理耗时（移动平均）
+        self.rtf: Optional[float] = None  # 实时率：处理耗时/音频时长（移动平均）
+        self.sampled_at = 0.0  # 最近一次更新延迟统计的时间
+        self.requests = 0
+        self.failures = 0
+        self._in_flight: Dict[int, float] = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def map_voice(self, voice_name: Optional[str]) -> Optional[str]:
+        """把路由器语音名映射为该后端的语音名"""
+        if voice_name in self.voice_map:
+            return self.voice_map[voice_name]
+        return self.voice_name or voice_name
+
+    def estimate(self, chars: int) -> float:
+        """估算该后端处理一个请求的延迟（秒），没有样本或样本过期时返回0"""
+        with self._lock:
+            now = time.time()
+            if self.seconds_per_char is None or (
+                not self._in_flight and now - self.sampled_at > self.refresh_seconds
+            ):
+                return 0.0
+            estimate = self.seconds_per_char * max(chars, 20)
+            # 运行中请求的耗时已经超过估算时，说明后端正在变慢
+            for started in self._in_flight.values():
+                estimate = max(estimate, now - started)
+            # 超出并发容量的部分需要排队
+            queued = len(self._in_flight) + 1 - self.max_concurrency
+            if queued > 0:
+                estimate *= 1 + queued / self.max_concurrency
+            return estimate
+
+    def available(self) -> bool:
+        """是否可以接收请求（熔断期间只放行探测请求）"""
+        return self.breaker.is_available()
+
+    def begin(self) -> Optional[int]:
+        """记录请求开始，返回用于结束记录的令牌；熔断时返回None"""
+        if not self.breaker.allow():
+            return None
+        with self._lock:
+            self._next_token += 1
+            self._in_flight[self._next_token] = time.time()
+            return self._next_token
+
+    def end(self, token: int, chars: int, response: Optional[TTSResponse]):
+        """记录请求结束并更新统计和熔断状态"""
+        success = response is not None and response.success
+        with self._lock:
+            started = self._in_flight.pop(token, time.time())
+            elapsed = time.time() - started
+            self.requests += 1
+            if success:
+                self.seconds_per_char = self._average(
+                    self.seconds_per_char, elapsed / max(chars, 20)
+                )
+                self.sampled_at = time.time()
+                if response.duration:
+                    self.rtf = self._average(self.rtf, elapsed / response.duration)
+            else:
+                self.failures += 1
+        self.breaker.record(success, elapsed)
+
+    def cancel(self, token: int):
+        """撤销请求记录，不计入统计"""
+        with self._lock:
+            self._in_flight.pop(token, None)
+        self.breaker.release()
+
+    def _average(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return current + self.alpha * (sample - current)
+
+    def stats(self) -> Dict[str, Any]:
+        breaker = self.breaker.stats()
+        with self._lock:
+            return {
+                "state": breaker["state"],
+                "in_flight": len(self._in_flight),
+                "max_concurrency": self.max_concurrency,
+                "seconds_per_char": self.seconds_per_char,
+                "rtf": self.rtf,
+                "error_rate": breaker["failure_rate"],
+                "requests": self.requests,
+                "failures": self.failures,
+                "circuit_breaker": breaker,
+            }
+
+
+class RouterTTS(BaseTTS):
+    """
+    多引擎路由器
+
+    特性:
+    - 后端按优先级排列，优先使用第一个预计能满足延迟目标的后端
+    - 都无法满足时选择预计延迟最小的后端，云端变慢时流量转向本地引擎
+    - 跟踪每个后端的延迟、实时率、错误率和运行中请求数
+    - 失败时按顺序切换到其他后端，持续出错的后端被熔断并定期探测
+    - 路由器语音名可以按后端映射为各自的语音名
+
+    限流、对冲等策略应配置在各个后端引擎上。
+    """
+
+    def __init__(
+        self,
+        voice_name: Optional[str] = None,
+        backends: Optional[List[Union[BaseTTS, str, Dict[str, Any]]]] = None,
+        latency_target: Optional[float] = None,
+        **kwargs,
+    ):
+        """
+        初始化路由器
+
+        Args:
+            voice_name: 默认语音名称（路由器语音名）
+            backends: 后端列表，按优先级排列，每项可以是：
+                - BaseTTS实例
+                - 引擎名称，如 "edge"
+                - 字典：{"engine": 引擎名称或实例, "name", "voice_name",
+                  "voice_map", "max_concurrency", "engine_kwargs", ...}，
+                  其余键作为Backend参数
+                未指定时读取config中的backends
+            latency_target: 延迟目标（秒），未指定时读取config中的latency_target，默认3秒
+            **kwargs: 其他配置参数
+        """
+        super().__init__(voice_name, **kwargs)
+        self.voice_name = voice_name
+        config = kwargs.get("config") or {}
+        if latency_target is None:
+            latency_target = config.get("latency_target", 3.0)
+        self.latency_target = latency_target
+        if backends is None:
+            backends = config.get("backends", [])
+        self.backends: List[Backend] = [self._create_backend(spec) for spec in backends]
+        if not self.backends:
+            logger.warning("路由器没有配置后端引擎")
+        else:
+            logger.info(
+                f"路由器初始化完成，后端: {[backend.name for backend in self.backends]}"
+            )
+
+    @staticmethod
+    def _create_backend(spec: Union[BaseTTS, str, Dict[str, Any]]) -> Backend:
+        if isinstance(spec, Backend):
+            return spec
+        if isinstance(spec, BaseTTS):
+            return Backend(spec)
+        if isinstance(spec, str):
+            spec = {"engine": spec}
+
+        options = dict(spec)
+        engine = options.pop("engine")
+        engine_kwargs = options.pop("engine_kwargs", {})
+        if isinstance(engine, str):
+            from ...factory import TTSFactory
+
+            options.setdefault("name", engine)
+            voice_name = engine_kwargs.pop("voice_name", options.get("voice_name"))
+            engine = TTSFactory.create_tts(engine, voice_name, **engine_kwargs)
+        return Backend(engine, **options)
+
+    def add_backend(self, backend: Union[BaseTTS, str, Dict[str, Any]]) -> Backend:
+        """追加一个后端（优先级最低）"""
+        backend = self._create_backend(backend)
+        self.backends.append(backend)
+        return backend
+
+    def _candidates(self, request: TTSRequest) -> List[Backend]:
+        """按路由顺序排列可用后端
+
+        先是预计满足延迟目标的后端（保持优先级顺序），
+        然后是其余后端（按预计延迟升序）。
+        """
+        chars = len(request.text)
+        meeting, missing = [], []
+        for backend in self.backends:
+            if not backend.available():
+                continue
+            estimate = backend.estimate(chars)
+            if estimate <= self.latency_target:
+                meeting.append(backend)
+            else:
+                missing.append((estimate, backend))
+        missing.sort(key=lambda item: item[0])
+        return meeting + [backend for _, backend in missing]
+
+    def synthesize(self, request: TTSRequest) -> TTSResponse:
+        """
+        语音合成实现
+
+        后端引擎负责输出文件和字幕文件处理，路由器只选择后端。
+
+        Args:
+            request: TTS请求对象
+
+        Returns:
+            TTSResponse: 第一个成功的后端响应，全部失败时为最后一个失败响应
+        """
+        start_time = time.time()
+        if not request.validate():
+            return TTSResponse(
+                success=False,
+                request=request,
+                error_message="请求参数验证失败",
+                error_code="INVALID_REQUEST",
+            )
+
+        response = self._synthesize(request)
+        response.request = request
+        response.processing_time = time.time() - start_time
+        return response
+
+    def _synthesize(self, request: TTSRequest) -> TTSResponse:
+        """依次尝试候选后端，直到成功"""
+        response = None
+        attempts = []
+        for backend in self._candidates(request):
+            backend_request = replace(
+                request, voice_name=backend.map_voice(request.voice_name)
+            )
+            token = backend.begin()
+            if token is None:
+                continue
+            response = None
+            try:
+                response = backend.engine.synthesize(backend_request)
+            except Exception as e:
+                logger.error(f"后端 {backend.name} 合成异常: {e}")
+                response = TTSResponse(
+                    success=False,
+                    request=request,
+                    error_message=str(e),
+                    error_code="BACKEND_ERROR",
+                )
+            finally:
+                backend.end(token, len(request.text), response)
+
+            attempts.append(backend.name)
+            if response.success:
+                break
+            logger.warning(
+                f"后端 {backend.name} 合成失败，尝试下一个: {response.error_message}"
+            )
+
+        if response is None:
+            return TTSResponse(
+                success=False,
+                request=request,
+                error_message="没有可用的后端引擎（全部熔断或未配置）",
+                error_code="NO_BACKEND",
+            )
+        response.engine_info["router_backend"] = attempts[-1]
+        response.engine_info["router_attempts"] = attempts
+        return response
+
+    def synthesize_stream(self, request: TTSRequest) -> Iterator[Dict[str, Any]]:
+        """流式语音合成，使用第一个支持流式合成的候选后端
+
+        开始产出数据后不再切换后端。只有后端自身的迭代器抛出异常才计为失败，
+        调用方提前关闭流（如客户端断开连接）时撤销请求记录，不影响熔断状态。
+        """
+        chars = len(request.text)
+        for backend in self._candidates(request):
+            backend_request = replace(
+                request, voice_name=backend.map_voice(request.voice_name)
+            )
+            token = backend.begin()
+            if token is None:
+                continue
+            stream = None
+            try:
+                stream = iter(backend.engine.synthesize_stream(backend_request))
+                try:
+                    first = next(stream)
+                except StopIteration:
+                    first = None
+            except NotImplementedError:
+                # 不支持流式合成不计为后端失败
+                backend.cancel(token)
+                _close_stream(stream)
+                continue
+            except Exception as e:
+                logger.warning(f"后端 {backend.name} 流式合成失败，尝试下一个: {e}")
+                backend.end(token, chars, None)
+                _close_stream(stream)
+                continue
+
+            failed = False
+            try:
+                if first is not None:
+                    yield first
+                while True:
+                    try:
+                        event = next(stream)
+                    except StopIteration:
+                        break
+                    except Exception:
+                        failed = True
+                        raise
+                    yield event
+            except BaseException:
+                # GeneratorExit等来自调用方的退出不是后端的问题
+                if failed:
+                    backend.end(token, chars, None)
+                else:
+                    backend.cancel(token)
+                raise
+            else:
+                backend.end(token, chars, TTSResponse(success=True))
+            finally:
+                _close_stream(stream)
+            return
+
+        raise RuntimeError("没有可用的支持流式合成的后端引擎")
+
+    def list_voices(self, language: Optional[str] = None) -> List[VoiceInfo]:
+        """
+        获取所有后端的语音列表（按名称去重）
+
+        Args:
+            language: 语言过滤条件
+
+        Returns:
+            List[VoiceInfo]: 语音信息列表
+        """
+        voices: Dict[str, VoiceInfo] = {}
+        for backend in self.backends:
+            try:
+                for voice in backend.engine.list_voices(language):
+                    voices.setdefault(voice.name, voice)
+            except Exception as e:
+                logger.error(f"获取后端 {backend.name} 语音列表失败: {e}")
+        return list(voices.values())
+
+    def get_default_voice(self) -> Optional[str]:
+        """返回配置的默认语音，未配置时由各后端使用自己的默认语音"""
+        return self.voice_name
+
+    def get_backend_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取每个后端的路由统计"""
+        return {backend.name: backend.stats() for backend in self.backends}
+
+    def get_engine_info(self) -> Dict[str, Any]:
+        """获取引擎信息"""
+        info = super().get_engine_info()
+        info["latency_target"] = self.latency_target
+        info["backends"] = self.get_backend_stats()
+        return info
+
+
+def _close_stream(stream: Optional[Iterator[Dict[str, Any]]]):
+    """关闭后端的流式迭代器，使其释放连接和线程"""
+    close = getattr(stream, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            logger.warning(f"关闭后端流式合成失败: {e}")
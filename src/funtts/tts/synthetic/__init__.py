@@ -0,0 +1,7 @@
+"""
+合成测试引擎模块
+"""
+
+from .tts import SyntheticTTS
+
+__all__ = ["SyntheticTTS"]
@@ -0,0 +1,194 @@
+"""
+合成测试引擎
+不依赖任何模型或网络，按设定的实时率生成正弦波音频和词边界，
+用于服务端压测、流水线调试和性能基准。
+"""
+
+import asyncio
+import math
+import re
+import struct
+import time
+import wave
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from funutil import getLogger
+
+from ...base import BaseTTS
+from ...models import SubtitleMaker, TTSRequest, TTSResponse, VoiceInfo
+from ...utils.file_utils import create_temp_file
+
+logger = getLogger("funtts.tts.synthetic")
+
+# 中日韩字符各算一个词，其他按空白和标点分词，标点不计入
+_WORD_PATTERN = re.compile(
+    r"[\u3400-\u9fff\uf900-\ufaff]|[^\W\u3400-\u9fff\uf900-\ufaff]+"
+)
+
+
+class SyntheticTTS(BaseTTS):
+    """
+    合成测试引擎
+
+    特性:
+    - 音频时长按文本长度估算（chars_per_second）
+    - 合成耗时 = 音频时长 × rtf，模拟真实引擎的处理速度
+    - 支持流式合成，按chunk_ms分块产出音频和词边界
+    - 提供原生异步实现，可用于验证对冲请求的取消
+    - 生成16位单声道正弦波，不需要任何依赖
+    """
+
+    supported_formats = ["wav"]
+
+    def __init__(self, voice_name: str = "synthetic", **kwargs):
+        """
+        初始化合成测试引擎
+
+        Args:
+            voice_name: 默认语音名称
+            **kwargs: 其他配置参数（也可以放在config中），包括:
+                - rtf: 实时率（合成耗时/音频时长），默认0.1
+                - first_chunk_latency: 首块音频前的固定延迟（秒），默认0.05
+                - chars_per_second: 每秒朗读的字符数，默认8
+                - sample_rate: 采样率，默认16000
+                - chunk_ms: 流式合成每块音频的时长（毫秒），默认100
+                - frequency: 正弦波频率（Hz），默认440
+                - voice_switch_latency: 换用与上一次不同的语音时的额外延迟（秒），
+                  模拟本地模型加载说话人/语音提示的开销，默认0
+        """
+        super().__init__(voice_name, **kwargs)
+        options = {**(kwargs.get("config") or {}), **kwargs}
+        self.voice_name = voice_name
+        self.rtf = options.get("rtf", 0.1)
+        self.first_chunk_latency = options.get("first_chunk_latency", 0.05)
+        self.chars_per_second = options.get("chars_per_second", 8.0)
+        self.sample_rate = options.get("sample_rate", 16000)
+        self.chunk_ms = options.get("chunk_ms", 100)
+        self.frequency = options.get("frequency", 440.0)
+        self.voice_switch_latency = options.get("voice_switch_latency", 0.0)
+        self._tone: Optional[bytes] = None
+        self._loaded_voice: Optional[str] = None
+
+    def _plan(
+        self, request: TTSRequest
+    ) -> Tuple[float, List[Tuple[float, float, str]]]:
+        """估算音频时长和每个词的起止时间"""
+        words = _WORD_PATTERN.findall(request.text)
+        seconds_per_char = 1.0 / (self.chars_per_second * request.voice_rate)
+        boundaries = []
+        position = 0.0
+        for word in words:
+            length = len(word) * seconds_per_char
+            boundaries.append((position, position + length, word))
+            position += length
+        return max(position, 0.1), boundaries
+
+    def _pcm(self, start_sample: int, count: int) -> bytes:
+        """生成从start_sample开始的count个采样"""
+        if self._tone is None:
+            # 预先生成1秒的波形循环使用，避免合成耗时被Python计算正弦占满
+            step = 2 * math.pi * self.frequency / self.sample_rate
+            self._tone = struct.pack(
+                f"<{self.sample_rate}h",
+                *(int(8000 * math.sin(step * i)) for i in range(self.sample_rate)),
+            )
+        offset = start_sample % self.sample_rate
+        repeat = (offset + count) // self.sample_rate + 1
+        return (self._tone * repeat)[offset * 2 : (offset + count) * 2]
+
+    def _synthesize(self, request: TTSRequest) -> TTSResponse:
+        """生成完整音频文件"""
+        duration, _ = self._plan(request)
+        first_audio = self._first_audio_callback()
+        time.sleep(self._switch_voice(request) + self.first_chunk_latency)
+        first_audio()
+        time.sleep(duration * self.rtf)
+        return self._render(request)
+
+    async def _asynthesize(self, request: TTSRequest) -> TTSResponse:
+        """原生异步合成，取消时不产生文件"""
+        duration, _ = self._plan(request)
+        await asyncio.sleep(self._switch_voice(request) + self.first_chunk_latency)
+        self._first_audio_callback()()
+        await asyncio.sleep(duration * self.rtf)
+        return self._render(request)
+
+    def _switch_voice(self, request: TTSRequest) -> float:
+        """换用语音的额外延迟（秒）"""
+        voice_name = request.voice_name or self.voice_name
+        if self.voice_switch_latency and voice_name != self._loaded_voice:
+            self._loaded_voice = voice_name
+            return self.voice_switch_latency
+        return 0.0
+
+    def _render(self, request: TTSRequest) -> TTSResponse:
+        """写出音频文件和词边界"""
+        duration, boundaries = self._plan(request)
+        voice_name = request.voice_name or self.voice_name
+        audio_file = request.output_file or create_temp_file(suffix=".wav")
+        samples = int(duration * self.sample_rate)
+        with wave.open(audio_file, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            wav_file.writeframes(self._pcm(0, samples))
+
+        subtitle_maker = None
+        if request.generate_subtitles:
+            subtitle_maker = SubtitleMaker()
+            for start, end, word in boundaries:
+                subtitle_maker.add_segment(start, end, word)
+
+        return TTSResponse(
+            success=True,
+            request=request,
+            audio_file=audio_file,
+            subtitle_maker=subtitle_maker,
+            duration=samples / self.sample_rate,
+            voice_used=voice_name,
+        )
+
+    def synthesize_stream(self, request: TTSRequest) -> Iterator[Dict[str, Any]]:
+        """流式合成：按实时率逐块产出原始PCM（16位单声道）和词边界"""
+        duration, boundaries = self._plan(request)
+        total = int(duration * self.sample_rate)
+        chunk = max(1, int(self.sample_rate * self.chunk_ms / 1000))
+
+        with self._limited(len(request.text)):
+            time.sleep(self.first_chunk_latency)
+            next_boundary = 0
+            for start in range(0, total, chunk):
+                count = min(chunk, total - start)
+                time.sleep(count / self.sample_rate * self.rtf)
+                chunk_end = (start + count) / self.sample_rate
+                while (
+                    next_boundary < len(boundaries)
+                    and boundaries[next_boundary][0] < chunk_end
+                ):
+                    begin, end, word = boundaries[next_boundary]
+                    yield {
+                        "type": "WordBoundary",
+                        "start_time": begin,
+                        "end_time": end,
+                        "text": word,
+                    }
+                    next_boundary += 1
+                yield {"type": "audio", "data": self._pcm(start, count)}
+
+    def stream_content_type(self, request: TTSRequest) -> str:
+        return f"audio/L16; rate={self.sample_rate}; channels=1"
+
+    def list_voices(self, language: Optional[str] = None) -> List[VoiceInfo]:
+        return [
+            VoiceInfo(
+                name=self.voice_name,
+                display_name="Synthetic",
+                language=language or "zh-CN",
+                gender="Neutral",
+                sample_rate=self.sample_rate,
+                description="测试用合成正弦波语音",
+            )
+        ]
+
+    def get_default_voice(self) -> Optional[str]:
+        return self.voice_name
@@ -7,7 +7,6 @@ Tortoise TTS是一个高质量的语音克隆TTS模型，能够生成极其逼
 
 import os
 import time
-import tempfile
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from loguru import logger
@@ -15,6 +14,9 @@ from loguru import logger
 from funtts.base import BaseTTS
 from funtts.models import TTSRequest, TTSResponse, VoiceInfo, AudioSegment
 from funtts.models.subtitle import SubtitleMaker
+from funtts.utils.file_utils import allocate_path
+from funtts.utils.torch_profile import CPUProfile
+from funtts.utils.workspace import get_workspace
 
 
 class TortoiseTTS(BaseTTS):
@@ -26,12 +28,15 @@ class TortoiseTTS(BaseTTS):
 
         Args:
             device: 计算设备 ('cpu', 'cuda', 'auto')
-            **kwargs: 其他配置参数
+            **kwargs: 其他配置参数，包括:
+                - cpu_profile: CPU推理配置，CPUProfile实例、参数字典或预设名
         """
         super().__init__(**kwargs)
 
         self.device = self._setup_device(device)
         self.api = None
+        self.cpu_profile = CPUProfile.from_value(kwargs.get("cpu_profile"))
+        self.quantized_modules: List[str] = []
 
         # 配置参数
         self.config = {
@@ -68,6 +73,7 @@ class TortoiseTTS(BaseTTS):
             from tortoise.api import TextToSpeech
 
             logger.info("正在加载Tortoise TTS模型...")
+            self.cpu_profile.apply_threads()
 
             # 初始化API
             self.api = TextToSpeech(
@@ -75,6 +81,14 @@ class TortoiseTTS(BaseTTS):
                 kv_cache=True,
                 half=(self.device == "cuda"),
             )
+            # 自回归模型和CLVP中的线性层；扩散模型和声码器以卷积为主
+            self.quantized_modules = self.cpu_profile.quantize_modules(
+                self.device,
+                {
+                    "autoregressive": getattr(self.api, "autoregressive", None),
+                    "clvp": getattr(self.api, "clvp", None),
+                },
+            )
 
             logger.success("Tortoise TTS模型加载成功")
 
@@ -102,30 +116,29 @@ class TortoiseTTS(BaseTTS):
             logger.info(f"开始Tortoise TTS语音合成: {request.text[:50]}...")
             start_time = time.time()
 
-            # 准备输出文件路径
-            timestamp = int(time.time() * 1000)
-            base_name = f"tortoise_output_{timestamp}"
-
-            if request.output_dir:
-                output_dir = Path(request.output_dir)
-                output_dir.mkdir(parents=True, exist_ok=True)
+            # 准备输出文件路径（已知最终路径时直接写入，避免再复制一次）
+            if request.output_file:
+                audio_file = Path(request.output_file)
             else:
-                output_dir = Path(tempfile.gettempdir()) / "funtts"
-                output_dir.mkdir(parents=True, exist_ok=True)
-
-            audio_file = output_dir / f"{base_name}.wav"
+                # 分配不冲突的文件名，未指定输出目录时在临时工作区中分配
+                audio_file = Path(
+                    allocate_path(
+                        ".wav", request.output_dir, prefix="tortoise_output_"
+                    )
+                )
 
             # 准备合成参数
             voice_name = request.voice_name or "random"
 
             # 执行语音合成
-            gen = self.api.tts_with_preset(
-                text=request.text,
-                voice_samples=None,  # 使用预设语音
-                conditioning_latents=None,
-                preset=self.config["preset"],
-                k=self.config["candidates"],
-            )
+            with self.cpu_profile.inference():
+                gen = self.api.tts_with_preset(
+                    text=request.text,
+                    voice_samples=None,  # 使用预设语音
+                    conditioning_latents=None,
+                    preset=self.config["preset"],
+                    k=self.config["candidates"],
+                )
 
             # 保存音频文件
             import torchaudio
@@ -155,18 +168,22 @@ class TortoiseTTS(BaseTTS):
 
                 # 生成标准字幕
                 if "srt" in request.subtitle_format.lower():
-                    subtitle_file = output_dir / f"{base_name}.srt"
+                    subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "srt"
+                    )
                     subtitle_maker.save_srt(subtitle_file)
 
                 # 生成FRT字幕
                 if "frt" in request.subtitle_format.lower():
-                    frt_subtitle_file = output_dir / f"{base_name}.frt"
+                    frt_subtitle_file = SubtitleMaker.generate_subtitle_filename(
+                        str(audio_file), "frt"
+                    )
                     subtitle_maker.save_frt(frt_subtitle_file)
 
             synthesis_time = time.time() - start_time
             logger.success(f"Tortoise TTS语音合成完成，耗时: {synthesis_time:.2f}秒")
 
-            return TTSResponse(
+            response = TTSResponse(
                 audio_file=str(audio_file),
                 subtitle_file=str(subtitle_file) if subtitle_file else None,
                 frt_subtitle_file=str(frt_subtitle_file) if frt_subtitle_file else None,
@@ -175,6 +192,8 @@ class TortoiseTTS(BaseTTS):
                 voice_name=voice_name,
                 engine_name="Tortoise TTS",
             )
+            # 临时工作区中的文件随响应对象释放
+            return get_workspace().attach(response)
 
         except Exception as e:
             logger.error(f"Tortoise TTS语音合成失败: {e}")
@@ -209,13 +228,14 @@ class TortoiseTTS(BaseTTS):
                 voice_samples_audio.append(audio)
 
             # 执行语音克隆
-            gen = self.api.tts_with_preset(
-                text=text,
-                voice_samples=voice_samples_audio,
-                conditioning_latents=None,
-                preset=self.config["preset"],
-                k=self.config["candidates"],
-            )
+            with self.cpu_profile.inference():
+                gen = self.api.tts_with_preset(
+                    text=text,
+                    voice_samples=voice_samples_audio,
+                    conditioning_latents=None,
+                    preset=self.config["preset"],
+                    k=self.config["candidates"],
+                )
 
             # 保存音频
             torchaudio.save(
@@ -383,5 +403,9 @@ class TortoiseTTS(BaseTTS):
             "device": self.device,
             "sample_rate": self.config["sample_rate"],
             "preset": self.config["preset"],
+            "cpu_profile": {
+                **self.cpu_profile.describe(),
+                "quantized_modules": self.quantized_modules,
+            },
             "note": "合成速度较慢，但音质极佳，适合高质量应用",
         }
@@ -6,5 +6,23 @@ FunTTS工具函数模块
 from .audio_utils import merge_audio_files
 from .subtitle_utils import merge_subtitle_makers
 from .response_utils import merge_tts_responses
+from .workspace import TempWorkspace, configure_workspace, get_workspace
+from .stream_writer import AudioStreamWriter, SubtitleStreamWriter
+from .text_utils import chunk_text, normalize_text, split_sentences
+from .torch_profile import CPU_PROFILE_PRESETS, CPUProfile
 
-__all__ = ["merge_audio_files", "merge_subtitle_makers", "merge_tts_responses"]
+__all__ = [
+    "merge_audio_files",
+    "merge_subtitle_makers",
+    "merge_tts_responses",
+    "TempWorkspace",
+    "configure_workspace",
+    "get_workspace",
+    "AudioStreamWriter",
+    "SubtitleStreamWriter",
+    "chunk_text",
+    "normalize_text",
+    "split_sentences",
+    "CPUProfile",
+    "CPU_PROFILE_PRESETS",
+]
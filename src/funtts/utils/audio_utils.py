@@ -4,9 +4,11 @@
 """
 
 import os
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from funutil import getLogger
 
+from .workspace import get_workspace
+
 logger = getLogger("funtts")
 
 
@@ -75,53 +77,56 @@ def _merge_with_ffmpeg(
     try:
         import subprocess
 
-        # 创建临时文件列表
-        temp_list_file = "temp_audio_list.txt"
-
-        with open(temp_list_file, "w") as f:
-            for i, audio_file in enumerate(audio_files):
-                f.write(f"file '{audio_file}'\n")
-                if i < len(audio_files) - 1:  # 不在最后一个文件后添加静音
-                    # 创建临时静音文件
-                    silence_file = f"temp_silence_{i}.wav"
-                    subprocess.run(
-                        [
-                            "ffmpeg",
-                            "-f",
-                            "lavfi",
-                            "-i",
-                            f"anullsrc=duration={silence_duration}",
-                            "-y",
-                            silence_file,
-                        ],
-                        check=True,
-                        capture_output=True,
-                    )
-                    f.write(f"file '{silence_file}'\n")
-
-        # 使用ffmpeg合并
-        cmd = [
-            "ffmpeg",
-            "-f",
-            "concat",
-            "-safe",
-            "0",
-            "-i",
-            temp_list_file,
-            "-c",
-            "copy",
-            "-y",
-            output_file,
-        ]
-
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-
-        # 清理临时文件
-        os.remove(temp_list_file)
-        for i in range(len(audio_files) - 1):
-            silence_file = f"temp_silence_{i}.wav"
-            if os.path.exists(silence_file):
-                os.remove(silence_file)
+        # 中间文件在临时工作区中分配，不再写入当前目录
+        workspace = get_workspace()
+        temp_list_file = workspace.allocate(suffix=".txt", prefix="concat_")
+        temp_files = [temp_list_file]
+
+        try:
+            with open(temp_list_file, "w") as f:
+                for i, audio_file in enumerate(audio_files):
+                    f.write(f"file '{os.path.abspath(audio_file)}'\n")
+                    if i < len(audio_files) - 1:  # 不在最后一个文件后添加静音
+                        # 创建临时静音文件
+                        silence_file = workspace.allocate(
+                            suffix=".wav", prefix="silence_"
+                        )
+                        temp_files.append(silence_file)
+                        subprocess.run(
+                            [
+                                "ffmpeg",
+                                "-f",
+                                "lavfi",
+                                "-i",
+                                f"anullsrc=duration={silence_duration}",
+                                "-y",
+                                silence_file,
+                            ],
+                            check=True,
+                            capture_output=True,
+                        )
+                        f.write(f"file '{silence_file}'\n")
+
+            # 使用ffmpeg合并
+            cmd = [
+                "ffmpeg",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                temp_list_file,
+                "-c",
+                "copy",
+                "-y",
+                output_file,
+            ]
+
+            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        finally:
+            # 清理临时文件
+            for temp_file in temp_files:
+                workspace.discard(temp_file)
 
         logger.success(f"音频合并完成(ffmpeg): {output_file}")
         return True
@@ -233,3 +238,78 @@ def convert_audio_format(
     except Exception as e:
         logger.error(f"音频格式转换失败: {e}")
         return False
+
+
+# MPEG Layer III比特率表（kbps），按MPEG1和MPEG2/2.5区分
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# 采样率表，键为MPEG版本位（3: MPEG1, 2: MPEG2, 0: MPEG2.5）
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+def mp3_frame_index(data: bytes) -> List[Tuple[int, float]]:
+    """解析MP3数据的帧索引
+
+    只解析帧头，不解码音频，可用于按时间在帧边界切分MP3数据。
+
+    Args:
+        data: MP3数据（Layer III，可带ID3v2标签）
+
+    Returns:
+        List[Tuple[int, float]]: 每帧的(字节偏移, 开始时间秒)
+
+    Raises:
+        ValueError: 数据不是有效的MPEG Layer III流
+    """
+    pos = 0
+    # 跳过ID3v2标签
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (
+            (data[6] & 0x7F) << 21
+            | (data[7] & 0x7F) << 14
+            | (data[8] & 0x7F) << 7
+            | (data[9] & 0x7F)
+        )
+        pos = 10 + size
+
+    frames = []
+    elapsed = 0.0
+    while pos + 4 <= len(data):
+        header = int.from_bytes(data[pos : pos + 4], "big")
+        if header >> 21 != 0x7FF:
+            if frames:
+                break
+            pos += 1
+            continue
+
+        version = (header >> 19) & 0x3
+        layer = (header >> 17) & 0x3
+        bitrate_index = (header >> 12) & 0xF
+        sample_rate_index = (header >> 10) & 0x3
+        padding = (header >> 9) & 0x1
+        if (
+            version == 1
+            or layer != 1
+            or bitrate_index in (0, 15)
+            or sample_rate_index == 3
+        ):
+            raise ValueError(f"不支持的MP3帧头: offset={pos}")
+
+        bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+        samples = 1152 if version == 3 else 576
+        frame_length = (samples // 8) * bitrate // sample_rate + padding
+
+        frames.append((pos, elapsed))
+        elapsed += samples / sample_rate
+        pos += frame_length
+
+    if not frames:
+        raise ValueError("未找到MP3帧")
+    return frames
@@ -0,0 +1,174 @@
+"""
+文件处理工具函数
+提供funtts临时文件管理和输出文件落盘（移动/硬链接/复制）等功能
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+from funutil import getLogger
+
+from .workspace import get_workspace
+
+logger = getLogger("funtts")
+
+
+def get_temp_dir() -> str:
+    """获取funtts临时文件目录（当前进程的临时工作区）"""
+    return get_workspace().path
+
+
+def create_temp_file(suffix: str = "", prefix: str = "funtts_") -> str:
+    """创建由funtts拥有的临时文件
+
+    在临时工作区中原子创建文件，之后落盘到输出路径时可以直接移动而不必复制；
+    作为响应文件返回时由工作区按引用计数和配额管理其生命周期。
+
+    Args:
+        suffix: 文件后缀（如 ".wav"）
+        prefix: 文件名前缀
+
+    Returns:
+        str: 临时文件路径
+    """
+    return get_workspace().allocate(suffix=suffix, prefix=prefix)
+
+
+def new_file_id() -> str:
+    """生成唯一的文件标识（毫秒时间戳 + 随机串），按创建时间排序"""
+    return f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:12]}"
+
+
+def content_file_id(*parts: Any) -> str:
+    """根据内容生成确定性的文件标识，相同内容得到相同标识"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """分块计算文件内容的sha256，大文件也不会整体读入内存"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def allocate_path(
+    suffix: str = "",
+    output_dir: Optional[str] = None,
+    prefix: str = "funtts_",
+    content_id: Optional[str] = None,
+) -> str:
+    """分配不冲突的输出文件路径
+
+    - 默认使用唯一标识命名，并以O_EXCL原子创建文件，并发请求不会互相覆盖
+    - 指定content_id时按内容命名，相同内容总是得到同一路径（用于缓存/去重）
+    - 未指定输出目录时在临时工作区中分配
+
+    Args:
+        suffix: 文件后缀（如 ".wav"）
+        output_dir: 输出目录
+        prefix: 文件名前缀
+        content_id: 内容标识，见content_file_id
+
+    Returns:
+        str: 已创建的文件路径
+    """
+    if not output_dir and content_id is None:
+        return create_temp_file(suffix=suffix, prefix=prefix)
+
+    directory = output_dir or get_temp_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    if content_id is not None:
+        path = os.path.join(directory, f"{prefix}{content_id}{suffix}")
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o644))
+        register_temp_file(path)
+        return path
+
+    while True:
+        path = os.path.join(directory, f"{prefix}{new_file_id()}{suffix}")
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return path
+        except FileExistsError:
+            continue
+
+
+def register_temp_file(file_path: str):
+    """登记funtts拥有的临时文件（须位于临时工作区内）"""
+    get_workspace().adopt(file_path)
+
+
+def unregister_temp_file(file_path: str):
+    """取消登记临时文件（文件被移动到工作区之外后调用）"""
+    get_workspace().forget(file_path)
+
+
+def is_temp_file(file_path: str) -> bool:
+    """判断文件是否为funtts拥有的临时文件"""
+    return get_workspace().owns(file_path)
+
+
+def materialize_file(
+    src: str, dst: str, move: bool = False, link: bool = False
+) -> str:
+    """将文件落盘到目标路径
+
+    - move: 同一文件系统内使用os.replace直接改名，跨设备时复制后删除源文件
+    - link: 同一文件系统内创建硬链接（保留源文件），失败时复制
+    - 其他情况：缓冲复制文件内容（不复制元数据）
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+        move: 是否可以消耗源文件
+        link: 保留源文件时是否优先使用硬链接
+
+    Returns:
+        str: 目标文件路径
+    """
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return dst
+
+    if move:
+        try:
+            os.replace(src, dst)
+            unregister_temp_file(src)
+            return dst
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        shutil.copyfile(src, dst)
+        os.remove(src)
+        unregister_temp_file(src)
+        return dst
+
+    if link:
+        # 目标已是源文件的硬链接：对同一inode的两个名称改名不会做任何事，临时链接会残留
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            return dst
+        # 先链接到临时名称再替换，保证目标已存在时也是原子操作
+        link_path = f"{dst}.{os.getpid()}.{threading.get_ident()}.link"
+        try:
+            os.link(src, link_path)
+            os.replace(link_path, dst)
+            return dst
+        except OSError as e:
+            logger.debug(f"硬链接失败，改为复制: {e}")
+        finally:
+            if os.path.lexists(link_path):
+                os.remove(link_path)
+
+    shutil.copyfile(src, dst)
+    return dst
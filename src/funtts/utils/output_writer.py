@@ -0,0 +1,120 @@
+"""
+后台输出写入器
+在响应返回后异步执行音频复制、字幕序列化等磁盘I/O（write-behind）
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Set
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+
+class OutputWriter:
+    """有界的后台写入线程池
+
+    - 待完成任务数达到 ``max_pending`` 时，``submit`` 会阻塞调用方（背压），
+      避免磁盘跟不上时无限堆积内存
+    - ``submit`` 返回 ``Future``，需要持久化保证的调用方可以等待单个任务
+    - ``flush`` 等待所有已提交的任务完成
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 64):
+        """
+        Args:
+            max_workers: 写入线程数
+            max_pending: 最大待完成任务数（包括正在执行的任务）
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="funtts-writer"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """提交写入任务
+
+        Args:
+            fn: 写入函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            Future: 任务结果
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def submit_all(self, tasks: List[Callable[[], None]]) -> Future:
+        """将多个无参写入任务作为一个任务按顺序提交"""
+        return self.submit(_run_tasks, tasks)
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"后台写入失败: {future.exception()}")
+
+    @property
+    def pending_count(self) -> int:
+        """待完成的任务数"""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待当前所有已提交的任务完成
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+
+        Returns:
+            bool: 是否在超时前全部完成
+        """
+        with self._lock:
+            pending = list(self._pending)
+        if not pending:
+            return True
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    def shutdown(self, wait: bool = True):
+        """关闭写入器
+
+        Args:
+            wait: 是否等待已提交的任务完成
+        """
+        self._executor.shutdown(wait=wait)
+
+
+def _run_tasks(tasks: List[Callable[[], None]]):
+    for task in tasks:
+        task()
+
+
+# 全局写入器实例
+_global_writer: Optional[OutputWriter] = None
+_global_writer_lock = threading.Lock()
+
+
+def get_output_writer() -> OutputWriter:
+    """获取全局后台写入器实例"""
+    global _global_writer
+    with _global_writer_lock:
+        if _global_writer is None:
+            _global_writer = OutputWriter()
+        return _global_writer
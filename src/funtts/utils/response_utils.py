@@ -8,6 +8,7 @@ from typing import List, Optional, Dict, Any
 from ..models import TTSResponse
 from .audio_utils import merge_audio_files, get_audio_duration
 from .subtitle_utils import merge_subtitle_makers
+from .workspace import get_workspace
 from funutil import getLogger
 
 
@@ -264,25 +265,34 @@ def _cleanup_temp_files(responses: List[TTSResponse], keep_file: str):
         for response in responses:
             # 删除原始音频文件（除了要保留的文件）
             if response.audio_file and response.audio_file != keep_file:
-                if os.path.exists(response.audio_file):
-                    os.remove(response.audio_file)
+                if _remove_file(response.audio_file):
                     logger.info(f"清理临时音频文件: {response.audio_file}")
 
             # 删除原始字幕文件
-            if response.subtitle_file and os.path.exists(response.subtitle_file):
-                os.remove(response.subtitle_file)
+            if response.subtitle_file and _remove_file(response.subtitle_file):
                 logger.info(f"清理临时字幕文件: {response.subtitle_file}")
 
-            if response.frt_subtitle_file and os.path.exists(
+            if response.frt_subtitle_file and _remove_file(
                 response.frt_subtitle_file
             ):
-                os.remove(response.frt_subtitle_file)
                 logger.info(f"清理临时FRT字幕文件: {response.frt_subtitle_file}")
 
     except Exception as e:
         logger.warning(f"清理临时文件时出错: {e}")
 
 
+def _remove_file(file_path: str) -> bool:
+    """删除文件，临时工作区中的文件同时取消管理"""
+    workspace = get_workspace()
+    if workspace.owns(file_path):
+        workspace.discard(file_path)
+        return True
+    if os.path.exists(file_path):
+        os.remove(file_path)
+        return True
+    return False
+
+
 def create_batch_response(
     responses: List[TTSResponse], batch_info: Optional[Dict[str, Any]] = None
 ) -> TTSResponse:
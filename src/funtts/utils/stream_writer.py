@@ -0,0 +1,233 @@
+"""
+流式输出写入器
+把按顺序到达的音频片段和字幕边追加边写入同一个输出文件，
+不把全部音频或字幕保留在内存中，也不在结束时重新读取和探测整个文件。
+"""
+
+import json
+import os
+import wave
+from typing import Optional
+
+from funutil import getLogger
+
+from ..models import AudioSegment, SubtitleMaker
+from .audio_utils import mp3_frame_index
+
+logger = getLogger("funtts")
+
+# 支持按片段直接拼接的音频格式
+STREAMABLE_FORMATS = ("wav", "mp3")
+
+
+def _skip_id3(data: bytes) -> bytes:
+    """去掉MP3数据开头的ID3v2标签，拼接时只保留第一个片段的标签"""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (
+            (data[6] & 0x7F) << 21
+            | (data[7] & 0x7F) << 14
+            | (data[8] & 0x7F) << 7
+            | (data[9] & 0x7F)
+        )
+        return data[10 + size :]
+    return data
+
+
+class AudioStreamWriter:
+    """音频流式写入器
+
+    - wav: 逐块复制PCM帧，关闭时由wave模块回填文件头中的长度；
+      所有片段的采样率、声道数和位深必须一致
+    - mp3: 在帧边界直接拼接，时长由帧头推算，不解码
+
+    使用示例:
+        with AudioStreamWriter("book.wav") as writer:
+            for path in chunk_files:
+                writer.append_file(path)
+                writer.add_silence(0.3)
+    """
+
+    def __init__(self, file_path: str, format: Optional[str] = None):
+        """
+        Args:
+            file_path: 输出文件路径
+            format: 音频格式（wav/mp3），默认按文件扩展名判断
+        """
+        self.file_path = file_path
+        self.format = (format or os.path.splitext(file_path)[1][1:]).lower()
+        if self.format not in STREAMABLE_FORMATS:
+            raise ValueError(
+                f"不支持流式拼接的音频格式: {self.format}，"
+                f"支持: {', '.join(STREAMABLE_FORMATS)}"
+            )
+        directory = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(directory, exist_ok=True)
+        self.duration = 0.0
+        self._wave: Optional[wave.Wave_write] = None
+        self._params = None
+        self._file = open(file_path, "wb") if self.format == "mp3" else None
+        self._silence_warned = False
+
+    def append_file(self, audio_file: str, chunk_frames: int = 65536) -> float:
+        """追加一个音频文件，返回其时长（秒）"""
+        if self.format == "mp3":
+            with open(audio_file, "rb") as file:
+                data = file.read()
+            return self.append_mp3(data)
+
+        with wave.open(audio_file, "rb") as source:
+            params = (
+                source.getnchannels(),
+                source.getsampwidth(),
+                source.getframerate(),
+            )
+            if self._wave is None:
+                self._wave = wave.open(self.file_path, "wb")
+                self._wave.setnchannels(params[0])
+                self._wave.setsampwidth(params[1])
+                self._wave.setframerate(params[2])
+                self._params = params
+            elif params != self._params:
+                raise ValueError(
+                    f"音频参数不一致: {audio_file} 为{params}，输出文件为{self._params}"
+                    "（声道数, 位深, 采样率）"
+                )
+            frames = source.getnframes()
+            while True:
+                data = source.readframes(chunk_frames)
+                if not data:
+                    break
+                self._wave.writeframesraw(data)
+        duration = frames / params[2]
+        self.duration += duration
+        return duration
+
+    def append_mp3(self, data: bytes) -> float:
+        """追加MP3数据，返回其时长（秒）"""
+        if self._file.tell():
+            data = _skip_id3(data)
+        frames = mp3_frame_index(data)
+        duration = 0.0
+        if len(frames) >= 2:
+            duration = frames[-1][1] + (frames[-1][1] - frames[-2][1])
+        self._file.write(data)
+        self.duration += duration
+        return duration
+
+    def add_silence(self, seconds: float) -> float:
+        """追加静音，返回实际追加的时长
+
+        MP3不解码就无法生成静音帧，此时不追加（返回0）。
+        """
+        if seconds <= 0:
+            return 0.0
+        if self.format == "mp3" or self._wave is None:
+            if self.format == "mp3" and not self._silence_warned:
+                logger.warning("MP3流式拼接不支持插入静音，片段之间将不留间隔")
+                self._silence_warned = True
+            return 0.0
+        channels, width, rate = self._params
+        frames = int(round(seconds * rate))
+        self._wave.writeframesraw(b"\0" * (frames * channels * width))
+        duration = frames / rate
+        self.duration += duration
+        return duration
+
+    def close(self):
+        if self._wave is not None:
+            # wave在关闭时回填RIFF和data块的长度
+            self._wave.close()
+            self._wave = None
+        elif self.format == "wav" and not os.path.exists(self.file_path):
+            # 没有任何片段时也输出一个有效的空wav文件
+            with wave.open(self.file_path, "wb") as empty:
+                empty.setnchannels(1)
+                empty.setsampwidth(2)
+                empty.setframerate(16000)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "AudioStreamWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SubtitleStreamWriter:
+    """字幕流式写入器，支持SRT、VTT和FRT格式
+
+    片段写入后立即落盘；FRT的total_duration字段在关闭时写在segments之后，
+    JSON对象的字段顺序不影响读取。
+    """
+
+    def __init__(self, file_path: str, format_type: Optional[str] = None):
+        """
+        Args:
+            file_path: 输出文件路径
+            format_type: 字幕格式（srt/vtt/frt），默认按文件扩展名判断
+        """
+        self.file_path = file_path
+        self.format_type = (format_type or os.path.splitext(file_path)[1][1:]).lower()
+        if self.format_type not in ("srt", "vtt", "frt"):
+            raise ValueError(f"不支持流式写入的字幕格式: {self.format_type}")
+        directory = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(directory, exist_ok=True)
+        self.count = 0
+        self.duration = 0.0
+        # 复用SubtitleMaker的时间格式和片段导出规则
+        self._maker = SubtitleMaker()
+        self._file = open(file_path, "w", encoding="utf-8")
+        if self.format_type == "vtt":
+            self._file.write("WEBVTT\n\n")
+        elif self.format_type == "frt":
+            self._file.write('{"format": "FRT", "version": "1.0", "segments": [')
+
+    def write(self, segment: AudioSegment, offset: float = 0.0):
+        """写入一个片段，时间加上offset"""
+        start = segment.start_time + offset
+        end = segment.end_time + offset
+        self.count += 1
+        self.duration = max(self.duration, end)
+        text = segment.text
+        speaker = (
+            segment.get_display_speaker()
+            if segment.speaker_name or segment.speaker_id
+            else None
+        )
+        if self.format_type == "srt":
+            text = f"[{speaker}] {text}" if speaker else text
+            self._file.write(
+                f"{self.count}\n{self._maker._format_time(start)} --> "
+                f"{self._maker._format_time(end)}\n{text}\n\n"
+            )
+        elif self.format_type == "vtt":
+            text = f"<v {speaker}>{text}" if speaker else text
+            self._file.write(
+                f"{self._maker._format_time(start, use_comma=False)} --> "
+                f"{self._maker._format_time(end, use_comma=False)}\n{text}\n\n"
+            )
+        else:
+            data = SubtitleMaker._export_dict(start, end, segment.segment_id, segment)
+            prefix = "\n  " if self.count == 1 else ",\n  "
+            self._file.write(prefix + json.dumps(data, ensure_ascii=False))
+
+    def write_maker(self, subtitle_maker: SubtitleMaker, offset: float = 0.0):
+        """写入一个字幕制作器中的全部片段"""
+        for segment in subtitle_maker.get_segments():
+            self.write(segment, offset)
+
+    def close(self):
+        if self._file is None:
+            return
+        if self.format_type == "frt":
+            self._file.write(f'\n], "total_duration": {self.duration}}}\n')
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "SubtitleStreamWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
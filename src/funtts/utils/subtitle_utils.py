@@ -3,8 +3,9 @@
 提供SubtitleMaker合并等功能
 """
 
+import os
 from typing import List, Optional
-from ..models import SubtitleMaker, AudioSegment
+from ..models import SubtitleMaker, AudioSegment, ConcatSubtitleMaker
 from funutil import getLogger
 
 logger = getLogger("funtts")
@@ -14,13 +15,18 @@ def merge_subtitle_makers(
     subtitle_makers: List[SubtitleMaker],
     time_offsets: Optional[List[float]] = None,
     gap_duration: float = 0.5,
+    as_view: bool = True,
 ) -> SubtitleMaker:
     """合并多个SubtitleMaker对象
 
+    默认返回拼接视图（ConcatSubtitleMaker），只记录源字幕制作器和各自的时间偏移，
+    不复制片段；导出时即时叠加偏移，修改或访问片段列表时才物化。
+
     Args:
         subtitle_makers: SubtitleMaker对象列表
         time_offsets: 每个字幕的时间偏移列表，如果为None则自动计算
         gap_duration: 字幕间隔时长（秒）
+        as_view: 是否返回拼接视图，False时立即复制所有片段
 
     Returns:
         SubtitleMaker: 合并后的字幕制作器
@@ -37,7 +43,6 @@ def merge_subtitle_makers(
         return merged
 
     try:
-        merged = SubtitleMaker()
         current_offset = 0.0
 
         # 如果没有提供时间偏移，自动计算
@@ -58,35 +63,13 @@ def merge_subtitle_makers(
                     time_offsets[-1] + gap_duration if time_offsets else 0.0
                 )
 
-        # 合并所有片段
-        for i, (maker, offset) in enumerate(zip(subtitle_makers, time_offsets)):
-            logger.info(f"合并第{i + 1}个字幕制作器，时间偏移: {offset}秒")
-
-            for segment in maker.segments:
-                # 创建新的片段，调整时间
-                new_segment = AudioSegment(
-                    start_time=segment.start_time + offset,
-                    end_time=segment.end_time + offset,
-                    text=segment.text,
-                    speaker_id=segment.speaker_id,
-                    speaker_name=segment.speaker_name,
-                    voice_name=segment.voice_name,
-                    emotion=segment.emotion,
-                    style=segment.style,
-                    segment_id=f"{i}_{segment.segment_id}"
-                    if segment.segment_id
-                    else f"{i}_{len(merged.segments)}",
-                    metadata=segment.metadata.copy() if segment.metadata else {},
-                )
-
-                merged.segments.append(new_segment)
-
-        # 更新总时长
-        if merged.segments:
-            merged._total_duration = max(seg.end_time for seg in merged.segments)
+        merged = ConcatSubtitleMaker(list(zip(subtitle_makers, time_offsets)))
+        if not as_view:
+            merged._materialize()
 
         logger.success(
-            f"字幕合并完成，共{len(merged.segments)}个片段，总时长{merged._total_duration:.2f}秒"
+            f"字幕合并完成，共{len(subtitle_makers)}个字幕制作器、{len(merged)}个片段，"
+            f"总时长{merged.get_total_duration():.2f}秒"
         )
         return merged
 
@@ -243,3 +226,34 @@ def adjust_subtitle_timing(
     except Exception as e:
         logger.error(f"字幕时间调整失败: {e}")
         return SubtitleMaker()
+
+
+def convert_subtitle_file(
+    input_file: str, output_file: str, format_type: Optional[str] = None
+) -> bool:
+    """转换字幕文件格式
+
+    FRT与FRTB之间的转换是无损的。
+
+    Args:
+        input_file: 输入字幕文件路径（SRT/VTT/FRT/FRTB）
+        output_file: 输出字幕文件路径
+        format_type: 输出格式，为None时根据输出文件扩展名判断
+
+    Returns:
+        bool: 是否转换成功
+    """
+    if format_type is None:
+        format_type = os.path.splitext(output_file)[1].lstrip(".") or "srt"
+
+    subtitle_maker = SubtitleMaker.load_from_file_static(input_file)
+    if subtitle_maker is None:
+        logger.error(f"字幕文件加载失败: {input_file}")
+        return False
+
+    if not SubtitleMaker.save_to_file_static(subtitle_maker, output_file, format_type):
+        logger.error(f"字幕文件保存失败: {output_file}")
+        return False
+
+    logger.success(f"字幕格式转换完成: {input_file} -> {output_file}")
+    return True
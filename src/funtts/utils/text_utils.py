@@ -0,0 +1,91 @@
+"""
+文本处理工具函数
+提供按句切分和按长度分块等功能
+"""
+
+import re
+import unicodedata
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# 句末标点（含其后的右引号、括号），英文句点后需跟空白才算句末
+_SENTENCE_END = re.compile(r"(?:[。！？!?；;…\n]+|\.(?=\s))[」』”’\"')）]*")
+# 超长无标点文本的次级切分点
+_SOFT_BREAK = re.compile(r"[，,、：:\s]")
+# 段落分隔：空行
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本，用于判断两段文本的合成结果是否相同
+
+    NFKC规范化（全角字母数字转半角等）并合并空白，
+    不改变大小写和标点，它们会影响朗读的语调和停顿。
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def split_sentences(text: str, max_chars: int = 200) -> Tuple[List[str], str]:
+    """从文本中切出完整的句子
+
+    Args:
+        text: 待切分文本
+        max_chars: 没有句末标点时，剩余文本超过该长度就在最后一个次级切分点处切开
+
+    Returns:
+        (完整句子列表, 未完成的剩余文本)
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentence = text[start : match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    rest = text[start:]
+    while len(rest) > max_chars:
+        breaks = [m.end() for m in _SOFT_BREAK.finditer(rest, 0, max_chars)]
+        cut = breaks[-1] if breaks else max_chars
+        sentences.append(rest[:cut].strip())
+        rest = rest[cut:]
+    return [sentence for sentence in sentences if sentence], rest
+
+
+def chunk_text(
+    text: str,
+    max_chars: int = 200,
+    isolate: Optional[Callable[[str], bool]] = None,
+) -> Iterator[str]:
+    """把长文本切成适合一次合成的文本块
+
+    按句合并，每块不超过max_chars（单句超长时按次级切分点切开），
+    文本块不跨段落，段落之间的停顿由调用方决定。
+
+    Args:
+        text: 待切分文本
+        max_chars: 每块的最大字符数
+        isolate: 对返回True的句子单独成块，不与前后的句子合并
+
+    Yields:
+        str: 文本块
+    """
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        sentences, rest = split_sentences(paragraph, max_chars)
+        if rest.strip():
+            sentences.append(rest.strip())
+        chunk = ""
+        for sentence in sentences:
+            if isolate is not None and isolate(sentence):
+                if chunk:
+                    yield chunk
+                    chunk = ""
+                yield sentence
+                continue
+            if chunk and len(chunk) + len(sentence) > max_chars:
+                yield chunk
+                chunk = ""
+            # 中文句子直接相连，其他语言的句子之间保留空格
+            joiner = " " if chunk and chunk[-1].isascii() else ""
+            chunk = f"{chunk}{joiner}{sentence}"
+        if chunk:
+            yield chunk
@@ -0,0 +1,165 @@
+"""
+torch引擎的CPU推理配置
+统一设置intra-op/inter-op线程数，在torch.inference_mode()下推理，
+并可选对模型的线性层做动态int8量化。
+"""
+
+import contextlib
+import os
+import threading
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Any, Dict, List, Optional, Union
+
+from funutil import getLogger
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+logger = getLogger("funtts")
+
+# 线程数是进程级的设置，多个引擎实例共用
+_threads_lock = threading.Lock()
+
+
+@dataclass
+class CPUProfile:
+    """torch引擎的CPU推理配置
+
+    - intra_op_threads: 单个算子内的并行线程数；None时按 CPU核数 // workers 计算，
+      workers为1时保持torch的默认值（等于CPU核数）
+    - inter_op_threads: 算子之间的并行线程数，None保持torch的默认值；
+      torch只允许在进程开始并行计算之前设置一次
+    - workers: 同一台机器上的推理进程数，多进程部署时避免每个进程都占满所有核
+    - inference_mode: 合成时是否在torch.inference_mode()下运行，不记录autograd信息
+    - quantize: 是否对nn.Linear层做动态int8量化，只在CPU设备上生效，
+      会带来少量精度损失，可先用 `funtts bench-cpu` 对比效果
+
+    线程数对整个进程生效，同一进程内的多个引擎应使用相同的线程配置。
+
+    使用示例:
+        profile = CPUProfile.from_value({"workers": 4, "quantize": True})
+        profile.apply_threads()
+        model = load_model()
+        profile.quantize_modules("cpu", {"decoder": model})
+        with profile.inference():
+            audio = model.generate(...)
+    """
+
+    intra_op_threads: Optional[int] = None
+    inter_op_threads: Optional[int] = None
+    workers: int = 1
+    inference_mode: bool = True
+    quantize: bool = False
+
+    @classmethod
+    def from_value(
+        cls, value: Union[None, str, Dict[str, Any], "CPUProfile"]
+    ) -> "CPUProfile":
+        """从预设名、参数字典或实例创建配置，None使用默认配置"""
+        if value is None:
+            return cls()
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            if value not in CPU_PROFILE_PRESETS:
+                available = ", ".join(CPU_PROFILE_PRESETS)
+                raise ValueError(f"未知的CPU推理配置: {value}. 可用配置: {available}")
+            return replace(CPU_PROFILE_PRESETS[value])
+        if isinstance(value, dict):
+            names = {field.name for field in fields(cls)}
+            unknown = set(value) - names
+            if unknown:
+                raise ValueError(f"未知的CPU推理配置参数: {', '.join(sorted(unknown))}")
+            return cls(**value)
+        raise TypeError(f"无法识别的CPU推理配置: {value!r}")
+
+    def resolve_threads(self) -> Optional[int]:
+        """intra-op线程数，None表示保持torch的默认值"""
+        if self.intra_op_threads:
+            return max(1, self.intra_op_threads)
+        if self.workers > 1:
+            return max(1, (os.cpu_count() or 1) // self.workers)
+        return None
+
+    def apply_threads(self):
+        """设置torch的线程数，应在加载模型之前调用"""
+        if torch is None:
+            return
+        with _threads_lock:
+            threads = self.resolve_threads()
+            if threads and torch.get_num_threads() != threads:
+                torch.set_num_threads(threads)
+                logger.info(f"torch intra-op线程数设置为 {threads}")
+            inter = self.inter_op_threads
+            if inter and torch.get_num_interop_threads() != inter:
+                try:
+                    torch.set_num_interop_threads(max(1, inter))
+                    logger.info(f"torch inter-op线程数设置为 {inter}")
+                except RuntimeError as e:
+                    # 进程已经开始并行计算后不能再修改
+                    logger.warning(f"无法设置torch inter-op线程数: {e}")
+
+    def quantize_modules(self, device: str, modules: Dict[str, Any]) -> List[str]:
+        """对模块的nn.Linear层做原地的动态int8量化
+
+        Args:
+            device: 模型所在的设备，非CPU设备不量化
+            modules: 名称到模块的映射，不是nn.Module的值会被跳过
+
+        Returns:
+            List[str]: 完成量化的模块名称
+        """
+        if not self.quantize or torch is None:
+            return []
+        if device != "cpu":
+            logger.info(f"设备为 {device}，跳过动态int8量化")
+            return []
+        if torch.backends.quantized.engine == "none":
+            logger.warning("当前torch构建不支持量化，跳过动态int8量化")
+            return []
+
+        quantization = getattr(torch, "ao", torch).quantization
+        quantized = []
+        for name, module in modules.items():
+            if not isinstance(module, torch.nn.Module):
+                continue
+            try:
+                # 原地替换，模型内部对子模块的其他引用仍然有效
+                quantization.quantize_dynamic(
+                    module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+                )
+                quantized.append(name)
+            except Exception as e:
+                logger.warning(f"动态int8量化失败，继续使用fp32权重: {name}, {e}")
+        if quantized:
+            logger.info(f"已对模块做动态int8量化: {', '.join(quantized)}")
+        return quantized
+
+    def inference(self):
+        """推理上下文：开启inference_mode时关闭autograd记录"""
+        if torch is None or not self.inference_mode:
+            return contextlib.nullcontext()
+        if hasattr(torch, "inference_mode"):
+            return torch.inference_mode()
+        return torch.no_grad()
+
+    def describe(self) -> Dict[str, Any]:
+        """配置及当前实际生效的线程数"""
+        info = asdict(self)
+        if torch is not None:
+            info["num_threads"] = torch.get_num_threads()
+            info["num_interop_threads"] = torch.get_num_interop_threads()
+        return info
+
+
+# 预设配置，供 cpu_profile="int8" 等简写和 bench-cpu 对比使用
+CPU_PROFILE_PRESETS: Dict[str, CPUProfile] = {
+    # torch默认行为：记录autograd信息、fp32权重
+    "torch": CPUProfile(inference_mode=False),
+    # 默认配置：inference_mode推理
+    "default": CPUProfile(),
+    # inference_mode推理 + 线性层动态int8量化
+    "int8": CPUProfile(quantize=True),
+}
@@ -0,0 +1,430 @@
+"""
+临时工作区管理
+为引擎和工具函数统一分配临时文件：每个进程一个工作区目录，
+支持可配置的根目录和字节配额，文件生命周期通过引用计数绑定到TTSResponse，
+超出配额时按LRU顺序清理不再被引用的文件，进程退出时删除整个工作区。
+"""
+
+import atexit
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from funutil import getLogger
+
+logger = getLogger("funtts")
+
+# 默认配额：1GB
+DEFAULT_QUOTA_BYTES = 1024 * 1024 * 1024
+
+# 工作区目录名前缀，后接主机名和进程号：ws-<hostname>-<pid>
+WORKSPACE_PREFIX = "ws-"
+
+# track()期间分配的文件路径
+_allocations: ContextVar[Optional[List[str]]] = ContextVar(
+    "funtts_workspace_allocations", default=None
+)
+
+
+@dataclass
+class _TempEntry:
+    """工作区中的一个临时文件"""
+
+    refs: int = 1  # 引用计数，分配者持有初始引用
+    claimed: bool = False  # 初始引用是否已转交给TTSResponse
+    size: int = 0  # 最近一次统计的文件大小
+    last_used: float = 0.0  # 最近使用时间
+
+
+class TempWorkspace:
+    """进程级临时工作区
+
+    - allocate()原子创建临时文件，分配者持有一个引用
+    - attach(response)将响应中属于工作区的文件交给响应持有，
+      响应对象被回收时自动释放引用
+    - 引用计数归零的文件保留在磁盘上，超出配额时按LRU顺序删除
+    - track()期间分配但没有交给响应的文件（如合成失败），退出时释放初始引用
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        quota_bytes: Optional[int] = DEFAULT_QUOTA_BYTES,
+    ):
+        """初始化工作区
+
+        Args:
+            root: 工作区根目录，进程工作区为其下的ws-<hostname>-<pid>子目录；
+                None时使用环境变量FUNTTS_TEMP_DIR或系统临时目录下的funtts
+            quota_bytes: 字节配额，None或0表示不限制
+        """
+        if root is None:
+            root = os.environ.get("FUNTTS_TEMP_DIR") or os.path.join(
+                tempfile.gettempdir(), "funtts"
+            )
+        self.root = os.path.abspath(root)
+        self.host = _host_name()
+        self.path = os.path.join(
+            self.root, f"{WORKSPACE_PREFIX}{self.host}-{os.getpid()}"
+        )
+        self.quota_bytes = quota_bytes or None
+
+        self._entries: "OrderedDict[str, _TempEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._evicted_files = 0
+        self._evicted_bytes = 0
+        # 已记录的文件大小之和，未超出配额时sweep不必逐个统计文件
+        self._used_bytes = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        _cleanup_stale_workspaces(self.root, self.host)
+        atexit.register(self.cleanup)
+
+    def allocate(self, suffix: str = "", prefix: str = "funtts_") -> str:
+        """在工作区中原子创建一个临时文件
+
+        Args:
+            suffix: 文件后缀（如 ".wav"）
+            prefix: 文件名前缀
+
+        Returns:
+            str: 临时文件路径，分配者持有一个引用
+        """
+        if self.quota_bytes:
+            self.sweep()
+        os.makedirs(self.path, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix, dir=self.path)
+        os.close(fd)
+        with self._lock:
+            self._entries[path] = _TempEntry(last_used=time.time())
+        tracked = _allocations.get()
+        if tracked is not None:
+            tracked.append(path)
+        return path
+
+    @contextmanager
+    def track(self):
+        """跟踪一次调用期间分配的文件
+
+        退出时仍未通过attach()交给响应的文件释放分配者的初始引用，
+        失败的合成不会让临时文件一直被引用而无法清理。
+        在线程池中执行的部分需要复制调用方的上下文（contextvars.copy_context）才会被跟踪。
+        """
+        paths: List[str] = []
+        token = _allocations.set(paths)
+        try:
+            yield paths
+        finally:
+            _allocations.reset(token)
+            self._release_unclaimed(paths)
+
+    def _release_unclaimed(self, paths: List[str]):
+        released = False
+        with self._lock:
+            for path in paths:
+                entry = self._entries.get(path)
+                if entry is None or entry.claimed or entry.refs <= 0:
+                    continue
+                # 初始引用已释放，之后attach()的响应各自增加引用
+                entry.claimed = True
+                entry.refs -= 1
+                entry.last_used = time.time()
+                self._entries.move_to_end(path)
+                if entry.refs == 0:
+                    self._resize(path, entry)
+                    released = True
+        if released and self.quota_bytes:
+            self.sweep()
+
+    def adopt(self, file_path: str) -> bool:
+        """将已存在（或即将写入）的文件纳入工作区管理
+
+        仅接受位于工作区目录内的文件。
+
+        Returns:
+            bool: 文件是否由工作区管理
+        """
+        path = os.path.abspath(file_path)
+        if os.path.dirname(path) != self.path:
+            return False
+        with self._lock:
+            if path not in self._entries:
+                entry = _TempEntry(last_used=time.time())
+                self._entries[path] = entry
+                self._resize(path, entry)
+        return True
+
+    def owns(self, file_path: str) -> bool:
+        """判断文件是否由工作区管理"""
+        with self._lock:
+            return os.path.abspath(file_path) in self._entries
+
+    def acquire(self, file_path: str) -> bool:
+        """增加文件引用"""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return False
+            entry.refs += 1
+            entry.last_used = time.time()
+            self._entries.move_to_end(path)
+            return True
+
+    def release(self, file_path: str):
+        """释放文件引用，引用归零后文件可被LRU清理"""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry.refs <= 0:
+                return
+            entry.refs -= 1
+            entry.last_used = time.time()
+            self._entries.move_to_end(path)
+            if entry.refs == 0:
+                self._resize(path, entry)
+        if self.quota_bytes:
+            self.sweep()
+
+    def attach(self, response: Any) -> Any:
+        """将响应中属于工作区的文件的生命周期绑定到响应对象
+
+        分配者持有的初始引用转交给响应；同一文件被多个响应共享时
+        每个响应各持有一个引用。响应对象被回收时自动释放。
+
+        Args:
+            response: TTSResponse对象
+
+        Returns:
+            传入的响应对象
+        """
+        paths = []
+        for file_path in (
+            response.audio_file,
+            response.subtitle_file,
+            response.frt_subtitle_file,
+        ):
+            if not file_path or not self.adopt(file_path):
+                continue
+            path = os.path.abspath(file_path)
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is None:
+                    continue
+                if entry.claimed:
+                    entry.refs += 1
+                else:
+                    entry.claimed = True
+                    # 交给响应时文件已写完
+                    self._resize(path, entry)
+                entry.last_used = time.time()
+                self._entries.move_to_end(path)
+            paths.append(path)
+
+        if paths:
+            weakref.finalize(response, self._release_all, tuple(paths))
+        return response
+
+    def _release_all(self, paths):
+        for path in paths:
+            self.release(path)
+
+    def forget(self, file_path: str):
+        """停止管理文件但不删除（文件已被移动到工作区之外）"""
+        with self._lock:
+            self._drop(os.path.abspath(file_path))
+
+    def discard(self, file_path: str):
+        """立即删除文件，不考虑引用计数"""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            self._drop(path)
+        _remove_file(path)
+
+    def _resize(self, path: str, entry: _TempEntry):
+        """重新统计文件大小并更新占用总数，调用方需持有锁"""
+        size = _file_size(path)
+        self._used_bytes += size - entry.size
+        entry.size = size
+
+    def _drop(self, path: str) -> Optional[_TempEntry]:
+        """移除文件记录并更新占用总数，调用方需持有锁"""
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._used_bytes -= entry.size
+        return entry
+
+    def usage(self) -> int:
+        """逐个统计工作区当前占用的字节数"""
+        with self._lock:
+            for path, entry in self._entries.items():
+                self._resize(path, entry)
+            return self._used_bytes
+
+    def sweep(self, target_bytes: Optional[int] = None) -> int:
+        """按LRU顺序删除不再被引用的文件，直到占用不超过目标值
+
+        Args:
+            target_bytes: 目标占用字节数，None时使用配额
+
+        Returns:
+            int: 删除的文件数量
+        """
+        if target_bytes is None:
+            target_bytes = self.quota_bytes
+        if target_bytes is None:
+            return 0
+
+        removed = 0
+        with self._lock:
+            # 已记录的大小未超出目标时直接返回，超出时再逐个统计确认
+            if self._used_bytes <= target_bytes:
+                return 0
+            used = self.usage()
+            if used <= target_bytes:
+                return 0
+            for path in list(self._entries):
+                if used <= target_bytes:
+                    break
+                entry = self._entries[path]
+                if entry.refs > 0:
+                    continue
+                self._drop(path)
+                _remove_file(path)
+                used -= entry.size
+                removed += 1
+                self._evicted_files += 1
+                self._evicted_bytes += entry.size
+
+        if used > target_bytes:
+            logger.warning(
+                f"临时工作区超出配额: {used}/{target_bytes} 字节，剩余文件仍被引用"
+            )
+        elif removed:
+            logger.debug(f"临时工作区清理了 {removed} 个文件")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """获取工作区状态"""
+        with self._lock:
+            used = self.usage()
+            pinned = sum(1 for entry in self._entries.values() if entry.refs > 0)
+            return {
+                "path": self.path,
+                "quota_bytes": self.quota_bytes,
+                "usage_bytes": used,
+                "files": len(self._entries),
+                "pinned_files": pinned,
+                "evictable_files": len(self._entries) - pinned,
+                "evicted_files": self._evicted_files,
+                "evicted_bytes": self._evicted_bytes,
+            }
+
+    def cleanup(self):
+        """删除整个工作区目录"""
+        with self._lock:
+            self._entries.clear()
+            self._used_bytes = 0
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"删除临时文件失败: {path}, {e}")
+
+
+def _host_name() -> str:
+    """用于工作区目录名的主机名，去掉不能出现在目录名中的字符"""
+    host = socket.gethostname() or "localhost"
+    return "".join(c if c.isalnum() or c in "._" else "_" for c in host)
+
+
+def _cleanup_stale_workspaces(root: str, host: str):
+    """删除本机已退出进程遗留的工作区目录
+
+    根目录可能由多台主机（或多个容器）共享，进程号只在本机有意义，
+    因此只检查主机名与本机相同的目录，其他主机的工作区由其自己清理。
+    """
+    if os.name != "posix":
+        return
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    prefix = f"{WORKSPACE_PREFIX}{host}-"
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        try:
+            pid = int(name[len(prefix) :])
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            logger.info(f"清理遗留的临时工作区: {name}")
+        except OSError:
+            continue
+
+
+_workspace: Optional[TempWorkspace] = None
+_workspace_lock = threading.Lock()
+
+
+def get_workspace() -> TempWorkspace:
+    """获取全局临时工作区
+
+    首次调用时根据环境变量FUNTTS_TEMP_DIR和FUNTTS_TEMP_QUOTA（字节）创建。
+    """
+    global _workspace
+    if _workspace is None:
+        with _workspace_lock:
+            if _workspace is None:
+                quota = os.environ.get("FUNTTS_TEMP_QUOTA")
+                _workspace = TempWorkspace(
+                    quota_bytes=int(quota) if quota else DEFAULT_QUOTA_BYTES
+                )
+    return _workspace
+
+
+def configure_workspace(
+    root: Optional[str] = None, quota_bytes: Optional[int] = DEFAULT_QUOTA_BYTES
+) -> TempWorkspace:
+    """配置全局临时工作区
+
+    应在开始合成前调用；之前分配的文件仍由旧工作区管理。
+
+    Args:
+        root: 工作区根目录
+        quota_bytes: 字节配额，None或0表示不限制
+
+    Returns:
+        TempWorkspace: 新的全局工作区
+    """
+    global _workspace
+    with _workspace_lock:
+        _workspace = TempWorkspace(root=root, quota_bytes=quota_bytes)
+    return _workspace